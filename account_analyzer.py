@@ -19,6 +19,9 @@ from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 from openpyxl.utils import get_column_letter
 
+from char_classes import char_stats, char_stats_many
+from classifier import get_classifier
+
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
@@ -192,27 +195,10 @@ def fetch_user_tweets(username, api_key, count=100):
 
 
 def classify_opening_pattern(text):
-    """冒頭パターンを分類"""
+    """冒頭パターンを分類（classifier のルールセット "opening:account"）"""
     # 改行や空白を除去して最初の文を取得
     first_line = text.strip().split("\n")[0].strip()
-
-    # 数字提示パターン（冒頭に数字がある）
-    if re.match(r"^\d+[.、。:：\s]", first_line):
-        return "数字提示"
-
-    # 疑問形パターン（？で終わる、または疑問詞で始まる）
-    if "？" in first_line or "?" in first_line or re.match(r"^(何|どう|いつ|どこ|誰|なぜ|どの)", first_line):
-        return "疑問形"
-
-    # 断定形パターン（です、だ、である、ですで終わる）
-    if re.search(r"(です|だ|である|ます|ました|でした)[\s。]*$", first_line):
-        return "断定形"
-
-    # 共感パターン（わかる、あるある、そう、ほんと、まじ など）
-    if re.search(r"(わかる|あるある|そう|ほんと|まじ|やば|すご|えぐ)", first_line, re.IGNORECASE):
-        return "共感"
-
-    return "その他"
+    return get_classifier("opening:account").classify(first_line)
 
 
 def detect_cta(text):
@@ -290,14 +276,18 @@ def detect_url(text):
     return bool(re.search(r"https?://", text))
 
 
-def detect_special_chars(text):
-    """特殊記号の使用を検出"""
-    chars = {
-        "矢印": bool(re.search(r"[→⇒➡]", text)),
-        "括弧": bool(re.search(r"[【】『』「」]", text)),
-        "記号": bool(re.search(r"[★☆◆◇■□▼▲]", text)),
+def _special_chars(stats):
+    """char_classes の集計 → 特殊記号の有無"""
+    return {
+        "矢印": bool(stats["arrow"]),
+        "括弧": bool(stats["bracket"]),
+        "記号": bool(stats["symbol"]),
     }
-    return chars
+
+
+def detect_special_chars(text):
+    """特殊記号（矢印 →⇒➡ / 括弧 【】『』「」 / 記号 ★☆◆◇■□▼▲）の使用を検出"""
+    return _special_chars(char_stats(text))
 
 
 def count_chars(text):
@@ -379,8 +369,9 @@ def analyze_account(username, tweets):
     retweets = [tweet.get("retweetCount", 0) for tweet in tweets]
     replies = [tweet.get("replyCount", 0) for tweet in tweets]
 
-    # 各投稿にエンゲージメントスコアと詳細分析を付与
-    for tweet in tweets:
+    # 各投稿にエンゲージメントスコアと詳細分析を付与（特殊記号は全投稿まとめて1回で数える）
+    char_stats_list = char_stats_many([tweet.get("text", "") for tweet in tweets]).to_dict("records")
+    for tweet, chars in zip(tweets, char_stats_list):
         text = tweet.get("text", "")
         tweet["engagement_score"] = (
             tweet.get("likeCount", 0) +
@@ -394,7 +385,7 @@ def analyze_account(username, tweets):
         tweet["emotions"] = analyze_emotion(text)
         tweet["theme"] = classify_theme(text)
         tweet["has_url"] = detect_url(text)
-        tweet["special_chars"] = detect_special_chars(text)
+        tweet["special_chars"] = _special_chars(chars)
 
     # バズった投稿TOP5とバズらなかった投稿TOP5
     sorted_tweets = sorted(tweets, key=lambda x: x["engagement_score"], reverse=True)
@@ -17,6 +17,7 @@ import re
 from collections import Counter, defaultdict
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from analyze_posts import (
@@ -759,6 +760,328 @@ def analyze_early_engagement_potential(df):
     }
 
 
+# ========================================
+# 8. DB全体の一括分析（列指向）
+# ========================================
+# テキスト由来の判定は1投稿につき1回だけ行って algorithm_features テーブルに保存し、
+# 集計はいいね・RT・リプライと判定結果の配列に対するNumPy演算だけで行う。
+
+FEATURE_CHUNK_SIZE = 5000
+TONE_FRIENDLY = ["建設的", "ポジティブ", "煽り（建設的）", "中立"]
+DWELL_BUCKETS = ["高(15-20)", "中(10-14)", "低(0-9)"]
+# 文字列の判定結果は整数コード（出現順）に変換して持つ
+CODED_COLUMNS = ("category", "link_type", "tone", "velocity")
+
+# algorithm_features の判定列（post_features の戻り値の順）
+FEATURE_COLUMNS = ["category", "is_thread", "link_type", "tone", "dwell_score", "early_score", "velocity"]
+
+_columns = {}  # db_path → (状態, 読み込んだ行, (列の辞書, コード → ラベル))
+_version = None
+
+
+def post_features(text):
+    """1投稿分のテキスト由来の判定をまとめて返す
+
+    戻り値: (カテゴリ, スレッド型か, リンク種別, トーン, 滞在時間スコア, 早期反応スコア, 速度)
+    """
+    text = text or ""
+    thread = detect_thread_structure(text)
+    link = detect_external_links(text)
+    early = predict_early_engagement(text)
+    if link["has_external_link"]:
+        link_type = "external"
+    elif link["has_x_link"]:
+        link_type = "x"
+    else:
+        link_type = "none"
+    return (
+        classify_category(text),
+        int(thread["is_thread_starter"] or thread["has_continuation_hint"]),
+        link_type,
+        analyze_tone(text)["overall"],
+        estimate_dwell_time_score(text),
+        early["score"],
+        early["predicted_velocity"],
+    )
+
+
+def definition_version():
+    """判定の定義の版（列名・判定関数のソース・カテゴリ分類のルールのハッシュ）"""
+    global _version
+    if _version is not None:
+        return _version
+    import hashlib
+    import inspect
+
+    from classifier import RULE_SETS
+
+    sources = [inspect.getsource(f) for f in
+               (post_features, detect_thread_structure, detect_external_links, analyze_tone,
+                estimate_dwell_time_score, predict_early_engagement)]
+    parts = FEATURE_COLUMNS + sources + [repr(RULE_SETS["category"])]
+    _version = hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+    return _version
+
+
+def update_algorithm_features(db_path=None, chunk_size=FEATURE_CHUNK_SIZE, progress=None):
+    """判定済みの投稿より新しい投稿だけを判定して保存する（定義が変わっていたら全件判定し直す）。処理件数を返す
+
+    チャンクごとにコミットするので、途中で止まっても次回は続きから判定する。
+    progress(割合, メッセージ) を渡すとチャンクごとに呼ぶ。
+    """
+    import sqlite3
+
+    from import_csv import DB_PATH, init_db
+
+    db_path = db_path or DB_PATH
+    init_db(db_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    version = definition_version()
+    stored = {r[0] for r in conn.execute("SELECT DISTINCT version FROM algorithm_feature_defs")}
+    if stored != {version}:
+        conn.execute("DELETE FROM algorithm_features")
+        conn.execute("DELETE FROM algorithm_feature_defs")
+        conn.executemany(
+            "INSERT INTO algorithm_feature_defs (name, version) VALUES (?, ?)",
+            [(name, version) for name in FEATURE_COLUMNS]
+        )
+        conn.commit()
+
+    last_id = conn.execute("SELECT COALESCE(MAX(post_id), 0) FROM algorithm_features").fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM posts WHERE id > ?", (last_id,)).fetchone()[0]
+    added = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, text FROM posts WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            f"INSERT OR REPLACE INTO algorithm_features (post_id, {', '.join(FEATURE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(FEATURE_COLUMNS) + 1))})",
+            [(pid, *post_features(text)) for pid, text in rows]
+        )
+        conn.commit()
+        last_id = rows[-1][0]
+        added += len(rows)
+        if progress:
+            progress(added / total if total else 1.0, f"特徴量を判定中 {added:,}/{total:,}件")
+    conn.close()
+    return added
+
+
+def _read_columns(conn, after_id=0):
+    df = pd.read_sql(
+        """
+        SELECT p.id, p.likes, p.retweets, p.replies,
+               f.category, f.is_thread, f.link_type, f.tone, f.dwell_score, f.early_score, f.velocity
+        FROM posts p JOIN algorithm_features f ON f.post_id = p.id
+        WHERE p.id > ? ORDER BY p.id
+        """,
+        conn, params=(after_id,)
+    )
+    for col in ["likes", "retweets", "replies"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+    return df
+
+
+def load_algorithm_columns(db_path=None, progress=None):
+    """投稿ID・いいね・RT・リプライと判定結果の列。DBが変わるまでキャッシュ
+
+    戻り値: ({列名: NumPy配列}, {CODED_COLUMNSの列名: コード順のラベル配列})
+    """
+    import sqlite3
+
+    from import_csv import DB_PATH
+
+    db_path = db_path or DB_PATH
+    update_algorithm_features(db_path, progress=progress)
+    conn = sqlite3.connect(db_path)
+    try:
+        state = tuple(conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM posts").fetchone())
+        state += (definition_version(),)
+        cached = _columns.get(db_path)
+        if cached and cached[0] == state:
+            return cached[2]
+        frame = None
+        if cached and cached[0][2] == state[2] and len(cached[1]):
+            # 追記だけなら新しい行だけ読み足す
+            old = cached[1]
+            added = _read_columns(conn, int(old["id"].iloc[-1]))
+            if len(old) + len(added) == state[0]:
+                frame = pd.concat([old, added], ignore_index=True)
+        if frame is None:
+            frame = _read_columns(conn)
+    finally:
+        conn.close()
+
+    columns = {col: frame[col].to_numpy() for col in frame.columns if col not in CODED_COLUMNS}
+    labels = {}
+    for col in CODED_COLUMNS:
+        codes, uniques = pd.factorize(frame[col])
+        columns[col] = codes.astype(np.int32)
+        labels[col] = np.asarray(uniques, dtype=object)
+    _columns[db_path] = (state, frame, (columns, labels))
+    return columns, labels
+
+
+def top_k(values, k, mask=None):
+    """値の大きい順に最大k件の添字（同値は元の順序）。argpartition で候補を絞ってから並べる"""
+    idx = np.flatnonzero(mask) if mask is not None else np.arange(len(values))
+    if len(idx) == 0:
+        return idx
+    vals = values[idx]
+    if len(idx) > k:
+        kth = vals[np.argpartition(-vals, k - 1)[k - 1]]
+        # k番目と同値の行は元の順序で必要な分だけ残す（同値が大量でも並べ替えない）
+        greater = np.flatnonzero(vals > kth)
+        tied = np.flatnonzero(vals == kth)[:k - len(greater)]
+        keep = np.concatenate([greater, tied])
+        idx, vals = idx[keep], vals[keep]
+    order = np.lexsort((idx, -vals))[:k]
+    return idx[order]
+
+
+def _group_means(codes, labels, values):
+    """{ラベル: 件数}, {ラベル: 平均}（コード順 = 出現順、0件のラベルは含めない）"""
+    counts = np.bincount(codes, minlength=len(labels))
+    sums = np.bincount(codes, weights=values, minlength=len(labels))
+    present = np.flatnonzero(counts)
+    return ({labels[i]: int(counts[i]) for i in present},
+            {labels[i]: float(sums[i] / counts[i]) for i in present})
+
+
+def _code(labels, label):
+    """ラベルのコード（存在しなければ -1 で、どの行にも一致しない）"""
+    hits = np.flatnonzero(labels == label)
+    return int(hits[0]) if len(hits) else -1
+
+
+def _masked_mean(values, mask):
+    return float(values[mask].mean()) if mask.any() else 0
+
+
+def analyze_algorithm_db(db_path=None, top_n=10, progress=None):
+    """DB全体（いいね>0の投稿）のXアルゴリズム分析を列演算でまとめて行う
+
+    analyze_discussion_algorithm_value / analyze_thread_potential / analyze_link_impact /
+    analyze_tone_distribution / analyze_dwell_potential / analyze_early_engagement_potential
+    と同じ集計値を、キー名もそろえて {"discussion", "thread", "link", "tone", "dwell", "early"} で返す。
+    TOP一覧の本文は上位の投稿だけDBから引く。全投稿ぶんのリスト（all_results / thread_posts /
+    correlation_data など）は作らない。progress(割合, メッセージ) は未判定の投稿の判定中に呼ぶ。
+    """
+    import sqlite3
+
+    from import_csv import DB_PATH
+    from similarity_index import fetch_posts
+
+    db_path = db_path or DB_PATH
+    cols, labels = load_algorithm_columns(db_path, progress)
+    keep = cols["likes"] > 0
+    c = {k: v[keep] for k, v in cols.items()}
+    likes = c["likes"].astype(np.float64)
+    retweets = c["retweets"].astype(np.float64)
+    replies = c["replies"].astype(np.float64)
+    n = len(likes)
+
+    # 加重スコア・議論率・ブースト（配列演算）
+    weighted = (likes * X_ALGORITHM_WEIGHTS["like"] + retweets * X_ALGORITHM_WEIGHTS["retweet"]
+                + replies * X_ALGORITHM_WEIGHTS["reply"])
+    simple = likes + retweets * 2 + replies * 3
+    boost = np.divide(weighted, simple, out=np.zeros(n), where=simple > 0)
+    discussion = replies / likes
+
+    top_weighted = top_k(weighted, top_n)
+    top_discussion = top_k(discussion, top_n)
+    fast = c["velocity"] == _code(labels["velocity"], "高速")
+    top_fast = top_k(likes, top_n, fast)
+    top_dwell = top_k(c["dwell_score"].astype(np.float64), top_n)
+
+    conn = sqlite3.connect(db_path)
+    needed = np.unique(np.concatenate([top_weighted, top_discussion, top_fast, top_dwell]))
+    posts = fetch_posts(conn, c["id"][needed].tolist())
+    conn.close()
+
+    def text_of(i):
+        return posts.get(int(c["id"][i]), {}).get("text") or ""
+
+    def entry(i, **extra):
+        return {"text": text_of(i)[:60], "likes": int(likes[i]), **extra}
+
+    discussion_rows = {
+        int(i): entry(i, user=posts.get(int(c["id"][i]), {}).get("account") or "",
+                      retweets=int(retweets[i]), replies=int(replies[i]),
+                      discussion_rate=float(discussion[i]), weighted_score=float(weighted[i]),
+                      simple_score=float(simple[i]), algorithm_boost=float(boost[i]),
+                      category=labels["category"][c["category"][i]])
+        for i in np.union1d(top_weighted, top_discussion)
+    }
+    _, cat_mean = _group_means(c["category"], labels["category"], weighted)
+
+    thread = c["is_thread"].astype(bool)
+    link_type = c["link_type"]
+    external = link_type == _code(labels["link_type"], "external")
+    x_link = link_type == _code(labels["link_type"], "x")
+    no_link = link_type == _code(labels["link_type"], "none")
+    tone_count, tone_mean = _group_means(c["tone"], labels["tone"], likes)
+    friendly = np.isin(c["tone"], [_code(labels["tone"], t) for t in TONE_FRIENDLY])
+    dwell_score = c["dwell_score"]
+    dwell_bucket = np.where(dwell_score >= 15, 0, np.where(dwell_score >= 10, 1, 2))
+    fast_rows = []
+    for i in top_fast:
+        early = predict_early_engagement(text_of(i))
+        fast_rows.append(entry(i, early_score=early["score"], velocity="高速", signals=early["signals"]))
+    velocity_count, velocity_mean = _group_means(c["velocity"], labels["velocity"], likes)
+    no_link_avg = _masked_mean(likes, no_link)
+    external_avg = _masked_mean(likes, external)
+
+    return {
+        "discussion": {
+            "top10_by_algorithm": [discussion_rows[int(i)] for i in top_weighted],
+            "top10_by_discussion": [discussion_rows[int(i)] for i in top_discussion],
+            "avg_weighted": float(weighted.mean()) if n else 0,
+            "avg_discussion_rate": float(discussion.mean()) if n else 0,
+            "cat_algorithm_scores": cat_mean,
+        },
+        "thread": {
+            "thread_count": int(thread.sum()),
+            "non_thread_count": int((~thread).sum()),
+            "thread_avg_likes": _masked_mean(likes, thread),
+            "non_thread_avg_likes": _masked_mean(likes, ~thread),
+            "thread_avg_replies": _masked_mean(replies, thread),
+            "non_thread_avg_replies": _masked_mean(replies, ~thread),
+        },
+        "link": {
+            "external_count": int(external.sum()),
+            "x_link_count": int(x_link.sum()),
+            "no_link_count": int(no_link.sum()),
+            "external_avg_likes": external_avg,
+            "x_link_avg_likes": _masked_mean(likes, x_link),
+            "no_link_avg_likes": no_link_avg,
+            "reach_penalty_confirmed": no_link_avg > external_avg,
+        },
+        "tone": {
+            "tone_distribution": tone_count,
+            "tone_avg_likes": tone_mean,
+            "friendly_avg": _masked_mean(likes, friendly),
+            "unfriendly_avg": _masked_mean(likes, ~friendly),
+            "friendly_count": int(friendly.sum()),
+            "unfriendly_count": int((~friendly).sum()),
+        },
+        "dwell": {
+            "top10": [entry(i, dwell_score=int(dwell_score[i]), length=len(text_of(i))) for i in top_dwell],
+            "avg_dwell_score": float(dwell_score.mean()) if n else 0,
+            "bucket_avg_likes": {b: _masked_mean(likes, dwell_bucket == j) for j, b in enumerate(DWELL_BUCKETS)},
+            "bucket_counts": {b: int((dwell_bucket == j).sum()) for j, b in enumerate(DWELL_BUCKETS)},
+        },
+        "early": {
+            "velocity_avg_likes": velocity_mean,
+            "velocity_counts": velocity_count,
+            "top10_fast": fast_rows,
+        },
+    }
+
+
 # ========================================
 # 統合レポート生成
 # ========================================
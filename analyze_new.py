@@ -3,23 +3,24 @@
 import sqlite3
 from datetime import datetime
 
-import pandas as pd
-
-from analyze_posts import calculate_buzz_score, classify_category, classify_opening_pattern
+from analyze_posts import calculate_buzz_score, classify_opening_pattern
 from buzz_score_v2 import calculate_buzz_score_v2
+from classifier import get_classifier
 from import_csv import DB_PATH, init_db
+from loaders import load_posts
 
 OUTPUT_DIR = "output"
 
 
-def _score_row(row):
-    text = str(row["text"] or "")
-    date_str = str(row["date"] or "")
-    return calculate_buzz_score_v2(text, date_str)["total_score"]
+def _v2_scores(texts):
+    return texts.fillna("").map(lambda text: calculate_buzz_score_v2(text)["total_score"])
+
 
+def analyze_new_posts(output_file=None):
+    """最新インポートバッチを「新規」として差分分析する
 
-def analyze_new_posts():
-    """最新インポートバッチを「新規」として差分分析する"""
+    output_file: レポートの保存先（省略時は output/analyze_new_<日時>.md）
+    """
     init_db()
     conn = sqlite3.connect(DB_PATH)
 
@@ -31,14 +32,11 @@ def analyze_new_posts():
         return
 
     # 同一インポート操作（60秒以内）を「新規バッチ」と判定
-    df_new = pd.read_sql("""
-        SELECT * FROM posts
-        WHERE added_at >= datetime(?, '-60 seconds')
-        ORDER BY likes DESC
-    """, conn, params=(latest,))
-
-    df_all = pd.read_sql("SELECT * FROM posts", conn)
     conn.close()
+    df_new = load_posts(DB_PATH, columns=["id", "account", "text", "likes"],
+                        where="added_at >= datetime(?, '-60 seconds')", params=(latest,), order_by="likes DESC")
+    # 既存分はスコア計算に使う列だけ
+    df_all = load_posts(DB_PATH, columns=["id", "text"])
 
     if len(df_new) == 0:
         print("新規追加データがありません。")
@@ -51,14 +49,15 @@ def analyze_new_posts():
 
     # スコア計算
     df_new = df_new.copy()
-    df_new["v2_score"] = df_new.apply(_score_row, axis=1)
-    df_new["category"] = df_new["text"].apply(classify_category)
+    df_new["v2_score"] = _v2_scores(df_new["text"])
+    df_new["category"] = get_classifier("category").classify_series(df_new["text"])
 
     lines = _build_report(df_new, df_prev, latest)
     report = "\n".join(lines)
 
-    today = datetime.now().strftime("%Y%m%d_%H%M")
-    output_file = f"{OUTPUT_DIR}/analyze_new_{today}.md"
+    if output_file is None:
+        today = datetime.now().strftime("%Y%m%d_%H%M")
+        output_file = f"{OUTPUT_DIR}/analyze_new_{today}.md"
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(report)
 
@@ -87,7 +86,7 @@ def _build_report(df_new, df_prev, latest):
 
     if len(df_prev) > 0:
         df_prev = df_prev.copy()
-        df_prev["v2_score"] = df_prev.apply(_score_row, axis=1)
+        df_prev["v2_score"] = _v2_scores(df_prev["text"])
         prev_avg = df_prev["v2_score"].mean()
         diff = new_avg - prev_avg
         lines.append(f"| 指標 | 新規 | 既存 | 差分 |")
@@ -7,11 +7,27 @@ from datetime import datetime
 
 import pandas as pd
 
+from char_classes import EMOJI_RANGES, char_stats_many, count_emoji, emoji_runs
+from classifier import get_classifier
+from filters import (
+    DUPLICATE,
+    EXCLUDE_KEYWORDS,
+    EXCLUDED,
+    GIVEAWAY,
+    GIVEAWAY_KEYWORDS,
+    KEEP,
+    REASON_LABELS,
+    apply_filters,
+    keyword_reasons,
+    reason_counts,
+)
+from loaders import read_table
+
 
 def load_excel(filename):
-    """Excelファイルを読み込む"""
+    """Excelファイルを読み込む（loaders のキャッシュがあればそちらから）"""
     try:
-        df = pd.read_excel(filename)
+        df = read_table(filename)
         print(f"読み込み完了: {len(df)}件のポスト")
         return df
     except Exception as e:
@@ -21,66 +37,24 @@ def load_excel(filename):
 
 def filter_keywords(df):
     """炎上系・著作権問題系のみ除外（重複除去なし）"""
-    exclude_keywords = [
-        "著作権", "版権", "海賊版", "収益化停止", "収益化が停止",
-        "剥奪", "侵害", "インプレゾンビ"
-    ]
-
-    def should_exclude(text):
-        for keyword in exclude_keywords:
-            if keyword in text:
-                return True
-        return False
-
-    return df[~df["本文"].apply(should_exclude)].copy()
-
-
-# プレゼント企画・業者系投稿の除外キーワード
-GIVEAWAY_KEYWORDS = [
-    "いいねしたら",
-    "フォロー&RT",
-    "RT&フォロー",
-    "プレゼント企画",
-    "抽選で",
-    "配布します",
-    "全員に配",
-    "リプで送ります",
-]
+    return df[(keyword_reasons(df["本文"], (EXCLUDED,)) == KEEP).to_numpy()].copy()
 
 
 def filter_giveaway(df):
     """プレゼント企画・業者系投稿を除外する"""
-    def is_giveaway(text):
-        for keyword in GIVEAWAY_KEYWORDS:
-            if keyword in str(text):
-                return True
-        return False
-
-    mask = df["本文"].apply(is_giveaway)
+    mask = (keyword_reasons(df["本文"], (GIVEAWAY,)) != KEEP).to_numpy()
     excluded = df[mask].copy()
     filtered = df[~mask].copy()
     return filtered, excluded
 
 
 def filter_data(df):
-    """データをフィルタリング"""
+    """データをフィルタリング（炎上系・プレゼント企画の除外と同一ユーザーの重複除去。理由は filters.apply_filters）"""
     original_count = len(df)
-
-    # 1. 炎上系・著作権問題系を除外
-    df_filtered = filter_keywords(df)
-    excluded_by_keyword = original_count - len(df_filtered)
-    print(f"炎上系・著作権問題系を除外: {excluded_by_keyword}件")
-
-    # 2. プレゼント企画・業者系を除外
-    df_filtered, _ = filter_giveaway(df_filtered)
-    excluded_by_giveaway = original_count - excluded_by_keyword - len(df_filtered)
-    print(f"プレゼント企画・業者系を除外: {excluded_by_giveaway}件")
-
-    # 3. 同一ユーザーの投稿は最もいいね数が高い1件のみ残す
-    df_filtered = df_filtered.sort_values("いいね数", ascending=False)
-    df_filtered = df_filtered.drop_duplicates(subset=["ユーザー名"], keep="first")
-    excluded_by_user = original_count - excluded_by_keyword - excluded_by_giveaway - len(df_filtered)
-    print(f"同一ユーザーの重複投稿を除外: {excluded_by_user}件")
+    df_filtered, reasons = apply_filters(df)
+    counts = reason_counts(reasons)
+    for reason in (EXCLUDED, GIVEAWAY, DUPLICATE):
+        print(f"{REASON_LABELS[reason]}を除外: {counts[reason]}件")
 
     total_excluded = original_count - len(df_filtered)
     print(f"最終分析対象: {len(df_filtered)}件（{total_excluded}件除外）")
@@ -119,18 +93,23 @@ def analyze_line_breaks(df):
     return avg_lines, top_avg_lines, bottom_avg_lines
 
 
-def analyze_bullet_points(df):
-    """箇条書きの分析"""
-    bullet_pattern = re.compile(r'^[・\-\*①-➓1-9]\s', re.MULTILINE)
+def _texts(df):
+    """本文の列（欠損は空文字）。列がなければ空文字の列"""
+    if "本文" not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df["本文"].fillna("").astype(str)
 
+
+def analyze_bullet_points(df):
+    """箇条書きの分析（行頭の「・」「-」「①」などの直後が空白の行があるか。char_classes で一括判定）"""
     with_bullets = []
     without_bullets = []
 
-    for _, row in df.iterrows():
-        text = safe_get(row, "本文", "")
+    bullet_lines = char_stats_many(_texts(df))["bullet_lines"].tolist()
+    for (_, row), bullets in zip(df.iterrows(), bullet_lines):
         likes = safe_get(row, "いいね数", 0)
 
-        if bullet_pattern.search(text):
+        if bullets:
             with_bullets.append(likes)
         else:
             without_bullets.append(likes)
@@ -178,24 +157,10 @@ def analyze_urls(df):
 
 
 def classify_opening_pattern(first_line):
-    """冒頭のパターン分類"""
+    """冒頭のパターン分類（classifier のルールセット "opening"）"""
     if not first_line:
         return "その他"
-
-    if re.search(r'[？?]', first_line):
-        return "疑問形"
-    elif re.search(r'^[0-9①-➓]|[0-9]+つ|[0-9]+個|[0-9]+選', first_line):
-        return "数字提示"
-    elif re.search(r'は？|まじで|やばい|最悪|ありえない', first_line, re.IGNORECASE):
-        return "煽り"
-    elif re.search(r'わかる|共感|同じ|あるある', first_line, re.IGNORECASE):
-        return "共感"
-    elif re.search(r'です|ます|である|だ。', first_line):
-        return "断定形"
-    elif re.search(r'みなさん|あなた|皆さん', first_line, re.IGNORECASE):
-        return "呼びかけ"
-    else:
-        return "その他"
+    return get_classifier("opening").classify(first_line)
 
 
 def analyze_opening_patterns(df):
@@ -321,34 +286,8 @@ def analyze_engagement_ratio(df):
 
 
 def classify_category(text):
-    """カテゴリ分類（精度向上版）"""
-    # 優先順位を持たせて判定
-
-    # 実績報告系（最優先）
-    if re.search(r'達成|収益|稼げた|稼いだ|成功|実績|儲かった|〜万円|月収|年収|売上|報酬|利益', text, re.IGNORECASE):
-        return "実績報告系"
-
-    # ノウハウ系
-    if re.search(r'方法|やり方|コツ|手順|ステップ|テクニック|攻略|マニュアル|ガイド|〜する方法|〜のやり方', text, re.IGNORECASE):
-        return "ノウハウ系"
-
-    # 体験談系
-    if re.search(r'私が|僕が|自分が|実際に|やってみた|試してみた|体験|経験|〜したら|〜してみた', text, re.IGNORECASE):
-        return "体験談系"
-
-    # 問題提起系
-    if re.search(r'は？|問題|危険|注意|警告|【悲報】|〜すぎる|ヤバい|おかしい', text, re.IGNORECASE):
-        return "問題提起系"
-
-    # ツール紹介系
-    if re.search(r'ツール|アプリ|サービス|プラグイン|拡張機能|おすすめ|紹介|AI|Claude|ChatGPT|GPT', text, re.IGNORECASE):
-        return "ツール紹介系"
-
-    # ニュース系
-    if re.search(r'発表|リリース|開始|開催|速報|最新|ニュース|公開', text, re.IGNORECASE):
-        return "ニュース系"
-
-    return "その他"
+    """カテゴリ分類（classifier のルールセット "category"。上のルールほど優先）"""
+    return get_classifier("category").classify(text)
 
 
 def analyze_categories(df):
@@ -527,11 +466,9 @@ def analyze_follower_normalized(df):
 
 # === 新規分析関数: テキスト最適化 ===
 
+# 絵文字の数え方は char_classes（コードポイントの表引き）で行う。正規表現が必要な箇所向けに同じ範囲で作る
 EMOJI_PATTERN = re.compile(
-    "[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF"
-    "\U0001F1E0-\U0001F1FF\U00002702-\U000027B0\U0001F900-\U0001F9FF"
-    "\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF\U00002600-\U000026FF"
-    "\U0000FE00-\U0000FE0F\U0000200D]+",
+    "[" + "".join(f"{chr(lo)}-{chr(hi)}" for lo, hi in EMOJI_RANGES) + "]+",
     flags=re.UNICODE,
 )
 
@@ -586,16 +523,14 @@ def analyze_emoji_usage(df):
     emoji_count_data = defaultdict(list)  # count -> [likes]
     emoji_counter = Counter()
 
-    for _, row in df.iterrows():
-        text = safe_get(row, "本文", "")
+    texts = _texts(df)
+    counts = char_stats_many(texts)["emoji"].tolist()
+    for (_, row), text, count in zip(df.iterrows(), texts, counts):
         likes = safe_get(row, "いいね数", 0)
-        emojis = EMOJI_PATTERN.findall(text)
-        count = len(emojis)
 
         if count > 0:
             with_emoji.append(likes)
-            for e in emojis:
-                emoji_counter[e] += 1
+            emoji_counter.update(emoji_runs(text))
         else:
             without_emoji.append(likes)
 
@@ -722,8 +657,7 @@ def calculate_buzz_score(text, score_params=None):
     total += s
 
     # 7. 絵文字・書式 (10点)
-    emojis = EMOJI_PATTERN.findall(text)
-    emoji_count = len(emojis)
+    emoji_count = count_emoji(text)
     if 1 <= emoji_count <= 3:
         s = 10
     elif emoji_count == 0:
@@ -806,7 +740,7 @@ def analyze_buzz_scores(df, score_params=None):
 def analyze_users(df_raw, df_filtered):
     """ユーザー分析（重複除去前のデータを使用）"""
     user_stats = []
-    grouped = df_raw.groupby("ユーザー名")
+    grouped = df_raw.groupby("ユーザー名", observed=True)
 
     for user, group in grouped:
         likes_list = group["いいね数"].tolist()
@@ -1846,11 +1780,11 @@ def generate_report(df, output_filename, original_count, excluded_count, df_raw=
     print(f"\nレポート生成完了: {output_filename}")
 
 
-def main():
-    """メイン処理"""
-    input_file = "output/buzz_posts_20260215.xlsx"
-    today = datetime.now().strftime("%Y%m%d")
-    output_file = f"output/analyze_report_詳細_v2_{today}.md"
+def main(input_file="output/buzz_posts_20260215.xlsx", output_file=None):
+    """メイン処理（output_file を省略すると output/analyze_report_詳細_v2_<日付>.md に保存）"""
+    if output_file is None:
+        today = datetime.now().strftime("%Y%m%d")
+        output_file = f"output/analyze_report_詳細_v2_{today}.md"
 
     if not os.path.exists(input_file):
         print(f"エラー: {input_file} が見つかりません。")
@@ -3,7 +3,6 @@
 import os
 import sqlite3
 import tempfile
-from collections import Counter
 from datetime import datetime
 
 import pandas as pd
@@ -11,20 +10,18 @@ import plotly.express as px
 import streamlit as st
 
 from algorithm_analysis import (
-    analyze_discussion_algorithm_value,
-    analyze_dwell_potential,
-    analyze_early_engagement_potential,
-    analyze_link_impact,
-    analyze_thread_potential,
     analyze_tone,
-    analyze_tone_distribution,
     calculate_algorithm_score,
     predict_early_engagement,
 )
-from analyze_posts import calculate_buzz_score
 from buzz_score_v2 import calculate_buzz_score_v2
 from import_csv import DB_PATH, import_file, init_db
+from jobs import JobWorker, find_job, submit_job
+from loaders import load_posts
 from reader_psychology import analyze_reader_psychology
+from score_server import ScoringService
+from template_index import TEMPLATES, template_examples
+from timeseries import WINDOWS, category_shares, hour_weekday_means, rolling_stats
 
 st.set_page_config(page_title="バズ分析ダッシュボード", layout="wide")
 st.title("バズ投稿 分析ダッシュボード")
@@ -36,6 +33,42 @@ def get_conn():
     return sqlite3.connect(DB_PATH)
 
 
+@st.cache_resource
+def get_scoring_service():
+    """スコア診断用の常駐サービス（類似投稿の候補をセッション間で共有）"""
+    return ScoringService(DB_PATH)
+
+
+@st.cache_resource
+def get_job_worker():
+    """重い分析を実行するバックグラウンドワーカー（サーバー内で1つ）"""
+    return JobWorker(DB_PATH).start()
+
+
+def background_job(kind, button_label, key):
+    """バックグラウンド分析の結果を返す。未実行ならボタン、実行中なら進捗を表示してNoneを返す
+
+    結果はDBの版（投稿件数:最大ID）ごとに保持されるので、インポートするまではどのセッションでも即表示。
+    """
+    job = find_job(kind, DB_PATH)
+    if job is None or job["status"] == "failed":
+        if job:
+            st.error(f"前回の分析に失敗しました: {job['error']}")
+        if st.button(button_label, key=key):
+            submit_job(kind, DB_PATH)
+            get_job_worker().wake()
+            st.rerun()
+        return None
+    if job["status"] != "done":
+        get_job_worker()  # サーバー再起動後でも待ちジョブを拾わせる
+        st.progress(job["progress"] or 0.0, text=job["message"] or "順番待ち中...")
+        if st.button("進捗を更新", key=f"{key}_refresh"):
+            st.rerun()
+        return None
+    st.caption(f"分析結果（{job['finished_at'].replace('T', ' ')} 完了。DBが更新されるまで保持）")
+    return job["result"]
+
+
 def get_account_list():
     """posts + account_followers の全アカウントをABC順（大文字小文字無視）で返す"""
     conn = get_conn()
@@ -67,14 +100,6 @@ def account_filter_ui(label="アカウント名でフィルター（部分一致
     return selected
 
 
-def to_naive_datetime(series):
-    """タイムゾーン付き・なし混在をtz-naiveに統一する"""
-    result = pd.to_datetime(series, errors="coerce", utc=True)
-    if hasattr(result, "dt"):
-        return result.dt.tz_convert(None)
-    return result
-
-
 # ============================================================
 # CSVアップロード
 # ============================================================
@@ -94,6 +119,7 @@ if uploaded:
             inserted, skipped_rows = import_file(tmp_path)
             skipped = len(skipped_rows)
             if inserted > 0:
+                get_scoring_service().refresh()
                 st.success(f"新規登録: {inserted}件 / スキップ（重複）: {skipped}件")
             else:
                 st.info(f"新規登録: 0件（全{skipped}件は既にDB済み）")
@@ -161,17 +187,13 @@ with tab1:
     st.header("投稿一覧")
 
     if total > 0:
-        conn = get_conn()
-        df_posts = pd.read_sql(
-            "SELECT id, account, text, likes, retweets, replies, impressions, date, source_file FROM posts",
-            conn
-        )
-        conn.close()
+        df_posts = load_posts(DB_PATH, columns=[
+            "id", "account", "text", "likes", "retweets", "replies", "impressions", "posted_at", "source_file"
+        ])
 
         with st.spinner("スコアを計算中..."):
-            df_posts["v2スコア"] = df_posts.apply(
-                lambda r: calculate_buzz_score_v2(str(r["text"] or ""), str(r["date"] or ""))["total_score"],
-                axis=1
+            df_posts["v2スコア"] = df_posts["text"].fillna("").map(
+                lambda text: calculate_buzz_score_v2(text)["total_score"]
             )
 
         # フィルター
@@ -194,21 +216,24 @@ with tab1:
 
         st.caption(f"表示件数: {len(df_filtered)}件 / 全{total}件")
 
+        # 投稿日時はパース済みの posted_at 列で並べる（表示名に変える前に並べ替える）
         sort_options = {
             "v2スコア（高い順）":        ("v2スコア", False),
             "いいね数（多い順）":         ("likes", False),
             "インプレッション（高い順）": ("impressions", False),
-            "投稿日時（新しい順）":       ("date", False),
-            "投稿日時（古い順）":         ("date", True),
+            "投稿日時（新しい順）":       ("posted_at", False),
+            "投稿日時（古い順）":         ("posted_at", True),
         }
         sort_label = st.selectbox("並び順", list(sort_options.keys()))
         sort_col, sort_asc = sort_options[sort_label]
+        df_filtered = df_filtered.sort_values(sort_col, ascending=sort_asc)
 
         df_display = df_filtered[[
             "account", "text", "likes", "retweets", "replies", "impressions",
-            "v2スコア", "date", "source_file"
+            "v2スコア", "posted_at", "source_file"
         ]].copy()
         df_display["text"] = df_display["text"].str[:80]
+        df_display["posted_at"] = df_display["posted_at"].dt.tz_convert("Asia/Tokyo").dt.strftime("%Y/%m/%d %H:%M")
         df_display = df_display.rename(columns={
             "account":     "アカウント",
             "text":        "本文（先頭80字）",
@@ -216,10 +241,9 @@ with tab1:
             "retweets":    "RT",
             "replies":     "リプライ",
             "impressions": "インプレッション",
-            "date":        "投稿日時",
+            "posted_at":   "投稿日時",
             "source_file": "ソースファイル",
         })
-        df_display = df_display.sort_values(sort_col, ascending=sort_asc)
         st.dataframe(df_display, use_container_width=True, height=500, hide_index=True)
     else:
         st.info("データがありません。上のアップロード機能でデータを追加してください。")
@@ -479,24 +503,18 @@ with tab4:
     st.header("投稿パターン分析")
 
     if total > 0:
-        conn = get_conn()
-        df_all = pd.read_sql("SELECT text, likes, retweets, date FROM posts", conn)
-        conn.close()
+        df_all = load_posts(DB_PATH, columns=["text", "likes", "retweets"])
 
         df_all["char_count"] = df_all["text"].str.len()
-        df_all["date_parsed"] = to_naive_datetime(df_all["date"])
-        df_all["hour"] = df_all["date_parsed"].dt.hour
-        df_all["weekday"] = df_all["date_parsed"].dt.dayofweek
+        # 時間帯・曜日はパース済みのepoch列から集計（投稿が増えるまで結果をキャッシュ）
+        hw = hour_weekday_means(DB_PATH)
 
         col_a, col_b = st.columns(2)
 
         with col_a:
-            st.subheader("時間帯別 平均いいね数")
-            df_hour = df_all.dropna(subset=["hour"]).copy()
-            if len(df_hour) > 0:
-                # 0〜23の全時間帯を用意してreindexで強制昇順
-                hour_avg = df_hour.groupby("hour")["likes"].mean().round(1)
-                hour_avg = hour_avg.reindex(range(24), fill_value=0).reset_index()
+            st.subheader("時間帯別 平均いいね数（JST）")
+            if hw["hour"].any():
+                hour_avg = hw["hour"].round(1).reset_index()
                 hour_avg.columns = ["時間帯_num", "平均いいね"]
                 hour_avg["時間帯"] = hour_avg["時間帯_num"].astype(str) + "時"
                 fig = px.bar(hour_avg, x="時間帯", y="平均いいね",
@@ -509,12 +527,9 @@ with tab4:
 
         with col_b:
             st.subheader("曜日別 平均いいね数")
-            df_wd = df_all.dropna(subset=["weekday"]).copy()
-            if len(df_wd) > 0:
+            if hw["weekday"].any():
                 wd_names = ["月", "火", "水", "木", "金", "土", "日"]
-                df_wd["曜日"] = df_wd["weekday"].apply(lambda x: wd_names[int(x)])
-                wd_avg = df_wd.groupby("曜日")["likes"].mean().round(1).reindex(wd_names, fill_value=0).reset_index()
-                wd_avg.columns = ["曜日", "平均いいね"]
+                wd_avg = pd.DataFrame({"曜日": wd_names, "平均いいね": hw["weekday"].round(1).values})
                 fig = px.bar(wd_avg, x="曜日", y="平均いいね",
                              category_orders={"曜日": wd_names})
                 fig.update_xaxes(tickangle=0)
@@ -523,6 +538,28 @@ with tab4:
             else:
                 st.info("日時データがありません。")
 
+        st.subheader("日次トレンド（移動窓）")
+        window = st.radio("集計窓", WINDOWS, horizontal=True,
+                          format_func=lambda w: f"直近{w}日", key="ts_window")
+        rolling = rolling_stats(window, DB_PATH)
+        if len(rolling) > 0:
+            df_roll = rolling[["median", "q25", "q75", "q90"]].rename(columns={
+                "median": "中央値", "q25": "25%点", "q75": "75%点", "q90": "90%点"
+            }).reset_index()
+            fig = px.line(df_roll, x="day", y=["中央値", "25%点", "75%点", "90%点"],
+                          labels={"day": "日付", "value": "いいね数", "variable": ""})
+            fig.update_layout(margin=dict(t=20, b=20))
+            st.plotly_chart(fig, use_container_width=True)
+
+            shares = category_shares(window, DB_PATH)
+            df_share = shares.reset_index().melt(id_vars="day", var_name="カテゴリ", value_name="構成比")
+            fig = px.area(df_share, x="day", y="構成比", color="カテゴリ",
+                          labels={"day": "日付"})
+            fig.update_layout(margin=dict(t=20, b=20), yaxis_tickformat=".0%")
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("日時データがありません。")
+
         st.subheader("文字数帯別 平均いいね数")
         bins = [0, 50, 100, 140, 200, 280, 1000]
         labels = ["〜50字", "51-100字", "101-140字", "141-200字", "201-280字", "281字〜"]
@@ -551,8 +588,9 @@ with tab5:
     )
 
     if input_text.strip():
-        v1_result = calculate_buzz_score(input_text)
-        v2_result = calculate_buzz_score_v2(input_text)
+        diagnosis = get_scoring_service().score(input_text)
+        v1_result = diagnosis["v1"]
+        v2_result = diagnosis["v2"]
 
         col1, col2, col3 = st.columns(3)
         col1.metric("v1スコア", f"{v1_result['total_score']}点")
@@ -597,20 +635,9 @@ with tab5:
 
         st.subheader("この投稿に近いバズ投稿 TOP3")
         if total > 0:
-            conn = get_conn()
-            df_buzz = pd.read_sql(
-                "SELECT account, text, likes, retweets FROM posts ORDER BY likes DESC LIMIT 200",
-                conn
-            )
-            conn.close()
-            words = set(input_text.replace("。", " ").replace("、", " ").split())
-            df_buzz["類似度"] = df_buzz["text"].apply(
-                lambda t: len(words & set(str(t).replace("。", " ").replace("、", " ").split()))
-            )
-            top3 = df_buzz.sort_values(["類似度", "likes"], ascending=[False, False]).head(3)
-            for i, (_, row) in enumerate(top3.iterrows(), 1):
-                with st.expander(f"#{i} いいね{row['likes']}件 / {row['account']}"):
-                    st.write(row["text"])
+            for i, post in enumerate(diagnosis["similar_posts"], 1):
+                with st.expander(f"#{i} いいね{post['likes']}件 / {post['account']}"):
+                    st.write(post["text"])
 
 # ============================================================
 # TAB6: スコア精度推移
@@ -731,54 +758,8 @@ with tab8:
     # ============================================================
     st.subheader("1. 投稿テンプレート")
 
-    TEMPLATES = [
-        {
-            "name": "拓巳型（自己開示型）",
-            "structure": "自己開示 → 具体的体験 → 気づき → 余韻",
-            "description": "「正直に言う」「実は」系の告白から入り、具体的な体験を語り、静かな気づきで締める。CTAなし。",
-            "skeleton": (
-                "正直に言う。[自己開示：恥ずかしいこと・弱点・失敗]\n\n"
-                "[具体的な体験・数字・エピソード]\n\n"
-                "それで気づいたのは、[シンプルな気づき]。\n\n"
-                "[余韻のある一文で締め。問いかけでも可]"
-            ),
-            "keywords": ["正直", "実は", "ド素人", "告白", "恥ずかしい"],
-        },
-        {
-            "name": "リスク警告型",
-            "structure": "事実提示 → 驚き → 対処法",
-            "description": "「知らないと損する」「○○してる人は注意」系。具体的な数字で驚かせて、対処法を提示。",
-            "skeleton": (
-                "[意外な事実・統計・体験]\n\n"
-                "これ、実は[驚きのポイント]。\n\n"
-                "対処法は[具体的なアクション]だけ。\n\n"
-                "[一言で締め]"
-            ),
-            "keywords": ["注意", "知らないと", "損", "実は", "危ない"],
-        },
-        {
-            "name": "プロンプト/ツール紹介型",
-            "structure": "失敗 → 改善 → 具体例",
-            "description": "「こう使ったら失敗した」→「こう変えたら上手くいった」→ 具体的なプロンプト/手順を提示。",
-            "skeleton": (
-                "[最初にやった失敗・よくある間違い]\n\n"
-                "でも[改善したこと]をしたら全然違った。\n\n"
-                "具体的には：\n[箇条書きで手順・プロンプト例]\n\n"
-                "[再現性ある締め・「試してみて」でも可]"
-            ),
-            "keywords": ["プロンプト", "Claude", "ChatGPT", "試した", "変えた"],
-        },
-    ]
-
-    # DBからテンプレート別の例示投稿を取得
-    def find_template_examples(keywords, df, n=2):
-        if df.empty:
-            return []
-        mask = df["text"].apply(
-            lambda t: any(kw in str(t) for kw in keywords)
-        )
-        matched = df[mask].head(n)
-        return matched[["text", "likes", "account"]].to_dict("records")
+    # テンプレート別の例示投稿（キーワード索引から引き、DBが変わるまでキャッシュ）
+    examples_by_template = template_examples(n=2)
 
     for tmpl in TEMPLATES:
         with st.expander(f"**{tmpl['name']}** ─ {tmpl['structure']}"):
@@ -787,7 +768,7 @@ with tab8:
                 st.markdown(f"**構造説明**\n\n{tmpl['description']}")
                 st.code(tmpl["skeleton"], language=None)
             with col_r:
-                examples = find_template_examples(tmpl["keywords"], top_posts)
+                examples = examples_by_template.get(tmpl["name"], [])
                 if examples:
                     st.markdown("**DB内の類似バズ投稿（いいね順）**")
                     for ex in examples:
@@ -1043,41 +1024,15 @@ with tab9:
     st.divider()
 
     # ---- 2. DB全体の心理パターン統計 ----
-    st.subheader("2. DB全体の心理パターン統計（上位100件）")
+    st.subheader("2. DB全体の心理パターン統計（いいね>0の全投稿）")
 
     if total > 0:
-        if st.button("統計を表示", key="psych_stats_btn"):
-            conn = get_conn()
-            df_psych_db = pd.read_sql(
-                "SELECT text, likes, retweets, replies FROM posts WHERE likes > 0 ORDER BY likes DESC LIMIT 100",
-                conn
-            )
-            conn.close()
-
-            with st.spinner("100件を分析中..."):
-                all_psych = [
-                    analyze_reader_psychology(
-                        str(r["text"] or ""),
-                        int(r["likes"] or 0),
-                        int(r["retweets"] or 0),
-                        int(r["replies"] or 0),
-                    )
-                    for _, r in df_psych_db.iterrows()
-                ]
-                likes_list = df_psych_db["likes"].fillna(0).astype(int).tolist()
-
+        psych_stats = background_job("psychology_stats", "統計を表示", "psych_stats_btn")
+        if psych_stats:
             # 感情分布
-            emotion_cnt = Counter(r["primary_emotion"] for r in all_psych)
-            emotion_likes_map = {}
-            for r, lk in zip(all_psych, likes_list):
-                emotion_likes_map.setdefault(r["primary_emotion"], []).append(lk)
             df_emotion = pd.DataFrame([
-                {
-                    "感情": e,
-                    "出現数": c,
-                    "平均いいね": round(sum(emotion_likes_map[e]) / len(emotion_likes_map[e])),
-                }
-                for e, c in emotion_cnt.most_common()
+                {"感情": r["name"], "出現数": r["count"], "平均いいね": round(r["avg_likes"])}
+                for r in psych_stats["emotions"]
             ])
 
             col_e1, col_e2 = st.columns(2)
@@ -1089,26 +1044,20 @@ with tab9:
                 fig_e.update_layout(margin=dict(t=30, b=20))
                 st.plotly_chart(fig_e, use_container_width=True)
 
-            # いいねトリガー分布
-            like_trigger_cnt = Counter(
-                t["trigger"] for r in all_psych for t in r["like_triggers"]
-            )
-            like_trigger_likes = {}
-            for r, lk in zip(all_psych, likes_list):
-                for t in r["like_triggers"]:
-                    like_trigger_likes.setdefault(t["trigger"], []).append(lk)
-
-            if like_trigger_cnt:
-                df_like_trg = pd.DataFrame([
-                    {
-                        "トリガー": t,
-                        "出現数": c,
-                        "平均いいね": round(sum(like_trigger_likes[t]) / len(like_trigger_likes[t])),
-                    }
-                    for t, c in like_trigger_cnt.most_common()
-                ])
-                st.markdown("**いいねトリガー 出現頻度（上位100件中）**")
-                st.dataframe(df_like_trg, use_container_width=True, hide_index=True)
+            st.caption(f"分析対象: {psych_stats['analyzed']:,}件")
+
+            # いいね・RT・リプ・ブクマ・フォローのトリガー分布
+            for trg_key, trg_label in [
+                ("like_triggers", "いいね"), ("rt_triggers", "RT"), ("reply_triggers", "リプ"),
+                ("bookmark_triggers", "ブックマーク"), ("follow_triggers", "フォロー"),
+            ]:
+                if psych_stats.get(trg_key):
+                    df_trg = pd.DataFrame([
+                        {"トリガー": r["name"], "出現数": r["count"], "平均いいね": round(r["avg_likes"])}
+                        for r in psych_stats[trg_key]
+                    ])
+                    st.markdown(f"**{trg_label}トリガー 出現頻度**")
+                    st.dataframe(df_trg, use_container_width=True, hide_index=True)
     else:
         st.info("データがありません。")
 
@@ -1199,25 +1148,14 @@ with tab10:
     st.subheader("2. DB全体のXアルゴリズム分析")
 
     if total > 0:
-        if st.button("DB全体を分析", key="algo_db_btn"):
-            conn = get_conn()
-            df_algo_raw = pd.read_sql(
-                "SELECT text, likes, retweets, replies, account FROM posts WHERE likes > 0",
-                conn
-            )
-            conn.close()
-            df_algo_jp = df_algo_raw.rename(columns={
-                "text": "本文", "likes": "いいね数",
-                "retweets": "リポスト数", "replies": "リプライ数", "account": "ユーザー名",
-            })
-
-            with st.spinner("分析中..."):
-                disc = analyze_discussion_algorithm_value(df_algo_jp)
-                thread = analyze_thread_potential(df_algo_jp)
-                link = analyze_link_impact(df_algo_jp)
-                tone_dist = analyze_tone_distribution(df_algo_jp)
-                dwell = analyze_dwell_potential(df_algo_jp)
-                early_all = analyze_early_engagement_potential(df_algo_jp)
+        result = background_job("algorithm_db", "DB全体を分析", "algo_db_btn")
+        if result:
+            disc = result["discussion"]
+            thread = result["thread"]
+            link = result["link"]
+            tone_dist = result["tone"]
+            dwell = result["dwell"]
+            early_all = result["early"]
 
             # アルゴリズム加重ランキング
             st.markdown("### アルゴリズム加重スコア TOP10")
@@ -0,0 +1,268 @@
+"""バズ分析ツールの統合CLI（サブコマンドごとに必要なモジュールだけを遅延インポート）
+
+使い方:
+    python buzz.py fetch                 # バズポスト取得
+    python buzz.py import <ファイル>...   # CSV/ExcelをDBにインポート
+    python buzz.py recalc                # スコア再計算
+    python buzz.py diff                  # 新規インポート分の分析
+    python buzz.py report                # 詳細分析レポート
+    python buzz.py charts [ファイル]      # グラフ生成
+    python buzz.py trend [--since 日付]   # 複数日のトレンド比較
+    python buzz.py accounts [--test]     # アカウント分析
+    python buzz.py score "本文"           # 単一テキストのスコア診断
+    python buzz.py optimize              # 線形スコアの重みを学習
+    python buzz.py serve [--http PORT]   # 常駐スコアリングサービス
+
+    --profile-imports を付けるとモジュールごとのインポート時間を表示する。
+"""
+
+import argparse
+import os
+import sys
+
+# このファイルでは標準ライブラリ以外をトップレベルでインポートしないこと
+# （pandas / matplotlib などは各サブコマンドの中で読み込む）
+
+
+# ========================================
+# サブコマンド
+# ========================================
+
+def cmd_fetch(args):
+    """TwitterAPI.ioからバズポストを取得"""
+    from buzz_analyzer import fetch_buzz_posts
+    fetch_buzz_posts()
+    return 0
+
+
+def cmd_import(args):
+    """CSV/ExcelファイルをDBにインポート"""
+    from import_csv import import_file
+
+    status = 0
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"エラー: {path} が見つかりません。")
+            status = 1
+            continue
+        print(f"--- {path} ---")
+        try:
+            import_file(path)
+        except ValueError as e:
+            print(f"エラー: {e}")
+            status = 1
+    return status
+
+
+def cmd_recalc(args):
+    """DB全体のスコアを再計算して相関を記録"""
+    from recalculate_score import recalculate
+    recalculate()
+    return 0
+
+
+def cmd_diff(args):
+    """最新インポート分の分析レポート"""
+    from analyze_new import analyze_new_posts
+    analyze_new_posts()
+    return 0
+
+
+def cmd_report(args):
+    """詳細分析レポートを生成"""
+    from analyze_posts import main as report_main
+    report_main()
+    return 0
+
+
+def cmd_charts(args):
+    """グラフを生成"""
+    from visualize import main as charts_main
+    charts_main(args.input)
+    return 0
+
+
+def cmd_trend(args):
+    """複数日のトレンド比較レポート"""
+    from trend_compare import main as trend_main
+    trend_main(since=args.since, until=args.until)
+    return 0
+
+
+def cmd_accounts(args):
+    """競合アカウント分析"""
+    from account_analyzer import main as accounts_main
+    accounts_main(test_mode=args.test, test_file=args.test_file)
+    return 0
+
+
+def cmd_score(args):
+    """単一テキストのv1/v2/アルゴリズムスコアを表示"""
+    from analyze_posts import calculate_buzz_score
+    from buzz_score_v2 import calculate_buzz_score_v2
+    from algorithm_analysis import analyze_tone, calculate_algorithm_score
+
+    text = args.text
+    if text == "-":
+        text = sys.stdin.read()
+    text = text.strip()
+    if not text:
+        print("エラー: テキストが空です。")
+        return 1
+
+    v1 = calculate_buzz_score(text)
+    v2 = calculate_buzz_score_v2(text)
+    algo = calculate_algorithm_score(text)
+    tone = analyze_tone(text)
+
+    print(f"v1スコア:           {v1['total_score']:.0f}/100")
+    print(f"v2スコア:           {v2['total_score']:.0f}/100")
+    print(f"アルゴリズムスコア: {algo['total_score']:.0f}/100")
+    print(f"トーン:             {tone['overall']}")
+    if args.verbose:
+        print("\n[v2 内訳]")
+        for name, pts in v2["factors"].items():
+            print(f"  {name}: {pts}")
+        print("\n[アルゴリズム 内訳]")
+        for name, pts in algo["factors"].items():
+            print(f"  {name}: {pts}")
+    return 0
+
+
+def cmd_optimize(args):
+    """score_weights の重みをDBから学習"""
+    from weight_optimizer import optimize
+    return 0 if optimize(n_folds=args.folds) else 1
+
+
+def cmd_serve(args):
+    """常駐スコアリングサービスを起動"""
+    from score_server import main as serve_main
+    serve_main(http_port=args.http)
+    return 0
+
+
+# ========================================
+# インポート時間の計測
+# ========================================
+
+def _parse_importtime(stderr_text):
+    """-X importtime の出力を (モジュール名, 自身us, 累積us, 深さ) のリストに変換"""
+    rows = []
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue  # ヘッダー行
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def profile_imports(argv, top_n=15):
+    """自分自身を -X importtime 付きで再実行し、重いインポートを集計する"""
+    import subprocess
+
+    cmd = [sys.executable, "-X", "importtime", os.path.abspath(__file__)] + argv
+    proc = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+
+    rows = _parse_importtime(proc.stderr)
+    other = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+    if other:
+        sys.stderr.write("\n".join(other) + "\n")
+
+    top_level = [r for r in rows if r[3] == 0]
+    total_us = sum(r[2] for r in top_level)
+
+    print("\n" + "=" * 60, file=sys.stderr)
+    print(f"インポート時間（トップレベル合計: {total_us / 1000:.1f}ms）", file=sys.stderr)
+    print("=" * 60, file=sys.stderr)
+    print(f"{'累積ms':>10} {'自身ms':>10}  モジュール", file=sys.stderr)
+    for name, self_us, cum_us, _ in sorted(top_level, key=lambda r: r[2], reverse=True)[:top_n]:
+        print(f"{cum_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}", file=sys.stderr)
+    return proc.returncode
+
+
+# ========================================
+# 引数定義
+# ========================================
+
+def build_parser():
+    """argparseのパーサーを構築"""
+    parser = argparse.ArgumentParser(prog="buzz", description="バズ分析ツール統合CLI")
+    parser.add_argument("--profile-imports", action="store_true",
+                        help="モジュールごとのインポート時間を表示する")
+    sub = parser.add_subparsers(dest="command", metavar="<command>")
+    sub.required = True
+
+    p = sub.add_parser("fetch", help="バズポストを取得してCSV/Excelに保存")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("import", help="CSV/ExcelをDBにインポート")
+    p.add_argument("files", nargs="+", help="インポートするファイル")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("recalc", help="DB全体のスコア再計算")
+    p.set_defaults(func=cmd_recalc)
+
+    p = sub.add_parser("diff", help="最新インポート分の分析")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("report", help="詳細分析レポートを生成")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("charts", help="グラフを生成")
+    p.add_argument("input", nargs="?", default=None, help="入力CSV/Excel（省略時は既定ファイル）")
+    p.set_defaults(func=cmd_charts)
+
+    p = sub.add_parser("trend", help="複数日のトレンド比較（日別集計はDBに保存）")
+    p.add_argument("--since", default=None, help="開始日 YYYYMMDD")
+    p.add_argument("--until", default=None, help="終了日 YYYYMMDD")
+    p.set_defaults(func=cmd_trend)
+
+    p = sub.add_parser("accounts", help="競合アカウント分析")
+    p.add_argument("--test", action="store_true", help="既存Excelから読み込む（API呼び出しなし）")
+    p.add_argument("--test-file", default="output/buzz_posts_20260215.xlsx",
+                   help="テストモードで使用するExcelファイル")
+    p.set_defaults(func=cmd_accounts)
+
+    p = sub.add_parser("score", help="テキストのスコア診断（- で標準入力）")
+    p.add_argument("text", help="診断する本文")
+    p.add_argument("-v", "--verbose", action="store_true", help="内訳を表示")
+    p.set_defaults(func=cmd_score)
+
+    p = sub.add_parser("optimize", help="線形スコアの重みを学習して score_weights に保存")
+    p.add_argument("--folds", type=int, default=5, help="交差検証の分割数")
+    p.set_defaults(func=cmd_optimize)
+
+    p = sub.add_parser("serve", help="常駐スコアリングサービス（JSONL / HTTP）")
+    p.add_argument("--http", type=int, default=None, metavar="PORT",
+                   help="指定ポートでローカルHTTPサーバーを起動する")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    """エントリーポイント"""
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.profile_imports:
+        rest = [a for a in argv if a != "--profile-imports"]
+        return profile_imports(rest)
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
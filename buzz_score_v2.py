@@ -2,16 +2,13 @@
 
 import math
 import os
-import random
 import re
 from collections import defaultdict
 from datetime import datetime
 
-import numpy as np
 import pandas as pd
 
 from analyze_posts import (
-    EMOJI_PATTERN,
     POWER_WORDS,
     calculate_buzz_score,
     classify_category,
@@ -21,12 +18,30 @@ from analyze_posts import (
     load_excel,
     safe_get,
 )
+import loaders
+from char_classes import count_emoji
 
 BUZZ_FILE = "output/buzz_posts_20260215.xlsx"
 SELF_FILE = "output/TwExport_20260217_191942.csv"
 DB_FILE = "data/buzz_database.db"
 OUTPUT_FILE = "output/buzz_score_v2_20260217.md"
 
+# 真偽の特徴量の判定パターン（スコア計算・特徴量抽出・feature_store で共通）
+NUMBER_PATTERN = re.compile(r'[0-9０-９]+[万円個件つ選ステップヶ月日時間分秒%％倍]')
+MONEY_PATTERN = re.compile(r'[0-9０-９]+万|[0-9０-９]+円|月収|年収|売上')
+FEATURE_CTA_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in [r'いいね|👍', r'保存|ブックマーク', r'フォロー', r'リポスト|RT|シェア|拡散', r'コメント|返信|教えて']
+]
+AUTHORITY_PATTERN = re.compile(
+    r'マイクロソフト|Microsoft|Google|OpenAI|Claude|GPT|Apple|Amazon|Anthropic|Meta|イーロン',
+    re.IGNORECASE
+)
+TOOL_PATTERN = re.compile(
+    r'Claude Code|Cursor|ChatGPT|Gemini|Copilot|Antigravity|Playwright|Notion AI|Dify|v0',
+    re.IGNORECASE
+)
+
 
 # === v2.0 スコア計算（旧版・比較用に残す） ===
 
@@ -93,7 +108,7 @@ def calculate_buzz_score_v2_0(text, post_datetime=None):
     factors["簡潔さ"] = s
     total += s
 
-    emoji_count = len(EMOJI_PATTERN.findall(text))
+    emoji_count = count_emoji(text)
     if emoji_count == 0:
         s = 10
     elif emoji_count <= 2:
@@ -176,10 +191,8 @@ def calculate_buzz_score_v2(text, post_datetime=None):
     total += s
 
     # 4. 具体的数字 (12点) - あり平均97 vs なし65、中央値40 vs 32
-    has_numbers = bool(re.search(
-        r'[0-9０-９]+[万円個件つ選ステップヶ月日時間分秒%％倍]', text
-    ))
-    has_money = bool(re.search(r'[0-9０-９]+万|[0-9０-９]+円|月収|年収|売上', text))
+    has_numbers = bool(NUMBER_PATTERN.search(text))
+    has_money = bool(MONEY_PATTERN.search(text))
     s = 0
     if has_numbers:
         s += 8
@@ -200,14 +213,8 @@ def calculate_buzz_score_v2(text, post_datetime=None):
     total += s
 
     # 6. 権威/ツール言及 (8点) - AI界隈のバズワード
-    has_authority = bool(re.search(
-        r'マイクロソフト|Microsoft|Google|OpenAI|Claude|GPT|Apple|Amazon|Anthropic|Meta|イーロン',
-        text, re.IGNORECASE
-    ))
-    has_tool = bool(re.search(
-        r'Claude Code|Cursor|ChatGPT|Gemini|Copilot|Antigravity|Playwright|Notion AI|Dify|v0',
-        text, re.IGNORECASE
-    ))
+    has_authority = bool(AUTHORITY_PATTERN.search(text))
+    has_tool = bool(TOOL_PATTERN.search(text))
     s = 0
     if has_authority:
         s += 4
@@ -262,14 +269,12 @@ def extract_features(text):
     first_line = text.split("\n")[0] if text else ""
     length = len(text)
     line_breaks = text.count("\n")
-    emoji_count = len(EMOJI_PATTERN.findall(text))
+    emoji_count = count_emoji(text)
     pw_count = sum(1 for p in POWER_WORDS.values() if p.search(text))
 
-    has_numbers = bool(re.search(r'[0-9０-９]+[万円個件つ選ステップヶ月日時間分秒%％倍]', text))
-    has_money = bool(re.search(r'[0-9０-９]+万|[0-9０-９]+円|月収|年収|売上', text))
-
-    cta_patterns = [r'いいね|👍', r'保存|ブックマーク', r'フォロー', r'リポスト|RT|シェア|拡散', r'コメント|返信|教えて']
-    has_cta = any(re.search(p, text, re.IGNORECASE) for p in cta_patterns)
+    has_numbers = bool(NUMBER_PATTERN.search(text))
+    has_money = bool(MONEY_PATTERN.search(text))
+    has_cta = any(p.search(text) for p in FEATURE_CTA_PATTERNS)
 
     emotion_patterns = {
         "期待": r'チャンス|可能性|稼げる|儲かる|成功|達成|実現|できる',
@@ -303,11 +308,7 @@ def extract_features(text):
 
 
 def load_from_db(db_path):
-    """SQLiteデータベースから全投稿を読み込み、analyze_posts互換のDataFrameを返す"""
-    import sqlite3
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT * FROM posts", conn)
-    conn.close()
+    """SQLiteデータベースから全投稿を読み込み、analyze_posts互換のDataFrameを返す（loaders.load_posts の型付き列）"""
     # カラム名をanalyze_posts互換に変換
     rename_map = {
         "text": "本文",
@@ -318,23 +319,13 @@ def load_from_db(db_path):
         "account": "ユーザー名",
         "follower_count": "フォロワー数",
     }
-    df = df.rename(columns=rename_map)
-    for col in ["いいね数", "リポスト数", "リプライ数", "フォロワー数"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
-    return df
+    df = loaders.load_posts(db_path, columns=["id", *rename_map, "impressions"])
+    return df.rename(columns=rename_map)
 
 
 def load_self_posts(filepath):
-    """自分の投稿CSVを読み込む"""
-    df = pd.read_csv(filepath, encoding="utf-8-sig")
-    # TwExportのCSV列名をコード内の統一名称に変換
-    rename_map = {"テキスト": "本文", "RT数": "リポスト数"}
-    df = df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns})
-    for col in ["いいね数", "リポスト数", "リプライ数", "フォロワー数"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
-    return df
+    """自分の投稿CSVを読み込む（TwExportの列名は統一名称に変換）"""
+    return loaders.load_self_posts(filepath)
 
 
 # === レポート生成 ===
@@ -360,27 +351,15 @@ def compute_all_scores(df):
     return results
 
 
-def run_split_validation(all_scores, n_trials=30):
-    """ランダム半分分割検証"""
-    random.seed(42)
-    indices = list(range(len(all_scores)))
-    results = {"v1": [], "v2_0": [], "v2": []}
-    for _ in range(n_trials):
-        random.shuffle(indices)
-        half = len(indices) // 2
-        for version in results:
-            a_likes = [all_scores[i]["likes"] for i in indices[:half]]
-            a_scores = [all_scores[i][version] for i in indices[:half]]
-            b_likes = [all_scores[i]["likes"] for i in indices[half:]]
-            b_scores = [all_scores[i][version] for i in indices[half:]]
-            df_a = pd.DataFrame({"l": a_likes, "s": a_scores})
-            df_b = pd.DataFrame({"l": b_likes, "s": b_scores})
-            results[version].extend([
-                float(df_a["l"].corr(df_a["s"])),
-                float(df_b["l"].corr(df_b["s"])),
-            ])
-    return {k: {"mean": np.mean(v), "std": np.std(v), "min": min(v), "max": max(v)}
-            for k, v in results.items()}
+def run_split_validation(all_scores, n_trials=1000):
+    """ランダム半分分割検証（Pearson相関の平均・標準偏差・最小・最大）"""
+    from score_validation import split_validation
+
+    likes = [s["likes"] for s in all_scores]
+    scores = {v: [s[v] for s in all_scores] for v in ("v1", "v2_0", "v2")}
+    results = split_validation(likes, scores, n_trials=n_trials)
+    return {k: {stat: r["pearson"][stat] for stat in ("mean", "std", "min", "max")}
+            for k, r in results.items()}
 
 
 def generate_report(df_buzz, df_self):
@@ -692,6 +671,31 @@ def generate_report(df_buzz, df_self):
         lines.append(f"| {factor} | {max_pt}点 | {avg_val:.1f} | {fill:.0f}% |")
     lines.append("")
 
+    # 分割検証・ブートストラップ
+    from score_validation import bootstrap_ci, split_validation
+
+    likes_arr = [s["likes"] for s in all_scores]
+    version_scores = {v: [s[v] for s in all_scores] for v in ("v1", "v2_0", "v2")}
+    split = split_validation(likes_arr, version_scores, n_trials=1000)
+    boot = bootstrap_ci(likes_arr, version_scores, n_boot=1000)
+
+    lines.append("### 4.5 ランダム半分分割検証とブートストラップ信頼区間")
+    lines.append("")
+    lines.append("半分分割1000回（各試行で両半分の相関を算出）と、復元抽出1000回の95%信頼区間。")
+    lines.append("")
+    lines.append("| 版 | Pearson 平均 ± SD | Pearson 95%CI | Spearman 平均 ± SD | Spearman 95%CI |")
+    lines.append("|----|-------------------|---------------|--------------------|----------------|")
+    for v, label in (("v1", "v1"), ("v2_0", "v2.0"), ("v2", "v2")):
+        sp = split[v]
+        bp = boot[v]
+        lines.append(
+            f"| {label} | {sp['pearson']['mean']:+.3f} ± {sp['pearson']['std']:.3f} "
+            f"| [{bp['pearson']['low']:+.3f}, {bp['pearson']['high']:+.3f}] "
+            f"| {sp['spearman']['mean']:+.3f} ± {sp['spearman']['std']:.3f} "
+            f"| [{bp['spearman']['low']:+.3f}, {bp['spearman']['high']:+.3f}] |"
+        )
+    lines.append("")
+
     # === セクション5: 乖離投稿分析 ===
     lines.append("---")
     lines.append("")
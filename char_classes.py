@@ -0,0 +1,191 @@
+"""文字種の表引きによる集計（絵文字・記号・括弧・句読点・箇条書き）
+
+絵文字の個数や記号の有無は、これまで用途ごとの正規表現で本文を何度も走査していた。
+ここではコードポイント → 文字種ビットの表（BMPと、絵文字のある第1面まで。それより上の面は分類なし）を
+1回だけ作り、本文をコードポイントの配列にして表を引く1回の走査で、全部の集計をまとめて出す。
+一括版は全投稿をつないだ1本の配列で同じ計算をする。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 文字種のビット
+EMOJI = 1 << 0         # analyze_posts の絵文字（EMOJI_RANGES）
+PICTOGRAPH = 1 << 1    # 顔文字・記号・乗り物・旗の絵文字（compare_self_with_buzz の判定）
+ARROW = 1 << 2         # 矢印
+BRACKET = 1 << 3       # 括弧
+SYMBOL = 1 << 4        # 記号
+EXCLAMATION = 1 << 5   # ！
+QUESTION = 1 << 6      # ？
+ELLIPSIS = 1 << 7      # …
+DOT = 1 << 8           # .（2つ続きで三点リーダー扱い）
+BULLET = 1 << 9        # 行頭の箇条書き記号（直後が空白のとき）
+SPACE = 1 << 10        # 空白文字（str.isspace）
+NEWLINE = 1 << 11      # 改行
+
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF), (0x1F1E0, 0x1F1FF),
+    (0x2702, 0x27B0), (0x1F900, 0x1F9FF), (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF),
+    (0x2600, 0x26FF), (0xFE00, 0xFE0F), (0x200D, 0x200D),
+]
+PICTOGRAPH_RANGES = [(0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF), (0x1F1E0, 0x1F1FF)]
+BULLET_RANGES = [(ord("①"), ord("➓")), (ord("1"), ord("9"))]
+
+CHAR_SETS = {
+    ARROW: "→⇒➡",
+    BRACKET: "【】『』「」",
+    SYMBOL: "★☆◆◇■□▼▲",
+    EXCLAMATION: "！!",
+    QUESTION: "？?",
+    ELLIPSIS: "…",
+    DOT: ".",
+    BULLET: "・-*",
+    NEWLINE: "\n",
+}
+
+# 件数を数える文字種（列名 → ビット）。emoji は連続した絵文字を1個と数える
+COUNTED = {
+    "pictograph": PICTOGRAPH,
+    "arrow": ARROW,
+    "bracket": BRACKET,
+    "symbol": SYMBOL,
+    "exclamation": EXCLAMATION,
+    "question": QUESTION,
+}
+COLUMNS = ["emoji", *COUNTED, "ellipsis", "bullet_lines"]
+
+TABLE_SIZE = 0x20000
+
+
+def _build_table():
+    table = np.zeros(TABLE_SIZE + 1, dtype=np.uint16)  # 末尾は表の外のコードポイント用（分類なし）
+    for bit, ranges in ((EMOJI, EMOJI_RANGES), (PICTOGRAPH, PICTOGRAPH_RANGES), (BULLET, BULLET_RANGES)):
+        for lo, hi in ranges:
+            table[lo:hi + 1] |= bit
+    for bit, chars in CHAR_SETS.items():
+        for ch in chars:
+            table[ord(ch)] |= bit
+    for cp in range(0x10000):
+        if chr(cp).isspace():
+            table[cp] |= SPACE
+    return table
+
+
+CLASS_TABLE = _build_table()
+EMOJI_TABLE = (CLASS_TABLE & EMOJI) != 0  # 絵文字だけを数えるとき用（ビット演算を1回省く）
+# 1件の集計で列ごとに見るビット（列の順は _BIT_COLUMNS）
+_BIT_COLUMNS = [EMOJI, *COUNTED.values(), ELLIPSIS, DOT, BULLET]
+_BITS = np.array(_BIT_COLUMNS, dtype=np.uint16)
+
+
+def _codepoints(text):
+    return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+
+
+def classes(text):
+    """本文の各文字の文字種ビット（uint16の配列）"""
+    return CLASS_TABLE.take(_codepoints(text), mode="clip")
+
+
+def _run_starts(mask):
+    """True が連続する区間の先頭の位置"""
+    starts = np.flatnonzero(mask[1:] & ~mask[:-1]) + 1
+    return np.concatenate(([0], starts)) if len(mask) and mask[0] else starts
+
+
+def _run_lengths(mask):
+    """True が連続する区間の (先頭の位置, 長さ)"""
+    edges = np.diff(np.concatenate(([False], mask, [False])).view(np.int8))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def _bullets(k, line_start):
+    """行頭が箇条書き記号で、直後が空白の位置（analyze_posts の ^[・\-\*①-➓1-9]\s と同じ）"""
+    next_space = np.zeros(len(k), dtype=bool)
+    next_space[:-1] = (k[1:] & SPACE) != 0
+    return np.flatnonzero(((k & BULLET) != 0) & line_start & next_space)
+
+
+def count_emoji(text):
+    """絵文字の個数（連続した絵文字は1個。analyze_posts.EMOJI_PATTERN.findall の件数と同じ）"""
+    if not text:
+        return 0
+    e = EMOJI_TABLE.take(_codepoints(text), mode="clip")
+    return int(np.count_nonzero(e[1:] > e[:-1])) + int(e[0])
+
+
+def count_class(text, bit):
+    """文字種 bit の文字の個数"""
+    return int(np.count_nonzero(classes(text) & bit)) if text else 0
+
+
+def emoji_runs(text):
+    """連続した絵文字の文字列のリスト（EMOJI_PATTERN.findall と同じ）"""
+    if not text:
+        return []
+    starts, lengths = _run_lengths(EMOJI_TABLE.take(_codepoints(text), mode="clip"))
+    return [text[s:s + n] for s, n in zip(starts.tolist(), lengths.tolist())]
+
+
+def char_stats(text):
+    """1件の文字種の集計（COLUMNS をキーにした dict）
+
+    emoji: 絵文字の個数（連続は1個） / pictograph〜question: 各文字種の文字数 /
+    ellipsis: 「…」の数 +「..」の数 / bullet_lines: 「・」「-」「①」などで始まり直後が空白の行数
+    """
+    if not text:
+        return dict.fromkeys(COLUMNS, 0)
+    k = classes(text)
+    flags = (k[:, None] & _BITS) != 0
+    counts = flags.sum(axis=0).tolist()
+    e = flags[:, 0]
+    stats = {"emoji": int(np.count_nonzero(e[1:] > e[:-1])) + int(e[0])}
+    stats.update(zip(COUNTED, counts[1:len(COUNTED) + 1]))
+    ellipsis, dots, bullets = counts[len(COUNTED) + 1:]
+    # 点・箇条書き記号がない投稿（大半）は区間を調べない
+    if dots:
+        ellipsis += int((_run_lengths(flags[:, -2])[1] // 2).sum())
+    stats["ellipsis"] = ellipsis
+    if bullets:
+        line_start = np.empty(len(k), dtype=bool)
+        line_start[0] = True
+        line_start[1:] = (k[:-1] & NEWLINE) != 0
+        bullets = len(_bullets(k, line_start))
+    stats["bullet_lines"] = bullets
+    return stats
+
+
+def char_stats_many(texts):
+    """複数投稿の文字種の集計（1行1投稿のDataFrame、列は COLUMNS）。全投稿を1本の配列にして1回で数える"""
+    if isinstance(texts, pd.Series):
+        index = texts.index
+        texts = texts.fillna("").astype(str).tolist()
+    else:
+        texts = ["" if t is None else str(t) for t in texts]
+        index = None
+    n = len(texts)
+    if n == 0:
+        return pd.DataFrame({c: np.zeros(0, dtype=np.int64) for c in COLUMNS}, index=index)
+
+    # 区切りの "\0" は文字種なしなので、絵文字や点の連続は投稿をまたがない
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=offsets[1:])
+    k = classes("\0".join(texts))
+    seg = np.repeat(np.arange(n), lengths + 1)[:len(k)]
+
+    line_start = np.zeros(len(k), dtype=bool)
+    line_start[1:] = (k[:-1] & NEWLINE) != 0
+    line_start[offsets[lengths > 0]] = True
+    dot_starts, dot_lengths = _run_lengths((k & DOT) != 0)
+
+    def per_post(positions, weights=None):
+        return np.bincount(seg[positions], weights=weights, minlength=n).astype(np.int64)
+
+    data = {"emoji": per_post(_run_starts((k & EMOJI) != 0))}
+    for name, bit in COUNTED.items():
+        data[name] = per_post(np.flatnonzero(k & bit))
+    data["ellipsis"] = per_post(np.flatnonzero(k & ELLIPSIS)) + per_post(dot_starts, dot_lengths // 2)
+    data["bullet_lines"] = per_post(_bullets(k, line_start))
+    return pd.DataFrame(data, index=index)
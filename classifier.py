@@ -0,0 +1,297 @@
+"""冒頭パターン・カテゴリの分類エンジン（名前付きルールセット）
+
+冒頭パターンやカテゴリの分類は「ルールを上から順に試し、最初に一致したラベルを返す」形で、
+モジュールごとに if/elif の連鎖として書かれ、1行ずつ呼ばれていた。ここでは順序付きのルールを
+1本の正規表現（ルールごとの名前付きグループの選択）にまとめ、1件ずつの判定は1〜数回の search で
+最初に一致したルールを求める。一括版は同じ文字列を1回だけ、未決定の文字列にだけルールを当てて判定する。
+
+使い方:
+    python classifier.py            # DBの投稿で、ルールごとの照合・1件ずつ・一括の所要時間を比べる
+    python classifier.py category   # ルールセットを指定
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+def _short(pattern, max_length=30):
+    """「pattern に一致し、かつ文字列の長さが max_length 未満」を1つの正規表現にする"""
+    return rf"^(?=[\s\S]{{0,{max_length - 1}}}\Z)[\s\S]*?(?:{pattern})"
+
+
+# ========================================
+# ルールセット（名前 → (順序付きの (ラベル, パターン[, フラグ]), どれにも一致しないときのラベル)）
+# ========================================
+
+RULE_SETS = {
+    # 本文全体のカテゴリ（analyze_posts・trend_compare・dashboard）
+    "category": ([
+        ("実績報告系", r'達成|収益|稼げた|稼いだ|成功|実績|儲かった|〜万円|月収|年収|売上|報酬|利益', re.IGNORECASE),
+        ("ノウハウ系", r'方法|やり方|コツ|手順|ステップ|テクニック|攻略|マニュアル|ガイド|〜する方法|〜のやり方',
+         re.IGNORECASE),
+        ("体験談系", r'私が|僕が|自分が|実際に|やってみた|試してみた|体験|経験|〜したら|〜してみた', re.IGNORECASE),
+        ("問題提起系", r'は？|問題|危険|注意|警告|【悲報】|〜すぎる|ヤバい|おかしい', re.IGNORECASE),
+        ("ツール紹介系", r'ツール|アプリ|サービス|プラグイン|拡張機能|おすすめ|紹介|AI|Claude|ChatGPT|GPT',
+         re.IGNORECASE),
+        ("ニュース系", r'発表|リリース|開始|開催|速報|最新|ニュース|公開', re.IGNORECASE),
+    ], "その他"),
+    # 1行目の冒頭パターン（analyze_posts・buzz_score_v2 ほか）
+    "opening": ([
+        ("疑問形", r'[？?]'),
+        ("数字提示", r'^[0-9①-➓]|[0-9]+つ|[0-9]+個|[0-9]+選'),
+        ("煽り", r'は？|まじで|やばい|最悪|ありえない', re.IGNORECASE),
+        ("共感", r'わかる|共感|同じ|あるある', re.IGNORECASE),
+        ("断定形", r'です|ます|である|だ。'),
+        ("呼びかけ", r'みなさん|あなた|皆さん', re.IGNORECASE),
+    ], "その他"),
+    # アカウント分析の冒頭パターン（account_analyzer）
+    "opening:account": ([
+        ("数字提示", r"^\d+[.、。:：\s]"),
+        ("疑問形", r"[？?]|^(何|どう|いつ|どこ|誰|なぜ|どの)"),
+        ("断定形", r"(です|だ|である|ます|ました|でした)[\s。]*$"),
+        ("共感", r"(わかる|あるある|そう|ほんと|まじ|やば|すご|えぐ)", re.IGNORECASE),
+    ], "その他"),
+    # フックの型（compare_self_with_buzz・text_analysis）
+    "opening:hook": ([
+        ("疑問・問いかけ型", r"[\?？]"),
+        ("インパクト短文型", _short(r"[!！]")),
+        ("数字リスト型", r"\d+[選つ個万円%]"),
+        ("秘匿・衝撃事実型", r"(知らない|知らなかった|まだ|実は|ぶっちゃけ|正直|ガチで|マジで)"),
+        ("警告・否定型", r"(やめ|するな|ダメ|禁止|注意|危険|ヤバい|やばい)"),
+        ("ノウハウ提示型", r"(方法|やり方|コツ|ステップ|手順|始め方|稼ぎ方|稼げる)"),
+        ("指示語フック型", _short(r"(これ|この|あの|あれ)")),
+        ("体験談・自己開示型", r"(僕|私|俺|自分|ワイ)"),
+        ("推薦・絶賛型", r"(おすすめ|最強|神|便利|無料|0円)"),
+    ], "その他"),
+}
+
+
+# ========================================
+# 分類エンジン
+# ========================================
+
+def split_alternatives(pattern):
+    """パターンをトップレベルの | で分割する"""
+    parts, current, depth, i = [], "", 0, 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            current += pattern[i:i + 2]
+            i += 2
+            continue
+        if ch == "[":
+            end = pattern.index("]", i + 2 if pattern[i + 1:i + 2] in ("]", "^") else i + 1)
+            current += pattern[i:end + 1]
+            i = end + 1
+            continue
+        depth += (ch == "(") - (ch == ")")
+        if ch == "|" and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+        i += 1
+    parts.append(current)
+    return parts
+
+
+def first_char_class(pattern):
+    """一致の先頭になりうる文字を文字クラスの中身として返す（判定できない書き方ならNone）"""
+    items = []
+    for alt in split_alternatives(pattern):
+        if alt[:1] == "\\" and not alt[1:2].isalnum() or alt[:2] in ("\\d", "\\w", "\\s"):
+            item, rest = alt[:2], alt[2:]
+        elif alt[:1] == "[" and alt[:2] != "[^":
+            end = alt.index("]", 2 if alt[1:2] == "]" else 1)
+            item, rest = alt[1:end], alt[end + 1:]
+        elif alt[:3] == "(?:" or alt[:1] == "(" and alt[1:2] != "?":
+            depth = 0
+            for end, ch in enumerate(alt):
+                depth += (ch == "(") - (ch == ")")
+                if depth == 0:
+                    break
+            item = first_char_class(alt[3 if alt[:3] == "(?:" else 1:end])
+            rest = alt[end + 1:]
+        elif alt and alt[0] not in "\\[(.^$*+?{":
+            item, rest = re.escape(alt[0]), alt[1:]
+        else:
+            return None
+        if item is None or rest[:1] in ("?", "*") or rest[:2] == "{0":
+            return None
+        items.append(item)
+    return "".join(dict.fromkeys(items))
+
+
+class Classifier:
+    """順序付きのルールを名前付きグループの選択 `(?P<r0>…)|(?P<r1>…)|…` にまとめた分類器
+
+    選択の search は「最も左で一致したルール」を返すので、それより前のルールだけの選択で
+    その位置の次から探し直すことを繰り返し、最初に一致するルール（ルールを順に re.search した結果）を求める。
+    探し直しは最大でルール数回。ルールの先頭文字がわかるときは先読みの文字クラスで候補位置を絞る。
+    """
+
+    def __init__(self, rules, default="その他", flags=0):
+        rules = [tuple(r) for r in rules]
+        self.labels = [r[0] for r in rules]
+        self.default = default
+        self._patterns = [re.compile(r[1], flags | (r[2] if len(r) > 2 else 0)) for r in rules]
+        groups = []
+        for i, (label, pattern, *rule_flags) in enumerate(rules):
+            if rule_flags and rule_flags[0] & re.IGNORECASE:
+                pattern = f"(?i:{pattern})"
+            groups.append(f"(?P<r{i}>{pattern})")
+        # _prefixes[k]: ルール0〜k-1の選択と、一致したグループ番号 → ルール番号
+        self._prefixes = [(None, {})]
+        for k in range(1, len(rules) + 1):
+            first = first_char_class("|".join(r[1] for r in rules[:k]))
+            prefilter = f"(?i:(?=[{first}]))" if first else ""
+            regex = re.compile(f"{prefilter}(?:{'|'.join(groups[:k])})", flags)
+            self._prefixes.append((regex, {regex.groupindex[f"r{i}"]: i for i in range(k)}))
+        self.regex = self._prefixes[-1][0]
+
+    def rule_index(self, text):
+        """最初に一致するルールの番号（どれにも一致しなければルール数）"""
+        best, pos = len(self.labels), 0
+        while best:
+            regex, groups = self._prefixes[best]
+            m = regex.search(text, pos)
+            if m is None:
+                break
+            # 一致したルールの名前付きグループが最後に閉じるので lastindex がそのグループになる
+            best, pos = groups[m.lastindex], m.start() + 1
+        return best
+
+    def classify(self, text):
+        """1件の文字列のラベル"""
+        i = self.rule_index(text)
+        return self.labels[i] if i < len(self.labels) else self.default
+
+    def classify_series(self, texts):
+        """pd.Series（またはリスト）の各要素のラベルを同じindexのSeriesで返す
+
+        同じ文字列は1回だけ判定し、ルールを順に、まだラベルの決まっていない文字列にだけ当てる。
+        """
+        if not isinstance(texts, pd.Series):
+            texts = pd.Series(list(texts), dtype=object)
+        codes, uniques = pd.factorize(texts.fillna("").astype(str), use_na_sentinel=False)
+        values = np.asarray(uniques, dtype=object)
+        labels = np.full(len(values), self.default, dtype=object)
+        remaining = np.arange(len(values))
+        for label, pattern in zip(self.labels, self._patterns):
+            if not len(remaining):
+                break
+            search = pattern.search
+            hit = np.fromiter((search(v) is not None for v in values[remaining]), dtype=bool, count=len(remaining))
+            labels[remaining[hit]] = label
+            remaining = remaining[~hit]
+        return pd.Series(labels[codes], index=texts.index, dtype=object)
+
+
+@lru_cache(maxsize=None)
+def _compile(rules, default, flags):
+    return Classifier(rules, default, flags)
+
+
+def get_classifier(name):
+    """名前付きルールセットの分類器（初回だけコンパイル）"""
+    if name not in RULE_SETS:
+        raise ValueError(f"不明なルールセット: {name}")
+    rules, default = RULE_SETS[name]
+    return _compile(tuple(tuple(r) for r in rules), default, 0)
+
+
+def classifier_for(patterns, default="その他", flags=0):
+    """{ラベル: パターン} の辞書（定義順）から分類器を作る。同じ定義ならコンパイル済みのものを返す"""
+    return _compile(tuple(patterns.items()), default, flags)
+
+
+def classify(name, text):
+    """ルールセット name で1件を分類"""
+    return get_classifier(name).classify(text)
+
+
+def classify_series(name, texts):
+    """ルールセット name で pd.Series を一括分類"""
+    return get_classifier(name).classify_series(texts)
+
+
+def first_lines(texts, strip_text=False):
+    """各投稿の1行目（前後の空白を除く）。strip_text なら本文の前後の空白を先に除く"""
+    s = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+    s = s.fillna("").astype(str)
+    if strip_text:
+        s = s.str.strip()
+    return s.str.split("\n", n=1).str[0].str.strip()
+
+
+# ========================================
+# ベンチマーク
+# ========================================
+
+def _classify_rule_by_rule(rules, default, text):
+    """ルールを1本ずつ re.search する従来の判定（ベンチマークの比較用）"""
+    for label, pattern, *rule_flags in rules:
+        if re.search(pattern, text, rule_flags[0] if rule_flags else 0):
+            return label
+    return default
+
+
+def benchmark(texts, names=None):
+    """ルールセットごとに、ルールごとの照合・1件ずつ・一括の所要時間（秒）を測る"""
+    import time
+
+    texts = pd.Series(list(texts), dtype=object).fillna("").astype(str)
+    results = []
+    for name in names or RULE_SETS:
+        engine = get_classifier(name)
+        rules, default = RULE_SETS[name]
+        inputs = texts if name == "category" else first_lines(texts)
+
+        start = time.perf_counter()
+        expected = [_classify_rule_by_rule(rules, default, t) for t in inputs]
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scalar = [engine.classify(t) for t in inputs]
+        scalar_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = engine.classify_series(inputs)
+        batch_time = time.perf_counter() - start
+
+        results.append({
+            "name": name,
+            "posts": len(inputs),
+            "rule_by_rule": loop_time,
+            "scalar": scalar_time,
+            "batch": batch_time,
+            "same": scalar == expected and batch.tolist() == expected,
+        })
+    return results
+
+
+def main(names=None):
+    """メイン処理"""
+    import sqlite3
+
+    from import_csv import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    texts = [r[0] for r in conn.execute("SELECT text FROM posts")]
+    conn.close()
+    print(f"投稿: {len(texts):,}件")
+    for r in benchmark(texts, names):
+        print(f"{r['name']:<16} ルールごと {r['rule_by_rule']:.3f}秒 / 1件ずつ {r['scalar']:.3f}秒 / "
+              f"一括 {r['batch']:.3f}秒{'' if r['same'] else '  ※結果が不一致'}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="分類エンジンのベンチマーク")
+    parser.add_argument("names", nargs="*", help=f"ルールセット名（{', '.join(RULE_SETS)}）")
+    args = parser.parse_args()
+    main(names=args.names or None)
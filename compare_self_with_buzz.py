@@ -8,71 +8,29 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 
+import loaders
+from char_classes import PICTOGRAPH, count_class
+from classifier import first_lines, get_classifier
+
 
 def load_self_posts(csv_path):
     """CSVから自分の投稿を読み込む"""
-    df = pd.read_csv(csv_path, encoding='utf-8')
-    # カラム名を統一
-    df = df.rename(columns={
-        'テキスト': '本文',
-        'いいね数': 'いいね数',
-        'imp': 'インプレッション数',
-        '投稿日時': '投稿日時',
-        'リプライ数': 'リプライ数',
-        'RT数': 'リポスト数'
-    })
+    df = loaders.load_self_posts(csv_path)
     print(f"自分の投稿: {len(df)}件")
     return df
 
 
 def load_buzz_posts(xlsx_path):
     """Excelからバズ投稿を読み込む（フィルタリング済み）"""
-    df = pd.read_excel(xlsx_path)
-    print(f"バズ投稿: {len(df)}件")
-
-    # 炎上系除外
-    exclude_keywords = [
-        "著作権", "版権", "海賊版", "収益化停止", "収益化が停止",
-        "剥奪", "侵害", "インプレゾンビ"
-    ]
-    def should_exclude(text):
-        for kw in exclude_keywords:
-            if kw in str(text):
-                return True
-        return False
-    df = df[~df["本文"].apply(should_exclude)].copy()
-
-    # 同一ユーザー重複除去
-    df = df.sort_values("いいね数", ascending=False)
-    df = df.drop_duplicates(subset=["ユーザー名"], keep="first")
+    df = loaders.load_buzz_posts(xlsx_path)
     print(f"バズ投稿（フィルタ後）: {len(df)}件")
-    return df.reset_index(drop=True)
+    return df
 
 
 def classify_opening_pattern(text):
-    """冒頭パターンを分類"""
+    """冒頭パターンを分類（classifier のルールセット "opening:hook"）"""
     first_line = text.split("\n")[0].strip()
-
-    if re.search(r"[\?？]", first_line):
-        return "疑問・問いかけ型"
-    elif re.search(r"[!！]{1,}", first_line) and len(first_line) < 30:
-        return "インパクト短文型"
-    elif re.search(r"\d+[選つ個万円%]", first_line):
-        return "数字リスト型"
-    elif re.search(r"(知らない|知らなかった|まだ|実は|ぶっちゃけ|正直|ガチで|マジで)", first_line):
-        return "秘匿・衝撃事実型"
-    elif re.search(r"(やめ|するな|ダメ|禁止|注意|危険|ヤバい|やばい)", first_line):
-        return "警告・否定型"
-    elif re.search(r"(方法|やり方|コツ|ステップ|手順|始め方|稼ぎ方|稼げる)", first_line):
-        return "ノウハウ提示型"
-    elif re.search(r"(これ|この|あの|あれ)", first_line) and len(first_line) < 30:
-        return "指示語フック型"
-    elif re.search(r"(僕|私|俺|自分|ワイ)", first_line):
-        return "体験談・自己開示型"
-    elif re.search(r"(おすすめ|最強|神|便利|無料|0円)", first_line):
-        return "推薦・絶賛型"
-    else:
-        return "その他"
+    return get_classifier("opening:hook").classify(first_line)
 
 
 def classify_structure_pattern(text):
@@ -192,16 +150,8 @@ def calculate_buzz_score(text, likes=0, rts=0, replies=0):
     elif structure != "主張のみ（短文完結）":
         score += 5
 
-    # 6. 絵文字使用（5点）
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # 顔文字
-        "\U0001F300-\U0001F5FF"  # 記号・絵文字
-        "\U0001F680-\U0001F6FF"  # 乗り物・場所
-        "\U0001F1E0-\U0001F1FF"  # 旗
-        "]+", flags=re.UNICODE
-    )
-    if emoji_pattern.search(text):
+    # 6. 絵文字使用（5点）: 顔文字・記号・乗り物・旗（char_classes.PICTOGRAPH_RANGES）
+    if count_class(text, PICTOGRAPH):
         score += 5
 
     # 7. 改行・見やすさ（10点）
@@ -253,8 +203,9 @@ def compare_distributions(self_df, buzz_df):
     results = {}
 
     # 1. 冒頭パターンの分布
-    self_df['冒頭パターン'] = self_df['本文'].apply(lambda x: classify_opening_pattern(str(x)))
-    buzz_df['冒頭パターン'] = buzz_df['本文'].apply(lambda x: classify_opening_pattern(str(x)))
+    hook = get_classifier("opening:hook")
+    self_df['冒頭パターン'] = hook.classify_series(first_lines(self_df['本文'].astype(str)))
+    buzz_df['冒頭パターン'] = hook.classify_series(first_lines(buzz_df['本文'].astype(str)))
 
     self_opening = self_df['冒頭パターン'].value_counts(normalize=True) * 100
     buzz_opening = buzz_df['冒頭パターン'].value_counts(normalize=True) * 100
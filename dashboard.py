@@ -7,6 +7,9 @@ from collections import defaultdict
 import pandas as pd
 import streamlit as st
 
+from classifier import get_classifier
+from loaders import read_table
+
 # ===== ページ設定 =====
 st.set_page_config(
     page_title="バズポスト分析ダッシュボード",
@@ -16,23 +19,6 @@ st.set_page_config(
 
 
 # ===== ユーティリティ関数 =====
-def classify_category(text):
-    """カテゴリ分類"""
-    if re.search(r'達成|収益|稼げた|稼いだ|成功|実績|儲かった|〜万円|月収|年収|売上|報酬|利益', text, re.IGNORECASE):
-        return "実績報告系"
-    if re.search(r'方法|やり方|コツ|手順|ステップ|テクニック|攻略', text, re.IGNORECASE):
-        return "ノウハウ系"
-    if re.search(r'私が|僕が|自分が|実際に|やってみた|試してみた|体験|経験', text, re.IGNORECASE):
-        return "体験談系"
-    if re.search(r'は？|問題|危険|注意|警告|【悲報】|〜すぎる|ヤバい', text, re.IGNORECASE):
-        return "問題提起系"
-    if re.search(r'ツール|アプリ|サービス|おすすめ|紹介|AI|Claude|ChatGPT|GPT', text, re.IGNORECASE):
-        return "ツール紹介系"
-    if re.search(r'発表|リリース|開始|速報|最新|ニュース|公開', text, re.IGNORECASE):
-        return "ニュース系"
-    return "その他"
-
-
 def find_data_files():
     """利用可能なデータファイルを検索"""
     files = []
@@ -46,11 +32,8 @@ def find_data_files():
 
 
 def load_data(file_path):
-    """データ読み込み"""
-    if file_path.endswith(".csv"):
-        return pd.read_csv(file_path)
-    else:
-        return pd.read_excel(file_path)
+    """データ読み込み（loaders のキャッシュがあればそちらから）"""
+    return read_table(file_path)
 
 
 # ===== サイドバー =====
@@ -69,7 +52,7 @@ selected_file = st.sidebar.selectbox("データファイル", data_files)
 df = load_data(selected_file)
 
 # カテゴリ列を追加
-df["カテゴリ"] = df["本文"].apply(lambda x: classify_category(str(x)))
+df["カテゴリ"] = get_classifier("category").classify_series(df["本文"].astype(str))
 
 # フィルター
 st.sidebar.markdown("### フィルター")
@@ -0,0 +1,184 @@
+"""急上昇キーワードの検出（日ごとのキーワードスケッチから、いいね加重の伸びをzスコアで測る）
+
+keyword_sketch が保存した日ごとのスケッチ（インポートのたびに新規投稿の分だけ更新される）から
+語×日の行列（出現投稿数・いいね合計）を作り、語ごとに
+「直近数日の、1投稿あたりいいね加重の出現量」が「それ以前の基準期間」からどれだけ外れているかを
+一括でzスコア化する。行列の大半は0なので、スケッチに載っている (語, 日) だけを持つ疎行列
+（行・列・値の配列）で作り、0でない要素だけで集計する。
+"""
+
+import os
+
+import numpy as np
+
+from import_csv import DB_PATH
+
+RECENT_DAYS = 3
+BASELINE_DAYS = 14
+MIN_RECENT_POSTS = 2
+Z_THRESHOLD = 2.0
+# 基準期間のばらつきが小さすぎる語でzが暴れないよう、標準偏差に下限を置く
+MIN_STD = 0.5
+
+
+def _calendar(last_date, n_days):
+    """YYYYMMDD の最終日から遡る n_days 日分の日付（古い順）"""
+    last = np.datetime64(f"{last_date[:4]}-{last_date[4:6]}-{last_date[6:]}")
+    days = np.arange(last - np.timedelta64(n_days - 1, "D"), last + np.timedelta64(1, "D"))
+    return [str(d).replace("-", "") for d in days]
+
+
+def term_day_matrix(terms=None, n_days=RECENT_DAYS + BASELINE_DAYS, db_path=DB_PATH):
+    """直近n_days日（暦日、投稿のない日は0）の語×日の (出現投稿数, いいね合計) 行列を返す
+
+    terms を省略すると、期間内のいずれかの日の上位k件に載った語すべてを対象にする（出現数はその日の
+    上位k件の値）。いいね合計と、指定した語の出現数はCount-Minの推定値で埋める。
+    行列は0の要素を持たない疎行列 (行, 列, 値, (T, D)) で返す。
+    戻り値: (terms, days, counts, likes, n_posts[D])
+    """
+    import sqlite3
+
+    from keyword_sketch import _hash_rows, daily_sketches
+
+    empty = ([], [], _sparse([], [], [], (0, 0)), _sparse([], [], [], (0, 0)), np.zeros(0))
+    if not os.path.exists(db_path):
+        return empty
+    conn = sqlite3.connect(db_path)
+    try:
+        last = conn.execute("SELECT MAX(date) FROM keyword_sketches").fetchone()[0]
+    except sqlite3.OperationalError:
+        last = None
+    conn.close()
+    if last is None:
+        return empty
+
+    days = _calendar(last, n_days)
+    sketches = daily_sketches(since=days[0], until=days[-1], db_path=db_path)
+    col_of = {d: j for j, d in enumerate(days)}
+    n_posts = np.zeros(len(days))
+    for d, s in sketches.items():
+        n_posts[col_of[d]] = s.n_posts
+
+    given = terms is not None
+    if given:
+        terms = list(terms)
+    else:
+        seen = {}
+        for s in sketches.values():
+            seen.update(dict.fromkeys(s.items))
+        terms = list(seen)
+    index = {t: i for i, t in enumerate(terms)}
+    # ハッシュは語ごとに1回だけ計算し、全日のスケッチで使い回す
+    hashed = _hash_rows(terms)
+    depth = np.arange(hashed.shape[0])[:, None]
+
+    count_parts, like_parts = [], []  # 日ごとの (行, 列, 値)
+    all_rows = np.arange(len(terms))
+    for d, s in sketches.items():
+        likes = s.cm_likes[depth, hashed].min(axis=0)
+        if given:
+            rows, counts = all_rows, s.cm_count[depth, hashed].min(axis=0)
+        else:
+            rows = np.fromiter((index[t] for t in s.items), dtype=np.int64, count=len(s.items))
+            counts = np.array([c for c, _ in s.items.values()], dtype=np.float64)
+        for parts, r, v in ((count_parts, rows, counts), (like_parts, all_rows, likes)):
+            keep = v > 0
+            parts.append((r[keep], np.full(int(keep.sum()), col_of[d]), v[keep]))
+
+    shape = (len(terms), len(days))
+    return (terms, days, _sparse(*_stack(count_parts), shape), _sparse(*_stack(like_parts), shape), n_posts)
+
+
+def _stack(parts):
+    if not parts:
+        return [], [], []
+    return [np.concatenate(p) for p in zip(*parts)]
+
+
+def _sparse(rows, cols, values, shape):
+    """疎行列 (行, 列, 値, 形)"""
+    return (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+            np.asarray(values, dtype=np.float64), shape)
+
+
+def _as_sparse(matrix):
+    """密な行列（np.ndarray）も疎行列 (行, 列, 値, 形) にそろえる"""
+    if isinstance(matrix, np.ndarray):
+        rows, cols = np.nonzero(matrix)
+        return _sparse(rows, cols, matrix[rows, cols], matrix.shape)
+    return matrix
+
+
+def momentum_scores(counts, likes, n_posts, recent=RECENT_DAYS, baseline=BASELINE_DAYS):
+    """語ごとの急上昇zスコア（全語を一括計算）
+
+    1投稿あたりのいいね加重出現量 log1p(いいね合計 / その日の投稿数) を日次の信号とし、
+    直近recent日の平均が、その前のbaseline日の平均から標準偏差いくつ分上にあるかを返す。
+    counts / likes は語×日の疎行列 (行, 列, 値, 形)、または密な np.ndarray。
+    信号は出現のない (語, 日) で0なので、0でない要素の和と二乗和だけから平均・標準偏差を出す。
+    戻り値: (z, 直近の出現投稿数, 直近の平均信号, 基準期間の平均信号)
+    """
+    c_rows, c_cols, c_vals, (n_terms, n_days) = _as_sparse(counts)
+    l_rows, l_cols, l_vals, _ = _as_sparse(likes)
+    if n_days == 0:
+        empty = np.zeros(n_terms)
+        return empty, empty, empty, empty
+    recent = min(recent, n_days)
+    base_start = max(0, n_days - recent - baseline)
+    n_base = n_days - recent - base_start
+    signal = np.log1p(l_vals / np.maximum(np.asarray(n_posts, dtype=np.float64), 1)[l_cols])
+
+    def row_sums(rows, values, mask):
+        return np.bincount(rows[mask], weights=values[mask], minlength=n_terms)
+
+    recent_mean = row_sums(l_rows, signal, l_cols >= n_days - recent) / recent
+    if n_base == 0:
+        base_mean = np.zeros_like(recent_mean)
+        base_std = np.full_like(recent_mean, MIN_STD)
+    else:
+        in_base = (l_cols >= base_start) & (l_cols < n_days - recent)
+        base_mean = row_sums(l_rows, signal, in_base) / n_base
+        variance = np.maximum(row_sums(l_rows, signal ** 2, in_base) / n_base - base_mean ** 2, 0.0)
+        base_std = np.maximum(np.sqrt(variance), MIN_STD)
+    z = (recent_mean - base_mean) / base_std
+    return z, row_sums(c_rows, c_vals, c_cols >= n_days - recent), recent_mean, base_mean
+
+
+def detect_emerging_terms(top_n=20, recent=RECENT_DAYS, baseline=BASELINE_DAYS,
+                          z_threshold=Z_THRESHOLD, db_path=DB_PATH):
+    """いいね加重の出現量が加速している語を、zスコアの高い順に返す"""
+    terms, _, counts, likes, n_posts = term_day_matrix(n_days=recent + baseline, db_path=db_path)
+    if not terms:
+        return []
+    z, recent_posts, recent_mean, base_mean = momentum_scores(counts, likes, n_posts, recent, baseline)
+
+    flagged = np.flatnonzero((z >= z_threshold) & (recent_posts >= MIN_RECENT_POSTS))
+    flagged = flagged[np.argsort(-z[flagged], kind="stable")][:top_n]
+    return [{
+        "term": terms[i],
+        "z": round(float(z[i]), 2),
+        "recent_posts": int(recent_posts[i]),
+        "recent_signal": round(float(recent_mean[i]), 3),
+        "baseline_signal": round(float(base_mean[i]), 3),
+    } for i in flagged]
+
+
+def term_momentum(terms, recent=RECENT_DAYS, baseline=BASELINE_DAYS, db_path=DB_PATH):
+    """指定した語の {語: zスコア}（スケッチがなければ空のdict）"""
+    terms, days, counts, likes, n_posts = term_day_matrix(terms, recent + baseline, db_path)
+    if not terms or n_posts[:-recent].sum() == 0:
+        return {}  # 基準期間のデータがないと伸びは測れない
+    z, _, _, _ = momentum_scores(counts, likes, n_posts, recent, baseline)
+    return dict(zip(terms, z.tolist()))
+
+
+if __name__ == "__main__":
+    from keyword_sketch import update_daily_sketches
+
+    update_daily_sketches()
+    results = detect_emerging_terms()
+    if not results:
+        print("急上昇キーワードは検出されませんでした。")
+    for r in results:
+        print(f"  {r['term']:<16} z={r['z']:+.2f}  直近{r['recent_posts']}件  "
+              f"{r['baseline_signal']:.2f} → {r['recent_signal']:.2f}")
@@ -1,37 +1,13 @@
 """TOP10投稿を抽出するスクリプト"""
 
-import pandas as pd
 import json
 
-def extract_top_posts():
-    # 自分の投稿を読み込み
-    self_df = pd.read_csv("output/TwExport_20260217_191942.csv", encoding='utf-8')
-    self_df = self_df.rename(columns={
-        'テキスト': '本文',
-        'いいね数': 'いいね数',
-        'imp': 'インプレッション数',
-        '投稿日時': '投稿日時',
-        'リプライ数': 'リプライ数',
-        'RT数': 'リポスト数',
-        'URL': 'URL'
-    })
-
-    # バズ投稿を読み込み
-    buzz_df = pd.read_excel("output/buzz_posts_20260215.xlsx")
+from loaders import load_buzz_posts, load_self_posts
 
-    # 炎上系除外
-    exclude_keywords = [
-        "著作権", "版権", "海賊版", "収益化停止", "収益化が停止",
-        "剥奪", "侵害", "インプレゾンビ"
-    ]
-    def should_exclude(text):
-        for kw in exclude_keywords:
-            if kw in str(text):
-                return True
-        return False
-    buzz_df = buzz_df[~buzz_df["本文"].apply(should_exclude)].copy()
-    buzz_df = buzz_df.sort_values("いいね数", ascending=False)
-    buzz_df = buzz_df.drop_duplicates(subset=["ユーザー名"], keep="first")
+def extract_top_posts():
+    # 自分の投稿・バズ投稿（炎上系除外・同一ユーザー重複除去済み）を読み込み
+    self_df = load_self_posts("output/TwExport_20260217_191942.csv")
+    buzz_df = load_buzz_posts("output/buzz_posts_20260215.xlsx")
 
     # 自分のインプレッションTOP10
     self_top10 = self_df.nlargest(10, 'インプレッション数')
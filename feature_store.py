@@ -0,0 +1,298 @@
+"""投稿の真偽フラグ（数字・CTA・ストーリー・スレッド・リンク・トーン・心理トリガー）のビット列ストア
+
+各モジュールで別々に再計算していた真偽の特徴量を、1投稿につき uint64 のビット列（BLOB）として
+feature_flags テーブルに保存する。フラグの定義（名前と、判定に使うパターン・関数のソース）から版を作り、
+定義が変わったら作り直す。読み込んだビット列といいねの配列はDBが変わるまでメモリにキャッシュし、
+「CTA ∧ ストーリー ∧ ¬外部リンク の中央値いいね」のような問い合わせは、本文を読み直さずに
+ビット演算とマスク付きの集計だけで答える。
+
+使い方:
+    python feature_store.py                                      # フラグごとの件数・中央値いいね
+    python feature_store.py "has_cta & has_story & ~link:external"  # 条件に合う投稿のいいね統計
+"""
+
+import hashlib
+import inspect
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from algorithm_analysis import analyze_tone, detect_external_links, detect_thread_structure
+from analyze_posts import has_story
+from buzz_score_v2 import (
+    AUTHORITY_PATTERN,
+    FEATURE_CTA_PATTERNS,
+    MONEY_PATTERN,
+    NUMBER_PATTERN,
+    TOOL_PATTERN,
+)
+from import_csv import DB_PATH, init_db
+from reader_psychology import get_psychology_engine
+
+CHUNK_SIZE = 5000
+TONE_SIGNALS = ["positive", "constructive", "negative", "aggressive"]
+
+# 心理トリガー以外のフラグ（_base_flags の戻り値の順）
+BASE_FLAGS = [
+    "has_numbers", "has_money", "has_cta", "has_story", "has_authority", "has_tool",
+    "thread:starter", "thread:continuation", "thread:conversation",
+    "link:external", "link:x",
+    *(f"tone:{k}" for k in TONE_SIGNALS), "tone:grok_friendly",
+]
+
+_flags = {}  # db_path → (状態, 読み込んだ行, (投稿ID, いいね, ビット列))
+_version = None
+
+
+def flag_names():
+    """ビット番号順のフラグ名。心理トリガーは "like:共感（あるある）"、感情の判定は "emotion:驚き" の形"""
+    return BASE_FLAGS + [f"{table}:{name}" for table, name in get_psychology_engine().labels]
+
+
+def n_words():
+    """1投稿あたりの uint64 の語数"""
+    return (len(flag_names()) + 63) // 64
+
+
+def _base_flags(text):
+    thread = detect_thread_structure(text)
+    link = detect_external_links(text)
+    tone = analyze_tone(text)
+    return [
+        bool(NUMBER_PATTERN.search(text)),
+        bool(MONEY_PATTERN.search(text)),
+        any(p.search(text) for p in FEATURE_CTA_PATTERNS),
+        has_story(text),
+        bool(AUTHORITY_PATTERN.search(text)),
+        bool(TOOL_PATTERN.search(text)),
+        thread["is_thread_starter"],
+        thread["has_continuation_hint"],
+        thread["invites_conversation"],
+        link["has_external_link"],
+        link["has_x_link"],
+        *(tone["scores"][k] > 0 for k in TONE_SIGNALS),
+        tone["grok_friendly"],
+    ]
+
+
+def definition_version():
+    """フラグ定義の版（フラグ名・判定パターン・判定関数のソースのハッシュ）"""
+    global _version
+    if _version is not None:
+        return _version
+    sources = [inspect.getsource(f) for f in
+               (_base_flags, has_story, detect_thread_structure, detect_external_links, analyze_tone)]
+    patterns = [p.pattern for p in (NUMBER_PATTERN, MONEY_PATTERN, AUTHORITY_PATTERN, TOOL_PATTERN,
+                                    *FEATURE_CTA_PATTERNS)]
+    parts = flag_names() + sources + patterns + [get_psychology_engine().regex.pattern]
+    _version = hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+    return _version
+
+
+def compute_flags(texts):
+    """本文のリストから (投稿数 × 語数) の uint64 ビット列を作る"""
+    engine = get_psychology_engine()
+    words = n_words()
+    shift = len(BASE_FLAGS)
+    out = np.zeros((len(texts), words), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        text = text or ""
+        value = engine.bits(text) << shift
+        for j, flag in enumerate(_base_flags(text)):
+            if flag:
+                value |= 1 << j
+        for w in range(words):
+            out[i, w] = (value >> (64 * w)) & 0xFFFFFFFFFFFFFFFF
+    return out
+
+
+def update_feature_flags(db_path=None, chunk_size=CHUNK_SIZE, progress=None):
+    """未判定の投稿のフラグを計算して保存する（定義が変わっていたら全件作り直す）。処理件数を返す"""
+    db_path = db_path or DB_PATH
+    init_db(db_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    version = definition_version()
+    stored = {r[0] for r in conn.execute("SELECT DISTINCT version FROM feature_flag_defs")}
+    if stored != {version}:
+        conn.execute("DELETE FROM feature_flags")
+        conn.execute("DELETE FROM feature_flag_defs")
+        conn.executemany(
+            "INSERT INTO feature_flag_defs (bit, name, version) VALUES (?, ?, ?)",
+            [(i, name, version) for i, name in enumerate(flag_names())]
+        )
+        conn.commit()
+
+    last_id = conn.execute("SELECT COALESCE(MAX(post_id), 0) FROM feature_flags").fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM posts WHERE id > ?", (last_id,)).fetchone()[0]
+    added = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, text FROM posts WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+        ).fetchall()
+        if not rows:
+            break
+        bits = compute_flags([text for _, text in rows]).astype("<u8")
+        conn.executemany(
+            "INSERT OR REPLACE INTO feature_flags (post_id, bits) VALUES (?, ?)",
+            [(pid, row.tobytes()) for (pid, _), row in zip(rows, bits)]
+        )
+        conn.commit()
+        last_id = rows[-1][0]
+        added += len(rows)
+        if progress:
+            progress(added / total, f"フラグを計算中 {added:,}/{total:,}件")
+    conn.close()
+    return added
+
+
+def _read_flags(conn, after_id=0):
+    df = pd.read_sql(
+        """
+        SELECT p.id, p.likes, f.bits
+        FROM posts p JOIN feature_flags f ON f.post_id = p.id
+        WHERE p.id > ? ORDER BY p.id
+        """,
+        conn, params=(after_id,)
+    )
+    df["likes"] = pd.to_numeric(df["likes"], errors="coerce").fillna(0).astype("int64")
+    return df
+
+
+def load_feature_flags(db_path=None, progress=None):
+    """(投稿ID, いいね, ビット列[投稿数 × 語数]) のNumPy配列。DBが変わるまでキャッシュ
+
+    未判定の投稿があれば先に判定する（progress は update_feature_flags に渡す）。
+    """
+    db_path = db_path or DB_PATH
+    update_feature_flags(db_path, progress=progress)
+    conn = sqlite3.connect(db_path)
+    try:
+        state = tuple(conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM posts").fetchone())
+        state += (definition_version(),)
+        cached = _flags.get(db_path)
+        if cached and cached[0] == state:
+            return cached[2]
+        frame = None
+        if cached and cached[0][2] == state[2] and len(cached[1]):
+            # 追記だけなら新しい行だけ読み足す
+            old = cached[1]
+            added = _read_flags(conn, int(old["id"].iloc[-1]))
+            if len(old) + len(added) == state[0]:
+                frame = pd.concat([old, added], ignore_index=True)
+        if frame is None:
+            frame = _read_flags(conn)
+    finally:
+        conn.close()
+
+    bits = np.frombuffer(b"".join(frame["bits"]), dtype="<u8").astype(np.uint64).reshape(-1, n_words())
+    columns = (frame["id"].to_numpy(), frame["likes"].to_numpy(), bits)
+    _flags[db_path] = (state, frame, columns)
+    return columns
+
+
+def psychology_bits(bits):
+    """ビット列 → 心理トリガーの部分だけを PsychologyEngine.bits と同じ並びにした uint64 の配列"""
+    shift = len(BASE_FLAGS)
+    out = np.zeros(len(bits), dtype=np.uint64)
+    for i in range(len(get_psychology_engine().labels)):
+        bit = shift + i
+        out |= ((bits[:, bit // 64] >> np.uint64(bit % 64)) & np.uint64(1)) << np.uint64(i)
+    return out
+
+
+def _word_masks(names):
+    """フラグ名のリスト → 語ごとのビットマスク（uint64 の配列）"""
+    index = {name: i for i, name in enumerate(flag_names())}
+    masks = np.zeros(n_words(), dtype=np.uint64)
+    for name in names:
+        if name not in index:
+            raise ValueError(f"不明なフラグ: {name}")
+        bit = index[name]
+        masks[bit // 64] |= np.uint64(1 << (bit % 64))
+    return masks
+
+
+def parse_condition(condition):
+    """"has_cta & has_story & ~link:external" → (必須のフラグ, 除外するフラグ)"""
+    require, exclude = [], []
+    for term in condition.split("&"):
+        term = term.strip()
+        if not term:
+            continue
+        if term[0] in "~!¬":
+            exclude.append(term[1:].strip())
+        else:
+            require.append(term)
+    return require, exclude
+
+
+def flag_mask(bits, require=(), exclude=()):
+    """require のフラグが全部立ち、exclude のフラグがどれも立っていない行の真偽配列"""
+    req = _word_masks(require)
+    exc = _word_masks(exclude)
+    return ((bits & req) == req).all(axis=1) & ((bits & exc) == 0).all(axis=1)
+
+
+def _likes_stats(likes):
+    if len(likes) == 0:
+        return {"count": 0, "mean_likes": 0, "median_likes": 0}
+    return {"count": int(len(likes)), "mean_likes": float(likes.mean()), "median_likes": float(np.median(likes))}
+
+
+def query_flags(condition, db_path=None, min_likes=1):
+    """条件（parse_condition の書式）に合う投稿のいいね統計
+
+    戻り値: {"count", "share"（いいね>=min_likes の投稿に占める割合）, "mean_likes", "median_likes"}
+    """
+    _, likes, bits = load_feature_flags(db_path)
+    target = likes >= min_likes
+    mask = flag_mask(bits, *parse_condition(condition)) & target
+    stats = _likes_stats(likes[mask])
+    stats["share"] = stats["count"] / int(target.sum()) if target.any() else 0
+    return stats
+
+
+def flag_summary(db_path=None, min_likes=1):
+    """フラグごとの件数・平均/中央値いいね（フラグあり・なし）のリスト（ビット番号順）"""
+    _, likes, bits = load_feature_flags(db_path)
+    target = likes >= min_likes
+    bits, likes = bits[target], likes[target]
+    summary = []
+    for i, name in enumerate(flag_names()):
+        hit = (bits[:, i // 64] >> np.uint64(i % 64)) & np.uint64(1) == 1
+        on, off = _likes_stats(likes[hit]), _likes_stats(likes[~hit])
+        summary.append({
+            "flag": name,
+            "count": on["count"],
+            "mean_likes": on["mean_likes"],
+            "median_likes": on["median_likes"],
+            "median_likes_without": off["median_likes"],
+        })
+    return summary
+
+
+def clear_cache():
+    _flags.clear()
+
+
+def main(condition=None):
+    """メイン処理"""
+    if condition:
+        stats = query_flags(condition)
+        print(f"{condition}: {stats['count']:,}件（{stats['share']:.1%}） "
+              f"平均いいね {stats['mean_likes']:.1f} / 中央値 {stats['median_likes']:.0f}")
+        return
+    for row in flag_summary():
+        print(f"{row['flag']:<28} {row['count']:>8,}件  中央値いいね {row['median_likes']:>6.0f}"
+              f"（なし {row['median_likes_without']:.0f}）")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="真偽フラグのビット列ストア")
+    parser.add_argument("condition", nargs="?", default=None,
+                        help='例: "has_cta & has_story & ~link:external"')
+    args = parser.parse_args()
+    main(condition=args.condition)
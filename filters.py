@@ -0,0 +1,138 @@
+"""投稿の除外フィルタ（炎上系・プレゼント企画・同一ユーザーの重複）と除外理由
+
+除外キーワードは、これまで本文1件ごとにキーワードのリストをループして調べていた（取り込み時も同じ）。
+ここでは全キーワードの正規表現の選択（|）を1つ作り、全投稿を "\\0" でつないだ1本の文字列を
+1回だけ走査する。一致した投稿（ごく一部）だけ、どのルールに当たったかを優先順に調べ直す。
+結果は投稿ごとの除外理由（カテゴリ型の列。残す投稿は "keep"）で返す。
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# 炎上系・著作権問題系の除外キーワード
+EXCLUDE_KEYWORDS = [
+    "著作権", "版権", "海賊版", "収益化停止", "収益化が停止",
+    "剥奪", "侵害", "インプレゾンビ"
+]
+
+# プレゼント企画・業者系投稿の除外キーワード
+GIVEAWAY_KEYWORDS = [
+    "いいねしたら",
+    "フォロー&RT",
+    "RT&フォロー",
+    "プレゼント企画",
+    "抽選で",
+    "配布します",
+    "全員に配",
+    "リプで送ります",
+]
+
+# 除外理由（カテゴリの順 = コード）
+KEEP = "keep"
+EXCLUDED = "exclude_keyword"
+GIVEAWAY = "giveaway"
+DUPLICATE = "duplicate_user"
+REASONS = [KEEP, EXCLUDED, GIVEAWAY, DUPLICATE]
+REASON_LABELS = {
+    EXCLUDED: "炎上系・著作権問題系",
+    GIVEAWAY: "プレゼント企画・業者系",
+    DUPLICATE: "同一ユーザーの重複投稿",
+}
+
+# キーワードで判定する理由とキーワード（両方に当たる投稿は先の理由）
+KEYWORDS = {
+    EXCLUDED: EXCLUDE_KEYWORDS,
+    GIVEAWAY: GIVEAWAY_KEYWORDS,
+}
+ALL_RULES = (EXCLUDED, GIVEAWAY)
+
+
+@lru_cache(maxsize=None)
+def _pattern(keywords):
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+def _texts(texts):
+    if isinstance(texts, pd.Series):
+        return texts.fillna("").astype(str).tolist(), texts.index
+    return ["" if t is None else str(t) for t in texts], None
+
+
+def _hit_rows(texts, keywords):
+    """いずれかのキーワードを含む本文の位置（昇順）。全本文をつないだ文字列を1回だけ走査する"""
+    n = len(texts)
+    if not n or not keywords:
+        return np.zeros(0, dtype=np.int64)
+    # 区切りの "\0" はキーワードに含まれないので、一致が投稿をまたがない
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=offsets[1:])
+    starts = [m.start() for m in _pattern(tuple(keywords)).finditer("\0".join(texts))]
+    return np.unique(np.searchsorted(offsets, starts, side="right") - 1)
+
+
+# ========================================
+# キーワードによる除外理由
+# ========================================
+
+def keyword_mask(texts, keywords):
+    """いずれかのキーワードを含む行がTrueのマスク（部分一致。欠損は空文字扱い）"""
+    texts, index = _texts(texts)
+    mask = np.zeros(len(texts), dtype=bool)
+    mask[_hit_rows(texts, keywords)] = True
+    return pd.Series(mask, index=index)
+
+
+def keyword_reasons(texts, rules=ALL_RULES):
+    """本文ごとの除外理由（カテゴリ型のSeries）。rules は KEYWORDS のキーを優先順に並べたもの"""
+    texts, index = _texts(texts)
+    n = len(texts)
+    codes = np.zeros(n, dtype=np.int8)
+    keywords = tuple(kw for rule in rules for kw in KEYWORDS[rule])
+    if n and keywords:
+        hits = _hit_rows(texts, keywords)
+        rule_patterns = [(REASONS.index(rule), _pattern(tuple(KEYWORDS[rule]))) for rule in rules]
+        for i in hits.tolist():
+            for code, pattern in rule_patterns:
+                if pattern.search(texts[i]):
+                    codes[i] = code
+                    break
+    return pd.Series(pd.Categorical.from_codes(codes, REASONS), index=index)
+
+
+# ========================================
+# 重複除去とフィルタ全体
+# ========================================
+
+def dedup_by_user(df):
+    """同一ユーザーの投稿は最もいいね数が高い1件だけ残す"""
+    df = df.sort_values("いいね数", ascending=False)
+    return df.drop_duplicates(subset=["ユーザー名"], keep="first")
+
+
+def apply_filters(df, rules=ALL_RULES, dedup=True):
+    """キーワード除外と同一ユーザーの重複除去をまとめて行う。(残した投稿, 除外理由) を返す
+
+    除外理由は df と同じ行・同じインデックスのカテゴリ型Series。
+    dedup=True のとき残した投稿はいいね数の降順（dedup_by_user と同じ順）。
+    """
+    reasons = keyword_reasons(df["本文"], rules)
+    kept = df[(reasons == KEEP).to_numpy()]
+    if dedup:
+        kept_positions = np.flatnonzero((reasons == KEEP).to_numpy())
+        order = dedup_by_user(kept.set_axis(range(len(kept)))).index.to_numpy()
+        codes = reasons.cat.codes.to_numpy().copy()
+        duplicate = np.ones(len(kept), dtype=bool)
+        duplicate[order] = False
+        codes[kept_positions[duplicate]] = REASONS.index(DUPLICATE)
+        reasons = pd.Series(pd.Categorical.from_codes(codes, REASONS), index=df.index)
+        kept = kept.iloc[order]
+    return kept.copy(), reasons
+
+
+def reason_counts(reasons):
+    """除外理由ごとの件数（REASONS の順の dict。keep を含む）"""
+    return {reason: int(n) for reason, n in reasons.value_counts(sort=False).reindex(REASONS, fill_value=0).items()}
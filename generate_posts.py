@@ -1,56 +1,54 @@
 """分析データに基づくバズポスト自動生成（テンプレート方式）"""
 
+import os
 import random
 import re
-from collections import defaultdict
+import sqlite3
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
+from keyword_sketch import TOOL_TERMS, WORK_TERMS, canonical_term, term_pattern
+from loaders import read_table
 
-def extract_trending_topics(df):
-    """データからトレンドのトピック・キーワードを抽出"""
-    tool_pattern = re.compile(
-        r'(ChatGPT|Claude|Claude Code|Gemini|Copilot|Midjourney|'
-        r'Stable Diffusion|DALL-E|Canva|Notion AI|Cursor|v0|Bolt)',
-        re.IGNORECASE
-    )
-    work_pattern = re.compile(
-        r'(ライティング|デザイン|プログラミング|動画編集|画像生成|'
-        r'コンテンツ販売|アフィリエイト|コンサル|Web制作|自動化|'
-        r'ブログ|YouTube|SNS運用|翻訳|データ分析)',
-        re.IGNORECASE
-    )
 
-    # 正規化マッピング（大文字小文字の揺れを統一）
-    tool_normalize = {
-        "chatgpt": "ChatGPT", "claude": "Claude", "claude code": "Claude Code",
-        "gemini": "Gemini", "copilot": "Copilot", "midjourney": "Midjourney",
-        "stable diffusion": "Stable Diffusion", "dall-e": "DALL-E",
-        "canva": "Canva", "notion ai": "Notion AI", "cursor": "Cursor",
-        "v0": "v0", "bolt": "Bolt",
-    }
-    work_normalize = {
-        "youtube": "YouTube", "sns運用": "SNS運用", "web制作": "Web制作",
-    }
+def extract_trending_topics(df, momentum=None):
+    """データからトレンドのトピック・キーワードを抽出
 
-    tools = defaultdict(int)
-    works = defaultdict(int)
+    いいね数の合計で順位付けし、日ごとのキーワードスケッチがあれば
+    直近で伸びている語（emerging_terms のzスコアが正）を上位に寄せる。
+    momentum に {語: zスコア} を渡すとDBを読まずにそれを使う。
+    """
+    # ツール名・仕事の種類は keyword_sketch と同じ語彙・表記（急上昇スコアの語と一致させる）
+    tool_pattern = term_pattern(TOOL_TERMS)
+    work_pattern = term_pattern(WORK_TERMS)
 
-    for _, row in df.iterrows():
-        text = str(row.get("本文", ""))
-        likes = row.get("いいね数", 0)
+    texts = df["本文"].astype(str) if "本文" in df.columns else pd.Series("", index=df.index)
+    likes = df["いいね数"] if "いいね数" in df.columns else pd.Series(0, index=df.index)
+
+    def liked_terms(pattern):
+        """出現1回ごとにその投稿のいいね数を足した {語: いいね合計}（初出順）"""
+        found = pd.DataFrame({"term": texts.str.findall(pattern), "likes": likes}).explode("term").dropna()
+        if found.empty:
+            return {}
+        found["term"] = found["term"].map(canonical_term)
+        return found.groupby("term", sort=False)["likes"].sum().to_dict()
 
-        for match in tool_pattern.finditer(text):
-            normalized = tool_normalize.get(match.group().lower(), match.group())
-            tools[normalized] += likes
-        for match in work_pattern.finditer(text):
-            normalized = work_normalize.get(match.group().lower(), match.group())
-            works[normalized] += likes
+    tools = liked_terms(tool_pattern)
+    works = liked_terms(work_pattern)
+
+    if momentum is None:
+        momentum = _term_momentum([*tools, *works])
+
+    def rank(totals):
+        # いいね合計を、直近で伸びている語ほど持ち上げる（伸びていない語はそのまま）
+        boosted = {t: v * (1 + max(momentum.get(t, 0.0), 0.0)) for t, v in totals.items()}
+        return sorted(boosted.items(), key=lambda x: x[1], reverse=True)[:5]
 
     # Claude Code があれば Claude と統合しない（別ツールとして扱う）
-    top_tools = sorted(tools.items(), key=lambda x: x[1], reverse=True)[:5]
-    top_works = sorted(works.items(), key=lambda x: x[1], reverse=True)[:5]
+    top_tools = rank(tools)
+    top_works = rank(works)
 
     return (
         [t[0] for t in top_tools] if top_tools else ["ChatGPT", "Claude Code", "Canva"],
@@ -58,6 +56,19 @@ def extract_trending_topics(df):
     )
 
 
+def _term_momentum(terms):
+    """DBに日ごとのキーワードスケッチがあれば、語ごとの急上昇zスコアを返す（なければ空）"""
+    from emerging_terms import term_momentum
+    from import_csv import DB_PATH
+
+    if not terms or not os.path.exists(DB_PATH):
+        return {}
+    try:
+        return term_momentum(terms)
+    except sqlite3.Error:
+        return {}  # 読めないDB・スキーマが古いDBなら伸びは使わない
+
+
 def extract_effective_ctas(df):
     """効果的なCTAを分析データから抽出"""
     cta_patterns = {
@@ -98,12 +109,12 @@ def extract_top_numbers(df):
     return numbers if numbers else ["30万円", "3ヶ月", "2時間", "月5万円"]
 
 
-def generate_achievement_post(tools, works, numbers):
+def generate_achievement_post(tools, works, numbers, rng=random):
     """パターン1: 実績報告×数字提示型"""
-    tool = random.choice(tools)
-    work = random.choice(works)
-    amount = random.choice(["5万円", "10万円", "15万円", "20万円", "30万円"])
-    steps = random.sample(works, min(3, len(works)))
+    tool = rng.choice(tools)
+    work = rng.choice(works)
+    amount = rng.choice(["5万円", "10万円", "15万円", "20万円", "30万円"])
+    steps = rng.sample(works, min(3, len(works)))
 
     templates = [
         f"""AI副業で月収{amount}達成しました
@@ -138,16 +149,16 @@ def generate_achievement_post(tools, works, numbers):
 
     return {
         "type": "実績報告×数字提示型",
-        "text": random.choice(templates),
+        "text": rng.choice(templates),
         "tips": "具体的な数字を入れるほどバズりやすい。自分の実績に合わせて数字を調整してください",
     }
 
 
-def generate_problem_empathy_post(tools, works, numbers):
+def generate_problem_empathy_post(tools, works, numbers, rng=random):
     """パターン2: 問題提起×共感型"""
-    tool = random.choice(tools)
-    work = random.choice(works)
-    amount = random.choice(["5万円", "10万円", "15万円"])
+    tool = rng.choice(tools)
+    work = rng.choice(works)
+    amount = rng.choice(["5万円", "10万円", "15万円"])
 
     templates = [
         f"""「AI副業なんて怪しい」って思ってた。
@@ -184,16 +195,16 @@ AIを使って稼ぐ側に回るだけ。
 
     return {
         "type": "問題提起×共感型",
-        "text": random.choice(templates),
+        "text": rng.choice(templates),
         "tips": "読者の不安や悩みに共感してから解決策を提示するのがポイント",
     }
 
 
-def generate_howto_post(tools, works, numbers):
+def generate_howto_post(tools, works, numbers, rng=random):
     """パターン3: ノウハウ×箇条書き型"""
-    tool = random.choice(tools)
-    work = random.choice(works)
-    amount = random.choice(["5万円", "10万円"])
+    tool = rng.choice(tools)
+    work = rng.choice(works)
+    amount = rng.choice(["5万円", "10万円"])
 
     templates = [
         f"""初心者がAI副業で月{amount}稼ぐ方法
@@ -233,12 +244,12 @@ def generate_howto_post(tools, works, numbers):
 
     return {
         "type": "ノウハウ×箇条書き型",
-        "text": random.choice(templates),
+        "text": rng.choice(templates),
         "tips": "ステップを明確にして「自分にもできそう」と思わせるのがコツ",
     }
 
 
-def _pick_compatible_pair(tools, works):
+def _pick_compatible_pair(tools, works, rng=random):
     """ツールとジャンルの自然な組み合わせを選ぶ"""
     compatibility = {
         "ChatGPT": ["ライティング", "コンテンツ販売", "ブログ", "SNS運用", "翻訳", "自動化"],
@@ -248,18 +259,18 @@ def _pick_compatible_pair(tools, works):
         "Midjourney": ["デザイン", "画像生成"],
         "Cursor": ["プログラミング", "自動化", "Web制作"],
     }
-    random.shuffle(tools)
+    rng.shuffle(tools)
     for tool in tools:
         compatible = compatibility.get(tool, works)
         matches = [w for w in works if w in compatible]
         if matches:
-            return tool, random.choice(matches)
-    return random.choice(tools), random.choice(works)
+            return tool, rng.choice(matches)
+    return rng.choice(tools), rng.choice(works)
 
 
-def generate_story_post(tools, works, numbers):
+def generate_story_post(tools, works, numbers, rng=random):
     """パターン4: 体験談×ストーリー型"""
-    tool, work = _pick_compatible_pair(tools, works)
+    tool, work = _pick_compatible_pair(tools, works, rng)
 
     templates = [
         f"""3ヶ月前: 残業月80時間で手取り25万
@@ -295,15 +306,15 @@ def generate_story_post(tools, works, numbers):
 
     return {
         "type": "体験談×ストーリー型",
-        "text": random.choice(templates),
+        "text": rng.choice(templates),
         "tips": "Before→Afterを明確にして、リアルな数字を含めると共感されやすい",
     }
 
 
-def generate_tool_intro_post(tools, works, numbers):
+def generate_tool_intro_post(tools, works, numbers, rng=random):
     """パターン5: ツール紹介×緊急性型"""
-    tool = random.choice(tools)
-    work = random.choice(works)
+    tool = rng.choice(tools)
+    work = rng.choice(works)
 
     # ランキング用にユニークなツール3つを確保
     unique_tools = list(dict.fromkeys(tools))  # 重複除去、順序保持
@@ -364,18 +375,162 @@ def generate_tool_intro_post(tools, works, numbers):
 
     return {
         "type": "ツール紹介×緊急性型",
-        "text": random.choice(templates),
+        "text": rng.choice(templates),
         "tips": "具体的なツール名を出すと検索流入も狙える。「今」「まだ」で緊急性を出す",
     }
 
 
-def generate_posts(df, n=5, topic=None):
+GENERATORS = [
+    generate_achievement_post,
+    generate_problem_empathy_post,
+    generate_howto_post,
+    generate_story_post,
+    generate_tool_intro_post,
+]
+
+# 候補探索モード
+POOL_SIZE = 200      # CTAの付け替えを試す上位候補数
+MMR_LAMBDA = 0.7     # 1に近いほどスコア重視、0に近いほど多様性重視
+MAX_SIMILARITY = 0.8  # 選択済みの投稿とこれ以上似た候補は（他に候補がある限り）選ばない
+
+
+class SlotWalker:
+    """rng の代わりに生成関数へ渡し、choice / sample / shuffle の選択肢の組み合わせを順に全部たどる
+
+    1回の生成で行った選択を添字の列として記録し、次の回は最後の選択から繰り上げる（桁上がり式）。
+    後の選択肢が前の選択で変わる場合（_pick_compatible_pair など）も、その回に実際に出た選択肢でたどる。
+    """
+
+    def __init__(self):
+        self._path = []   # 各選択で選ぶ添字
+        self._sizes = []  # 各選択の選択肢数（今回の生成で記録）
+        self._pos = 0
+
+    def _pick(self, n):
+        if self._pos == len(self._path):
+            self._path.append(0)
+        self._sizes.append(n)
+        self._pos += 1
+        return self._path[self._pos - 1]
+
+    def choice(self, seq):
+        return seq[self._pick(len(seq))]
+
+    def sample(self, population, k):
+        pool = list(population)
+        return [pool.pop(self._pick(len(pool))) for _ in range(k)]
+
+    def shuffle(self, x):
+        pool = list(x)
+        x[:] = [pool.pop(self._pick(len(pool))) for _ in range(len(pool))]
+
+    def walk(self, make):
+        """make(self) を選択肢の組み合わせごとに1回ずつ呼んだ結果を順に返す"""
+        self._path = []
+        while True:
+            self._sizes, self._pos = [], 0
+            yield make(self)
+            path = self._path[:self._pos]
+            while path and path[-1] + 1 >= self._sizes[len(path) - 1]:
+                path.pop()
+            if not path:
+                return
+            path[-1] += 1
+            self._path = path
+
+
+def enumerate_candidates(tools, works, numbers):
+    """5パターンの生成関数のスロット（ツール・ジャンル・金額・テンプレートなど）の全組み合わせから、
+    本文が重複しない候補を作る（乱数を使わないので同じ入力なら同じ候補・同じ順）"""
+    tools, works = list(dict.fromkeys(tools)), list(dict.fromkeys(works))
+    candidates = {}
+    for gen in GENERATORS:
+        for post in SlotWalker().walk(lambda rng: gen(list(tools), list(works), numbers, rng)):
+            candidates.setdefault(post["text"], post)
+    return list(candidates.values())
+
+
+def score_texts(texts):
+    """v2スコアとアルゴリズムスコアをまとめて計算し、(合成スコア, v2, アルゴリズム) の配列を返す
+
+    どちらのスコア関数も1本文ずつ評価する（本文ごとのPythonループ。同じ本文は1回だけ計算する）。
+    """
+    from algorithm_analysis import calculate_algorithm_score
+    from buzz_score_v2 import calculate_buzz_score_v2
+
+    unique = list(dict.fromkeys(texts))
+    v2 = dict(zip(unique, (calculate_buzz_score_v2(t)["total_score"] for t in unique)))
+    algo = dict(zip(unique, (calculate_algorithm_score(t)["total_score"] for t in unique)))
+    v2 = np.fromiter((v2[t] for t in texts), dtype=np.float64, count=len(texts))
+    algo = np.fromiter((algo[t] for t in texts), dtype=np.float64, count=len(texts))
+    return (v2 + algo) / 2, v2, algo
+
+
+def _ngram_vectors(texts):
+    """文字n-gram（similarity_index と同じハッシュ、サブリニアTF）のL2正規化済み行列"""
+    from similarity_index import hashed_ngram_counts
+
+    rows, feats, counts = hashed_ngram_counts(texts)
+    cols, inverse = np.unique(feats, return_inverse=True)
+    X = np.zeros((len(texts), len(cols)))
+    X[rows, inverse] = 1 + np.log(counts)
+    X /= np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+    return X
+
+
+def select_mmr(scores, X, n, lam=MMR_LAMBDA, max_similarity=MAX_SIMILARITY):
+    """MMR: スコアが高く、選択済みの候補に似ていないものから順にn件選ぶ（添字のリスト）"""
+    scores = np.asarray(scores, dtype=np.float64)
+    span = scores.max() - scores.min() if len(scores) else 0
+    relevance = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+    max_sim = np.zeros(len(scores))
+    available = np.ones(len(scores), dtype=bool)
+    selected = []
+    for _ in range(min(n, len(scores))):
+        allowed = available & (max_sim <= max_similarity)
+        if not allowed.any():
+            allowed = available
+        mmr = np.where(allowed, lam * relevance - (1 - lam) * max_sim, -np.inf)
+        i = int(np.argmax(mmr))
+        selected.append(i)
+        available[i] = False
+        max_sim = np.maximum(max_sim, X @ X[i])
+    return selected
+
+
+def search_posts(tools, works, numbers, ctas, n=5):
+    """候補を全組み合わせで生成して一括採点し、似た投稿が並ばないよう上位n件を選ぶ"""
+    candidates = enumerate_candidates(tools, works, numbers)
+    texts = [c["text"] for c in candidates]
+    base, _, _ = score_texts(texts)
+    pool = np.argsort(-base, kind="stable")[:POOL_SIZE]
+
+    # CTAの付け替え（なし + 各CTA）は上位候補にだけ試す
+    variants = [(int(i), cta) for i in pool for cta in [None, *ctas]]
+    full_texts = [texts[i] if cta is None else f"{texts[i]}\n\n{cta}" for i, cta in variants]
+    total, v2, algo = score_texts(full_texts)
+
+    posts = []
+    for j in select_mmr(total, _ngram_vectors(full_texts), n):
+        i, cta = variants[j]
+        post = dict(candidates[i])
+        if cta:
+            post["cta"] = cta
+        post["score"] = round(float(total[j]), 1)
+        post["v2_score"] = int(v2[j])
+        post["algorithm_score"] = int(algo[j])
+        posts.append(post)
+    return posts
+
+
+def generate_posts(df, n=5, topic=None, search=False):
     """分析データに基づいてバズポストのテンプレートを生成
 
     Args:
         df: 分析済みのDataFrame
         n: 生成する投稿数（デフォルト5）
         topic: 特定のトピック（指定なしならデータから自動抽出）
+        search: Trueなら候補を大量に生成・採点し、多様性を保った上位n件を返す
 
     Returns:
         list: 生成された投稿テンプレートのリスト
@@ -384,17 +539,12 @@ def generate_posts(df, n=5, topic=None):
     numbers = extract_top_numbers(df)
     ctas = extract_effective_ctas(df)
 
-    generators = [
-        generate_achievement_post,
-        generate_problem_empathy_post,
-        generate_howto_post,
-        generate_story_post,
-        generate_tool_intro_post,
-    ]
+    if search:
+        return search_posts(tools, works, numbers, ctas, n), tools, works, ctas
 
     posts = []
     for i in range(n):
-        gen = generators[i % len(generators)]
+        gen = GENERATORS[i % len(GENERATORS)]
         post = gen(tools, works, numbers)
         # 効果的なCTAを追加
         if ctas and random.random() > 0.3:
@@ -424,6 +574,9 @@ def format_posts_markdown(posts, tools, works, ctas, section_num=8):
             lines.append(f"\n{post['cta']}")
         lines.append("```\n")
         lines.append(f"> **Tips:** {post['tips']}\n")
+        if "score" in post:
+            lines.append(f"> **予測スコア:** {post['score']}"
+                         f"（v2: {post['v2_score']} / アルゴリズム: {post['algorithm_score']}）\n")
 
     lines.append("### 使い方\n")
     lines.append("1. 上記テンプレートから自分に合うものを選ぶ")
@@ -435,12 +588,12 @@ def format_posts_markdown(posts, tools, works, ctas, section_num=8):
     return "\n".join(lines)
 
 
-def generate_posts_standalone(input_file, output_file=None):
+def generate_posts_standalone(input_file, output_file=None, search=False):
     """スタンドアロン実行用"""
-    df = pd.read_excel(input_file)
+    df = read_table(input_file)
     print(f"読み込み完了: {len(df)}件のポスト")
 
-    posts, tools, works, ctas = generate_posts(df, n=5)
+    posts, tools, works, ctas = generate_posts(df, n=5, search=search)
     md = format_posts_markdown(posts, tools, works, ctas)
 
     if output_file:
@@ -476,4 +629,4 @@ if __name__ == "__main__":
     today = datetime.now().strftime("%Y%m%d")
     output_file = f"output/generated_posts_{today}.md"
     os.makedirs("output", exist_ok=True)
-    generate_posts_standalone(input_file, output_file)
+    generate_posts_standalone(input_file, output_file, search="--search" in sys.argv)
@@ -7,15 +7,15 @@ from datetime import datetime
 
 import pandas as pd
 
-from analyze_posts import GIVEAWAY_KEYWORDS
-
 DB_PATH = "data/buzz_database.db"
 
 
-def init_db():
+def init_db(db_path=DB_PATH):
     """DBとテーブルを初期化する（存在しない場合のみ作成）"""
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path)
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS posts (
             id          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -51,6 +51,102 @@ def init_db():
             followers INTEGER DEFAULT 0,
             updated_at TEXT
         );
+
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            date         TEXT PRIMARY KEY,
+            checksum     TEXT,
+            path         TEXT,
+            post_count   INTEGER DEFAULT 0,
+            avg_likes    REAL,
+            max_likes    INTEGER,
+            median_likes REAL,
+            total_likes  INTEGER,
+            categories   TEXT,
+            keywords     TEXT,
+            updated_at   TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS keyword_sketches (
+            date        TEXT PRIMARY KEY,
+            n_posts     INTEGER DEFAULT 0,
+            max_post_id INTEGER DEFAULT 0,
+            sketch      BLOB,
+            updated_at  TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS template_keyword_posts (
+            keyword TEXT,
+            post_id INTEGER,
+            likes   INTEGER DEFAULT 0,
+            PRIMARY KEY (keyword, post_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_template_keyword_likes
+            ON template_keyword_posts (keyword, likes DESC, post_id);
+
+        CREATE TABLE IF NOT EXISTS algorithm_features (
+            post_id     INTEGER PRIMARY KEY,
+            category    TEXT,
+            is_thread   INTEGER,
+            link_type   TEXT,
+            tone        TEXT,
+            dwell_score INTEGER,
+            early_score INTEGER,
+            velocity    TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS algorithm_feature_defs (
+            name    TEXT PRIMARY KEY,
+            version TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS feature_flags (
+            post_id INTEGER PRIMARY KEY,
+            bits    BLOB
+        );
+
+        CREATE TABLE IF NOT EXISTS feature_flag_defs (
+            bit     INTEGER PRIMARY KEY,
+            name    TEXT,
+            version TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS index_state (
+            name        TEXT PRIMARY KEY,
+            max_post_id INTEGER DEFAULT 0,
+            updated_at  TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS jobs (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind        TEXT NOT NULL,
+            db_version  TEXT,
+            status      TEXT DEFAULT 'queued',
+            progress    REAL DEFAULT 0,
+            message     TEXT,
+            result      TEXT,
+            error       TEXT,
+            created_at  TEXT,
+            updated_at  TEXT,
+            finished_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_kind_version ON jobs (kind, db_version, id);
+
+        CREATE TABLE IF NOT EXISTS dropped_posts (
+            account     TEXT,
+            text        TEXT,
+            reason      TEXT,
+            source_file TEXT,
+            dropped_at  TEXT,
+            PRIMARY KEY (account, text)
+        );
+
+        CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+            stage       TEXT PRIMARY KEY,
+            input_hash  TEXT,
+            output_hash TEXT,
+            seconds     REAL,
+            updated_at  TEXT
+        );
     """)
     # postsテーブルにfollower_count列がなければ追加（マイグレーション）
     try:
@@ -58,6 +154,12 @@ def init_db():
         conn.commit()
     except sqlite3.OperationalError:
         pass  # 既に存在する場合は無視
+    # 投稿日時をパース済みのUNIX秒（timeseries.pyが未設定の行だけ埋める）
+    try:
+        conn.execute("ALTER TABLE posts ADD COLUMN epoch INTEGER")
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass
     conn.commit()
     conn.close()
 
@@ -128,12 +230,19 @@ def normalize_df(df, source_file):
     return rows
 
 
-def _is_giveaway(text):
-    """プレゼント企画・業者系投稿かどうか判定"""
-    for kw in GIVEAWAY_KEYWORDS:
-        if kw in text:
-            return True
-    return False
+def drop_filtered(rows):
+    """プレゼント企画・業者系の行を除き、除外した行と理由を dropped_posts に記録する。残った行を返す"""
+    from filters import GIVEAWAY, KEEP, keyword_reasons
+
+    reasons = keyword_reasons([r["text"] for r in rows], rules=(GIVEAWAY,)).tolist()
+    dropped = [(r["account"], r["text"], reason, r["source_file"], r["added_at"])
+               for r, reason in zip(rows, reasons) if reason != KEEP]
+    if dropped:
+        conn = sqlite3.connect(DB_PATH)
+        conn.executemany("INSERT OR REPLACE INTO dropped_posts VALUES (?, ?, ?, ?, ?)", dropped)
+        conn.commit()
+        conn.close()
+    return [r for r, reason in zip(rows, reasons) if reason == KEEP]
 
 
 def import_file(filepath):
@@ -163,7 +272,7 @@ def import_file(filepath):
 
     # プレゼント企画フィルター
     before_filter = len(rows)
-    rows = [r for r in rows if not _is_giveaway(r["text"])]
+    rows = drop_filtered(rows)
     filtered_out = before_filter - len(rows)
     if filtered_out > 0:
         print(f"プレゼント企画・業者系を除外: {filtered_out}件")
@@ -195,6 +304,14 @@ def import_file(filepath):
     skipped = len(skipped_rows)
     print(f"新規登録: {inserted}件 / スキップ（重複）: {skipped}件")
     print(f"DB合計: {total}件")
+
+    # 類似投稿インデックス・日ごとのキーワードスケッチに新規分を追記
+    # （テンプレート索引・アルゴリズム判定・フラグは、読む側が未処理の投稿だけ処理してから読む）
+    if inserted > 0:
+        from keyword_sketch import update_daily_sketches
+        from similarity_index import update_index
+        update_index(DB_PATH)
+        update_daily_sketches(DB_PATH)
     return inserted, skipped_rows
 
 
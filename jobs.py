@@ -0,0 +1,255 @@
+"""重い分析のバックグラウンド実行（jobs テーブル + ワーカースレッド）
+
+ダッシュボードのボタンで分析を直接実行すると、終わるまで画面が止まり、
+次の再実行で結果が消えてしまう。そこで分析をジョブとして jobs テーブルに登録し、
+ワーカー（ダッシュボード内のスレッド、または `python jobs.py` の別プロセス）が順に実行する。
+進捗と結果（JSON）はジョブの行に書き込み、結果はDBの版（投稿件数:最大ID）ごとに保持するので、
+同じ版のあいだはどのセッションからでもすぐに読める。
+
+使い方:
+    python jobs.py                         # ワーカーとして常駐し、待ちジョブを順に実行する
+    python jobs.py --submit algorithm_db   # ジョブを登録して、実行まで待つ
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from import_csv import DB_PATH, init_db
+
+POLL_SECONDS = 2.0
+PROGRESS_INTERVAL = 0.5  # 進捗の書き込み間隔（秒）
+STALE_SECONDS = 600  # これ以上更新のない実行中ジョブは、ワーカーが落ちたとみなして再実行する
+ACTIVE = ("queued", "running")
+
+
+def _run_algorithm_db(db_path, progress):
+    from algorithm_analysis import analyze_algorithm_db
+
+    return analyze_algorithm_db(db_path, progress=progress)
+
+
+def _run_psychology_stats(db_path, progress):
+    from reader_psychology import psychology_stats
+
+    return psychology_stats(db_path, progress=progress)
+
+
+# ジョブ種別 → 実行関数 (db_path, progress) → JSONにできる結果
+JOB_KINDS = {
+    "algorithm_db": _run_algorithm_db,
+    "psychology_stats": _run_psychology_stats,
+}
+
+
+def _connect(db_path):
+    return sqlite3.connect(db_path, timeout=30)
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def db_version(conn):
+    """DBの版（投稿件数:最大ID）。投稿の追加・削除で変わる"""
+    count, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM posts").fetchone()
+    return f"{count}:{max_id}"
+
+
+def _job_from_row(cursor, row):
+    job = {col[0]: value for col, value in zip(cursor.description, row)}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def get_job(job_id, db_path=DB_PATH):
+    """ジョブ1件（dict、resultは読み込み済み）。なければNone"""
+    conn = _connect(db_path)
+    try:
+        cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        return _job_from_row(cursor, row) if row else None
+    finally:
+        conn.close()
+
+
+def find_job(kind, db_path=DB_PATH):
+    """現在のDBの版に対する最新のジョブ（完了・実行中・待ち・失敗のいずれか）。なければNone"""
+    conn = _connect(db_path)
+    try:
+        cursor = conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? AND db_version = ? ORDER BY id DESC LIMIT 1",
+            (kind, db_version(conn))
+        )
+        row = cursor.fetchone()
+        return _job_from_row(cursor, row) if row else None
+    finally:
+        conn.close()
+
+
+def submit_job(kind, db_path=DB_PATH):
+    """ジョブを登録してIDを返す。同じ版で完了済み・実行待ちのジョブがあればそのIDを返す"""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"不明なジョブ種別: {kind}")
+    init_db(db_path)
+    conn = _connect(db_path)
+    try:
+        # 確認から登録までを書き込みロックの中で行い、同時に登録されても1件にする
+        conn.execute("BEGIN IMMEDIATE")
+        version = db_version(conn)
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE kind = ? AND db_version = ? AND status IN ('queued', 'running', 'done') "
+            "ORDER BY id DESC LIMIT 1",
+            (kind, version)
+        ).fetchone()
+        if row:
+            conn.rollback()
+            return row[0]
+        now = _now()
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, db_version, status, progress, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', 0, ?, ?)",
+            (kind, version, now, now)
+        )
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def _claim(conn):
+    """最も古い待ちジョブを実行中にして (id, kind) を返す。別のワーカーと取り合っても1つだけが取れる"""
+    stale = (datetime.now() - timedelta(seconds=STALE_SECONDS)).isoformat(timespec="seconds")
+    conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running' AND updated_at < ?", (stale,))
+    conn.commit()
+    row = conn.execute("SELECT id, kind FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+    if row is None:
+        return None
+    # 実行時点の版で結果を保持する（登録後にインポートがあっても結果と版が食い違わないように）
+    cursor = conn.execute(
+        "UPDATE jobs SET status = 'running', db_version = ?, progress = 0, message = NULL, updated_at = ? "
+        "WHERE id = ? AND status = 'queued'",
+        (db_version(conn), _now(), row[0])
+    )
+    conn.commit()
+    return row if cursor.rowcount == 1 else None
+
+
+def run_next_job(db_path=DB_PATH):
+    """待ちジョブを1件実行して、そのIDを返す（待ちがなければNone）。失敗はジョブに記録する"""
+    conn = _connect(db_path)
+    try:
+        claimed = _claim(conn)
+        if claimed is None:
+            return None
+        job_id, kind = claimed
+        last_write = [0.0]
+
+        def progress(fraction, message=""):
+            now = time.monotonic()
+            if now - last_write[0] < PROGRESS_INTERVAL and fraction < 1:
+                return
+            last_write[0] = now
+            conn.execute(
+                "UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ?",
+                (min(max(float(fraction), 0.0), 1.0), message, _now(), job_id)
+            )
+            conn.commit()
+
+        try:
+            func = JOB_KINDS.get(kind)
+            if func is None:
+                raise ValueError(f"不明なジョブ種別: {kind}")
+            result = json.dumps(func(db_path, progress), ensure_ascii=False)
+        except Exception as e:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                (f"{type(e).__name__}: {e}", _now(), _now(), job_id)
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, message = NULL, result = ?, "
+                "updated_at = ?, finished_at = ? WHERE id = ?",
+                (result, _now(), _now(), job_id)
+            )
+            # 同じ種別の古い結果は残さない
+            conn.execute(
+                "DELETE FROM jobs WHERE kind = ? AND id < ? AND status IN ('done', 'failed')",
+                (kind, job_id)
+            )
+        conn.commit()
+        return job_id
+    finally:
+        conn.close()
+
+
+class JobWorker:
+    """待ちジョブを順に実行するバックグラウンドスレッド"""
+
+    def __init__(self, db_path=DB_PATH, poll_seconds=POLL_SECONDS):
+        self.db_path = db_path
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        init_db(self.db_path)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """登録直後のジョブをポーリング間隔を待たずに拾わせる"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if run_next_job(self.db_path) is not None:
+                    continue
+            except sqlite3.Error as e:
+                print(f"ジョブの取得に失敗: {e}", file=sys.stderr)
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+
+def main(submit=None):
+    """メイン処理"""
+    if submit:
+        job_id = submit_job(submit)
+        print(f"ジョブ登録: #{job_id} {submit}")
+        while True:
+            run_next_job()
+            job = get_job(job_id)
+            if job is None or job["status"] not in ACTIVE:
+                break
+            time.sleep(POLL_SECONDS)
+        print(f"ジョブ #{job_id}: {job['status'] if job else '削除済み'}"
+              + (f"（{job['error']}）" if job and job["error"] else ""))
+        return
+
+    print(f"ジョブワーカー起動（{', '.join(JOB_KINDS)}）", file=sys.stderr)
+    worker = JobWorker().start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop(timeout=5)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="重い分析のバックグラウンド実行")
+    parser.add_argument("--submit", choices=sorted(JOB_KINDS), default=None,
+                        help="ジョブを登録して完了まで待つ")
+    args = parser.parse_args()
+    main(submit=args.submit)
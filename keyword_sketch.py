@@ -0,0 +1,330 @@
+"""キーワードのストリーミング集計（Space-Saving 上位k件 + Count-Min スケッチ）
+
+投稿をチャンク単位で読み、チャンク内は正確に数えてから上位k件の要約にマージする。
+メモリは「k + チャンク内の語彙」に収まり、要約どうしは足し合わせられるので
+日ごと・シャードごとに作ったものを後から期間でまとめられる。
+上位に残らなかった語でも Count-Min スケッチから出現数（と、いいね加重）の上限推定を引ける。
+日ごとのスケッチは keyword_sketches テーブルに保存し、インポートのたびに新しい投稿の分だけ更新する。
+"""
+
+import hashlib
+import io
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from import_csv import DB_PATH, init_db
+
+TOP_K = 1000
+CM_WIDTH = 2048
+CM_DEPTH = 4
+CHUNK_SIZE = 5000
+
+# ツール名・仕事の種類（generate_posts のトレンド抽出と、急上昇スコアの語の表記はこれに揃える）
+TOOL_TERMS = [
+    "ChatGPT", "Claude", "Claude Code", "Gemini", "Copilot", "Midjourney",
+    "Stable Diffusion", "DALL-E", "Canva", "Notion AI", "Cursor", "v0", "Bolt",
+]
+WORK_TERMS = [
+    "ライティング", "デザイン", "プログラミング", "動画編集", "画像生成",
+    "コンテンツ販売", "アフィリエイト", "コンサル", "Web制作", "自動化",
+    "ブログ", "YouTube", "SNS運用", "翻訳", "データ分析",
+]
+CANONICAL = {t.lower(): t for t in [*TOOL_TERMS, *WORK_TERMS, "AI"]}
+
+
+def term_pattern(terms):
+    """語のリスト → 長い語から試す大文字小文字を区別しないパターン（英字の途中では切らない）"""
+    alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<![A-Za-z])(?:{alternation})(?![A-Za-z])", re.IGNORECASE)
+
+
+def canonical_term(word):
+    """表記揺れの統一（ツール名・仕事の種類は決まった表記、それ以外の英字語は小文字）"""
+    lowered = word.lower()
+    if lowered in CANONICAL:
+        return CANONICAL[lowered]
+    return lowered if word.isascii() else word
+
+
+KATAKANA = re.compile(r"[ァ-ヶー]{3,}")
+KANJI = re.compile(r"[一-龥]{2,6}")
+ENGLISH = re.compile(r"[A-Za-z]{3,}")
+# 漢字の連続（業務自動化）やカタカナ＋漢字（データ分析）に埋もれる語、3文字未満・複数語の名前
+NAMED_TERMS = term_pattern(CANONICAL.values())
+
+STOP_WORDS = {
+    "する", "できる", "ある", "いる", "なる", "やる", "くる", "もの", "こと",
+    "それ", "これ", "あれ", "ため", "よう", "とき", "ところ", "ほう",
+    "てる", "している", "した", "して", "から", "まで", "ので", "けど",
+    "という", "ている", "たち", "など", "って", "ない", "ません",
+    "https", "http", "www", "com", "the", "and", "for", "you",
+}
+
+
+def tokenize(text, named=True):
+    """本文 → キーワードのリスト（カタカナ語・漢字フレーズ・英字語、表記は canonical_term で統一）
+
+    named=True なら TOOL_TERMS / WORK_TERMS などの既知の語も、長い語の一部に含まれていれば拾う
+    （同じ位置の語として既に拾っていれば重ねて数えない）。
+    """
+    text = str(text or "")
+    matches = [m for pattern in (KATAKANA, KANJI, ENGLISH) for m in pattern.finditer(text)]
+    if named:
+        spans = {m.span() for m in matches}
+        matches += [m for m in NAMED_TERMS.finditer(text) if m.span() not in spans]
+    words = (canonical_term(m.group()) for m in matches)
+    return [w for w in words if w not in STOP_WORDS and len(w) >= 2]
+
+
+def _hash_rows(terms):
+    """語 → Count-Minの各段の列番号 (depth × 語数)。プロセスをまたいで安定なハッシュを使う"""
+    cols = np.empty((CM_DEPTH, len(terms)), dtype=np.int64)
+    for j, term in enumerate(terms):
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8 * CM_DEPTH).digest()
+        cols[:, j] = np.frombuffer(digest, dtype=np.uint64) % np.uint64(CM_WIDTH)
+    return cols
+
+
+class KeywordSketch:
+    """上位k件（Space-Saving）と Count-Min（出現数・いいね加重）をまとめた要約"""
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.items = {}  # 語 → [推定数, 誤差上限]
+        self.cm_count = np.zeros((CM_DEPTH, CM_WIDTH), dtype=np.float64)
+        self.cm_likes = np.zeros((CM_DEPTH, CM_WIDTH), dtype=np.float64)
+        self.n_posts = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def _floor(self):
+        """要約に載っていない語の推定数の上限（満杯でなければ0）"""
+        if len(self.items) < self.k:
+            return 0.0
+        return min(c for c, _ in self.items.values())
+
+    # --- 更新 ---
+
+    def add_counts(self, counts, likes=None, n_posts=0):
+        """正確な集計（{語: 数}, {語: いいね合計}）を取り込む"""
+        if counts:
+            terms = list(counts)
+            cols = _hash_rows(terms)
+            rows = np.repeat(np.arange(CM_DEPTH), len(terms))
+            np.add.at(self.cm_count, (rows, cols.ravel()),
+                      np.tile(np.fromiter(counts.values(), dtype=np.float64, count=len(terms)), CM_DEPTH))
+            if likes:
+                w = np.array([likes.get(t, 0) for t in terms], dtype=np.float64)
+                np.add.at(self.cm_likes, (rows, cols.ravel()), np.tile(w, CM_DEPTH))
+        exact = KeywordSketch(self.k)
+        exact.items = {t: [float(c), 0.0] for t, c in counts.items()}
+        self._merge_items(exact, exact_other=True)
+        self.n_posts += n_posts
+        return self
+
+    def update(self, texts, likes=None, per_post=True, named=True, tokenizer=None):
+        """1チャンク分の本文を取り込む。per_post=Trueなら1投稿内の重複は1回と数える
+
+        tokenizer: 本文 → 語のリスト（省略時は tokenize）。フレーズの出現数なども同じ要約で数えられる
+        """
+        counts = Counter()
+        like_sums = Counter()
+        for i, text in enumerate(texts):
+            words = tokenizer(text) if tokenizer else tokenize(text, named=named)
+            if per_post:
+                words = list(dict.fromkeys(words))
+            counts.update(words)
+            if likes is not None:
+                w = float(likes[i] or 0)
+                for word in set(words):
+                    like_sums[word] += w
+        return self.add_counts(counts, like_sums, n_posts=len(texts))
+
+    def _merge_items(self, other, exact_other=False):
+        """Space-Saving要約のマージ（片方にない語は相手の下限値を足す）"""
+        floor_self = self._floor()
+        floor_other = 0.0 if exact_other else other._floor()
+        merged = {}
+        for term in [*self.items, *(t for t in other.items if t not in self.items)]:
+            c1, e1 = self.items.get(term, (floor_self, floor_self))
+            c2, e2 = other.items.get(term, (floor_other, floor_other))
+            merged[term] = [c1 + c2, e1 + e2]
+        if len(merged) > self.k:
+            keep = sorted(merged.items(), key=lambda x: x[1][0], reverse=True)[:self.k]
+            merged = dict(keep)
+        self.items = merged
+
+    def merge(self, other):
+        """別の要約（別の日・シャード）を足し合わせる"""
+        self._merge_items(other)
+        self.cm_count += other.cm_count
+        self.cm_likes += other.cm_likes
+        self.n_posts += other.n_posts
+        return self
+
+    # --- 問い合わせ ---
+
+    def top(self, n=20):
+        """推定数の多い順に [(語, 推定数), ...]"""
+        ranked = sorted(self.items.items(), key=lambda x: x[1][0], reverse=True)[:n]
+        return [(t, int(c)) for t, (c, _) in ranked]
+
+    def estimate(self, terms):
+        """Count-Minによる (出現数, いいね合計) の推定（どちらも上限側の推定）"""
+        if isinstance(terms, str):
+            terms = [terms]
+        cols = _hash_rows(list(terms))
+        rows = np.arange(CM_DEPTH)[:, None]
+        return self.cm_count[rows, cols].min(axis=0), self.cm_likes[rows, cols].min(axis=0)
+
+    # --- 保存 ---
+
+    def to_bytes(self):
+        terms = list(self.items)
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf, k=np.array([self.k]), n_posts=np.array([self.n_posts]),
+            terms=np.array(terms, dtype=str),
+            counts=np.array([self.items[t] for t in terms], dtype=np.float64).reshape(-1, 2),
+            cm_count=self.cm_count, cm_likes=self.cm_likes,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data)) as z:
+            sketch = cls(int(z["k"][0]))
+            if z["cm_count"].shape == sketch.cm_count.shape:
+                sketch.cm_count = z["cm_count"]
+                sketch.cm_likes = z["cm_likes"]
+            sketch.items = {t: [float(c), float(e)] for t, (c, e) in zip(z["terms"].tolist(), z["counts"])}
+            sketch.n_posts = int(z["n_posts"][0])
+        return sketch
+
+
+def stream_sketch(texts, likes=None, chunk_size=CHUNK_SIZE, per_post=True, named=True, k=TOP_K, tokenizer=None):
+    """本文の列をチャンクごとに読みながら1つの要約を作る
+
+    語彙（異なる語の数）が k 以下なら数は正確。超えると上位k件の推定（上限側）になる。
+    """
+    sketch = KeywordSketch(k)
+    texts = list(texts)
+    likes = None if likes is None else list(likes)
+    for start in range(0, len(texts), chunk_size):
+        chunk_likes = None if likes is None else likes[start:start + chunk_size]
+        sketch.update(texts[start:start + chunk_size], chunk_likes, per_post=per_post, named=named,
+                      tokenizer=tokenizer)
+    return sketch
+
+
+# ========================================
+# 日ごとのスケッチ（keyword_sketches テーブル）
+# ========================================
+
+def _day_of(epochs):
+    """UNIX秒 → JSTの日付文字列 YYYYMMDD"""
+    days = (np.asarray(epochs, dtype=np.int64) + 9 * 3600) // 86400
+    return np.char.replace(np.datetime_as_string(days.astype("datetime64[D]")), "-", "")
+
+
+def update_daily_sketches(db_path=DB_PATH, rebuild=False, chunk_size=CHUNK_SIZE):
+    """前回以降に追加された投稿だけを日ごとのスケッチに取り込む。{日付: 追加件数} を返す"""
+    from timeseries import UNPARSED, backfill_epochs
+
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    if rebuild:
+        conn.execute("DELETE FROM keyword_sketches")
+    backfill_epochs(conn)
+    last_id = conn.execute("SELECT COALESCE(MAX(max_post_id), 0) FROM keyword_sketches").fetchone()[0]
+    cursor = conn.execute(
+        "SELECT id, epoch, likes, text FROM posts WHERE id > ? AND epoch > ? ORDER BY id",
+        (last_id, UNPARSED)
+    )
+
+    added = Counter()
+    sketches = {}
+    run_max = last_id
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        days = _day_of([r[1] for r in rows])
+        likes = [r[2] for r in rows]
+        texts = [r[3] for r in rows]
+        for day in dict.fromkeys(days.tolist()):
+            idx = np.flatnonzero(days == day)
+            if day not in sketches:
+                sketches[day] = load_sketch(day, db_path=db_path, conn=conn) or KeywordSketch()
+            sketches[day].update([texts[i] for i in idx], [likes[i] for i in idx])
+            added[day] += len(idx)
+        run_max = int(ids.max())
+
+    now = datetime.now().isoformat()
+    conn.executemany(
+        "INSERT OR REPLACE INTO keyword_sketches (date, n_posts, max_post_id, sketch, updated_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(day, s.n_posts, run_max, s.to_bytes(), now) for day, s in sketches.items()]
+    )
+    conn.commit()
+    conn.close()
+    return dict(added)
+
+
+def load_sketch(date, db_path=DB_PATH, conn=None):
+    """1日分（YYYYMMDD）のスケッチ。なければNone"""
+    own = conn is None
+    if own:
+        conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT sketch FROM keyword_sketches WHERE date = ?", (date,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if own:
+        conn.close()
+    return KeywordSketch.from_bytes(row[0]) if row else None
+
+
+def daily_sketches(since=None, until=None, db_path=DB_PATH):
+    """期間内の {日付: スケッチ}（日付順）"""
+    query = "SELECT date, sketch FROM keyword_sketches WHERE 1=1"
+    params = []
+    if since:
+        query += " AND date >= ?"
+        params.append(since)
+    if until:
+        query += " AND date <= ?"
+        params.append(until)
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(query + " ORDER BY date", params).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    conn.close()
+    return {date: KeywordSketch.from_bytes(blob) for date, blob in rows}
+
+
+def merged_sketch(since=None, until=None, db_path=DB_PATH):
+    """期間内の日ごとのスケッチを1つにまとめる"""
+    total = KeywordSketch()
+    for sketch in daily_sketches(since, until, db_path).values():
+        total.merge(sketch)
+    return total
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = time.perf_counter()
+    added = update_daily_sketches(rebuild="--rebuild" in sys.argv)
+    print(f"キーワードスケッチ更新: {sum(added.values())}件 / {len(added)}日 "
+          f"({time.perf_counter() - start:.2f}秒)")
+    for word, count in merged_sketch().top(20):
+        print(f"  {word}: {count}")
@@ -0,0 +1,248 @@
+"""バズ投稿・自分の投稿ファイル（xlsx / CSV）とDBの投稿の共通読み込み
+
+同じxlsx/CSVをレポートごとに読み直し、炎上系キーワードの除外と同一ユーザーの重複除去も
+それぞれが書いていた。ここで読み込みを1つにまとめ、初回に読んだ表を元ファイルの隣に
+Feather形式のキャッシュ（.<ファイル名>.cache.feather、非圧縮）として保存する。キャッシュは元ファイルの
+更新時刻とサイズで引き、メモリマップで開くので、2回目以降はExcelを開かずに読める。
+pyarrow（streamlit の依存）がなければキャッシュなしで毎回読む。除外・重複除去は filters の一括判定で行う。
+
+DBの posts は、必要な列だけを型付きで読む（load_posts）。アカウント・取り込み元はカテゴリ型、
+件数はint32、投稿日時はパース済みの epoch 列（timeseries.backfill_epochs）から作るので、
+全件を読む分析でも文字列のオブジェクト列と日時の再パースを持たない。
+"""
+
+import importlib.util
+import json
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import filters
+from filters import EXCLUDED, apply_filters
+from import_csv import DB_PATH
+
+# 読み込み方や保存形式を変えたら上げる（古いキャッシュは読み直す）
+CACHE_VERSION = 1
+
+CSV_ENCODINGS = ["utf-8-sig", "utf-8", "cp932"]
+
+# TwExportのCSV列名 → コード内の統一名称
+SELF_RENAME = {"テキスト": "本文", "imp": "インプレッション数", "RT数": "リポスト数"}
+SELF_INT_COLUMNS = ["いいね数", "リポスト数", "リプライ数", "フォロワー数"]
+
+# postsの列 → 読み込み後の型（text / date / added_at は文字列のまま）
+POST_DTYPES = {
+    "id": "int64",
+    "account": "category",
+    "likes": "int32",
+    "retweets": "int32",
+    "replies": "int32",
+    "impressions": "int32",
+    "follower_count": "int32",
+    "epoch": "int64",
+    "source_file": "category",
+}
+POSTED_AT = "posted_at"  # epoch から作る投稿日時（UTC。パースできなかった投稿は NaT）
+CHUNK_ROWS = 100_000
+
+
+# ========================================
+# キャッシュ付き読み込み
+# ========================================
+
+def cache_path(path):
+    """path のキャッシュファイルのパス"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache.feather")
+
+
+CACHE_KEY = b"buzz_source_key"  # キャッシュのスキーマのメタデータに入れる元ファイルのキー
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return json.dumps([CACHE_VERSION, st.st_mtime_ns, st.st_size]).encode("utf-8")
+
+
+def _parse(path):
+    """xlsx / CSV をそのまま読む（CSVはエンコーディングを順に試す）"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    if ext == ".csv":
+        for enc in CSV_ENCODINGS:
+            try:
+                return pd.read_csv(path, encoding=enc)
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("CSVのエンコーディングが判定できませんでした")
+    raise ValueError(f"未対応のファイル形式: {ext}")
+
+
+def _read_cache(cached, key):
+    """キーが一致するキャッシュをメモリマップで読む（なければ・古ければ None）"""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    try:
+        table = feather.read_table(cached, memory_map=True)
+    except (OSError, ValueError, pa.ArrowException):
+        return None  # ないか壊れている（読み直して書き直す）
+    if (table.schema.metadata or {}).get(CACHE_KEY) != key:
+        return None
+    return table.to_pandas()
+
+
+def _write_cache(cached, key, df):
+    """一時ファイルに書いてから置き換える（並行して読むステージに書きかけを見せない）"""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    try:
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), CACHE_KEY: key})
+    except (ValueError, TypeError, pa.ArrowException):
+        return  # 型の混ざった列などFeatherにできない表はキャッシュしない
+    directory, name = os.path.split(cached)
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory or ".")
+    except OSError:
+        return  # 書き込めない場所ならキャッシュなしで続ける
+    try:
+        with os.fdopen(fd, "wb") as f:
+            feather.write_feather(table, f, compression="uncompressed")
+        os.replace(tmp, cached)
+    except (OSError, pa.ArrowException):
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def read_table(path, use_cache=True):
+    """xlsx / CSV をDataFrameで返す。元ファイルが変わっていなければキャッシュから読む"""
+    if not use_cache or importlib.util.find_spec("pyarrow") is None:
+        return _parse(path)
+    key = _source_key(path)
+    cached = cache_path(path)
+    df = _read_cache(cached, key)
+    if df is not None:
+        return df
+
+    df = _parse(path)
+    _write_cache(cached, key, df)
+    return df
+
+
+# ========================================
+# 除外（filters の一括判定を使う）
+# ========================================
+
+def keyword_mask(texts, keywords):
+    """いずれかのキーワードを含む行がTrueのマスク（部分一致。欠損は空文字扱い）"""
+    return filters.keyword_mask(texts, keywords)
+
+
+# ========================================
+# 用途別の読み込み
+# ========================================
+
+def load_buzz_posts(path, use_cache=True):
+    """バズ投稿を読み込み、炎上系キーワードの除外と同一ユーザーの重複除去をした表を返す"""
+    df, _ = apply_filters(read_table(path, use_cache=use_cache), rules=(EXCLUDED,))
+    return df.reset_index(drop=True)
+
+
+def load_self_posts(path, use_cache=True):
+    """自分の投稿（TwExportのCSV）を読み込み、列名を統一して件数列を整数にした表を返す"""
+    df = read_table(path, use_cache=use_cache)
+    df = df.rename(columns={k: v for k, v in SELF_RENAME.items() if k in df.columns})
+    for col in SELF_INT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+    return df
+
+
+# ========================================
+# DBの投稿（型付き・必要な列だけ）
+# ========================================
+
+def _typed(df):
+    """列を POST_DTYPES の型にする（件数は欠損を0に。int32に収まらない列はint64のまま。カテゴリの欠損は NaN のまま）"""
+    for col in df.columns:
+        dtype = POST_DTYPES.get(col)
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+        elif dtype is not None:
+            values = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+            if dtype == "int32" and len(values) and values.abs().max() > np.iinfo(np.int32).max:
+                dtype = "int64"
+            df[col] = values.astype(dtype)
+    return df
+
+
+def _posted_at(epoch):
+    from timeseries import UNPARSED
+
+    return pd.to_datetime(epoch.where(epoch != UNPARSED), unit="s", utc=True)
+
+
+def iter_posts(db_path=DB_PATH, columns=None, where=None, params=(), order_by=None, chunksize=CHUNK_ROWS):
+    """postsを chunksize 行ずつ型付きのDataFrameで返すイテレータ（引数は load_posts と同じ）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        if columns is None:
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(posts)")]
+        columns = list(columns)
+        selected = [c for c in columns if c != POSTED_AT]
+        if POSTED_AT in columns and "epoch" not in selected:
+            selected.append("epoch")
+        if "epoch" in selected:
+            from timeseries import backfill_epochs
+
+            backfill_epochs(conn)  # 日時を未パースの投稿があれば先に epoch を埋める
+
+        query = f"SELECT {', '.join(selected)} FROM posts"
+        if where:
+            query += f" WHERE {where}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        empty = True
+        for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+            empty = False
+            chunk = _typed(chunk)
+            if POSTED_AT in columns:
+                chunk[POSTED_AT] = _posted_at(chunk["epoch"])
+            yield chunk[columns]
+        if empty:
+            chunk = _typed(pd.DataFrame({c: pd.Series(dtype=object) for c in selected}))
+            if POSTED_AT in columns:
+                chunk[POSTED_AT] = _posted_at(chunk["epoch"])
+            yield chunk[columns]
+    finally:
+        conn.close()
+
+
+def load_posts(db_path=DB_PATH, columns=None, where=None, params=(), order_by=None, chunksize=None):
+    """postsを型付きのDataFrameで読む
+
+    columns: 読む列（省略時は全列）。"posted_at" を含めると epoch からUTCの日時列を作る
+    where / params / order_by: SQLの絞り込み・並び順
+    chunksize: 指定すると、その行数ずつのDataFrameを返すイテレータになる（全件を一度に持たない）
+    """
+    chunks = iter_posts(db_path, columns, where, params, order_by, chunksize or CHUNK_ROWS)
+    if chunksize:
+        return chunks
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    df = pd.concat(chunks, ignore_index=True)
+    # チャンクごとにカテゴリが違うと concat で文字列に戻るので、カテゴリを合わせ直す
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            df[col] = pd.Series(union_categoricals([c[col] for c in chunks]), index=df.index)
+    return df
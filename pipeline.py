@@ -0,0 +1,272 @@
+"""日次パイプライン（取得 → 取り込み → スコア再計算 → 差分分析、並行してレポート・グラフ）
+
+これまでは buzz_analyzer.py → import_csv.py → recalculate_score.py → analyze_new.py →
+analyze_posts.py → visualize.py を手で順に実行し、途中で失敗すると最初からやり直していた。
+ここでは各ステージの入力と出力（ファイル、またはDBの投稿）を宣言し、入力の内容ハッシュを
+pipeline_checkpoints テーブルに記録する。前回と入力が同じで出力も残っているステージはスキップし、
+失敗したステージとその下流だけを次回に回す。依存のないステージ（レポートとグラフなど）は並列に実行する。
+
+使い方:
+    python pipeline.py                                    # 今日の取得から全部
+    python pipeline.py output/buzz_posts_20260215.xlsx    # 取得済みのファイルから
+    python pipeline.py --force visualize                  # 指定ステージは入力が同じでも実行する
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+
+from import_csv import DB_PATH, init_db
+
+DB = "db:posts"  # 入力・出力としてのDBの投稿（内容は 件数:最大ID で表す）
+REPORT_CHART_DIR = "output/charts"  # analyze_posts がレポート用（フィルタ後の投稿）に描くグラフ
+FILE_CHART_DIR = "output/charts_all"  # visualize がファイル全体で描くグラフ（レポートのグラフと別の置き場所）
+
+
+# ========================================
+# ステージ
+# ========================================
+
+def _run_fetch():
+    from buzz_analyzer import fetch_buzz_posts
+
+    fetch_buzz_posts()
+
+
+def _run_import(buzz_file):
+    from import_csv import import_file
+
+    import_file(buzz_file)
+
+
+def _run_recalculate():
+    from recalculate_score import recalculate
+
+    recalculate()
+
+
+def _run_analyze_new(report):
+    from analyze_new import analyze_new_posts
+
+    analyze_new_posts(report)
+
+
+def _run_analyze_posts(buzz_file, report):
+    from analyze_posts import main
+
+    main(buzz_file, report)
+
+
+def _run_visualize(buzz_file):
+    from visualize import main
+
+    main(buzz_file, FILE_CHART_DIR)
+
+
+def daily_stages(buzz_file=None):
+    """日次のステージ定義（名前 → {"run", "inputs", "outputs"}）
+
+    buzz_file を省略すると今日の取得（buzz_analyzer）から始める。
+    レポートは今日の日付のファイル名で出力として宣言する（消したら次回に作り直す）。
+    analyze_posts と visualize は並列に動くので、グラフは別々のディレクトリに書く
+    （同じPNG・マニフェストを同時に書き換えない）。
+    """
+    stages = {}
+    today = datetime.now().strftime("%Y%m%d")
+    new_report = os.path.join("output", f"analyze_new_{today}.md")
+    posts_report = os.path.join("output", f"analyze_report_詳細_v2_{today}.md")
+    if buzz_file is None:
+        buzz_file = os.path.join("output", f"buzz_posts_{today}.xlsx")
+        stages["fetch"] = {"run": _run_fetch, "inputs": [], "outputs": [buzz_file]}
+    stages.update({
+        "import": {"run": partial(_run_import, buzz_file), "inputs": [buzz_file], "outputs": [DB]},
+        "recalculate": {"run": _run_recalculate, "inputs": [DB], "outputs": ["output/score_evolution.md"]},
+        "analyze_new": {"run": partial(_run_analyze_new, new_report), "inputs": [DB], "outputs": [new_report]},
+        "analyze_posts": {"run": partial(_run_analyze_posts, buzz_file, posts_report), "inputs": [buzz_file],
+                          "outputs": [posts_report, REPORT_CHART_DIR]},
+        "visualize": {"run": partial(_run_visualize, buzz_file), "inputs": [buzz_file], "outputs": [FILE_CHART_DIR]},
+    })
+    return stages
+
+
+def upstream(stages):
+    """ステージごとの上流ステージ（入力のどれかを出力するステージ）の集合"""
+    producers = {}
+    for name, stage in stages.items():
+        for path in stage["outputs"]:
+            producers[path] = name
+    return {name: {producers[path] for path in stage["inputs"] if path in producers and producers[path] != name}
+            for name, stage in stages.items()}
+
+
+# ========================================
+# 内容ハッシュ・チェックポイント
+# ========================================
+
+def _file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def resource_digest(resource, db_path=DB_PATH):
+    """入力・出力1つの内容ハッシュ（存在しなければ None）"""
+    if resource == DB:
+        if not os.path.exists(db_path):
+            return None
+        conn = sqlite3.connect(db_path)
+        try:
+            count, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM posts").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            conn.close()
+        return f"{count}:{max_id}"
+    if os.path.isdir(resource):
+        h = hashlib.sha1()
+        for root, _, files in sorted(os.walk(resource)):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                h.update(f"{os.path.relpath(path, resource)}:{_file_digest(path)}\n".encode("utf-8"))
+        return h.hexdigest()
+    if os.path.isfile(resource):
+        return _file_digest(resource)
+    return None
+
+
+def _digest(resources, db_path):
+    h = hashlib.sha1()
+    for resource in resources:
+        h.update(f"{resource}={resource_digest(resource, db_path)}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_checkpoints(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT stage, input_hash, output_hash FROM pipeline_checkpoints").fetchall()
+    conn.close()
+    return {stage: (input_hash, output_hash) for stage, input_hash, output_hash in rows}
+
+
+def _save_checkpoint(db_path, stage, input_hash, output_hash, seconds):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(
+        "INSERT OR REPLACE INTO pipeline_checkpoints (stage, input_hash, output_hash, seconds, updated_at)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (stage, input_hash, output_hash, seconds, datetime.now().isoformat(timespec="seconds")),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _up_to_date(stage, checkpoint, input_hash, db_path):
+    """前回と入力が同じで、宣言した出力がすべて残っていて前回のまま"""
+    if checkpoint is None or checkpoint[0] != input_hash:
+        return False
+    if any(resource_digest(r, db_path) is None for r in stage["outputs"]):
+        return False
+    return checkpoint[1] == _digest(stage["outputs"], db_path)
+
+
+# ========================================
+# 実行
+# ========================================
+
+def _timed(run):
+    start = time.perf_counter()
+    try:
+        run()
+        return None, time.perf_counter() - start
+    except (Exception, SystemExit) as e:  # 取得などは失敗時に sys.exit する
+        return e, time.perf_counter() - start
+
+
+def run_pipeline(stages, force=(), workers=2, db_path=DB_PATH):
+    """ステージを依存順に実行する。ステージ名 → {"status", "seconds", "error"} を返す
+
+    status は done（実行）/ skipped（最新のためスキップ）/ failed（失敗）/ blocked（上流の失敗で未実行）。
+    """
+    init_db(db_path)
+    checkpoints = _load_checkpoints(db_path)
+    deps = upstream(stages)
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(results) < len(stages):
+            progressed = False
+            for name, stage in stages.items():
+                if name in results or name in (n for n, _ in running.values()):
+                    continue
+                if any(results.get(d, {}).get("status") in ("failed", "blocked") for d in deps[name]):
+                    results[name] = {"status": "blocked", "seconds": 0.0, "error": None}
+                    progressed = True
+                    continue
+                if not all(d in results for d in deps[name]):
+                    continue
+                progressed = True
+                input_hash = _digest(stage["inputs"], db_path)
+                if name not in force and _up_to_date(stage, checkpoints.get(name), input_hash, db_path):
+                    results[name] = {"status": "skipped", "seconds": 0.0, "error": None}
+                    continue
+                print(f"[pipeline] {name} を実行します")
+                running[pool.submit(_timed, stage["run"])] = (name, input_hash)
+            if not running:
+                if not progressed:
+                    raise ValueError(f"ステージの依存が循環しています: {sorted(set(stages) - set(results))}")
+                continue  # スキップ・ブロックで状態が変わったので、もう一度準備できたステージを探す
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, input_hash = running.pop(future)
+                error, seconds = future.result()
+                if error is None:
+                    output_hash = _digest(stages[name]["outputs"], db_path)
+                    _save_checkpoint(db_path, name, input_hash, output_hash, seconds)
+                    results[name] = {"status": "done", "seconds": seconds, "error": None}
+                else:
+                    results[name] = {"status": "failed", "seconds": seconds, "error": error}
+    return {name: results[name] for name in stages}
+
+
+STATUS_LABELS = {"done": "実行", "skipped": "スキップ（最新）", "failed": "失敗", "blocked": "未実行（上流が失敗）"}
+
+
+def format_summary(results):
+    """ステージごとの所要時間の表（文字列）"""
+    lines = ["", "=" * 50, "パイプライン実行結果", "=" * 50]
+    for name, r in results.items():
+        line = f"{name:<15} {STATUS_LABELS[r['status']]:<12} {r['seconds']:7.1f}秒"
+        if r["error"] is not None:
+            line += f"  {type(r['error']).__name__}: {r['error']}"
+        lines.append(line)
+    total = sum(r["seconds"] for r in results.values())
+    lines.append(f"{'合計':<15} {'':<12} {total:7.1f}秒")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="日次パイプライン（最新のステージはスキップ）")
+    parser.add_argument("buzz_file", nargs="?", help="取得済みのバズ投稿ファイル（省略時は今日の取得から）")
+    parser.add_argument("--force", nargs="*", default=[], help="入力が同じでも実行するステージ")
+    parser.add_argument("--workers", type=int, default=2, help="並列に実行するステージ数")
+    args = parser.parse_args(argv)
+
+    stages = daily_stages(args.buzz_file)
+    unknown = set(args.force) - set(stages)
+    if unknown:
+        parser.error(f"未知のステージ: {', '.join(sorted(unknown))}（{', '.join(stages)}）")
+    results = run_pipeline(stages, force=set(args.force), workers=args.workers)
+    print(format_summary(results))
+    return 1 if any(r["status"] in ("failed", "blocked") for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
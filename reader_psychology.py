@@ -12,8 +12,10 @@
 import os
 import re
 from collections import defaultdict
+from itertools import compress
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from analyze_posts import (
@@ -28,6 +30,7 @@ from algorithm_analysis import (
     detect_external_links,
     detect_thread_structure,
 )
+from classifier import first_char_class, split_alternatives
 
 
 # ========================================
@@ -138,6 +141,105 @@ FOLLOW_TRIGGERS = {
     },
 }
 
+# 読者の第一感情（上から順に判定し、最初に当てはまったもの）
+EMOTION_CHECKS = [
+    ("驚き", r'マジで|ガチで|ヤバい|やばい|衝撃|信じられない|驚'),
+    ("共感", r'わかる|あるある|そうそう|私も|僕も|同じ経験'),
+    ("希望", r'誰でも|初心者でも|ゼロから|稼げ|始められ'),
+    ("危機感", r'危険|注意|知らないと損|やばい|怖い|リスク'),
+    ("応援", r'正直|実は|告白|ド素人|恥ずかしい|初めて'),
+    ("憧れ", r'月\d+万|達成|成功|実績|年収'),
+    ("好奇心", r'秘密|ここだけ|内緒|実は.*意外|知られてない'),
+    ("参加欲", r'[\?？]|どう思|みんなは|教えて'),
+]
+DEFAULT_EMOTION = "関心"
+
+
+# ========================================
+# 一括判定エンジン（トリガーのビット集合）
+# ========================================
+# 5つのトリガー表と第一感情の判定を、名前付きグループの先読みを並べた1本の正規表現にまとめる。
+# どれかのパターンが始まる位置でだけ止まり、その位置で一致するグループを全部拾うので、
+# パターンごとに re.search した結果と同じになる。当てはまった判定は1投稿1つの整数のビットで持つ
+# （下位ビットからトリガー表の定義順、続いて EMOTION_CHECKS の順）。
+
+TRIGGER_TABLES = {
+    "like": LIKE_TRIGGERS,
+    "rt": RT_TRIGGERS,
+    "reply": REPLY_TRIGGERS,
+    "bookmark": BOOKMARK_TRIGGERS,
+    "follow": FOLLOW_TRIGGERS,
+}
+
+_engine = None
+
+
+class PsychologyEngine:
+    """全トリガー表と感情判定を1回の走査で判定し、投稿ごとのビット集合を返す"""
+
+    def __init__(self):
+        self.labels = []  # ビット番号 → (表名, 名前)。感情の表名は "emotion"
+        alternatives = []
+        for table, triggers in TRIGGER_TABLES.items():
+            for name, cfg in triggers.items():
+                self.labels.append((table, name))
+                alternatives.append("|".join(cfg["patterns"]))
+        for emotion, pattern in EMOTION_CHECKS:
+            self.labels.append(("emotion", emotion))
+            alternatives.append(pattern)
+
+        # 止まる位置: 全パターンの選択肢を平たく並べたもの。先頭文字の文字クラスで先に絞る
+        anchor = "|".join(dict.fromkeys(a for alt in alternatives for a in split_alternatives(alt)))
+        first = first_char_class(anchor)
+        prefilter = f"(?=[{first}])" if first else ""
+        groups = "".join(f"(?=(?P<b{i}>{alt}))?" for i, alt in enumerate(alternatives))
+        self.regex = re.compile(f"{prefilter}(?={anchor}){groups}", re.IGNORECASE)
+        # m.groups() の並び → ビット値（パターン内の無名グループは0）
+        self._group_bits = [0] * self.regex.groups
+        for i in range(len(alternatives)):
+            self._group_bits[self.regex.groupindex[f"b{i}"] - 1] = 1 << i
+        self.emotion_shift = len(self.labels) - len(EMOTION_CHECKS)
+
+    def bits(self, text):
+        """1投稿のビット集合（int）"""
+        flags = 0
+        for m in self.regex.finditer(text or ""):
+            flags |= sum(compress(self._group_bits, m.groups()))
+        return flags
+
+    def bits_many(self, texts):
+        """複数投稿のビット集合（np.uint64 の配列）"""
+        return np.fromiter((self.bits(t) for t in texts), dtype=np.uint64, count=len(texts))
+
+    def names(self, flags, table):
+        """ビット集合のうち、指定した表で当てはまった名前（定義順）"""
+        return [name for i, (t, name) in enumerate(self.labels) if t == table and flags >> i & 1]
+
+    def table_bits(self, table):
+        """[(ビット番号, 名前), ...]（指定した表の定義順）"""
+        return [(i, name) for i, (t, name) in enumerate(self.labels) if t == table]
+
+    def primary_emotion(self, flags):
+        for j, (emotion, _) in enumerate(EMOTION_CHECKS):
+            if flags >> (self.emotion_shift + j) & 1:
+                return emotion
+        return DEFAULT_EMOTION
+
+    def emotion_codes(self, bits):
+        """投稿ごとの第一感情の番号（EMOTION_CHECKS の添字、当てはまらなければ len(EMOTION_CHECKS)）"""
+        codes = np.full(len(bits), len(EMOTION_CHECKS), dtype=np.int64)
+        for j in reversed(range(len(EMOTION_CHECKS))):
+            codes[(bits >> np.uint64(self.emotion_shift + j)) & np.uint64(1) == 1] = j
+        return codes
+
+
+def get_psychology_engine():
+    """PsychologyEngine（初回だけ正規表現をコンパイルする）"""
+    global _engine
+    if _engine is None:
+        _engine = PsychologyEngine()
+    return _engine
+
 
 # ========================================
 # 読者心理分析メイン
@@ -157,55 +259,14 @@ def analyze_reader_psychology(text, likes=0, retweets=0, replies=0):
         "one_line_why": "",
     }
 
-    # いいねの心理
-    for trigger_name, cfg in LIKE_TRIGGERS.items():
-        for pat in cfg["patterns"]:
-            if re.search(pat, text, re.IGNORECASE):
-                result["like_triggers"].append({
-                    "trigger": trigger_name,
-                    "psychology": cfg["psychology"],
-                })
-                break
-
-    # RTの心理
-    for trigger_name, cfg in RT_TRIGGERS.items():
-        for pat in cfg["patterns"]:
-            if re.search(pat, text, re.IGNORECASE):
-                result["rt_triggers"].append({
-                    "trigger": trigger_name,
-                    "psychology": cfg["psychology"],
-                })
-                break
-
-    # リプライの心理
-    for trigger_name, cfg in REPLY_TRIGGERS.items():
-        for pat in cfg["patterns"]:
-            if re.search(pat, text, re.IGNORECASE):
-                result["reply_triggers"].append({
-                    "trigger": trigger_name,
-                    "psychology": cfg["psychology"],
-                })
-                break
-
-    # ブックマークの心理
-    for trigger_name, cfg in BOOKMARK_TRIGGERS.items():
-        for pat in cfg["patterns"]:
-            if re.search(pat, text, re.IGNORECASE):
-                result["bookmark_triggers"].append({
-                    "trigger": trigger_name,
-                    "psychology": cfg["psychology"],
-                })
-                break
-
-    # フォローの心理
-    for trigger_name, cfg in FOLLOW_TRIGGERS.items():
-        for pat in cfg["patterns"]:
-            if re.search(pat, text, re.IGNORECASE):
-                result["follow_triggers"].append({
-                    "trigger": trigger_name,
-                    "psychology": cfg["psychology"],
-                })
-                break
+    # いいね・RT・リプ・ブクマ・フォローの心理と第一感情（1回の走査でまとめて判定）
+    engine = get_psychology_engine()
+    flags = engine.bits(text)
+    for table, triggers in TRIGGER_TABLES.items():
+        result[f"{table}_triggers"] = [
+            {"trigger": name, "psychology": triggers[name]["psychology"]}
+            for name in engine.names(flags, table)
+        ]
 
     # 主要感情の判定
     tone = analyze_tone(text)
@@ -213,29 +274,11 @@ def analyze_reader_psychology(text, likes=0, retweets=0, replies=0):
 
     # 一行サマリー生成
     result["one_line_why"] = _generate_one_line_why(result, text, likes, retweets, replies)
-    result["primary_emotion"] = _detect_primary_emotion(text)
+    result["primary_emotion"] = engine.primary_emotion(flags)
 
     return result
 
 
-def _detect_primary_emotion(text):
-    """読者が最初に感じる感情を1つ判定"""
-    emotion_checks = [
-        ("驚き", r'マジで|ガチで|ヤバい|やばい|衝撃|信じられない|驚'),
-        ("共感", r'わかる|あるある|そうそう|私も|僕も|同じ経験'),
-        ("希望", r'誰でも|初心者でも|ゼロから|稼げ|始められ'),
-        ("危機感", r'危険|注意|知らないと損|やばい|怖い|リスク'),
-        ("応援", r'正直|実は|告白|ド素人|恥ずかしい|初めて'),
-        ("憧れ", r'月\d+万|達成|成功|実績|年収'),
-        ("好奇心", r'秘密|ここだけ|内緒|実は.*意外|知られてない'),
-        ("参加欲", r'[\?？]|どう思|みんなは|教えて'),
-    ]
-    for emotion, pattern in emotion_checks:
-        if re.search(pattern, text, re.IGNORECASE):
-            return emotion
-    return "関心"
-
-
 def _generate_one_line_why(result, text, likes, retweets, replies):
     """なぜバズったかを一行で言語化"""
     parts = []
@@ -264,6 +307,55 @@ def _generate_one_line_why(result, text, likes, retweets, replies):
     return " / ".join(parts)
 
 
+# ========================================
+# DB上位投稿の心理パターン統計
+# ========================================
+
+def psychology_stats(db_path=None, limit=None, progress=None):
+    """いいね>0の全投稿（limit指定時はいいね上位limit件）の第一感情・トリガーの分布
+
+    判定は feature_store のビット列（未判定の投稿だけ計算して保存）から取り出し、出現数と平均いいねは
+    ビットのマスクで集計する。本文は読み直さない。
+    戻り値: {"analyzed": 件数, "emotions": [...], "like_triggers": [...], "rt_triggers": [...], ...}
+    各リストは {"name", "count", "avg_likes"} を出現数の多い順（同数なら、いいねの多い投稿に
+    先に現れたもの順）に並べたもの。progress(割合, メッセージ) は未判定の投稿の判定中に呼ぶ。
+    """
+    from feature_store import load_feature_flags, psychology_bits
+
+    engine = get_psychology_engine()
+    ids, likes, bits = load_feature_flags(db_path, progress=progress)
+    rows = np.flatnonzero(likes > 0)
+    if limit:
+        rows = rows[np.lexsort((ids[rows], -likes[rows]))][:limit]
+    bits = psychology_bits(bits[rows])
+    likes = likes[rows]
+    rank = np.empty(len(likes), dtype=np.int64)  # いいね降順（同数は読んだ順）での順位
+    rank[np.lexsort((np.arange(len(likes)), -likes))] = np.arange(len(likes))
+
+    def table(names, masks):
+        rows = []
+        for name, hit in zip(names, masks):
+            count = int(hit.sum())
+            if count:
+                rows.append((-count, int(rank[hit].min()),
+                             {"name": name, "count": count, "avg_likes": float(likes[hit].mean())}))
+        return [r for *_, r in sorted(rows, key=lambda r: r[:2])]
+
+    codes = engine.emotion_codes(bits)
+    emotions = [e for e, _ in EMOTION_CHECKS] + [DEFAULT_EMOTION]
+    result = {
+        "analyzed": len(likes),
+        "emotions": table(emotions, [codes == j for j in range(len(emotions))]),
+    }
+    for name in TRIGGER_TABLES:
+        entries = engine.table_bits(name)
+        result[f"{name}_triggers"] = table(
+            [trigger for _, trigger in entries],
+            [(bits >> np.uint64(bit)) & np.uint64(1) == 1 for bit, _ in entries]
+        )
+    return result
+
+
 # ========================================
 # 全投稿の読者心理レポート
 # ========================================
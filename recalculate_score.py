@@ -9,15 +9,14 @@ import pandas as pd
 from analyze_posts import calculate_buzz_score
 from buzz_score_v2 import calculate_buzz_score_v2
 from import_csv import DB_PATH, init_db
+from loaders import load_posts
 
 OUTPUT_FILE = "output/score_evolution.md"
 
 
 def recalculate():
     init_db()
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql("SELECT id, text, likes, date FROM posts", conn)
-    conn.close()
+    df = load_posts(DB_PATH, columns=["id", "text", "likes"])
 
     if len(df) == 0:
         print("DBにデータがありません。先に import_csv.py を実行してください。")
@@ -27,13 +26,10 @@ def recalculate():
     print(f"対象: {n}件")
 
     v1_scores, v2_scores, likes_list = [], [], []
-    for _, row in df.iterrows():
-        text = str(row["text"] or "")
-        date_str = str(row["date"] or "")
-        likes = int(row["likes"] or 0)
+    for text, likes in zip(df["text"].fillna(""), df["likes"]):
         v1_scores.append(calculate_buzz_score(text)["total_score"])
-        v2_scores.append(calculate_buzz_score_v2(text, date_str)["total_score"])
-        likes_list.append(likes)
+        v2_scores.append(calculate_buzz_score_v2(text)["total_score"])
+        likes_list.append(int(likes))
 
     df_sc = pd.DataFrame({"likes": likes_list, "v1": v1_scores, "v2": v2_scores})
     corr_v1 = float(df_sc["likes"].corr(df_sc["v1"]))
@@ -20,6 +20,7 @@ from analyze_posts import (
     load_excel,
     safe_get,
 )
+import loaders
 
 # === データ読み込み ===
 
@@ -30,11 +31,7 @@ OUTPUT_FILE = "output/advanced_analysis_20260217.md"
 
 def load_self_posts(filepath):
     """自分の投稿CSVを読み込む"""
-    df = pd.read_csv(filepath, encoding="utf-8-sig")
-    df["いいね数"] = pd.to_numeric(df["いいね数"], errors="coerce").fillna(0).astype(int)
-    df["リポスト数"] = pd.to_numeric(df["リポスト数"], errors="coerce").fillna(0).astype(int)
-    df["リプライ数"] = pd.to_numeric(df["リプライ数"], errors="coerce").fillna(0).astype(int)
-    df["フォロワー数"] = pd.to_numeric(df["フォロワー数"], errors="coerce").fillna(0).astype(int)
+    df = loaders.load_self_posts(filepath)
     print(f"自分の投稿読み込み完了: {len(df)}件")
     return df
 
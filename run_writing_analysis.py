@@ -1,111 +1,294 @@
 """文章スタイル詳細分析の実行スクリプト
 
 使い方：
-1. 自分の投稿とバズ投稿のTOP10を比較
-   python run_writing_analysis.py
+1. 自分の投稿とバズ投稿（どちらもDBから）を比較
+   python run_writing_analysis.py [--self-account アカウント名]
+
+   TOP10の詳細分解に加えて、全投稿の分布（分位点・パターン構成比）を比較する。
+   自分の投稿は --self-account のアカウント、省略時は TwExport からインポートした投稿。
 
 2. カスタムデータで分析
    このスクリプトを参考に、任意のデータで分析可能
 """
 
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import json
+
+from analyze_posts import EXCLUDE_KEYWORDS
+from import_csv import DB_PATH
 from writing_analysis import WritingAnalyzer, generate_detailed_report, generate_comparison_report
 
+SELF_SOURCE_PATTERN = "TwExport%"
+CHUNK_SIZE = 5000     # 1回に読み込んで一括分析する投稿数
+SHARD_SIZE = 20000    # 並列処理の単位（投稿IDの範囲）
+QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+# 構成比を比べるカテゴリ列
+STYLE_COLUMNS = {
+    "opening_pattern": "冒頭パターン",
+    "structure_type": "文章構成",
+    "closing_pattern": "締め方",
+    "rhythm": "リズム",
+    "punctuation_style": "句読点スタイル",
+    "casual_degree": "口語度",
+}
+# 分位点を比べる数値列 → (表示名, ヒストグラムの刻み)
+NUMERIC_COLUMNS = {
+    "total_chars": ("文字数", 1),
+    "line_count": ("行数", 1),
+    "sentence_count": ("文の数", 1),
+    "avg_sentence_length": ("平均文長", 0.1),
+    "variation": ("文長のばらつき", 0.1),
+    "number_count": ("数字の数", 1),
+    "casual_count": ("口語表現の数", 1),
+}
+
+
+# ========================================
+# DBからの読み込み条件
+# ========================================
 
-def load_top_posts_from_csv_and_excel(self_csv, buzz_xlsx, top_n=10):
-    """CSVとExcelからTOP投稿を抽出"""
-
-    # 自分の投稿を読み込み
-    self_df = pd.read_csv(self_csv, encoding='utf-8')
-    self_df = self_df.rename(columns={
-        'テキスト': '本文',
-        'いいね数': 'いいね数',
-        'imp': 'インプレッション数',
-        '投稿日時': '投稿日時',
-        'リプライ数': 'リプライ数',
-        'RT数': 'リポスト数'
-    })
-
-    # バズ投稿を読み込み
-    buzz_df = pd.read_excel(buzz_xlsx)
-
-    # 炎上系除外
-    exclude_keywords = [
-        "著作権", "版権", "海賊版", "収益化停止", "収益化が停止",
-        "剥奪", "侵害", "インプレゾンビ"
-    ]
-
-    def should_exclude(text):
-        for kw in exclude_keywords:
-            if kw in str(text):
-                return True
-        return False
-
-    buzz_df = buzz_df[~buzz_df["本文"].apply(should_exclude)].copy()
-    buzz_df = buzz_df.sort_values("いいね数", ascending=False)
-    buzz_df = buzz_df.drop_duplicates(subset=["ユーザー名"], keep="first")
-
-    # TOP N抽出
-    self_top = self_df.nlargest(top_n, 'インプレッション数')
-    buzz_top = buzz_df.nlargest(top_n, 'いいね数')
-
-    # フォーマット変換
-    self_posts = []
-    for idx, row in self_top.iterrows():
-        self_posts.append({
-            'text': str(row['本文']),
-            'metrics': {
-                'インプレッション数': int(row['インプレッション数']),
-                'いいね数': int(row['いいね数']),
-                'リポスト数': int(row.get('リポスト数', 0)),
-                'リプライ数': int(row.get('リプライ数', 0))
-            },
-            'title': f"{int(row['インプレッション数']):,}インプ / {int(row['いいね数'])}いいね"
-        })
-
-    buzz_posts = []
-    for idx, row in buzz_top.iterrows():
-        buzz_posts.append({
-            'text': str(row['本文']),
-            'metrics': {
-                'いいね数': int(row['いいね数']),
-                'リポスト数': int(row.get('リポスト数', 0)),
-                'リプライ数': int(row.get('リプライ数', 0))
-            },
-            'title': f"{int(row['いいね数'])}いいね (@{row['ユーザー名']})"
-        })
+def corpus_filters(self_account=None):
+    """{"self": (WHERE句, パラメータ), "buzz": (...)}。バズ側は自分の投稿と炎上系を除く"""
+    if self_account:
+        self_where, self_params = "COALESCE(account, '') = ?", [self_account]
+    else:
+        self_where, self_params = "COALESCE(source_file, '') LIKE ?", [SELF_SOURCE_PATTERN]
+    exclude = " AND ".join(["instr(COALESCE(text, ''), ?) = 0"] * len(EXCLUDE_KEYWORDS))
+    buzz_where = f"NOT ({self_where}) AND {exclude}"
+    return {
+        "self": (self_where, self_params),
+        "buzz": (buzz_where, self_params + list(EXCLUDE_KEYWORDS)),
+    }
+
+
+def load_top_posts_from_db(self_account=None, top_n=10, db_path=DB_PATH):
+    """自分の投稿（インプレッション順）とバズ投稿（いいね順・1アカウント1件）のTOP Nを返す"""
+    filters = corpus_filters(self_account)
+    conn = sqlite3.connect(db_path)
+    self_where, self_params = filters["self"]
+    self_rows = conn.execute(
+        f"SELECT text, impressions, likes, retweets, replies FROM posts WHERE {self_where} "
+        "ORDER BY impressions DESC, id LIMIT ?",
+        (*self_params, top_n)
+    ).fetchall()
+    buzz_where, buzz_params = filters["buzz"]
+    buzz_rows = conn.execute(
+        f"""
+        SELECT text, likes, retweets, replies, account FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY account ORDER BY likes DESC, id) AS rank
+            FROM posts WHERE {buzz_where}
+        )
+        WHERE rank = 1 ORDER BY likes DESC, id LIMIT ?
+        """,
+        (*buzz_params, top_n)
+    ).fetchall()
+    conn.close()
+
+    self_posts = [{
+        'text': str(text),
+        'metrics': {
+            'インプレッション数': int(imp or 0),
+            'いいね数': int(likes or 0),
+            'リポスト数': int(rts or 0),
+            'リプライ数': int(replies or 0)
+        },
+        'title': f"{int(imp or 0):,}インプ / {int(likes or 0)}いいね"
+    } for text, imp, likes, rts, replies in self_rows]
+
+    buzz_posts = [{
+        'text': str(text),
+        'metrics': {
+            'いいね数': int(likes or 0),
+            'リポスト数': int(rts or 0),
+            'リプライ数': int(replies or 0)
+        },
+        'title': f"{int(likes or 0)}いいね (@{account})"
+    } for text, likes, rts, replies, account in buzz_rows]
 
     return self_posts, buzz_posts
 
 
-def main():
+# ========================================
+# 全投稿の分布（チャンク単位で集計し、足し合わせる）
+# ========================================
+
+class StyleSummary:
+    """文章スタイルの分布（カテゴリ列の件数 + 数値列の固定幅ヒストグラム）
+
+    メモリは投稿数ではなくカテゴリ数とヒストグラムの幅だけに比例し、
+    別チャンク・別プロセスで作ったものを merge で足し合わせられる。
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.counts = {col: Counter() for col in STYLE_COLUMNS}
+        self.hists = {col: np.zeros(0, dtype=np.int64) for col in NUMERIC_COLUMNS}
+
+    @staticmethod
+    def _add_hist(a, b):
+        if len(a) < len(b):
+            a, b = b, a
+        out = a.copy()
+        out[:len(b)] += b
+        return out
+
+    def add(self, frame):
+        """analyze_many の結果（1チャンク分）を取り込む"""
+        self.n += len(frame)
+        for col in STYLE_COLUMNS:
+            self.counts[col].update(frame[col].value_counts().to_dict())
+        for col, (_, step) in NUMERIC_COLUMNS.items():
+            bins = np.clip(np.rint(frame[col].to_numpy(dtype=np.float64) / step), 0, None).astype(np.int64)
+            self.hists[col] = self._add_hist(self.hists[col], np.bincount(bins))
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        for col in STYLE_COLUMNS:
+            self.counts[col].update(other.counts[col])
+        for col in NUMERIC_COLUMNS:
+            self.hists[col] = self._add_hist(self.hists[col], other.hists[col])
+        return self
+
+    def shares(self, col):
+        """カテゴリ列の構成比（%、多い順）"""
+        if not self.n:
+            return pd.Series(dtype=np.float64)
+        return (pd.Series(self.counts[col], dtype=np.float64) / self.n * 100).sort_values(ascending=False)
+
+    def quantiles(self, col, qs=QUANTILES):
+        """数値列の分位点 {q: 値}（ヒストグラムの刻みの精度で正確）"""
+        hist = self.hists[col]
+        if not self.n or not len(hist):
+            return {q: 0.0 for q in qs}
+        cum = np.cumsum(hist)
+        step = NUMERIC_COLUMNS[col][1]
+        ranks = np.maximum(np.ceil(np.array(qs) * self.n), 1)
+        return {q: round(float(np.searchsorted(cum, r) * step), 1) for q, r in zip(qs, ranks)}
+
+
+def _summarize_shard(db_path, where, params, lo, hi, chunk_size=CHUNK_SIZE):
+    """IDが [lo, hi) の範囲で条件に合う投稿をチャンクごとに一括分析して集計する"""
+    analyzer = WritingAnalyzer()
+    summary = StyleSummary()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute(
+        f"SELECT text FROM posts WHERE id >= ? AND id < ? AND ({where}) ORDER BY id",
+        (lo, hi, *params)
+    )
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        summary.add(analyzer.analyze_many([r[0] for r in rows]))
+    conn.close()
+    return summary
+
+
+def summarize_styles(groups, db_path=DB_PATH, workers=None, shard_size=SHARD_SIZE):
+    """{ラベル: (WHERE句, パラメータ)} → {ラベル: StyleSummary}
+
+    投稿IDの範囲でシャードに分け、プロセスプールで並列に集計してからマージする。
+    """
+    conn = sqlite3.connect(db_path)
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0]
+    conn.close()
+    jobs = [(label, where, params, lo, lo + shard_size)
+            for label, (where, params) in groups.items()
+            for lo in range(0, max_id + 1, shard_size)]
+
+    workers = workers or os.cpu_count() or 1
+    results = {}
+    if workers > 1 and len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                futures = {i: pool.submit(_summarize_shard, db_path, *job[1:]) for i, job in enumerate(jobs)}
+                results = {i: f.result() for i, f in futures.items()}
+        except (OSError, RuntimeError):
+            results = {}  # プールが使えない環境では順番に処理する
+    for i, job in enumerate(jobs):
+        if i not in results:
+            results[i] = _summarize_shard(db_path, *job[1:])
+
+    summaries = {label: StyleSummary() for label in groups}
+    for i, (label, *_) in enumerate(jobs):
+        summaries[label].merge(results[i])
+    return summaries
+
+
+def generate_distribution_report(summary_a, summary_b, label_a, label_b, output_path):
+    """全投稿の分布（分位点・構成比）の比較レポートを生成"""
+    lines = []
+    lines.append(f"# {label_a} vs {label_b} 文章スタイル分布比較（全投稿）")
+    lines.append(f"\n**分析日**: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    lines.append(f"**{label_a}**: {summary_a.n:,}件")
+    lines.append(f"**{label_b}**: {summary_b.n:,}件")
+    lines.append("")
+
+    lines.append("## 1. 数値指標の分位点")
+    lines.append("")
+    q_heads = " / ".join(f"p{int(q * 100)}" for q in QUANTILES)
+    lines.append(f"| 指標 | {label_a}（{q_heads}） | {label_b}（{q_heads}） |")
+    lines.append("|:---|---:|---:|")
+    for col, (name, _) in NUMERIC_COLUMNS.items():
+        qa = " / ".join(f"{v:g}" for v in summary_a.quantiles(col).values())
+        qb = " / ".join(f"{v:g}" for v in summary_b.quantiles(col).values())
+        lines.append(f"| {name} | {qa} | {qb} |")
+    lines.append("")
+
+    for i, (col, name) in enumerate(STYLE_COLUMNS.items(), 2):
+        share_a, share_b = summary_a.shares(col), summary_b.shares(col)
+        lines.append(f"## {i}. {name}の構成比")
+        lines.append("")
+        lines.append(f"| {name} | {label_a} | {label_b} | 差 |")
+        lines.append("|:---|---:|---:|---:|")
+        categories = share_a.add(share_b, fill_value=0).sort_values(ascending=False).index
+        for cat in categories:
+            pa, pb = share_a.get(cat, 0.0), share_b.get(cat, 0.0)
+            lines.append(f"| {cat} | {pa:.1f}% | {pb:.1f}% | {pa - pb:+.1f} |")
+        lines.append("")
+
+    os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+    print(f"分布比較レポート生成完了: {output_path}")
+    return output_path
+
+
+def main(self_account=None, top_n=10, workers=None):
     """メイン処理"""
     print("=== 文章スタイル詳細分析を開始 ===\n")
 
     # データ読み込み
     print("1. データ読み込み中...")
-    self_csv = "output/TwExport_20260217_191942.csv"
-    buzz_xlsx = "output/buzz_posts_20260215.xlsx"
-
-    self_posts, buzz_posts = load_top_posts_from_csv_and_excel(self_csv, buzz_xlsx, top_n=10)
-    print(f"   自分の投稿TOP10: {len(self_posts)}件")
-    print(f"   バズ投稿TOP10: {len(buzz_posts)}件\n")
+    self_posts, buzz_posts = load_top_posts_from_db(self_account, top_n=top_n)
+    print(f"   自分の投稿TOP{top_n}: {len(self_posts)}件")
+    print(f"   バズ投稿TOP{top_n}: {len(buzz_posts)}件\n")
+    if not self_posts or not buzz_posts:
+        print("エラー: 比較する投稿がDBにありません（自分の投稿は --self-account で指定できます）")
+        return
 
     # 個別の詳細レポート生成
     print("2. 自分の投稿の詳細分析レポートを生成中...")
     self_report = generate_detailed_report(
         self_posts,
-        "output/writing_analysis_self_top10.md",
-        "自分のインプレッションTOP10 詳細分析"
+        f"output/writing_analysis_self_top{top_n}.md",
+        f"自分のインプレッションTOP{top_n} 詳細分析"
     )
     print(f"   → {self_report}\n")
 
     print("3. バズ投稿の詳細分析レポートを生成中...")
     buzz_report = generate_detailed_report(
         buzz_posts,
-        "output/writing_analysis_buzz_top10.md",
-        "バズ投稿いいね数TOP10 詳細分析"
+        f"output/writing_analysis_buzz_top{top_n}.md",
+        f"バズ投稿いいね数TOP{top_n} 詳細分析"
     )
     print(f"   → {buzz_report}\n")
 
@@ -114,43 +297,47 @@ def main():
     comparison_report = generate_comparison_report(
         self_posts,
         buzz_posts,
-        "自分の投稿TOP10",
-        "バズ投稿TOP10",
+        f"自分の投稿TOP{top_n}",
+        f"バズ投稿TOP{top_n}",
         "output/writing_style_comparison_auto.md"
     )
     print(f"   → {comparison_report}\n")
 
+    # 全投稿の分布比較
+    print("5. 全投稿の文章スタイル分布を集計中...")
+    summaries = summarize_styles(corpus_filters(self_account), workers=workers)
+    distribution_report = generate_distribution_report(
+        summaries["self"], summaries["buzz"], "自分の全投稿", "バズ投稿全体",
+        "output/writing_style_distribution.md"
+    )
+    print(f"   → {distribution_report}\n")
+
     # 統計サマリー表示
     print("=== 分析完了 ===")
     print("\n生成されたレポート:")
     print(f"1. {self_report}")
     print(f"2. {buzz_report}")
     print(f"3. {comparison_report}")
+    print(f"4. {distribution_report}")
 
-    # クイック統計
-    analyzer = WritingAnalyzer()
-
+    # クイック統計（全投稿）
     print("\n【クイック統計】")
+    for key, label in [("self", "自分"), ("buzz", "バズ投稿")]:
+        print(f"\n{label}の冒頭パターンTOP3（{summaries[key].n:,}件）:")
+        for pattern, pct in summaries[key].shares("opening_pattern").head(3).items():
+            print(f"  - {pattern}: {pct:.1f}%")
 
-    # 自分の投稿の傾向
-    self_openings = [analyzer.analyze_opening(p['text'])['pattern'] for p in self_posts]
-    print(f"\n自分の冒頭パターンTOP3:")
-    for pattern, count in pd.Series(self_openings).value_counts().head(3).items():
-        print(f"  - {pattern}: {count}件")
-
-    # バズ投稿の傾向
-    buzz_openings = [analyzer.analyze_opening(p['text'])['pattern'] for p in buzz_posts]
-    print(f"\nバズ投稿の冒頭パターンTOP3:")
-    for pattern, count in pd.Series(buzz_openings).value_counts().head(3).items():
-        print(f"  - {pattern}: {count}件")
-
-    # 平均文字数
-    self_avg_chars = sum(len(p['text']) for p in self_posts) / len(self_posts)
-    buzz_avg_chars = sum(len(p['text']) for p in buzz_posts) / len(buzz_posts)
-    print(f"\n平均文字数:")
-    print(f"  - 自分: {self_avg_chars:.0f}文字")
-    print(f"  - バズ: {buzz_avg_chars:.0f}文字")
+    print(f"\n文字数の中央値:")
+    print(f"  - 自分: {summaries['self'].quantiles('total_chars')[0.5]:.0f}文字")
+    print(f"  - バズ: {summaries['buzz'].quantiles('total_chars')[0.5]:.0f}文字")
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="文章スタイル詳細分析（自分の投稿 vs バズ投稿）")
+    parser.add_argument("--self-account", help="自分のアカウント名（省略時はTwExportからインポートした投稿）")
+    parser.add_argument("--top-n", type=int, default=10, help="詳細分解する上位件数")
+    parser.add_argument("--workers", type=int, help="並列プロセス数（既定: CPU数）")
+    args = parser.parse_args()
+    main(args.self_account, args.top_n, args.workers)
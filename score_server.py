@@ -0,0 +1,351 @@
+"""常駐型スコアリングサービス（stdin/stdout JSONL + ローカルHTTP）
+
+スコア診断のたびにパターンのコンパイルや類似投稿インデックスの読み込みをやり直さないよう、
+プロセスを常駐させてインデックスとスコア関数を温めたまま使い回す。
+
+使い方:
+    python score_server.py                # 標準入力から1行1JSONで受け付ける
+    python score_server.py --http 8765    # http://127.0.0.1:8765/score で受け付ける
+
+リクエスト:  {"id": 1, "text": "本文"}  または  {"id": 1, "texts": ["本文1", "本文2"]}
+レスポンス:  {"id": 1, "result": {...}}  または  {"id": 1, "results": [{...}, ...]}
+"""
+
+import copy
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from algorithm_analysis import analyze_tone, calculate_algorithm_score
+from analyze_posts import calculate_buzz_score
+from buzz_score_v2 import calculate_buzz_score_v2
+from import_csv import DB_PATH
+from similarity_index import INDEX_PATH, SimilarityIndex, fetch_posts, update_index
+from weight_optimizer import LinearScorer
+
+MAX_BATCH = 64
+CACHE_SIZE = 1024
+
+
+class ScoringService:
+    """スコア関数と類似投稿インデックスをメモリに保持して診断するサービス"""
+
+    def __init__(self, db_path=DB_PATH, index_path=INDEX_PATH):
+        self.db_path = db_path
+        self.index_path = index_path
+        self.index = SimilarityIndex()
+        self.linear = None
+        self._conn = None
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.refresh()
+        self._warm_up()
+
+    @property
+    def candidates(self):
+        """類似投稿の検索対象件数"""
+        return len(self.index)
+
+    def refresh(self):
+        """未登録の投稿をインデックスに追記し、重みとともに読み直す（インポート後に呼ぶ）"""
+        index = SimilarityIndex()
+        linear = None
+        conn = None
+        if os.path.exists(self.db_path):
+            try:
+                update_index(self.db_path, self.index_path)
+            except sqlite3.OperationalError:
+                pass  # postsテーブル未作成
+            index = SimilarityIndex.load(self.index_path)
+            linear = LinearScorer.load(db_path=self.db_path)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if len(index):
+            index.query("ウォームアップ")  # 転置インデックスを先に作っておく
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self.index = index
+            self.linear = linear
+            self._conn = conn
+            self._cache.clear()
+        return len(index)
+
+    def _warm_up(self):
+        """正規表現キャッシュを温めるため一度だけ全スコア関数を通す"""
+        self._score_uncached(["ウォームアップ？実は3つの方法を試してみた。フォローしてね"])
+
+    def _similar_posts(self, texts, top_k):
+        """インデックスから文字n-gramの近い投稿を本文ごとに返す（投稿はまとめて1回で引く）"""
+        hits = [self.index.query(text, top_k=top_k * 2) for text in texts]
+        ids = sorted({pid for h in hits for pid, _ in h})
+        if not ids:
+            return [[] for _ in texts]
+        with self._lock:
+            posts = fetch_posts(self._conn, ids)
+        results = []
+        for h in hits:
+            similar = [{**posts[pid], "similarity": round(sim, 4)} for pid, sim in h if pid in posts]
+            results.append(similar[:top_k])
+        return results
+
+    def _score_uncached(self, texts, top_k=3):
+        """本文のリストを診断する。線形スコアは特徴量行列1つで、類似投稿は1回の問い合わせでまとめて求め、
+        ルールベースのスコア（v1 / v2 / アルゴリズム / トーン）は本文ごとに計算する"""
+        linear = self.linear.score_many(texts) if self.linear else [None] * len(texts)
+        similar = self._similar_posts(texts, top_k)
+        results = []
+        for text, lin, posts in zip(texts, linear, similar):
+            algo = calculate_algorithm_score(text)
+            results.append({
+                "length": len(text),
+                "v1": calculate_buzz_score(text),
+                "v2": calculate_buzz_score_v2(text),
+                "algorithm": {"total_score": algo["total_score"], "factors": algo["factors"]},
+                "tone": analyze_tone(text),
+                "linear": lin,
+                "similar_posts": posts,
+            })
+        return results
+
+    def score(self, text, top_k=3):
+        """1件を診断（同一テキストはキャッシュから返す）"""
+        return self.score_batch([text], top_k)[0]
+
+    def score_batch(self, texts, top_k=3):
+        """複数件を診断（キャッシュにない本文だけを、重複を除いて1回でまとめて計算）
+
+        結果はキャッシュのコピーを返す（呼び出し側が書き換えても次の診断に影響しない）。
+        """
+        texts = [str(t or "").strip() for t in texts]
+        with self._lock:
+            found = {t: self._cache[(t, top_k)] for t in set(texts) if (t, top_k) in self._cache}
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        if missing:
+            found.update(zip(missing, self._score_uncached(missing, top_k)))
+            with self._lock:
+                for t in missing:
+                    if len(self._cache) >= CACHE_SIZE:
+                        self._cache.pop(next(iter(self._cache)))
+                    self._cache[(t, top_k)] = found[t]
+        return [copy.deepcopy(found[t]) for t in texts]
+
+
+# ========================================
+# 同時リクエストのバッチ処理
+# ========================================
+
+class BatchWorker:
+    """複数スレッドからのリクエストをキューにまとめ、1スレッドでまとめて診断する"""
+
+    def __init__(self, service, max_batch=MAX_BATCH):
+        self.service = service
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts, top_k=3):
+        """診断を依頼して結果が出るまで待つ"""
+        done = threading.Event()
+        slot = {"texts": texts, "top_k": top_k, "done": done}
+        self._queue.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["results"]
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            while len(pending) < self.max_batch:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_top_k = {}
+            for slot in pending:
+                by_top_k.setdefault(slot["top_k"], []).append(slot)
+            try:
+                for top_k, slots in by_top_k.items():
+                    self._score_slots(slots, top_k)
+            finally:
+                for slot in pending:
+                    slot["done"].set()
+
+    def _score_slots(self, slots, top_k):
+        """同じ top_k の依頼の本文をつなげて1回で診断し、依頼ごとに切り分けて返す"""
+        try:
+            texts = [text for slot in slots for text in slot["texts"]]
+            results = self.service.score_batch(texts, top_k)
+        except Exception as e:  # 1件の失敗で他のリクエストを止めない
+            if len(slots) == 1:
+                slots[0]["error"] = e
+            else:
+                for slot in slots:  # どの依頼が失敗したか1件ずつ切り分ける
+                    self._score_slots([slot], top_k)
+            return
+        start = 0
+        for slot in slots:
+            end = start + len(slot["texts"])
+            slot["results"] = results[start:end]
+            start = end
+
+
+def parse_request(request):
+    """リクエストを検証して (top_k, 本文のリスト or None, 1件か) を返す。不正なら ValueError"""
+    if not isinstance(request, dict):
+        raise ValueError("リクエストはJSONオブジェクトで指定してください")
+    top_k = request.get("top_k", 3)
+    if isinstance(top_k, bool) or not isinstance(top_k, (int, str)):
+        raise ValueError("top_k は整数で指定してください")
+    try:
+        top_k = int(top_k)
+    except ValueError:
+        raise ValueError("top_k は整数で指定してください") from None
+    if top_k < 1:
+        raise ValueError("top_k は1以上で指定してください")
+    if "texts" in request:
+        if not isinstance(request["texts"], list):
+            raise ValueError("texts は配列で指定してください")
+        return top_k, request["texts"], False
+    if "text" in request:
+        return top_k, [request["text"]], True
+    return top_k, None, False
+
+
+def handle_request(service, request):
+    """1リクエスト（dict）を処理してレスポンス（dict）を返す（不正なリクエストは ValueError）"""
+    top_k, texts, single = parse_request(request)
+    response = {"id": request.get("id")}
+    start = time.perf_counter()
+    if request.get("refresh"):
+        response["candidates"] = service.refresh()
+    if texts is not None:
+        results = service.score_batch(texts, top_k)
+        if single:
+            response["result"] = results[0]
+        else:
+            response["results"] = results
+    elif not request.get("refresh"):
+        response["error"] = "text または texts を指定してください"
+    response["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return response
+
+
+# ========================================
+# stdin/stdout JSONL
+# ========================================
+
+def serve_stdio(service, stdin=None, stdout=None):
+    """1行1JSONのリクエストを読み、1行1JSONで応答する"""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            response = handle_request(service, json.loads(line))
+        except (ValueError, TypeError) as e:
+            response = {"error": f"不正なリクエスト: {e}"}
+        stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+
+# ========================================
+# ローカルHTTP
+# ========================================
+
+def make_http_server(service, port=8765, host="127.0.0.1"):
+    """POST /score でJSONを受け付けるHTTPサーバー（ローカル専用。port=0 なら空きポート）を作る"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    worker = BatchWorker(service)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "candidates": service.candidates})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path not in ("/score", "/refresh"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                top_k, texts, single = parse_request(request)
+            except ValueError as e:
+                self._send(400, {"error": f"不正なリクエスト: {e}"})
+                return
+
+            if self.path == "/refresh":
+                self._send(200, {"candidates": service.refresh()})
+                return
+            if texts is None:
+                self._send(400, {"error": "text または texts を指定してください"})
+                return
+
+            start = time.perf_counter()
+            try:
+                results = worker.submit(texts, top_k)
+            except Exception as e:  # 診断の失敗はサーバーを止めずに500で返す
+                self._send(500, {"error": f"診断に失敗しました: {e}"})
+                return
+            payload = {"result": results[0]} if single else {"results": results}
+            payload["id"] = request.get("id")
+            payload["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self._send(200, payload)
+
+        def log_message(self, format, *args):
+            pass  # アクセスログは出さない
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve_http(service, port=8765, host="127.0.0.1"):
+    """HTTPサーバーを起動して Ctrl+C まで受け付ける"""
+    server = make_http_server(service, port, host)
+    print(f"スコアリングサーバー起動: http://{host}:{port}/score（類似検索対象 {service.candidates}件）",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(http_port=None):
+    """メイン処理"""
+    service = ScoringService()
+    if http_port:
+        serve_http(service, port=http_port)
+    else:
+        print(f"スコアリングサービス起動（類似検索対象 {service.candidates}件）。1行1JSONで入力してください。",
+              file=sys.stderr)
+        serve_stdio(service)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="常駐型スコアリングサービス")
+    parser.add_argument("--http", type=int, default=None, metavar="PORT",
+                        help="指定ポートでローカルHTTPサーバーを起動する")
+    args = parser.parse_args()
+    main(http_port=args.http)
@@ -0,0 +1,216 @@
+"""スコアといいね数の相関をNumPyで一括検証する（ランダム半分分割 / ブートストラップ）
+
+試行ごとにDataFrameを作らず、全試行の分割を (試行×投稿) の割り当て行列として一度に引き、
+Pearson相関に必要な和（Σx, Σx², Σy, Σy², Σxy）を「割り当て行列 × 集計列」の1回の行列積で求める。
+半分分割は試行ごとの乱数キーの argpartition で投稿をちょうど半分ずつに分ける。
+Spearmanは試行ごとの部分集合（半分・復元抽出の標本）の中で順位を付け直す。全体で一度だけ並べた順に
+割り当て（選ばれた回数）を並べ、同値のグループごとの累積和から部分集合内の平均順位を一括で求める。
+"""
+
+import numpy as np
+
+# 1チャンクで扱う (試行数 × 投稿数) の要素数の上限（順位はfloat64で持つので約30MB×数本）
+CHUNK_ELEMENTS = 4_000_000
+
+
+def _chunks(n_trials, n):
+    """メモリ上限に収まるよう試行を分割する"""
+    size = max(1, CHUNK_ELEMENTS // max(n, 1))
+    for start in range(0, n_trials, size):
+        yield min(size, n_trials - start)
+
+
+def _tie_groups(values):
+    """(昇順の並び, 並び順での同値グループの先頭位置, 投稿ごとのグループ番号)"""
+    values = np.asarray(values)
+    order = np.argsort(values, kind="stable")
+    sorted_vals = values[order]
+    new_group = np.empty(len(values), dtype=bool)
+    new_group[:1] = True
+    new_group[1:] = sorted_vals[1:] != sorted_vals[:-1]
+    group_of = np.empty(len(values), dtype=np.int64)
+    group_of[order] = np.cumsum(new_group) - 1
+    return order, np.flatnonzero(new_group), group_of
+
+
+def average_ranks(values):
+    """平均順位（同順位は平均、1始まり）"""
+    if len(values) == 0:
+        return np.zeros(0)
+    return subset_ranks(np.ones((1, len(values))), _tie_groups(values))[0]
+
+
+def _group_ranks(weights, groups):
+    """試行ごとの同値グループの (件数, 部分集合内の平均順位)。どちらも (試行×グループ)"""
+    order, starts, _ = groups
+    # 値の昇順に並べ、同値グループごとの件数 → それより小さい件数の累積 → グループの平均順位
+    totals = np.add.reduceat(np.take(weights, order, axis=1), starts, axis=1).astype(np.float64)
+    return totals, np.cumsum(totals, axis=1) - totals + (totals + 1.0) / 2.0
+
+
+def subset_ranks(weights, groups):
+    """試行ごとの部分集合の中での平均順位（試行×投稿）
+
+    weights: (試行×投稿) の各投稿が部分集合に入った回数（半分分割は0/1、ブートストラップは重複回数）。
+    同じ投稿を複数回選んだ場合も同値として平均順位になる。部分集合に入っていない投稿の値は使わない。
+    """
+    _, group_rank = _group_ranks(weights, groups)
+    return np.take(group_rank, groups[2], axis=1)
+
+
+def _spearman(weights, like_groups, score_groups):
+    """部分集合内で順位を付け直したSpearman相関（試行×版）
+
+    平均順位の和は件数だけで決まり（N(N+1)/2）、二乗和はグループ単位で求まるので、
+    投稿数の長さの計算は順位の積和 Σ w·r_いいね·r_スコア だけ。
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    like_totals, like_rank = _group_ranks(weights, like_groups)
+    n = like_totals.sum(axis=1)
+    s = n * (n + 1.0) / 2.0
+    var_x = (like_totals * like_rank ** 2).sum(axis=1) - s * s / n
+    weighted_like = weights * np.take(like_rank, like_groups[2], axis=1)
+    result = []
+    for groups in score_groups:
+        totals, rank = _group_ranks(weights, groups)
+        sxy = np.einsum("ij,ij->i", weighted_like, np.take(rank, groups[2], axis=1))
+        var_y = (totals * rank ** 2).sum(axis=1) - s * s / n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result.append((sxy - s * s / n) / np.sqrt(var_x * var_y))
+    return np.column_stack(result)
+
+
+def _standardize(a):
+    """float32で和を取っても桁落ちしないよう平均0・分散1に揃える"""
+    sd = a.std(axis=0)
+    sd[sd == 0] = 1.0
+    return (a - a.mean(axis=0)) / sd
+
+
+class _PairSums:
+    """いいね数（x）と各スコア版（y_j）の相関に必要な集計列をまとめた行列
+
+    列の並び: [1, x, x², y_1..y_k, y_1²..y_k², x·y_1..x·y_k]
+    """
+
+    def __init__(self, x, y):
+        x = _standardize(x[:, None])[:, 0]
+        y = _standardize(y)
+        self.k = y.shape[1]
+        self.columns = np.column_stack([
+            np.ones_like(x), x, x * x, y, y * y, y * x[:, None]
+        ]).astype(np.float32)
+        self.total = self.columns.sum(axis=0, dtype=np.float64)
+
+    def corr(self, sums):
+        """行列積で得た和（試行×列）から相関（試行×版）を求める"""
+        k = self.k
+        sums = np.asarray(sums, dtype=np.float64)
+        n = sums[:, 0:1]
+        sx = sums[:, 1:2]
+        sxx = sums[:, 2:3]
+        sy = sums[:, 3:3 + k]
+        syy = sums[:, 3 + k:3 + 2 * k]
+        sxy = sums[:, 3 + 2 * k:3 + 3 * k]
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return cov / np.sqrt(var_x * var_y)
+
+
+def _summary(values):
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        nan = float("nan")
+        return {"mean": nan, "std": nan, "min": nan, "max": nan, "p05": nan, "p95": nan}
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "p05": float(np.percentile(values, 5)),
+        "p95": float(np.percentile(values, 95)),
+    }
+
+
+def _prepare(likes, scores):
+    likes = np.asarray(likes, dtype=np.float64)
+    versions = list(scores)
+    score_mat = np.column_stack([np.asarray(scores[v], dtype=np.float64) for v in versions])
+    return likes, versions, score_mat
+
+
+def split_validation(likes, scores, n_trials=1000, seed=42):
+    """ランダム半分分割で各半分の相関を求め、版ごとの分布を返す
+
+    scores: {版名: スコア配列}。戻り値: {版名: {"pearson": 要約, "spearman": 要約}}
+    試行ごとに投稿をちょうど半分（A は n//2 件、B は残り）に分け、A・B両方の相関を数える
+    （標本数は 2×n_trials）。Spearmanは各半分の中で順位を付け直す。
+    """
+    likes, versions, score_mat = _prepare(likes, scores)
+    n = len(likes)
+    half = n // 2
+    rng = np.random.default_rng(seed)
+
+    raw = _PairSums(likes, score_mat)
+    like_groups = _tie_groups(likes)
+    score_groups = [_tie_groups(score_mat[:, j]) for j in range(len(versions))]
+
+    pearson = []
+    spearman = []
+    for size in _chunks(n_trials, n):
+        # 乱数キーの小さい方から半分をAにする（試行ごとの並べ替えと同じ分け方）
+        mask = np.zeros((size, n), dtype=np.float32)
+        if half:
+            picked = np.argpartition(rng.random((size, n)), half - 1, axis=1)[:, :half]
+            np.put_along_axis(mask, picked, 1.0, axis=1)
+        sums = mask @ raw.columns
+        pearson.append(np.vstack([raw.corr(sums), raw.corr(raw.total - sums)]))
+        spearman.append(np.vstack([_spearman(mask, like_groups, score_groups),
+                                   _spearman(1.0 - mask, like_groups, score_groups)]))
+
+    pearson = np.vstack(pearson)
+    spearman = np.vstack(spearman)
+    return {v: {"pearson": _summary(pearson[:, j]), "spearman": _summary(spearman[:, j])}
+            for j, v in enumerate(versions)}
+
+
+def bootstrap_ci(likes, scores, n_boot=2000, alpha=0.05, seed=42):
+    """復元抽出ブートストラップで相関係数の信頼区間を求める
+
+    復元抽出は「各投稿が何回選ばれたか」の重み行列として表し、行列積で一括計算する。
+    Spearmanは標本ごとに（重複して選ばれた投稿は同順位として）順位を付け直す。
+    戻り値: {版名: {"pearson": {"estimate", "low", "high"}, "spearman": {...}}}
+    """
+    likes, versions, score_mat = _prepare(likes, scores)
+    n = len(likes)
+    rng = np.random.default_rng(seed)
+
+    raw = _PairSums(likes, score_mat)
+    like_groups = _tie_groups(likes)
+    score_groups = [_tie_groups(score_mat[:, j]) for j in range(len(versions))]
+
+    samples = {"pearson": [], "spearman": []}
+    for size in _chunks(n_boot, n):
+        picks = rng.integers(0, n, size=(size, n)) + (np.arange(size) * n)[:, None]
+        weights = np.bincount(picks.ravel(), minlength=size * n).reshape(size, n).astype(np.float32)
+        samples["pearson"].append(raw.corr(weights @ raw.columns))
+        samples["spearman"].append(_spearman(weights, like_groups, score_groups))
+
+    estimates = {"pearson": raw.corr(raw.total[None, :])[0],
+                 "spearman": _spearman(np.ones((1, n)), like_groups, score_groups)[0]}
+    lo, hi = 100 * alpha / 2, 100 * (1 - alpha / 2)
+
+    results = {}
+    for j, v in enumerate(versions):
+        results[v] = {}
+        for name in ("pearson", "spearman"):
+            col = np.vstack(samples[name])[:, j]
+            col = col[np.isfinite(col)]
+            results[v][name] = {
+                "estimate": float(estimates[name][j]),
+                "low": float(np.percentile(col, lo)) if len(col) else float("nan"),
+                "high": float(np.percentile(col, hi)) if len(col) else float("nan"),
+            }
+    return results
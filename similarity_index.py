@@ -0,0 +1,249 @@
+"""文字2〜3-gramのハッシュTF-IDFによる類似投稿インデックス
+
+日本語は空白で単語が区切れないため、語の集合ではなく文字n-gramで類似度を測る。
+n-gramは固定次元にハッシュし、疎行列（CSR）として data/similarity_index.npz に保存する。
+インポート時に新しい投稿だけを追記し、問い合わせは転置インデックス経由の
+疎な内積 + argpartition による上位k件選択で行う。
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+
+from import_csv import DB_PATH
+
+INDEX_PATH = "data/similarity_index.npz"
+N_FEATURES = 1 << 18  # ハッシュ次元（衝突はTF-IDFの重みでほぼ無視できる）
+NGRAM_SIZES = (2, 3)
+
+# n-gramごとに異なる乗数でハッシュし、2-gramと3-gramが衝突しにくいようにする
+_HASH_MULTIPLIERS = {
+    2: (np.uint64(0x9E3779B185EBCA87), np.uint64(0xC2B2AE3D27D4EB4F)),
+    3: (np.uint64(0x165667B19E3779F9), np.uint64(0xD6E8FEB86659FD93)),
+}
+
+
+# ========================================
+# n-gram特徴量
+# ========================================
+
+def _codepoints(texts):
+    """テキスト群をコードポイント配列に連結し、(codes, 各テキストの開始位置) を返す"""
+    normalized = [str(t or "").lower().replace("\n", " ") for t in texts]
+    lengths = np.fromiter((len(t) for t in normalized), dtype=np.int64, count=len(normalized))
+    offsets = np.zeros(len(normalized) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    joined = "".join(normalized)
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    return codes, offsets
+
+
+def hashed_ngram_counts(texts):
+    """テキスト群の文字n-gramをハッシュし、(行番号, 特徴番号, 出現回数) を返す
+
+    全テキストを1本の配列に連結してn-gramをまとめてハッシュするため、
+    Pythonループはテキスト数ではなくn-gramサイズの数だけで済む。
+    """
+    codes, offsets = _codepoints(texts)
+    n_docs = len(offsets) - 1
+    doc_of_pos = np.repeat(np.arange(n_docs, dtype=np.int64), np.diff(offsets))
+
+    keys = []
+    for n in NGRAM_SIZES:
+        if len(codes) < n:
+            continue
+        m1, m2 = _HASH_MULTIPLIERS[n]
+        h = codes[:len(codes) - n + 1] * m1
+        for k in range(1, n):
+            h = (h ^ codes[k:len(codes) - n + 1 + k]) * m2
+        h = (h >> np.uint64(20)) % np.uint64(N_FEATURES)
+        start_doc = doc_of_pos[:len(codes) - n + 1]
+        end_doc = doc_of_pos[n - 1:]
+        valid = start_doc == end_doc  # テキスト境界をまたぐn-gramは除外
+        keys.append(start_doc[valid] * N_FEATURES + h[valid].astype(np.int64))
+
+    if not keys:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    uniq, counts = np.unique(np.concatenate(keys), return_counts=True)
+    return uniq // N_FEATURES, uniq % N_FEATURES, counts
+
+
+# ========================================
+# インデックス本体
+# ========================================
+
+class SimilarityIndex:
+    """投稿IDと文字n-gram TF（サブリニア）のCSR行列、文書頻度を保持する"""
+
+    def __init__(self, post_ids=None, indptr=None, indices=None, tf=None, df=None):
+        self.post_ids = post_ids if post_ids is not None else np.zeros(0, dtype=np.int64)
+        self.indptr = indptr if indptr is not None else np.zeros(1, dtype=np.int64)
+        self.indices = indices if indices is not None else np.zeros(0, dtype=np.int32)
+        self.tf = tf if tf is not None else np.zeros(0, dtype=np.float32)
+        self.df = df if df is not None else np.zeros(N_FEATURES, dtype=np.int32)
+        self._inverted = None
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    @property
+    def max_post_id(self):
+        return int(self.post_ids.max()) if len(self.post_ids) else 0
+
+    # --- 構築・追記 ---
+
+    def add(self, post_ids, texts):
+        """投稿を追記する（既存行の再計算はしない）"""
+        if len(texts) == 0:
+            return 0
+        rows, cols, counts = hashed_ngram_counts(texts)
+        row_nnz = np.bincount(rows, minlength=len(texts))
+        new_indptr = self.indptr[-1] + np.cumsum(row_nnz)
+
+        self.post_ids = np.concatenate([self.post_ids, np.asarray(post_ids, dtype=np.int64)])
+        self.indptr = np.concatenate([self.indptr, new_indptr])
+        self.indices = np.concatenate([self.indices, cols.astype(np.int32)])
+        self.tf = np.concatenate([self.tf, (1.0 + np.log(counts)).astype(np.float32)])
+        self.df += np.bincount(cols, minlength=N_FEATURES).astype(np.int32)
+        self._inverted = None
+        return len(texts)
+
+    # --- 保存・読み込み ---
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, post_ids=self.post_ids, indptr=self.indptr,
+                 indices=self.indices, tf=self.tf, df=self.df,
+                 n_features=np.array([N_FEATURES]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """保存済みインデックスを読み込む（なければ空のインデックス）"""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as z:
+            if int(z["n_features"][0]) != N_FEATURES:
+                return cls()  # ハッシュ次元が変わったら作り直し
+            return cls(z["post_ids"], z["indptr"], z["indices"], z["tf"], z["df"])
+
+    # --- 問い合わせ ---
+
+    def _idf(self):
+        n = len(self.post_ids)
+        return (np.log((1.0 + n) / (1.0 + self.df)) + 1.0).astype(np.float32)
+
+    def _build_inverted(self):
+        """特徴番号→(行, 重み) の転置インデックスと行ノルムを作る（初回問い合わせ時のみ）"""
+        idf = self._idf()
+        weights = self.tf * idf[self.indices]
+        row_of_nnz = np.repeat(np.arange(len(self.post_ids), dtype=np.int64), np.diff(self.indptr))
+        norms = np.sqrt(np.bincount(row_of_nnz, weights=weights.astype(np.float64) ** 2,
+                                    minlength=len(self.post_ids)))
+        norms[norms == 0] = 1.0
+
+        order = np.argsort(self.indices, kind="stable")
+        col_ptr = np.zeros(N_FEATURES + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=N_FEATURES), out=col_ptr[1:])
+        self._inverted = {
+            "idf": idf,
+            "col_ptr": col_ptr,
+            "rows": row_of_nnz[order],
+            "weights": (weights / norms[row_of_nnz])[order].astype(np.float32),
+        }
+
+    def query(self, text, top_k=3, exclude_ids=None):
+        """類似度上位k件を [(post_id, 類似度), ...] で返す"""
+        if len(self.post_ids) == 0:
+            return []
+        if self._inverted is None:
+            self._build_inverted()
+        inv = self._inverted
+
+        _, cols, counts = hashed_ngram_counts([text])
+        if len(cols) == 0:
+            return []
+        q = (1.0 + np.log(counts)) * inv["idf"][cols]
+        q /= np.linalg.norm(q) or 1.0
+
+        starts = inv["col_ptr"][cols]
+        lengths = inv["col_ptr"][cols + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return []
+        # 各特徴のポスティングを1本の位置配列に展開してまとめて加算する
+        pos = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        scores = np.bincount(inv["rows"][pos],
+                             weights=inv["weights"][pos] * np.repeat(q, lengths),
+                             minlength=len(self.post_ids))
+
+        if exclude_ids is not None and len(exclude_ids):
+            scores[np.isin(self.post_ids, list(exclude_ids))] = 0.0
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.post_ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+
+# ========================================
+# DB連携
+# ========================================
+
+def update_index(db_path=DB_PATH, path=INDEX_PATH, rebuild=False):
+    """インデックス済みIDより新しい投稿だけを追記して保存する。追加件数を返す"""
+    index = SimilarityIndex() if rebuild else SimilarityIndex.load(path)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT id, text FROM posts WHERE id > ? ORDER BY id", (index.max_post_id,)
+    ).fetchall()
+    conn.close()
+    if not rows and os.path.exists(path):
+        return 0
+    added = index.add([r[0] for r in rows], [r[1] for r in rows])
+    index.save(path)
+    return added
+
+
+def fetch_posts(conn, post_ids):
+    """投稿IDのリストから {id: 投稿dict} を返す（削除済みIDは含まれない）"""
+    if not post_ids:
+        return {}
+    placeholders = ",".join("?" * len(post_ids))
+    rows = conn.execute(
+        f"SELECT id, account, text, likes, retweets FROM posts WHERE id IN ({placeholders})",
+        list(post_ids)
+    ).fetchall()
+    return {r[0]: {"id": r[0], "account": r[1], "text": r[2], "likes": r[3], "retweets": r[4]}
+            for r in rows}
+
+
+def find_similar_posts(text, top_k=3, db_path=DB_PATH, index=None):
+    """本文に近い投稿を類似度順に返す"""
+    if index is None:
+        index = SimilarityIndex.load()
+    # 削除済みの投稿が混ざっても件数が足りるよう多めに取る
+    hits = index.query(text, top_k=top_k * 2)
+    conn = sqlite3.connect(db_path)
+    posts = fetch_posts(conn, [pid for pid, _ in hits])
+    conn.close()
+    results = []
+    for pid, sim in hits:
+        if pid in posts:
+            results.append({**posts[pid], "similarity": round(sim, 4)})
+        if len(results) >= top_k:
+            break
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = time.perf_counter()
+    added = update_index(rebuild="--rebuild" in sys.argv)
+    index = SimilarityIndex.load()
+    print(f"類似インデックス更新: +{added}件 / 合計 {len(index)}件 "
+          f"({time.perf_counter() - start:.2f}秒)")
@@ -0,0 +1,159 @@
+"""投稿テンプレートと、テンプレートのキーワード → 投稿IDの転置インデックス
+
+キーワードを含む投稿を template_keyword_posts テーブルに（いいね数つきで）記録しておき、
+テンプレートごとの例示投稿は「キーワードごとにいいね上位n件」を合わせるだけで引けるようにする。
+インポート時に新しい投稿の分だけ追記し、引いた例示はDBの状態が変わるまでメモリにキャッシュする。
+"""
+
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from import_csv import DB_PATH, init_db
+
+TEMPLATES = [
+    {
+        "name": "拓巳型（自己開示型）",
+        "structure": "自己開示 → 具体的体験 → 気づき → 余韻",
+        "description": "「正直に言う」「実は」系の告白から入り、具体的な体験を語り、静かな気づきで締める。CTAなし。",
+        "skeleton": (
+            "正直に言う。[自己開示：恥ずかしいこと・弱点・失敗]\n\n"
+            "[具体的な体験・数字・エピソード]\n\n"
+            "それで気づいたのは、[シンプルな気づき]。\n\n"
+            "[余韻のある一文で締め。問いかけでも可]"
+        ),
+        "keywords": ["正直", "実は", "ド素人", "告白", "恥ずかしい"],
+    },
+    {
+        "name": "リスク警告型",
+        "structure": "事実提示 → 驚き → 対処法",
+        "description": "「知らないと損する」「○○してる人は注意」系。具体的な数字で驚かせて、対処法を提示。",
+        "skeleton": (
+            "[意外な事実・統計・体験]\n\n"
+            "これ、実は[驚きのポイント]。\n\n"
+            "対処法は[具体的なアクション]だけ。\n\n"
+            "[一言で締め]"
+        ),
+        "keywords": ["注意", "知らないと", "損", "実は", "危ない"],
+    },
+    {
+        "name": "プロンプト/ツール紹介型",
+        "structure": "失敗 → 改善 → 具体例",
+        "description": "「こう使ったら失敗した」→「こう変えたら上手くいった」→ 具体的なプロンプト/手順を提示。",
+        "skeleton": (
+            "[最初にやった失敗・よくある間違い]\n\n"
+            "でも[改善したこと]をしたら全然違った。\n\n"
+            "具体的には：\n[箇条書きで手順・プロンプト例]\n\n"
+            "[再現性ある締め・「試してみて」でも可]"
+        ),
+        "keywords": ["プロンプト", "Claude", "ChatGPT", "試した", "変えた"],
+    },
+]
+
+INDEX_NAME = "template_keywords"
+CHUNK_SIZE = 5000
+
+_examples = {}  # (db_path, n) → (状態, {テンプレート名: 例示投稿のリスト})
+
+
+def template_keywords():
+    """全テンプレートのキーワード（重複なし、定義順）"""
+    return list(dict.fromkeys(kw for t in TEMPLATES for kw in t["keywords"]))
+
+
+def update_template_index(db_path=DB_PATH, rebuild=False):
+    """前回以降に追加された投稿だけをキーワードごとの投稿リストに追記する。追加件数を返す"""
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    if rebuild:
+        conn.execute("DELETE FROM template_keyword_posts")
+        conn.execute("DELETE FROM index_state WHERE name = ?", (INDEX_NAME,))
+    row = conn.execute("SELECT max_post_id FROM index_state WHERE name = ?", (INDEX_NAME,)).fetchone()
+    last_id = row[0] if row else 0
+    cursor = conn.execute(
+        "SELECT id, text, likes FROM posts WHERE id > ? AND likes > 0 ORDER BY id", (last_id,)
+    )
+
+    keywords = template_keywords()
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0]
+    added = 0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        chunk = pd.DataFrame(rows, columns=["id", "text", "likes"])
+        texts = chunk["text"].fillna("").astype(str)
+        entries = []
+        for kw in keywords:
+            hit = chunk[texts.str.contains(kw, regex=False).to_numpy()]
+            entries.extend((kw, int(i), int(l)) for i, l in zip(hit["id"], hit["likes"]))
+        conn.executemany(
+            "INSERT OR REPLACE INTO template_keyword_posts (keyword, post_id, likes) VALUES (?, ?, ?)",
+            entries
+        )
+        added += len(rows)
+
+    conn.execute(
+        "INSERT OR REPLACE INTO index_state (name, max_post_id, updated_at) VALUES (?, ?, ?)",
+        (INDEX_NAME, max(max_id, last_id), datetime.now().isoformat())
+    )
+    conn.commit()
+    conn.close()
+    return added
+
+
+def _top_examples(conn, keywords, n):
+    """キーワードのどれかを含む投稿のいいね上位n件（キーワードごとの上位n件を合わせて選ぶ）"""
+    candidates = {}
+    for kw in keywords:
+        rows = conn.execute(
+            """
+            SELECT p.id, p.text, p.likes, p.account
+            FROM template_keyword_posts t JOIN posts p ON p.id = t.post_id
+            WHERE t.keyword = ?
+            ORDER BY t.likes DESC, t.post_id
+            LIMIT ?
+            """,
+            (kw, n)
+        ).fetchall()
+        for pid, text, likes, account in rows:
+            candidates[pid] = {"text": text, "likes": likes, "account": account, "_id": pid}
+    ranked = sorted(candidates.values(), key=lambda r: (-r["likes"], r["_id"]))[:n]
+    return [{k: v for k, v in r.items() if k != "_id"} for r in ranked]
+
+
+def template_examples(n=2, db_path=DB_PATH):
+    """{テンプレート名: [{"text", "likes", "account"}, ...]}（いいね順、DBが変わるまでキャッシュ）"""
+    conn = sqlite3.connect(db_path)
+    try:
+        state = tuple(conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM posts").fetchone())
+    finally:
+        conn.close()
+    hit = _examples.get((db_path, n))
+    if hit and hit[0] == state:
+        return hit[1]
+
+    update_template_index(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        result = {t["name"]: _top_examples(conn, t["keywords"], n) for t in TEMPLATES}
+    finally:
+        conn.close()
+    _examples[(db_path, n)] = (state, result)
+    return result
+
+
+def clear_cache():
+    _examples.clear()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = time.perf_counter()
+    added = update_template_index(rebuild="--rebuild" in sys.argv)
+    print(f"テンプレート索引更新: {added}件 ({time.perf_counter() - start:.2f}秒)")
+    for name, examples in template_examples().items():
+        print(f"{name}: " + ", ".join(f"いいね{e['likes']}" for e in examples))
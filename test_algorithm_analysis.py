@@ -0,0 +1,87 @@
+"""algorithm_analysis.pyのDB全体一括分析のテスト"""
+
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import algorithm_analysis as aa
+from import_csv import DB_PATH, init_db
+
+POSTS = [
+    ("a", "正直に言う。副業で失敗した話\n\n1/5", 120, 10, 40),
+    ("b", "これ知らないと損するよ！\nhttps://example.com/x", 300, 50, 5),
+    ("c", "ChatGPTで月5万円稼いだ方法、わかる人いる？", 80, 3, 30),
+    ("d", "バカじゃないの？", 10, 0, 20),
+    ("e", "ランチ美味しかった", 0, 0, 0),  # いいね0は対象外
+    ("f", "詳しくは https://x.com/foo/status/1 を見て", 45, 2, 2),
+]
+
+
+def _assert_same(old, new, path=""):
+    if isinstance(new, dict):
+        for key, value in new.items():
+            _assert_same(old[key], value, f"{path}/{key}")
+    elif isinstance(new, list):
+        assert len(old) == len(new), path
+        for i, (o, n) in enumerate(zip(old, new)):
+            _assert_same(o, n, f"{path}[{i}]")
+    elif isinstance(new, float) or isinstance(old, float):
+        assert math.isclose(old, new, abs_tol=1e-9), path
+    else:
+        assert old == new, path
+
+
+def test_db_analysis_matches_per_post_functions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        "INSERT INTO posts (account, text, likes, retweets, replies) VALUES (?, ?, ?, ?, ?)", POSTS
+    )
+    conn.commit()
+    df = pd.read_sql(
+        "SELECT text, likes, retweets, replies, account FROM posts WHERE likes > 0", conn
+    ).rename(columns={"text": "本文", "likes": "いいね数", "retweets": "リポスト数",
+                      "replies": "リプライ数", "account": "ユーザー名"})
+    conn.close()
+
+    result = aa.analyze_algorithm_db()
+    _assert_same(aa.analyze_discussion_algorithm_value(df), result["discussion"])
+    _assert_same(aa.analyze_thread_potential(df), result["thread"])
+    _assert_same(aa.analyze_link_impact(df), result["link"])
+    _assert_same(aa.analyze_tone_distribution(df), result["tone"])
+    _assert_same(aa.analyze_dwell_potential(df), result["dwell"])
+    _assert_same(aa.analyze_early_engagement_potential(df), result["early"])
+
+
+def test_top_k_keeps_original_order_for_ties():
+    values = np.array([0.0, 5.0, 0.0, 5.0, 9.0, 0.0])
+    assert aa.top_k(values, 3).tolist() == [4, 1, 3]
+    assert aa.top_k(values, 4).tolist() == [4, 1, 3, 0]
+    assert aa.top_k(values, 2, values < 9).tolist() == [1, 3]
+
+
+def test_definition_change_rejudges_with_explicit_db_path(tmp_path, monkeypatch):
+    # カレントディレクトリは変えず、db_path だけで別のDBを作って判定する
+    db_path = str(tmp_path / "db" / "algo.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO posts (account, text, likes, retweets, replies) VALUES (?, ?, ?, ?, ?)", POSTS
+    )
+    conn.commit()
+    conn.close()
+
+    assert aa.update_algorithm_features(db_path) == len(POSTS)
+    assert aa.update_algorithm_features(db_path) == 0
+    columns, _ = aa.load_algorithm_columns(db_path)
+
+    monkeypatch.setattr(aa, "_version", "changed")
+    assert aa.update_algorithm_features(db_path) == len(POSTS)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT DISTINCT version FROM algorithm_feature_defs").fetchall() == [("changed",)]
+    conn.close()
+    # 版が変わればメモリ上の列も読み直す
+    assert aa.load_algorithm_columns(db_path)[0] is not columns
@@ -0,0 +1,51 @@
+"""char_classes.pyの文字種集計のテスト"""
+
+import re
+
+import pandas as pd
+
+from analyze_posts import EMOJI_PATTERN
+from char_classes import COLUMNS, char_stats, char_stats_many, count_emoji, emoji_runs
+
+TEXTS = [
+    "正直に言う。副業で失敗した😭😭 でも続けた🔥\n\n・確定申告\n・経費\n- 住民税",
+    "【保存版】3つのコツ→まとめ★\n① 準備\n②まだ\n1 始める",
+    "本当に…？ えっ!! ...... あれ..",
+    "❤️‍🔥 旗🇯🇵 と 𠮷野家 ☆彡",
+    "・\n・",
+    "",
+    "www",
+]
+
+PICTOGRAPH_PATTERN = re.compile("[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]")
+BULLET_PATTERN = re.compile(r'^[・\-\*①-➓1-9]\s', re.MULTILINE)
+
+
+def _expected(text):
+    return {
+        "emoji": len(EMOJI_PATTERN.findall(text)),
+        "pictograph": len(PICTOGRAPH_PATTERN.findall(text)),
+        "arrow": len(re.findall(r"[→⇒➡]", text)),
+        "bracket": len(re.findall(r"[【】『』「」]", text)),
+        "symbol": len(re.findall(r"[★☆◆◇■□▼▲]", text)),
+        "exclamation": text.count("！") + text.count("!"),
+        "question": text.count("？") + text.count("?"),
+        "ellipsis": text.count("…") + text.count(".."),
+        "bullet_lines": len(BULLET_PATTERN.findall(text)),
+    }
+
+
+def test_char_stats_match_regex_counts():
+    for text in TEXTS:
+        assert char_stats(text) == _expected(text), text
+        assert count_emoji(text) == len(EMOJI_PATTERN.findall(text))
+        assert emoji_runs(text) == EMOJI_PATTERN.findall(text)
+
+
+def test_char_stats_many_matches_per_post():
+    s = pd.Series(TEXTS + [None], index=range(100, 100 + len(TEXTS) + 1))
+    frame = char_stats_many(s)
+    assert list(frame.columns) == COLUMNS
+    assert frame.index.tolist() == s.index.tolist()
+    assert frame.to_dict("records") == [_expected(t) for t in TEXTS + [""]]
+    assert char_stats_many([]).empty
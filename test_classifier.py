@@ -0,0 +1,55 @@
+"""classifier.pyの分類エンジンのテスト"""
+
+import re
+
+import pandas as pd
+
+from classifier import RULE_SETS, Classifier, first_lines, get_classifier
+
+TEXTS = [
+    "正直に言う。副業で失敗した。でも続けたら月5万円になった。あなたはどう？",
+    "知らないと損する3つのこと\n\n・確定申告\n・経費",
+    " 1. まず最初に",
+    "これ！",
+    "これ、本当に便利なツールだった。みんなも試してみて！！！！！！",
+    "ChatGPTで月収100万円達成",
+    "ai ツール紹介します",
+    "まじで最悪",
+    "何それ",
+    "あるあるです 。 ",
+    "\n\n私がやってみた結果",
+    "",
+]
+
+
+def _expected(rules, default, text):
+    for label, pattern, *flags in rules:
+        if re.search(pattern, text, flags[0] if flags else 0):
+            return label
+    return default
+
+
+def test_rule_sets_match_rule_by_rule_search():
+    texts = TEXTS + first_lines(TEXTS).tolist()
+    for name, (rules, default) in RULE_SETS.items():
+        engine = get_classifier(name)
+        expected = [_expected(rules, default, t) for t in texts]
+        assert [engine.classify(t) for t in texts] == expected, name
+        assert engine.classify_series(pd.Series(texts)).tolist() == expected, name
+
+
+def test_first_rule_wins_over_leftmost_match():
+    # 先に出てくるのは2番目のルールの一致だが、1番目のルールも後ろで一致する
+    engine = Classifier([("a", "ab"), ("b", "xa"), ("c", "^z|q")], default="-")
+    assert engine.classify("xab") == "a"
+    assert engine.classify("xaq") == "b"
+    assert engine.classify("qz") == "c"
+    assert engine.classify("zz") == "c"
+    assert engine.classify("yz") == "-"
+
+
+def test_classify_series_keeps_index_and_handles_missing():
+    s = pd.Series(["これ！", None, "これ！", "何それ？"], index=[10, 20, 30, 40])
+    out = get_classifier("opening:hook").classify_series(s)
+    assert out.index.tolist() == [10, 20, 30, 40]
+    assert out.tolist() == ["インパクト短文型", "その他", "インパクト短文型", "疑問・問いかけ型"]
@@ -0,0 +1,62 @@
+"""emerging_terms.pyのテスト"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from emerging_terms import momentum_scores, term_momentum
+from generate_posts import extract_trending_topics
+from import_csv import init_db
+from keyword_sketch import tokenize, update_daily_sketches
+
+
+def test_momentum_flags_only_accelerating_terms():
+    """直近だけいいね加重の出現量が増えた語のzが高く、横ばいの語は0付近になること"""
+    n_posts = np.full(10, 20.0)
+    counts = np.array([[2] * 7 + [6] * 3, [3] * 10, [5] * 7 + [0] * 3], dtype=float)
+    likes = np.array([[20] * 7 + [900] * 3, [60] * 10, [100] * 7 + [0] * 3], dtype=float)
+    z, recent_posts, _, _ = momentum_scores(counts, likes, n_posts, recent=3, baseline=7)
+    assert z[0] > 2
+    assert abs(z[1]) < 1e-9
+    assert z[2] < 0
+    assert recent_posts.tolist() == [18, 9, 0]
+
+
+def test_trending_topics_boosted_by_momentum():
+    df = pd.DataFrame({
+        "本文": ["ChatGPTでブログ", "ChatGPTで自動化", "Canvaでデザイン"],
+        "いいね数": [100, 100, 80],
+    })
+    tools, works = extract_trending_topics(df, momentum={})
+    assert tools[:2] == ["ChatGPT", "Canva"]
+    tools, _ = extract_trending_topics(df, momentum={"Canva": 3.0, "ChatGPT": -1.0})
+    assert tools[:2] == ["Canva", "ChatGPT"]
+
+
+def test_tokenize_yields_trend_terms():
+    """漢字の連続・カタカナ＋漢字に埋もれた語と英字の表記揺れも、generate_posts と同じ表記で拾うこと"""
+    words = tokenize("業務自動化でデータ分析、chatgptとCLAUDE CODEでyoutube")
+    for term in ["業務自動化", "自動化", "データ分析", "ChatGPT", "Claude Code", "YouTube"]:
+        assert term in words
+    assert tokenize("自動化").count("自動化") == 1  # 同じ位置の語は重ねて数えない
+
+
+def test_work_term_momentum_from_daily_sketches(tmp_path):
+    """取り込んだ投稿のスケッチから、直近で伸びた仕事の語に正のzスコアが付くこと"""
+    db_path = str(tmp_path / "buzz.db")
+    init_db(db_path)
+    rows = []
+    for day in range(1, 18):
+        date = f"2025-01-{day:02d} 03:00:00"
+        rows += [("今日のランチ", 100, date)] * 5
+        rows.append(("業務自動化で時短", 2000 if day > 14 else 10, date))
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO posts (account, text, likes, date) VALUES ('a', ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    update_daily_sketches(db_path=db_path)
+
+    z = term_momentum(["自動化", "ランチ"], db_path=db_path)
+    assert z["自動化"] > 2
+    assert abs(z["ランチ"]) < 1e-9
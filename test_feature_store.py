@@ -0,0 +1,87 @@
+"""feature_store.pyのテスト"""
+
+import sqlite3
+
+import numpy as np
+
+import feature_store
+from buzz_score_v2 import extract_features
+from import_csv import DB_PATH, init_db
+
+POSTS = [
+    ("正直に言う。最初は失敗した。保存して見返してね", 120),
+    ("私がやってみた方法。フォローしてね https://example.com", 300),
+    ("ChatGPTで月5万円。いいねで応援して", 80),
+    ("ランチ美味しかった", 10),
+    ("まず結論から。コメントで教えて", 45),
+]
+
+
+def _insert(posts):
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany("INSERT INTO posts (account, text, likes) VALUES ('a', ?, ?)", posts)
+    conn.commit()
+    conn.close()
+
+
+def test_query_matches_text_features(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    feature_store.clear_cache()
+    init_db()
+    _insert(POSTS)
+
+    expected = [likes for text, likes in POSTS
+                if extract_features(text)["has_cta"] and extract_features(text)["has_story"]
+                and "https://" not in text]
+    stats = feature_store.query_flags("has_cta & has_story & ~link:external")
+    assert stats["count"] == len(expected) == 2
+    assert stats["median_likes"] == float(np.median(expected))
+
+    # 追記した投稿も問い合わせに入る
+    _insert([("僕も最初は失敗した。保存してね", 500)])
+    assert feature_store.query_flags("has_cta & has_story & ~link:external")["count"] == 3
+    assert feature_store.query_flags("link:external")["count"] == 1
+
+
+def test_definition_change_rebuilds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    feature_store.clear_cache()
+    init_db()
+    _insert(POSTS)
+    assert feature_store.update_feature_flags() == len(POSTS)
+    assert feature_store.update_feature_flags() == 0
+
+    monkeypatch.setattr(feature_store, "_version", "changed")
+    assert feature_store.update_feature_flags() == len(POSTS)
+
+
+def test_flag_mask_combines_words():
+    bits = np.array([[0b011], [0b001], [0b111]], dtype=np.uint64)
+    names = feature_store.flag_names()
+    mask = feature_store.flag_mask(bits, require=[names[0]], exclude=[names[2]])
+    assert mask.tolist() == [True, True, False]
+
+
+def test_psychology_stats_reads_stored_bits(tmp_path):
+    # カレントディレクトリは変えず、db_path のDBだけを使う
+    from reader_psychology import get_psychology_engine, psychology_stats
+
+    db_path = str(tmp_path / "db" / "buzz.db")
+    feature_store.clear_cache()
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO posts (account, text, likes) VALUES ('a', ?, ?)", POSTS + [("いいね0件", 0)])
+    conn.commit()
+    conn.close()
+
+    _, likes, bits = feature_store.load_feature_flags(db_path)
+    engine = get_psychology_engine()
+    expected = engine.bits_many([text for text, _ in POSTS] + ["いいね0件"])
+    assert feature_store.psychology_bits(bits).tolist() == expected.tolist()
+
+    stats = psychology_stats(db_path)
+    assert stats["analyzed"] == len(POSTS)
+    assert sum(e["count"] for e in stats["emotions"]) == len(POSTS)
+    top = psychology_stats(db_path, limit=2)
+    assert top["analyzed"] == 2
+    assert sum(e["count"] * e["avg_likes"] for e in top["emotions"]) == 300 + 120
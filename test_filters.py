@@ -0,0 +1,51 @@
+"""filters.pyの除外フィルタ・除外理由のテスト"""
+
+import pandas as pd
+
+from filters import (
+    DUPLICATE,
+    EXCLUDE_KEYWORDS,
+    EXCLUDED,
+    GIVEAWAY,
+    GIVEAWAY_KEYWORDS,
+    KEEP,
+    REASONS,
+    apply_filters,
+    keyword_reasons,
+    reason_counts,
+)
+
+DF = pd.DataFrame({
+    "本文": ["副業のコツ", "抽選で3名に著作権フリー素材", "抽選で3名", "副業のコツ2", None, "RT&フォロー", "普通の投稿"],
+    "ユーザー名": ["a", "b", "c", "a", "d", "e", "a"],
+    "いいね数": [10, 50, 30, 20, 5, 40, 20],
+}, index=[10, 11, 12, 13, 14, 15, 16])
+
+
+def _expected_reason(text):
+    text = text if isinstance(text, str) else ""
+    if any(kw in text for kw in EXCLUDE_KEYWORDS):
+        return EXCLUDED
+    if any(kw in text for kw in GIVEAWAY_KEYWORDS):
+        return GIVEAWAY
+    return KEEP
+
+
+def test_keyword_reasons_prefers_earlier_rule():
+    reasons = keyword_reasons(DF["本文"])
+    assert isinstance(reasons.dtype, pd.CategoricalDtype)
+    assert list(reasons.cat.categories) == REASONS
+    assert reasons.index.tolist() == DF.index.tolist()
+    assert reasons.tolist() == [_expected_reason(t) for t in DF["本文"]]
+    # 除外キーワードのルールだけなら、プレゼント企画は残す
+    assert keyword_reasons(DF["本文"], (EXCLUDED,)).tolist().count(KEEP) == 6
+    assert keyword_reasons(["抽選で", "", None]).tolist() == [GIVEAWAY, KEEP, KEEP]
+
+
+def test_apply_filters_matches_stepwise_filtering():
+    kept, reasons = apply_filters(DF)
+    stepwise = DF[[_expected_reason(t) == KEEP for t in DF["本文"]]]
+    stepwise = stepwise.sort_values("いいね数", ascending=False).drop_duplicates(subset=["ユーザー名"])
+    pd.testing.assert_frame_equal(kept, stepwise)
+    assert set(reasons[reasons == KEEP].index) == set(kept.index)
+    assert reason_counts(reasons) == {KEEP: 2, EXCLUDED: 1, GIVEAWAY: 2, DUPLICATE: 2}
@@ -0,0 +1,35 @@
+"""generate_posts.pyの候補探索モードのテスト"""
+
+import numpy as np
+
+from generate_posts import SlotWalker, enumerate_candidates, search_posts, select_mmr
+
+
+def test_search_returns_diverse_scored_posts():
+    tools, works = ["ChatGPT", "Canva"], ["ブログ", "デザイン"]
+    ctas = ["保存して見返してね", "気になる人はコメントで教えて"]
+    posts = search_posts(tools, works, [], ctas, n=5)
+    assert len(posts) == 5
+    assert len({p["text"] for p in posts}) == 5
+    assert all(0 <= p["score"] <= 100 for p in posts)
+    assert [p["text"] for p in search_posts(tools, works, [], ctas, n=5)] == [p["text"] for p in posts]
+
+
+def test_mmr_skips_near_duplicates():
+    X = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    assert select_mmr([10, 9.9, 5], X, 2) == [0, 2]
+
+
+def test_slot_walker_visits_every_combination_once():
+    walker = SlotWalker()
+    seen = list(walker.walk(lambda rng: (rng.choice("ab"), tuple(rng.sample([1, 2, 3], 2)))))
+    assert len(seen) == len(set(seen)) == 2 * 6
+
+
+def test_candidates_cover_the_slot_product():
+    tools, works = ["ChatGPT", "Canva", "ChatGPT"], ["ブログ", "デザイン"]
+    candidates = enumerate_candidates(tools, works, [])
+    assert [c["text"] for c in enumerate_candidates(tools, works, [])] == [c["text"] for c in candidates]
+    # 実績報告型の2つ目のテンプレートは ツール×ジャンル×金額（5通り）のすべてが出る
+    used = [c["text"] for c in candidates if "を使い始めて1ヶ月" in c["text"]]
+    assert len(used) == 2 * 2 * 5
@@ -0,0 +1,98 @@
+"""jobs.pyのテスト"""
+
+import sqlite3
+
+import jobs
+from import_csv import DB_PATH, init_db
+
+
+def _insert(posts):
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany("INSERT INTO posts (account, text, likes, replies) VALUES (?, ?, ?, ?)", posts)
+    conn.commit()
+    conn.close()
+
+
+def test_results_are_kept_per_db_version(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    _insert([("a", "正直に言う。失敗した話", 120, 10), ("b", "これ知らないと損する！", 300, 5)])
+
+    job_id = jobs.submit_job("psychology_stats")
+    assert jobs.submit_job("psychology_stats") == job_id  # 実行待ちの同じジョブは再登録しない
+    assert jobs.find_job("psychology_stats")["status"] == "queued"
+    assert jobs.run_next_job() == job_id
+    assert jobs.run_next_job() is None
+
+    job = jobs.find_job("psychology_stats")
+    assert job["status"] == "done" and job["progress"] == 1
+    assert job["result"]["analyzed"] == 2
+    assert sum(r["count"] for r in job["result"]["emotions"]) == 2
+    assert jobs.submit_job("psychology_stats") == job_id  # 完了済みならそのまま使う
+
+    _insert([("c", "ランチの話", 50, 0)])
+    assert jobs.find_job("psychology_stats") is None  # DBが変わったら結果は引かない
+    new_id = jobs.submit_job("psychology_stats")
+    assert new_id != job_id
+    jobs.run_next_job()
+    assert jobs.find_job("psychology_stats")["result"]["analyzed"] == 3
+    assert jobs.get_job(job_id) is None  # 古い版の結果は消える
+
+
+def test_failure_is_recorded(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+
+    def broken(db_path, progress):
+        progress(0.5, "途中")
+        raise RuntimeError("壊れた")
+
+    monkeypatch.setitem(jobs.JOB_KINDS, "broken", broken)
+    job_id = jobs.submit_job("broken")
+    jobs.run_next_job()
+    job = jobs.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "RuntimeError: 壊れた"
+    assert jobs.submit_job("broken") != job_id  # 失敗したら登録し直せる
+
+
+def test_concurrent_submits_register_one_job(tmp_path, monkeypatch):
+    # カレントディレクトリは変えず、db_path だけで別のDBを使う
+    import threading
+    import time
+
+    db_path = str(tmp_path / "db" / "jobs.db")
+    init_db(db_path)
+    now = jobs._now
+
+    def slow_now():
+        time.sleep(0.05)  # 確認と登録のあいだに他のスレッドが割り込めるようにする
+        return now()
+
+    monkeypatch.setattr(jobs, "_now", slow_now)
+    barrier = threading.Barrier(8)
+    ids = []
+
+    def submit():
+        barrier.wait()
+        ids.append(jobs.submit_job("psychology_stats", db_path))
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+
+    assert len(ids) == 8 and len(set(ids)) == 1
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 1
+    conn.close()
+    worker = jobs.JobWorker(db_path, poll_seconds=0.05).start()
+    try:
+        for _ in range(200):
+            if jobs.get_job(ids[0], db_path)["status"] == "done":
+                break
+            threading.Event().wait(0.05)
+    finally:
+        worker.stop(timeout=5)
+    assert jobs.get_job(ids[0], db_path)["status"] == "done"
@@ -0,0 +1,70 @@
+"""keyword_sketch.pyのテスト"""
+
+import sqlite3
+from collections import Counter
+
+from import_csv import init_db
+from keyword_sketch import KeywordSketch, merged_sketch, stream_sketch, tokenize, update_daily_sketches
+
+TEXTS = [
+    "ChatGPTで副業を自動化した",
+    "Claude Codeで業務を自動化",
+    "AIで副業、ChatGPTとClaude",
+    "今日のランチはカレー",
+] * 5
+
+
+def test_sharded_merge_matches_single_pass():
+    """チャンク分割・シャード分割しても語彙がk以下なら正確な数と一致すること"""
+    likes = list(range(len(TEXTS)))
+    whole = stream_sketch(TEXTS, likes, chunk_size=3)
+    left = stream_sketch(TEXTS[:7], likes[:7])
+    right = KeywordSketch.from_bytes(stream_sketch(TEXTS[7:], likes[7:]).to_bytes())
+    merged = left.merge(right)
+
+    expected = Counter(w for t in TEXTS for w in dict.fromkeys(tokenize(t)))
+    assert dict(whole.top(100)) == dict(expected)
+    assert dict(merged.top(100)) == dict(expected)
+    assert merged.n_posts == len(TEXTS)
+
+    counts, like_sums = merged.estimate(["自動化", "カレー"])
+    assert counts[0] >= 10 and like_sums[0] >= sum(l for t, l in zip(TEXTS, likes) if "自動化" in t)
+
+
+def test_bounded_summary_keeps_heavy_hitters():
+    """上位k件に収まらない語彙でも頻出語は残り、推定数は過小にならないこと"""
+    kana = [chr(c) for c in range(0x30A2, 0x30F3)]
+    noise = [kana[i // len(kana)] + kana[i % len(kana)] + "ー" for i in range(500)]  # 1回ずつの語
+    texts = ["副業ブログ"] * 50 + noise
+    sketch = stream_sketch(texts, chunk_size=64, k=20)
+    assert len(sketch) <= 20
+    top = dict(sketch.top(3))
+    assert "副業" in top and top["副業"] >= 50
+
+
+def test_update_daily_sketches_with_explicit_db_path(tmp_path):
+    # カレントディレクトリは変えず、db_path だけで別のDBに保存する
+    db_path = str(tmp_path / "db" / "sketch.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO posts (account, text, likes, date) VALUES ('a', ?, 1, ?)",
+                     [(t, "Wed Jan 01 01:00:00 +0000 2025") for t in TEXTS])
+    conn.commit()
+    conn.close()
+
+    assert update_daily_sketches(db_path=db_path) == {"20250101": len(TEXTS)}
+    assert update_daily_sketches(db_path=db_path) == {}
+    assert dict(merged_sketch(db_path=db_path).top(100))["ChatGPT"] == 10
+
+
+def test_phrase_counts_match_exact_counts():
+    """フレーズの出現数（text_analysis）が要約経由でも正確な数と一致すること"""
+    import pandas as pd
+    from text_analysis import extract_frequent_keywords
+
+    df = pd.DataFrame({"本文": TEXTS + ["月5万円を自動化で稼いだ。月10万も"]})
+    words, phrases = extract_frequent_keywords(df)
+    exact_words, exact_phrases = extract_frequent_keywords(df, exact=True)
+    assert dict(words) == dict(exact_words)
+    assert dict(phrases) == dict(exact_phrases)
+    assert dict(phrases)["自動化"] == 11 and dict(phrases)["月N万"] == 2
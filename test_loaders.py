@@ -0,0 +1,110 @@
+"""loaders.pyの共通読み込み・キャッシュのテスト"""
+
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import loaders
+from import_csv import DB_PATH, init_db
+
+BUZZ = pd.DataFrame({
+    "本文": ["副業のコツ", "著作権が心配", "抽選で3名", "副業のコツ2", None, "インプレゾンビ対策"],
+    "ユーザー名": ["a", "b", "c", "a", "d", "e"],
+    "いいね数": [10, 50, 30, 20, 5, 40],
+})
+
+
+def test_read_table_uses_cache_until_source_changes(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "buzz.csv")
+    BUZZ.to_csv(path, index=False, encoding="utf-8-sig")
+    first = loaders.read_table(path)
+    assert os.path.exists(loaders.cache_path(path))
+
+    # キャッシュが効いている間は元ファイルを読まない
+    def fail(_path):
+        raise AssertionError("parsed again")
+    monkeypatch.setattr(loaders, "_parse", fail)
+    pd.testing.assert_frame_equal(loaders.read_table(path), first)
+
+    monkeypatch.undo()
+    BUZZ.head(2).to_csv(path, index=False, encoding="utf-8-sig")
+    assert len(loaders.read_table(path)) == 2
+
+
+def test_read_table_reparses_broken_cache(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "buzz.csv")
+    BUZZ.to_csv(path, index=False)
+    with open(loaders.cache_path(path), "wb") as f:
+        f.write(b"not a feather file")
+    pd.testing.assert_frame_equal(loaders.read_table(path), loaders.read_table(path, use_cache=False))
+    # 壊れたキャッシュは書き直され、一時ファイルは残らない
+    assert sorted(os.listdir(tmp_path)) == [".buzz.csv.cache.feather", "buzz.csv"]
+    pd.testing.assert_frame_equal(loaders.read_table(path), loaders.read_table(path, use_cache=False))
+
+
+def test_load_buzz_posts_excludes_keywords_and_dedups_users(tmp_path):
+    path = str(tmp_path / "buzz.csv")
+    BUZZ.to_csv(path, index=False)
+    df = loaders.load_buzz_posts(path)
+    assert df["本文"].fillna("").tolist() == ["抽選で3名", "副業のコツ2", ""]
+    assert df.index.tolist() == [0, 1, 2]
+    mask = loaders.keyword_mask(BUZZ["本文"], ["コツ", "3名"])
+    assert mask.tolist() == [True, False, True, True, False, False]
+
+
+def test_load_self_posts_renames_and_coerces_counts(tmp_path):
+    path = str(tmp_path / "self.csv")
+    pd.DataFrame({"テキスト": ["a", "b"], "いいね数": ["3", ""], "RT数": [1, 2], "imp": [100, 200]}).to_csv(
+        path, index=False, encoding="cp932")
+    df = loaders.load_self_posts(path)
+    assert list(df.columns) == ["本文", "いいね数", "リポスト数", "インプレッション数"]
+    assert df["いいね数"].tolist() == [3, 0]
+
+
+def test_load_posts_compact_dtypes_and_chunks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany(
+        "INSERT INTO posts (account, text, likes, date, source_file) VALUES (?, ?, ?, ?, ?)",
+        [("a", "一", 10, "Sat Feb 14 12:41:16 +0000 2026", "x.xlsx"),
+         ("b", "二", None, "不明", "x.xlsx"),
+         ("a", "三", 30, "Sun Feb 15 00:00:00 +0000 2026", "y.csv")],
+    )
+    conn.commit()
+    conn.close()
+
+    df = loaders.load_posts(columns=["account", "likes", "source_file", "posted_at"])
+    assert list(df.columns) == ["account", "likes", "source_file", "posted_at"]
+    assert isinstance(df["account"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["source_file"].dtype, pd.CategoricalDtype)
+    assert df["likes"].dtype == "int32" and df["likes"].tolist() == [10, 0, 30]
+    assert df["posted_at"].iloc[0] == pd.Timestamp("2026-02-14 12:41:16", tz="UTC")
+    assert pd.isna(df["posted_at"].iloc[1])
+
+    chunks = list(loaders.load_posts(columns=["id", "account"], order_by="id", chunksize=2))
+    assert [len(c) for c in chunks] == [2, 1]
+    monkeypatch.setattr(loaders, "CHUNK_ROWS", 2)
+    merged = loaders.load_posts(columns=["id", "account"], where="id > ?", params=(0,), order_by="id")
+    assert merged["account"].tolist() == ["a", "b", "a"]
+    assert isinstance(merged["account"].dtype, pd.CategoricalDtype)
+    assert len(loaders.load_posts(columns=["id", "likes"], where="likes > 100")) == 0
+
+
+def test_load_posts_keeps_missing_categories_as_nan(tmp_path):
+    # カレントディレクトリは変えず、db_path のDBから読む
+    db_path = str(tmp_path / "db" / "buzz.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO posts (account, text, likes, source_file) VALUES (?, ?, ?, ?)",
+                     [("a", "一", 1, "x.csv"), ("b", "二", 2, None)])
+    conn.commit()
+    conn.close()
+
+    df = loaders.load_posts(db_path, columns=["account", "source_file"])
+    assert df["source_file"].cat.categories.tolist() == ["x.csv"]  # 選択肢に空文字が出ない
+    assert df["source_file"].isna().tolist() == [False, True]
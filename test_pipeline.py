@@ -0,0 +1,121 @@
+"""pipeline.pyのステージ実行・チェックポイントのテスト"""
+
+import os
+
+import pandas as pd
+
+import pipeline
+
+
+def _stages(calls, fail=()):
+    def step(name, src, dst):
+        def run():
+            calls.append(name)
+            if name in fail:
+                raise RuntimeError(f"{name} failed")
+            with open(src, encoding="utf-8") as f:
+                text = f.read()
+            with open(dst, "w", encoding="utf-8") as f:
+                f.write(text + name)
+        return {"run": run, "inputs": [src], "outputs": [dst]}
+
+    return {
+        "report": step("report", "b.txt", "report.txt"),
+        "chart": step("chart", "a.txt", "chart.txt"),
+        "merge": step("merge", "a.txt", "b.txt"),
+    }
+
+
+def test_runs_in_dependency_order_and_skips_up_to_date(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    calls = []
+
+    results = pipeline.run_pipeline(_stages(calls))
+    assert calls.index("merge") < calls.index("report")
+    assert {r["status"] for r in results.values()} == {"done"}
+    assert list(results) == ["report", "chart", "merge"]
+    assert "パイプライン実行結果" in pipeline.format_summary(results)
+
+    # 入力が変わらなければ何もしない。出力を消したステージは作り直し、内容が同じなら下流はそのまま
+    calls.clear()
+    assert {r["status"] for r in pipeline.run_pipeline(_stages(calls)).values()} == {"skipped"}
+    (tmp_path / "b.txt").unlink()
+    pipeline.run_pipeline(_stages(calls))
+    assert calls == ["merge"]
+
+    calls.clear()
+    (tmp_path / "a.txt").write_text("x", encoding="utf-8")
+    pipeline.run_pipeline(_stages(calls))
+    assert sorted(calls) == ["chart", "merge", "report"]
+
+    calls.clear()
+    pipeline.run_pipeline(_stages(calls), force={"chart"})
+    assert calls == ["chart"]
+
+
+def test_failed_stage_blocks_downstream_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    calls = []
+
+    results = pipeline.run_pipeline(_stages(calls, fail={"merge"}))
+    assert results["merge"]["status"] == "failed"
+    assert results["report"]["status"] == "blocked"
+    assert results["chart"]["status"] == "done"
+
+    calls.clear()
+    results = pipeline.run_pipeline(_stages(calls))
+    assert sorted(calls) == ["merge", "report"]
+    assert results["chart"]["status"] == "skipped"
+    assert (tmp_path / "report.txt").read_text(encoding="utf-8") == "amergereport"
+
+
+def test_explicit_db_path_and_declared_reports(tmp_path):
+    # カレントディレクトリは変えず、db_path のDBにチェックポイントを保存する
+    src = tmp_path / "a.txt"
+    src.write_text("a", encoding="utf-8")
+    dst = tmp_path / "report.md"
+    calls = []
+
+    def run():
+        calls.append("report")
+        dst.write_text("report", encoding="utf-8")
+
+    stages = {"report": {"run": run, "inputs": [str(src)], "outputs": [str(dst)]}}
+    db_path = str(tmp_path / "db" / "pipeline.db")
+    assert pipeline.run_pipeline(stages, db_path=db_path)["report"]["status"] == "done"
+    assert pipeline.run_pipeline(stages, db_path=db_path)["report"]["status"] == "skipped"
+    dst.unlink()
+    pipeline.run_pipeline(stages, db_path=db_path)
+    assert calls == ["report", "report"]
+
+    # 日次のレポートステージも出力ファイルを宣言している（消したら作り直す）
+    daily = pipeline.daily_stages(str(tmp_path / "buzz.xlsx"))
+    for name in ("analyze_new", "analyze_posts"):
+        assert daily[name]["outputs"][0].endswith(".md")
+
+
+def test_daily_stages_skip_everything_on_second_run(tmp_path, monkeypatch):
+    # レポートのグラフとファイル全体のグラフは別のディレクトリに書くので、2回目は全ステージがスキップされる
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("output")
+    buzz_file = os.path.join("output", "buzz_posts_20260215.xlsx")
+    pd.DataFrame({
+        "ユーザー名": ["a", "b", "c", "d"],
+        "本文": ["ChatGPTで月5万円。保存してね", "正直に言う。最初は失敗した", "AIで時短する3つの方法", "ランチ美味しかった"],
+        "いいね数": [120, 300, 80, 10],
+        "リポスト数": [12, 30, 8, 1],
+        "リプライ数": [3, 5, 1, 0],
+        "フォロワー数": [1000, 5000, 800, 100],
+        "ポストURL": [f"https://x.com/{u}/status/1" for u in "abcd"],
+        "投稿日時": ["Sat Feb 14 12:41:16 +0000 2026", "Sun Feb 15 00:00:00 +0000 2026",
+                     "Sun Feb 15 09:30:00 +0000 2026", "Mon Feb 16 22:10:00 +0000 2026"],
+    }).to_excel(buzz_file, index=False)
+
+    first = pipeline.run_pipeline(pipeline.daily_stages(buzz_file))
+    assert {name: r["status"] for name, r in first.items()} == {name: "done" for name in first}
+    assert pipeline.REPORT_CHART_DIR not in pipeline.daily_stages(buzz_file)["visualize"]["outputs"]
+
+    second = pipeline.run_pipeline(pipeline.daily_stages(buzz_file))
+    assert {name: r["status"] for name, r in second.items()} == {name: "skipped" for name in second}
@@ -0,0 +1,52 @@
+"""reader_psychology.pyの一括判定エンジンのテスト"""
+
+import re
+
+import numpy as np
+
+from reader_psychology import (
+    DEFAULT_EMOTION,
+    EMOTION_CHECKS,
+    TRIGGER_TABLES,
+    get_psychology_engine,
+)
+
+TEXTS = [
+    "正直に言う。副業で失敗した。でも続けたら月5万円になった。あなたはどう？",
+    "第3年目のプロが教える10選。保存してね",
+    "2026万円 AI ai ＡＩ",
+    "僕は実は…ここだけの話、意外と簡単",
+    "AかBか？ vs VS それとも",
+    "実は\n意外",
+    "",
+    "ランチ美味しかった",
+]
+
+
+def _expected_names(text, triggers):
+    return [
+        name for name, cfg in triggers.items()
+        if any(re.search(p, text, re.IGNORECASE) for p in cfg["patterns"])
+    ]
+
+
+def _expected_emotion(text):
+    for emotion, pattern in EMOTION_CHECKS:
+        if re.search(pattern, text, re.IGNORECASE):
+            return emotion
+    return DEFAULT_EMOTION
+
+
+def test_bits_match_per_pattern_search():
+    engine = get_psychology_engine()
+    bits = engine.bits_many(TEXTS)
+    for text, flags in zip(TEXTS, bits.tolist()):
+        assert flags == engine.bits(text)
+        for table, triggers in TRIGGER_TABLES.items():
+            assert engine.names(flags, table) == _expected_names(text, triggers), (text, table)
+        assert engine.primary_emotion(flags) == _expected_emotion(text)
+
+    expected = [[e for e, _ in EMOTION_CHECKS].index(_expected_emotion(t))
+                if _expected_emotion(t) != DEFAULT_EMOTION else len(EMOTION_CHECKS) for t in TEXTS]
+    assert engine.emotion_codes(bits).tolist() == expected
+    assert bits.dtype == np.uint64
@@ -0,0 +1,140 @@
+"""score_server.pyのテスト"""
+
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from score_server import BatchWorker, ScoringService, handle_request, make_http_server, serve_stdio
+
+
+@pytest.fixture
+def service(tmp_path):
+    # DBのない状態（類似投稿・線形スコアなし）で起動する
+    return ScoringService(db_path=str(tmp_path / "none.db"), index_path=str(tmp_path / "index.npz"))
+
+
+def test_handle_request(service):
+    one = handle_request(service, {"id": 1, "text": "ChatGPTで副業を始める3つの方法"})
+    assert one["id"] == 1 and one["result"]["v2"] is not None
+    assert one["result"]["similar_posts"] == [] and one["result"]["linear"] is None
+
+    many = handle_request(service, {"id": 2, "texts": ["a", "ChatGPTで副業を始める3つの方法", "a"]})
+    assert len(many["results"]) == 3
+    assert many["results"][1] == one["result"]
+
+    assert handle_request(service, {"id": 3, "refresh": True})["candidates"] == 0
+    assert "error" in handle_request(service, {"id": 4})
+    for bad in ([1], "x", {"text": "a", "top_k": "x"}, {"text": "a", "top_k": [3]}, {"texts": "a"}):
+        with pytest.raises(ValueError):
+            handle_request(service, bad)
+
+
+def test_score_batch_scores_missing_texts_once_and_returns_copies(service, monkeypatch):
+    calls = []
+    score_uncached = service._score_uncached
+
+    def record(texts, top_k=3):
+        calls.append(list(texts))
+        return score_uncached(texts, top_k)
+    monkeypatch.setattr(service, "_score_uncached", record)
+
+    first = service.score_batch(["a", "b", "a"])
+    assert calls == [["a", "b"]]  # キャッシュにない本文を重複なしで1回にまとめる
+    service.score_batch(["b", "c"])
+    assert calls == [["a", "b"], ["c"]]
+
+    first[0]["v2"]["total_score"] = -1  # 返した結果を書き換えてもキャッシュは変わらない
+    first[0]["similar_posts"].append("x")
+    again = service.score("a")
+    assert again["v2"]["total_score"] != -1 and again["similar_posts"] == []
+    assert first[2]["v2"]["total_score"] != -1
+
+
+def test_stdio_survives_invalid_lines(service):
+    lines = ['[1]', '"x"', '{"text": "a", "top_k": "x"}', '{not json', '{"id": 5, "text": "副業"}']
+    out = io.StringIO()
+    serve_stdio(service, io.StringIO("\n".join(lines) + "\n"), out)
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(responses) == 5
+    assert all("不正なリクエスト" in r["error"] for r in responses[:4])
+    assert responses[4]["id"] == 5 and responses[4]["result"]["length"] == 2
+
+
+class FakeService:
+    """score_batch の呼び出しを記録し、最初の呼び出しは release まで止める"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def score_batch(self, texts, top_k=3):
+        self.calls.append((list(texts), top_k))
+        if len(self.calls) == 1:
+            self.release.wait(5)
+        if "boom" in texts:
+            raise RuntimeError("boom")
+        return [f"{t}:{top_k}" for t in texts]
+
+
+def test_batch_worker_scores_pending_requests_together():
+    fake = FakeService()
+    worker = BatchWorker(fake)
+    results = {}
+
+    def submit(name, texts, top_k=3):
+        try:
+            results[name] = worker.submit(texts, top_k)
+        except RuntimeError as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=submit, args=("first", ["x"]))]
+    threads[0].start()
+    while not fake.calls:  # 1件目の診断中に残りの依頼をためる
+        time.sleep(0.01)
+    for name, texts, top_k in [("a", ["a1", "a2"], 3), ("b", ["b1"], 3), ("bad", ["boom"], 3), ("c", ["c1"], 5)]:
+        threads.append(threading.Thread(target=submit, args=(name, texts, top_k)))
+        threads[-1].start()
+    while worker._queue.qsize() < 4:
+        time.sleep(0.01)
+    fake.release.set()
+    for t in threads:
+        t.join(5)
+
+    assert results["a"] == ["a1:3", "a2:3"] and results["b"] == ["b1:3"] and results["c"] == ["c1:5"]
+    assert isinstance(results["bad"], RuntimeError)
+    # 同じ top_k の依頼は本文をつなげて1回で診断し、失敗したときだけ1件ずつに分ける
+    assert fake.calls[1] == (["a1", "a2", "b1", "boom"], 3)
+    assert (["c1"], 5) in fake.calls
+    assert len(fake.calls) == 6
+
+
+def test_http_handler(service):
+    server = make_http_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def post(path, body):
+        request = urllib.request.Request(base + path, data=body, method="POST")
+        with urllib.request.urlopen(request, timeout=10) as r:
+            return json.loads(r.read())
+
+    try:
+        with urllib.request.urlopen(base + "/health", timeout=10) as r:
+            assert json.loads(r.read()) == {"status": "ok", "candidates": 0}
+        one = post("/score", json.dumps({"id": 7, "text": "AIで時短"}).encode("utf-8"))
+        assert one["id"] == 7 and one["result"] == service.score("AIで時短")
+        many = post("/score", json.dumps({"texts": ["AIで時短", "副業"]}).encode("utf-8"))
+        assert [r["length"] for r in many["results"]] == [5, 2]
+        for body in (b"{not json", b"[1]", b'"x"', b'{"text": "a", "top_k": "x"}', b'{"top_k": 3}'):
+            with pytest.raises(urllib.error.HTTPError) as e:
+                post("/score", body)
+            assert e.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
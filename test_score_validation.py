@@ -0,0 +1,96 @@
+"""score_validation.pyの相関の一括計算のテスト"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from score_validation import _PairSums, _tie_groups, average_ranks, bootstrap_ci, split_validation, subset_ranks
+
+
+def _data(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = rng.integers(0, 30, n).astype(float)  # 同順位を含む
+    likes = np.round(np.exp(scores / 10 + rng.normal(0, 1, n)))
+    return likes, {"v1": scores, "v2": scores + rng.normal(0, 5, n)}
+
+
+def _spearman(x, y):
+    # 平均順位（pandas の rank）のPearson相関
+    return np.corrcoef(pd.Series(x).rank(), pd.Series(y).rank())[0, 1]
+
+
+def test_average_ranks_ties():
+    assert average_ranks([10, 30, 20, 30]).tolist() == [1.0, 3.5, 2.0, 3.5]
+
+
+def test_subset_ranks_rerank_within_subset():
+    values = np.array([10, 30, 20, 30, 5])
+    weights = np.array([[1, 1, 0, 1, 0], [2, 0, 1, 0, 1]])
+    ranks = subset_ranks(weights, _tie_groups(values))
+    assert ranks[0, [0, 1, 3]].tolist() == [1.0, 2.5, 2.5]
+    # 2回選んだ投稿は同値2件として平均順位（5 → 1, 10 → 2.5, 20 → 4）
+    assert ranks[1, [4, 0, 2]].tolist() == [1.0, 2.5, 4.0]
+
+
+def test_matrix_product_matches_corrcoef():
+    likes, scores = _data()
+    y = np.column_stack([scores["v1"], scores["v2"]])
+    mask = np.random.default_rng(1).random((3, len(likes))) < 0.5
+
+    pearson = _PairSums(likes, y)
+    r = pearson.corr(mask.astype(np.float32) @ pearson.columns)
+    for t, m in enumerate(mask):
+        for j in range(2):
+            assert np.isclose(r[t, j], np.corrcoef(likes[m], y[m, j])[0, 1], atol=1e-4)
+
+
+def _split_halves(n, n_trials, seed):
+    keys = np.random.default_rng(seed).random((n_trials, n))
+    picked = np.argpartition(keys, n // 2 - 1, axis=1)[:, :n // 2]
+    return [(a, np.setdiff1d(np.arange(n), a)) for a in picked]
+
+
+def test_split_validation_uses_exact_halves_and_reranks():
+    likes, scores = _data(n=201)
+    result = split_validation(likes, scores, n_trials=40, seed=3)
+    assert result == split_validation(likes, scores, n_trials=40, seed=3)
+
+    halves = _split_halves(len(likes), 40, 3)
+    assert {(len(a), len(b)) for a, b in halves} == {(100, 101)}
+    for v, y in scores.items():
+        pearson = [np.corrcoef(likes[h], y[h])[0, 1] for pair in halves for h in pair]
+        spearman = [_spearman(likes[h], y[h]) for pair in halves for h in pair]
+        for stat, f in (("mean", np.mean), ("min", np.min), ("max", np.max)):
+            assert np.isclose(result[v]["pearson"][stat], f(pearson), atol=1e-4)
+            assert np.isclose(result[v]["spearman"][stat], f(spearman), atol=1e-9)
+
+
+def test_split_spearman_matches_scipy():
+    stats = pytest.importorskip("scipy.stats")
+    likes, scores = _data(n=60)
+    result = split_validation(likes, {"v1": scores["v1"]}, n_trials=5, seed=1)
+    rho = [stats.spearmanr(likes[h], scores["v1"][h])[0] for pair in _split_halves(60, 5, 1) for h in pair]
+    assert np.isclose(result["v1"]["spearman"]["mean"], np.mean(rho))
+    assert np.isclose(result["v1"]["spearman"]["min"], np.min(rho))
+
+
+def test_bootstrap_ci_matches_resampling_loop():
+    likes, scores = _data()
+    n, n_boot = len(likes), 300
+    result = bootstrap_ci(likes, scores, n_boot=n_boot, seed=7)
+    assert result == bootstrap_ci(likes, scores, n_boot=n_boot, seed=7)  # 同じシードなら同じ区間
+
+    # 同じ乱数列で1回ずつ復元抽出して相関を取る素朴な実装と一致する
+    picks = np.random.default_rng(7).integers(0, n, size=(n_boot, n))
+    for v, y in scores.items():
+        boot = [np.corrcoef(likes[p], y[p])[0, 1] for p in picks]
+        ci = result[v]["pearson"]
+        assert np.isclose(ci["estimate"], np.corrcoef(likes, y)[0, 1], atol=1e-5)
+        assert np.isclose(ci["low"], np.percentile(boot, 2.5), atol=1e-4)
+        assert np.isclose(ci["high"], np.percentile(boot, 97.5), atol=1e-4)
+
+        boot = [_spearman(likes[p], y[p]) for p in picks]
+        ci = result[v]["spearman"]
+        assert np.isclose(ci["estimate"], _spearman(likes, y))
+        assert np.isclose(ci["low"], np.percentile(boot, 2.5))
+        assert np.isclose(ci["high"], np.percentile(boot, 97.5))
@@ -0,0 +1,41 @@
+"""similarity_index.pyのテスト"""
+
+import numpy as np
+
+from similarity_index import SimilarityIndex, hashed_ngram_counts
+
+TEXTS = [
+    "ChatGPTで副業を始めて月5万円稼げた方法を解説します",
+    "Claude Codeで業務を自動化してみた結果がやばい",
+    "今日のランチはカレーでした",
+]
+
+
+def test_ngrams_do_not_cross_text_boundaries():
+    """連結したテキストの境界をまたぐn-gramが作られないこと"""
+    rows, _, counts = hashed_ngram_counts(["ab", "cd"])
+    # "ab" と "cd" の2-gramが1つずつ、3-gramはなし
+    assert sorted(rows.tolist()) == [0, 1]
+    assert counts.tolist() == [1, 1]
+
+
+def test_query_ranks_related_post_first(tmp_path):
+    """文字n-gramが近い投稿が上位に来て、保存・読み込み後も同じ結果になること"""
+    index = SimilarityIndex()
+    index.add([10, 20], TEXTS[:2])
+    index.add([30], TEXTS[2:])  # 追記
+
+    hits = index.query("ChatGPTの副業で稼げた方法", top_k=2)
+    assert hits[0][0] == 10
+    assert all(pid != 30 for pid, _ in hits)
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = SimilarityIndex.load(path)
+    assert len(loaded) == 3
+    assert loaded.query("ChatGPTの副業で稼げた方法", top_k=2) == hits
+    assert np.array_equal(loaded.df, index.df)
+
+
+def test_query_on_empty_index():
+    assert SimilarityIndex().query("テスト") == []
@@ -0,0 +1,49 @@
+"""template_index.pyのテスト"""
+
+import sqlite3
+
+import template_index
+from import_csv import DB_PATH, init_db
+
+
+def _insert(posts):
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany("INSERT INTO posts (account, text, likes) VALUES (?, ?, ?)", posts)
+    conn.commit()
+    conn.close()
+
+
+def test_examples_follow_likes_and_new_posts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    template_index.clear_cache()
+    init_db()
+    _insert([
+        ("a", "正直に言うと失敗した", 50),
+        ("b", "実はこれ危ない", 300),
+        ("c", "ランチの話", 900),
+        ("d", "正直、恥ずかしい", 0),  # いいね0は対象外
+    ])
+    examples = template_index.template_examples(n=2)
+    assert [e["likes"] for e in examples["拓巳型（自己開示型）"]] == [300, 50]
+    assert [e["account"] for e in examples["リスク警告型"]] == ["b"]
+    assert examples["プロンプト/ツール紹介型"] == []
+
+    _insert([("e", "ChatGPTのプロンプトを変えた", 120)])
+    examples = template_index.template_examples(n=2)
+    assert [e["account"] for e in examples["プロンプト/ツール紹介型"]] == ["e"]
+
+
+def test_update_with_explicit_db_path(tmp_path):
+    # カレントディレクトリは変えず、db_path だけで別のDBを作って索引する
+    template_index.clear_cache()
+    db_path = str(tmp_path / "db" / "templates.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO posts (account, text, likes) VALUES ('a', '実はこれ危ない', 10)")
+    conn.commit()
+    conn.close()
+
+    assert template_index.update_template_index(db_path) == 1
+    assert template_index.update_template_index(db_path) == 0
+    examples = template_index.template_examples(n=1, db_path=db_path)
+    assert [e["account"] for e in examples["リスク警告型"]] == ["a"]
@@ -0,0 +1,83 @@
+"""timeseries.pyのテスト"""
+
+import sqlite3
+
+import pandas as pd
+
+import timeseries
+from import_csv import DB_PATH, init_db
+
+POSTS = [
+    # (本文, いいね数, 投稿日時UTC)
+    ("ChatGPTで月5万円稼げた", 100, "Wed Jan 01 01:00:00 +0000 2025"),
+    ("今日のランチ", 10, "Wed Jan 01 16:00:00 +0000 2025"),  # JSTでは1/2
+    ("AIツール紹介", 30, "2025-01-03 03:00:00"),
+    ("日時なし", 999, ""),
+    ("やり方を解説", 50, "Fri Jan 10 00:00:00 +0000 2025"),
+]
+
+
+def _make_db(tmp_path, monkeypatch, posts):
+    monkeypatch.chdir(tmp_path)
+    timeseries.clear_cache()
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    conn.executemany("INSERT INTO posts (account, text, likes, date) VALUES ('a', ?, ?, ?)", posts)
+    conn.commit()
+    conn.close()
+
+
+def test_parse_epoch_mixed_formats():
+    epochs = timeseries.parse_epoch(["Wed Jan 01 01:00:00 +0000 2025", "2025-01-01 01:00:00", "", None])
+    assert epochs[0] == epochs[1] == int(pd.Timestamp("2025-01-01 01:00", tz="UTC").timestamp())
+    assert epochs[2] == epochs[3] == timeseries.UNPARSED
+
+
+def test_rolling_window_matches_direct_computation(tmp_path, monkeypatch):
+    """各日の値が「JSTでその日までの直近window日の投稿」だけから計算されること"""
+    _make_db(tmp_path, monkeypatch, POSTS)
+
+    stats = timeseries.rolling_stats(window=7)
+    assert stats.index[0] == pd.Timestamp("2025-01-01")
+    assert stats.index[-1] == pd.Timestamp("2025-01-10")
+    assert stats.loc["2025-01-02", "daily_posts"] == 1
+    assert stats.loc["2025-01-03", "median"] == 30
+    assert stats.loc["2025-01-05", "posts"] == 3  # 投稿のない日も窓内の投稿で計算
+    assert stats.loc["2025-01-08", "posts"] == 2  # 1/1の投稿は窓から外れる
+    assert stats.loc["2025-01-09", "posts"] == 1
+    assert stats.loc["2025-01-10", "median"] == 50
+
+    shares = timeseries.category_shares(window=7)
+    assert (shares.sum(axis=1).round(6) == 1).all()
+
+    # 追記した投稿も反映される
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO posts (account, text, likes, date) VALUES ('b', '追加', 70, '2025-01-10 01:00:00')")
+    conn.commit()
+    conn.close()
+    assert timeseries.rolling_stats(window=7).loc["2025-01-10", "posts"] == 2
+
+
+def test_visualize_hours_share_the_parser():
+    import visualize
+
+    dates = pd.Series(["Wed Jan 01 16:00:00 +0000 2025", "2025-01-01 01:00:00", "不明"], index=[5, 6, 7])
+    hours = visualize._jst_hours(dates)
+    assert hours.index.tolist() == [5, 6, 7]
+    assert hours.iloc[:2].tolist() == [1, 10]
+    assert pd.isna(hours.iloc[2])
+
+
+def test_load_frame_with_explicit_db_path(tmp_path):
+    # カレントディレクトリは変えず、db_path だけで別のDBを作って読む
+    timeseries.clear_cache()
+    db_path = str(tmp_path / "db" / "ts.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO posts (account, text, likes, date) VALUES ('a', ?, ?, ?)", POSTS)
+    conn.commit()
+    conn.close()
+
+    frame = timeseries.load_frame(db_path)
+    assert len(frame) == 4
+    assert frame["day"].iloc[0] == pd.Timestamp("2025-01-01")
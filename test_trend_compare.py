@@ -0,0 +1,38 @@
+"""trend_compare.pyの日別集計（daily_stats）のテスト"""
+
+import os
+
+import pandas as pd
+
+from trend_compare import generate_trend_report, load_daily_stats, sync_daily_stats
+
+
+def test_sync_daily_stats_with_explicit_db_path(tmp_path):
+    # カレントディレクトリは変えず、db_path だけで別のDBに保存する
+    path = str(tmp_path / "buzz_posts_20260215.csv")
+    pd.DataFrame({"本文": ["ChatGPTで副業", "AIで効率化"], "いいね数": [100, 300]}).to_csv(path, index=False)
+    files = [{"date": "2026-02-15", "path": path, "format": "csv"}]
+    db_path = str(tmp_path / "db" / "trend.db")
+
+    assert sync_daily_stats(files, db_path) == ["2026-02-15"]
+    assert sync_daily_stats(files, db_path) == []  # チェックサムが同じ日は集計し直さない
+    assert os.path.exists(db_path)
+
+    stats = load_daily_stats(db_path=db_path)
+    assert [s["date"] for s in stats] == ["2026-02-15"]
+    assert stats[0]["post_count"] == 2 and stats[0]["total_likes"] == 400
+
+
+def test_new_keywords_compare_top_ten(tmp_path):
+    # 前日11位のキーワードは上位10件に入っていないので、当日上位なら新登場として載る
+    words = [f"語{i}" for i in range(12)]
+    prev = {"date": "20260214", "post_count": 1, "avg_likes": 1, "max_likes": 1, "median_likes": 1,
+            "categories": {}, "keywords": [(w, 20 - i) for i, w in enumerate(words[:11])]}
+    curr = dict(prev, date="20260215", keywords=[("語10", 30)] + [(w, 20 - i) for i, w in enumerate(words[:9])])
+    path = str(tmp_path / "trend.md")
+    generate_trend_report([prev, curr], path)
+    with open(path, encoding="utf-8") as f:
+        report = f.read()
+    new_section = report.split("### 新たにトレンド入りしたキーワード")[1].split("---")[0]
+    assert "**語10** (NEW)" in new_section
+    assert "語0" not in new_section
@@ -0,0 +1,41 @@
+"""visualize.pyのチャート一括生成（指紋キャッシュ）のテスト"""
+
+import json
+import os
+
+import pandas as pd
+
+import visualize
+
+POSTS = pd.DataFrame({
+    "本文": ["ChatGPTで月5万円。保存してね", "正直に言う。最初は失敗した", "AIで時短する3つの方法", "ランチ美味しかった"],
+    "いいね数": [120, 300, 80, 10],
+    "投稿日時": ["Sat Feb 14 12:41:16 +0000 2026", "Sun Feb 15 00:00:00 +0000 2026",
+                 "Sun Feb 15 09:30:00 +0000 2026", "Mon Feb 16 22:10:00 +0000 2026"],
+})
+USERS = pd.DataFrame({"ユーザー名": ["a", "b", "a", "c"], "いいね数": [120, 300, 80, 10]})
+
+
+def test_unchanged_input_skips_rendering(tmp_path, monkeypatch):
+    out = str(tmp_path / "charts")
+    # 初回はプロセスプールで全チャートを描き、指紋を .chart_manifest.json に残す
+    results = visualize.generate_all_charts(POSTS, out, df_raw=USERS, workers=2)
+    assert len(results) == len(visualize.CHARTS)
+    with open(os.path.join(out, visualize.MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["user_analysis.png"] == visualize.frame_fingerprint(USERS, ["ユーザー名", "いいね数"])
+
+    rendered = []
+
+    def render(key, data, path):
+        rendered.append(key)
+        return path
+    monkeypatch.setattr(visualize, "render_chart", render)
+
+    # 入力が同じなら描き直さない
+    assert len(visualize.generate_all_charts(POSTS, out, df_raw=USERS, workers=1)) == len(visualize.CHARTS)
+    assert rendered == []
+
+    # ユーザーの表だけ変えると、ユーザー分析だけを描き直す
+    visualize.generate_all_charts(POSTS, out, df_raw=USERS.assign(いいね数=[1, 2, 3, 4]), workers=1)
+    assert rendered == ["user_analysis"]
@@ -0,0 +1,63 @@
+"""weight_optimizer.pyのリッジ回帰・交差検証・LinearScorerのテスト"""
+
+import sqlite3
+
+import numpy as np
+
+from import_csv import init_db
+from weight_optimizer import FEATURE_NAMES, LinearScorer, fit_weights, lambda_grid, optimize, save_weights
+
+
+def test_fit_weights_recovers_known_weights(tmp_path):
+    rng = np.random.default_rng(0)
+    n, p = 4000, len(FEATURE_NAMES)
+    X = (rng.random((n, p)) < 0.3).astype(np.float32)
+    true_w = rng.normal(0, 0.5, p)
+    y = X @ true_w + 2.0 + rng.normal(0, 0.05, n)
+    likes = np.expm1(y)
+
+    result = fit_weights(X, likes, n_folds=4)
+    assert np.abs(result["weights"] - true_w).max() < 0.05
+    assert abs(result["intercept"] - 2.0) < 0.05
+    assert result["cv_corr"] > 0.99
+    assert result["cv_r2"] == max(result["cv_by_lambda"].values())
+
+    db_path = str(tmp_path / "weights.db")
+    init_db(db_path)
+    version = save_weights(result, version="test", sample_size=n, db_path=db_path)
+    scorer = LinearScorer.load(db_path=db_path)
+    assert scorer.version == version
+    np.testing.assert_allclose(scorer.score_matrix(X[:5]), X[:5] @ result["weights"] + result["intercept"], rtol=1e-4)
+    texts = ["ChatGPTで月5万円稼いだ方法", "今日のランチ"]
+    assert scorer.score_many(texts) == [scorer.score(t) for t in texts]
+
+
+def test_noisy_signal_selects_lambda_inside_grid():
+    # 相関で選ぶと最大の係数に寄って重みが0に縮む。検証MSEなら途中の係数で重みを取り戻す
+    rng = np.random.default_rng(0)
+    n, p = 400, len(FEATURE_NAMES)
+    X = (rng.random((n, p)) < 0.3).astype(np.float32)
+    true_w = rng.normal(0, 0.3, p)
+    y = X @ true_w + 5.0 + rng.normal(0, 1.0, n)
+
+    result = fit_weights(X, np.expm1(y))
+    grid = lambda_grid(n)
+    assert grid[0] < result["lambda"] < grid[-1]
+    assert np.corrcoef(result["weights"], true_w)[0, 1] > 0.8
+    assert np.std(result["weights"]) > 0.5 * np.std(true_w)
+    assert result["cv_r2"] > 0.2
+
+
+def test_optimize_uses_given_db_path(tmp_path):
+    db_path = str(tmp_path / "sub" / "buzz.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    texts = ["正直に言う。副業で月5万円稼いだ方法", "ChatGPTの使い方まとめ\n\n・要約\n・翻訳", "今日のランチ", "知らないと損する3つのこと"]
+    conn.executemany("INSERT INTO posts (text, likes) VALUES (?, ?)",
+                     [(texts[i % 4] + str(i), 10 + 37 * i % 500) for i in range(40)])
+    conn.commit()
+    conn.close()
+
+    version = optimize(db_path=db_path, n_folds=2)
+    assert version is not None
+    assert LinearScorer.load(db_path=db_path).version == version
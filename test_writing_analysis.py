@@ -0,0 +1,48 @@
+"""writing_analysis.pyの一括分析・run_writing_analysis.pyの分布集計のテスト"""
+
+import numpy as np
+
+from run_writing_analysis import QUANTILES, StyleSummary
+from writing_analysis import WritingAnalyzer
+
+TEXTS = [
+    "正直に言う。副業で失敗した。でも続けたら月5万円になった。あなたはどう？",
+    "知らないと損する3つのこと\n\n・確定申告\n・経費\n・住民税\n\n保存してね！",
+    "「AIに仕事奪われる」って言うけど…\n\n使う側に回るだけ…\n\nやってみよう！！！",
+    "www わかるって〜かな",
+    "",
+    "\n\n",
+    "https://example.com 詳しくはこちら。とても。良い。記事。です。",
+]
+
+
+def test_analyze_many_matches_per_post_analysis():
+    analyzer = WritingAnalyzer()
+    frame = analyzer.analyze_many(TEXTS)
+    assert len(frame) == len(TEXTS)
+    for text, row in zip(TEXTS, frame.itertuples()):
+        structure = analyzer.analyze_structure(text)
+        rhythm = analyzer.analyze_rhythm(text)
+        assert row.opening_pattern == analyzer.analyze_opening(text)["pattern"]
+        assert row.structure_type == structure["structure_type"]
+        assert row.sentence_count == structure["stats"]["sentence_count"]
+        assert row.number_count == structure["number_count"]
+        assert row.closing_pattern == analyzer.analyze_closing(text)["pattern"]
+        assert row.rhythm == rhythm["rhythm"]
+        assert row.variation == rhythm["variation"]
+        assert row.punctuation_style == rhythm["punctuation_style"]
+        assert row.casual_degree == rhythm.get("casual_degree", row.casual_degree)
+
+
+def test_style_summary_merge_matches_whole_batch():
+    analyzer = WritingAnalyzer()
+    texts = TEXTS * 3
+    whole = StyleSummary().add(analyzer.analyze_many(texts))
+    parts = StyleSummary().add(analyzer.analyze_many(texts[:5]))
+    parts.merge(StyleSummary().add(analyzer.analyze_many(texts[5:])))
+
+    frame = analyzer.analyze_many(texts)
+    for col in ("total_chars", "avg_sentence_length"):
+        expected = {q: float(np.quantile(frame[col], q, method="inverted_cdf")) for q in QUANTILES}
+        assert whole.quantiles(col) == parts.quantiles(col) == expected
+    assert parts.shares("opening_pattern").to_dict() == whole.shares("opening_pattern").to_dict()
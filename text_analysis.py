@@ -5,29 +5,18 @@ import re
 from collections import Counter, defaultdict
 from datetime import datetime
 
-import pandas as pd
+from classifier import first_lines, get_classifier
+from filters import EXCLUDED, apply_filters
+from loaders import read_table
 
 
 def load_and_filter(filepath):
     """Excelを読み込み、フィルタリング済み76件を返す"""
-    df = pd.read_excel(filepath)
+    df = read_table(filepath)
     print(f"読み込み: {len(df)}件")
 
-    # 炎上系除外
-    exclude_keywords = [
-        "著作権", "版権", "海賊版", "収益化停止", "収益化が停止",
-        "剥奪", "侵害", "インプレゾンビ"
-    ]
-    def should_exclude(text):
-        for kw in exclude_keywords:
-            if kw in str(text):
-                return True
-        return False
-    df = df[~df["本文"].apply(should_exclude)].copy()
-
-    # 同一ユーザー重複除去
-    df = df.sort_values("いいね数", ascending=False)
-    df = df.drop_duplicates(subset=["ユーザー名"], keep="first")
+    # 炎上系除外・同一ユーザー重複除去
+    df, _ = apply_filters(df, rules=(EXCLUDED,))
     print(f"フィルタ後: {len(df)}件")
     return df.reset_index(drop=True)
 
@@ -35,34 +24,11 @@ def load_and_filter(filepath):
 def extract_opening_phrases(df):
     """1. 冒頭フレーズのパターン分類"""
     categories = defaultdict(list)
+    lines = first_lines(df["本文"].astype(str), strip_text=True)
+    # 分類（classifier のルールセット "opening:hook"。compare_self_with_buzz と同じ型）
+    labels = get_classifier("opening:hook").classify_series(lines)
 
-    for _, row in df.iterrows():
-        text = str(row["本文"]).strip()
-        first_line = text.split("\n")[0].strip()
-        likes = row["いいね数"]
-
-        # 分類
-        if re.search(r"[\?？]", first_line):
-            cat = "疑問・問いかけ型"
-        elif re.search(r"[!！]{1,}", first_line) and len(first_line) < 30:
-            cat = "インパクト短文型"
-        elif re.search(r"\d+[選つ個万円%]", first_line):
-            cat = "数字リスト型"
-        elif re.search(r"(知らない|知らなかった|まだ|実は|ぶっちゃけ|正直|ガチで|マジで)", first_line):
-            cat = "秘匿・衝撃事実型"
-        elif re.search(r"(やめ|するな|ダメ|禁止|注意|危険|ヤバい|やばい)", first_line):
-            cat = "警告・否定型"
-        elif re.search(r"(方法|やり方|コツ|ステップ|手順|始め方|稼ぎ方|稼げる)", first_line):
-            cat = "ノウハウ提示型"
-        elif re.search(r"(これ|この|あの|あれ)", first_line) and len(first_line) < 30:
-            cat = "指示語フック型"
-        elif re.search(r"(僕|私|俺|自分|ワイ)", first_line):
-            cat = "体験談・自己開示型"
-        elif re.search(r"(おすすめ|最強|神|便利|無料|0円)", first_line):
-            cat = "推薦・絶賛型"
-        else:
-            cat = "その他"
-
+    for first_line, cat, likes in zip(lines, labels, df["いいね数"]):
         categories[cat].append({
             "first_line": first_line[:80],
             "likes": likes
@@ -158,49 +124,44 @@ def extract_cta_phrases(df):
     return results
 
 
-def extract_frequent_keywords(df, top_n=20):
-    """4. 頻出キーワード・フレーズTOP20"""
-    # 単語レベル（2-6文字のカタカナ・漢字フレーズ）
-    all_text = " ".join(df["本文"].astype(str).tolist())
-
-    # キーフレーズ抽出（よく使われる意味のあるフレーズ）
-    # カタカナ語
-    katakana = re.findall(r"[ァ-ヶー]{3,}", all_text)
-    # 漢字フレーズ
-    kanji = re.findall(r"[一-龥]{2,6}", all_text)
-    # 英数字キーワード
-    english = re.findall(r"[A-Za-z]{3,}", all_text)
-
-    # ストップワード
-    stop_words = {
-        "する", "できる", "ある", "いる", "なる", "やる", "くる", "もの", "こと",
-        "それ", "これ", "あれ", "ため", "よう", "とき", "ところ", "ほう",
-        "てる", "している", "した", "して", "から", "まで", "ので", "けど",
-        "という", "ている", "たち", "など", "って", "ない", "ません",
-        "https", "http", "www", "com", "the", "and", "for", "you",
-    }
-
-    all_words = katakana + kanji + english
-    filtered = [w for w in all_words if w not in stop_words and len(w) >= 2]
-    counter = Counter(filtered)
-
-    # バズ文脈でよく使われるフレーズ（2-3語の複合）
-    phrase_patterns = [
-        r"AI副業", r"副業[で月]", r"月[0-9０-９]+万",
-        r"[0-9０-９]+万円", r"ChatGPT", r"AI[でを使]",
-        r"完全無料", r"知らないと損", r"今すぐ",
-        r"副業初心者", r"稼[いげぐ]", r"収益化",
-        r"自動化", r"不労所得", r"コンテンツ販売",
-        r"SNS運用", r"個人で稼", r"脱サラ",
-        r"AI時代", r"プログラミング不要", r"ノーコード",
+# バズ文脈でよく使われるフレーズ（2-3語の複合）: (表示名, パターン)
+PHRASE_PATTERNS = [
+    (label, re.compile(pattern)) for label, pattern in [
+        ("AI副業", r"AI副業"), ("副業[で月]", r"副業[で月]"), ("月N万", r"月[0-9０-９]+万"),
+        ("N万円", r"[0-9０-９]+万円"), ("ChatGPT", r"ChatGPT"), ("AI活用", r"AI[でを使]"),
+        ("完全無料", r"完全無料"), ("知らないと損", r"知らないと損"), ("今すぐ", r"今すぐ"),
+        ("副業初心者", r"副業初心者"), ("稼ぐ", r"稼[いげぐ]"), ("収益化", r"収益化"),
+        ("自動化", r"自動化"), ("不労所得", r"不労所得"), ("コンテンツ販売", r"コンテンツ販売"),
+        ("SNS運用", r"SNS運用"), ("個人で稼", r"個人で稼"), ("脱サラ", r"脱サラ"),
+        ("AI時代", r"AI時代"), ("プログラミング不要", r"プログラミング不要"), ("ノーコード", r"ノーコード"),
     ]
-    phrase_counter = Counter()
-    for pattern in phrase_patterns:
-        count = len(re.findall(pattern, all_text))
-        if count > 0:
-            phrase_counter[pattern.replace(r"[でを使]", "活用").replace(r"[いげぐ]", "ぐ").replace(r"[0-9０-９]+", "N")] = count
+]
+
+
+def _phrase_tokens(text):
+    """本文 → 出現したフレーズの表示名（出現回数分）"""
+    return [label for label, pattern in PHRASE_PATTERNS for _ in pattern.finditer(text)]
+
+
+def extract_frequent_keywords(df, top_n=20, exact=False):
+    """4. 頻出キーワード・フレーズTOP20
+
+    単語・フレーズともチャンクごとに keyword_sketch の要約へ数える（全文を1つの文字列にしない）。
+    異なる語が keyword_sketch.TOP_K 以下なら正確な数と同じで、超えると上位の推定数になる。
+    exact=True なら要約を使わず全語を正確に数える。
+    """
+    from keyword_sketch import stream_sketch, tokenize
+
+    texts = df["本文"].astype(str).tolist()
+    if exact:
+        words = Counter(w for text in texts for w in tokenize(text, named=False))
+        phrases = Counter(p for text in texts for p in _phrase_tokens(text))
+        return words.most_common(top_n), phrases.most_common(20)
 
-    return counter.most_common(top_n), phrase_counter.most_common(20)
+    # 単語レベル（カタカナ語・2-6文字の漢字フレーズ・英字語）
+    words = stream_sketch(texts, per_post=False, named=False)
+    phrases = stream_sketch(texts, per_post=False, tokenizer=_phrase_tokens)
+    return words.top(top_n), phrases.top(20)
 
 
 def decompose_top_posts(df, top_n=5):
@@ -0,0 +1,201 @@
+"""postsテーブルの時系列分析（日次の移動中央値・分位点・カテゴリ構成比）
+
+投稿日時の文字列は一度だけパースして posts.epoch（UNIX秒、パースできない日時は0）に保存し、
+以降は数値列として読み込む。日付の区切りはJST。
+集計は pandas の時間窓 rolling で一括計算し、投稿数と最大IDが変わらない間は
+窓ごとの結果をメモリにキャッシュする（新規投稿は差分だけ読み足す）。
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from import_csv import DB_PATH, init_db
+
+WINDOWS = (7, 28)
+QUANTILES = (0.25, 0.75, 0.9)
+TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+JST_OFFSET = pd.Timedelta(hours=9)
+UNPARSED = 0
+
+_frames = {}   # db_path → (状態, 全投稿, 日時のある投稿)
+_results = {}  # (db_path, 種類, 窓) → (状態, 結果)
+
+
+# ========================================
+# 日時のパース（1投稿1回）
+# ========================================
+
+def parse_dates(dates):
+    """投稿日時の文字列 → UTCの日時（Series。パースできないものはNaT）
+
+    TwitterAPIの形式で一括パースし、外れた行だけ形式を推測してパースし直す。
+    """
+    dates = pd.Series(dates, dtype="string")
+    parsed = pd.to_datetime(dates, format=TWITTER_DATE_FORMAT, errors="coerce", utc=True)
+    rest = parsed.isna() & dates.notna() & (dates.str.strip() != "")
+    if rest.any():
+        parsed[rest] = pd.to_datetime(dates[rest], format="mixed", errors="coerce", utc=True)
+    return parsed
+
+
+def parse_epoch(dates):
+    """投稿日時の文字列 → UNIX秒（int64）。パースできないものは0"""
+    parsed = parse_dates(dates)
+    epoch = (parsed - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    return epoch.fillna(UNPARSED).astype("int64").to_numpy()
+
+
+def backfill_epochs(conn):
+    """epoch未設定の投稿だけ日時をパースして保存する。処理件数を返す"""
+    rows = conn.execute("SELECT id, date FROM posts WHERE epoch IS NULL").fetchall()
+    if not rows:
+        return 0
+    ids = [r[0] for r in rows]
+    epochs = parse_epoch([r[1] for r in rows])
+    conn.executemany("UPDATE posts SET epoch = ? WHERE id = ?", zip(epochs.tolist(), ids))
+    conn.commit()
+    return len(rows)
+
+
+# ========================================
+# 投稿フレーム（差分読み込み + キャッシュ）
+# ========================================
+
+def _state(conn):
+    """投稿の追加・削除を検知するための (件数, 最大ID)"""
+    return tuple(conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM posts").fetchone())
+
+
+def _read_posts(conn, after_id=0):
+    from classifier import get_classifier
+
+    df = pd.read_sql(
+        "SELECT id, epoch, likes, text FROM posts WHERE id > ? ORDER BY id", conn, params=(after_id,)
+    )
+    df["category"] = get_classifier("category").classify_series(df["text"].fillna(""))
+    df["likes"] = df["likes"].fillna(0).astype(np.float64)
+    return df.drop(columns="text")
+
+
+def load_frame(db_path=DB_PATH):
+    """id, epoch, likes, category, ts（JSTの日時）, day（JSTの日付）の投稿フレーム"""
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        backfill_epochs(conn)
+        state = _state(conn)
+        cached = _frames.get(db_path)
+        if cached and cached[0] == state:
+            return cached[2]
+
+        raw = None
+        if cached and len(cached[1]):
+            last_id = int(cached[1]["id"].max())
+            added = conn.execute("SELECT COUNT(*) FROM posts WHERE id > ?", (last_id,)).fetchone()[0]
+            if len(cached[1]) + added == state[0]:
+                # 追記だけなら新しい行だけ読み足す
+                raw = pd.concat([cached[1], _read_posts(conn, last_id)], ignore_index=True)
+        if raw is None:
+            raw = _read_posts(conn)
+    finally:
+        conn.close()
+
+    frame = raw[raw["epoch"] > UNPARSED].copy()
+    frame["ts"] = pd.to_datetime(frame["epoch"], unit="s") + JST_OFFSET
+    frame["day"] = frame["ts"].dt.floor("D")
+    frame = frame.sort_values("ts", kind="stable").reset_index(drop=True)
+    _frames[db_path] = (state, raw, frame)
+    return frame
+
+
+def _cached(db_path, kind, window, compute):
+    """投稿の状態が変わっていなければ前回の結果を返す"""
+    frame = load_frame(db_path)
+    state = _frames[db_path][0]
+    key = (db_path, kind, window)
+    hit = _results.get(key)
+    if hit and hit[0] == state:
+        return hit[1]
+    result = compute(frame, window)
+    _results[key] = (state, result)
+    return result
+
+
+def clear_cache():
+    _frames.clear()
+    _results.clear()
+
+
+# ========================================
+# 集計
+# ========================================
+
+def _days(frame):
+    return pd.date_range(frame["day"].min(), frame["day"].max(), freq="D", name="day")
+
+
+def _rolling_stats(frame, window):
+    if frame.empty:
+        return pd.DataFrame()
+    days = _days(frame)
+    # 各日の終わりにNaNの番兵を置き、「その日までの直近window日」の値を番兵の行で読む
+    posts = pd.Series(frame["likes"].to_numpy(), index=frame["ts"].to_numpy())
+    ends = pd.Series(np.nan, index=days + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1))
+    s = pd.concat([posts, ends]).sort_index(kind="stable")
+    roll = s.rolling(f"{window}D")
+    stats = {"posts": roll.count(), "mean": roll.mean(), "median": roll.median()}
+    for q in QUANTILES:
+        stats[f"q{int(q * 100)}"] = roll.quantile(q)
+    out = pd.DataFrame(stats)
+    out = out[s.isna().to_numpy()]
+    out.index = days
+    out["posts"] = out["posts"].astype(int)
+    out.insert(0, "daily_posts", frame.groupby("day").size().reindex(days, fill_value=0))
+    return out
+
+
+def _category_shares(frame, window):
+    if frame.empty:
+        return pd.DataFrame()
+    counts = pd.crosstab(frame["day"], frame["category"]).reindex(_days(frame), fill_value=0)
+    rolled = counts.rolling(window, min_periods=1).sum()
+    return rolled.div(rolled.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+
+
+def _hour_weekday(frame, _window):
+    hour = frame.groupby(frame["ts"].dt.hour)["likes"].mean().reindex(range(24), fill_value=0)
+    weekday = frame.groupby(frame["ts"].dt.dayofweek)["likes"].mean().reindex(range(7), fill_value=0)
+    return {"hour": hour, "weekday": weekday}
+
+
+def rolling_stats(window=7, db_path=DB_PATH):
+    """日ごとの直近window日のいいね統計
+
+    列: daily_posts（その日の投稿数）, posts（窓内の投稿数）, mean, median, q25, q75, q90
+    """
+    return _cached(db_path, "rolling", window, _rolling_stats)
+
+
+def category_shares(window=7, db_path=DB_PATH):
+    """日ごとの直近window日のカテゴリ構成比（行の合計が1）"""
+    return _cached(db_path, "category", window, _category_shares)
+
+
+def hour_weekday_means(db_path=DB_PATH):
+    """JSTの時間帯（0〜23）・曜日（0=月）ごとの平均いいね数"""
+    return _cached(db_path, "hour_weekday", None, _hour_weekday)
+
+
+if __name__ == "__main__":
+    import time
+
+    for w in WINDOWS:
+        start = time.perf_counter()
+        stats = rolling_stats(w)
+        shares = category_shares(w)
+        print(f"{w}日窓: {len(stats)}日分 ({time.perf_counter() - start:.3f}秒)")
+        if len(stats):
+            print(stats.tail(5).round(1).to_string())
+            print(shares.tail(1).round(3).to_string())
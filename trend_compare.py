@@ -1,18 +1,22 @@
-"""複数日のバズポスト トレンド比較分析"""
+"""複数日のバズポスト トレンド比較分析
 
+日ごとの集計（投稿数・いいね統計・カテゴリ分布・キーワード件数）は
+SQLiteの daily_stats テーブルに日付とファイルのチェックサムをキーに保存し、
+新しい日・内容が変わった日のファイルだけを読み直す。長期間のレポートはこの集計だけを参照する。
+"""
+
+import hashlib
+import json
 import os
 import re
-from collections import defaultdict
+import sqlite3
 from datetime import datetime
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 import pandas as pd
 
-from visualize import setup_japanese_font, COLORS
-
-FONT = setup_japanese_font()
+from classifier import get_classifier
+from import_csv import DB_PATH, init_db
+from loaders import read_table
 
 
 def find_data_files(data_dir="."):
@@ -52,100 +56,171 @@ def find_data_files(data_dir="."):
 
 
 def load_data_file(file_info):
-    """ファイルを読み込んでDataFrameを返す"""
-    if file_info["format"] == "csv":
-        return pd.read_csv(file_info["path"])
-    else:
-        return pd.read_excel(file_info["path"])
+    """ファイルを読み込んでDataFrameを返す（loaders のキャッシュがあればそちらから）"""
+    return read_table(file_info["path"])
 
 
 def classify_category(text):
-    """カテゴリ分類（analyze_posts.pyと同じロジック）"""
-    if re.search(r'達成|収益|稼げた|稼いだ|成功|実績|儲かった|〜万円|月収|年収|売上|報酬|利益', text, re.IGNORECASE):
-        return "実績報告系"
-    if re.search(r'方法|やり方|コツ|手順|ステップ|テクニック|攻略|マニュアル|ガイド|〜する方法|〜のやり方', text, re.IGNORECASE):
-        return "ノウハウ系"
-    if re.search(r'私が|僕が|自分が|実際に|やってみた|試してみた|体験|経験|〜したら|〜してみた', text, re.IGNORECASE):
-        return "体験談系"
-    if re.search(r'は？|問題|危険|注意|警告|【悲報】|〜すぎる|ヤバい|おかしい', text, re.IGNORECASE):
-        return "問題提起系"
-    if re.search(r'ツール|アプリ|サービス|プラグイン|拡張機能|おすすめ|紹介|AI|Claude|ChatGPT|GPT', text, re.IGNORECASE):
-        return "ツール紹介系"
-    if re.search(r'発表|リリース|開始|開催|速報|最新|ニュース|公開', text, re.IGNORECASE):
-        return "ニュース系"
-    return "その他"
-
-
-def extract_keywords(df, top_n=10):
-    """頻出キーワードを抽出"""
-    keyword_pattern = re.compile(
-        r'(ChatGPT|Claude|Claude Code|Gemini|Copilot|Midjourney|'
-        r'Stable Diffusion|DALL-E|Canva|Notion AI|Cursor|v0|Bolt|'
-        r'副業|稼ぐ|収益|自動化|AI|ライティング|プログラミング|'
-        r'デザイン|動画|YouTube|SNS|ブログ|アフィリエイト)',
-        re.IGNORECASE
-    )
-
-    counts = defaultdict(int)
-    for _, row in df.iterrows():
-        text = str(row.get("本文", ""))
-        found = set()
-        for match in keyword_pattern.finditer(text):
-            word = match.group()
-            if word not in found:
-                counts[word] += 1
-                found.add(word)
-
-    return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:top_n]
-
-
-def compare_trends(data_dir="."):
-    """複数日のデータを比較分析"""
-    files = find_data_files(data_dir)
+    """カテゴリ分類（classifier のルールセット "category"。analyze_posts.pyと同じ）"""
+    return get_classifier("category").classify(text)
 
-    if len(files) < 2:
-        print("比較には2日分以上のデータが必要です。")
-        print(f"現在のデータファイル数: {len(files)}件")
-        return None
 
-    print(f"データファイル {len(files)}日分を検出:")
-    for f in files:
-        print(f"  - {f['date']}: {f['path']}")
+KEYWORD_PATTERN = re.compile(
+    r'(ChatGPT|Claude|Claude Code|Gemini|Copilot|Midjourney|'
+    r'Stable Diffusion|DALL-E|Canva|Notion AI|Cursor|v0|Bolt|'
+    r'副業|稼ぐ|収益|自動化|AI|ライティング|プログラミング|'
+    r'デザイン|動画|YouTube|SNS|ブログ|アフィリエイト)',
+    re.IGNORECASE
+)
+
+
+def keyword_counts(df):
+    """キーワードごとの出現投稿数（1投稿内の重複は1件）を件数の多い順に返す"""
+    if "本文" not in df.columns or df.empty:
+        return []
+    found = df["本文"].fillna("").astype(str).str.findall(KEYWORD_PATTERN)
+    words = found.map(lambda ws: list(dict.fromkeys(ws))).explode().dropna()
+    counts = words.value_counts(sort=False)
+    return sorted(((w, int(c)) for w, c in counts.items()), key=lambda x: x[1], reverse=True)
+
+
+TOP_KEYWORDS = 10  # レポートに載せ、新登場の判定に使う上位キーワード数
 
-    daily_stats = []
 
+def extract_keywords(df, top_n=TOP_KEYWORDS):
+    """頻出キーワードを抽出"""
+    return keyword_counts(df)[:top_n]
+
+
+# ========================================
+# 日別集計（daily_stats）
+# ========================================
+
+def file_checksum(path):
+    """ファイル内容のSHA-1"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def compute_daily_stats(df, date):
+    """1日分のDataFrameから集計を作る"""
+    likes = pd.to_numeric(df["いいね数"], errors="coerce") if "いいね数" in df.columns else None
+    texts = df["本文"].fillna("").astype(str) if "本文" in df.columns else pd.Series([""] * len(df))
+    categories = get_classifier("category").classify_series(texts).value_counts(sort=False)
+    return {
+        "date": date,
+        "post_count": len(df),
+        "avg_likes": float(likes.mean()) if likes is not None else 0,
+        "max_likes": int(likes.max()) if likes is not None and likes.notna().any() else 0,
+        "median_likes": float(likes.median()) if likes is not None else 0,
+        "total_likes": int(likes.sum()) if likes is not None else 0,
+        "categories": {cat: int(n) for cat, n in categories.items()},
+        "keywords": keyword_counts(df),
+    }
+
+
+def _row_to_stats(row):
+    date, post_count, avg, max_likes, median, total, categories, keywords = row
+    return {
+        "date": date,
+        "post_count": post_count,
+        "avg_likes": avg if avg is not None else float("nan"),
+        "max_likes": max_likes or 0,
+        "median_likes": median if median is not None else float("nan"),
+        "total_likes": total or 0,
+        "categories": json.loads(categories or "{}"),
+        "keywords": [tuple(kw) for kw in json.loads(keywords or "[]")],
+    }
+
+
+def sync_daily_stats(files, db_path=DB_PATH):
+    """ファイル一覧のうち、新しい日・チェックサムが変わった日だけを集計して保存する
+
+    戻り値: 集計し直した日付のリスト
+    """
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    stored = dict(conn.execute("SELECT date, checksum FROM daily_stats").fetchall())
+    updated = []
     for file_info in files:
-        df = load_data_file(file_info)
-        date = file_info["date"]
-
-        # 基本統計
-        stats = {
-            "date": date,
-            "post_count": len(df),
-            "avg_likes": df["いいね数"].mean() if "いいね数" in df.columns else 0,
-            "max_likes": df["いいね数"].max() if "いいね数" in df.columns else 0,
-            "median_likes": df["いいね数"].median() if "いいね数" in df.columns else 0,
-            "total_likes": df["いいね数"].sum() if "いいね数" in df.columns else 0,
-        }
-
-        # カテゴリ分布
-        cat_counts = defaultdict(int)
-        for _, row in df.iterrows():
-            text = str(row.get("本文", ""))
-            cat = classify_category(text)
-            cat_counts[cat] += 1
-        stats["categories"] = dict(cat_counts)
-
-        # キーワード
-        stats["keywords"] = extract_keywords(df)
-
-        daily_stats.append(stats)
+        checksum = file_checksum(file_info["path"])
+        if stored.get(file_info["date"]) == checksum:
+            continue
+        stats = compute_daily_stats(load_data_file(file_info), file_info["date"])
+        conn.execute(
+            "INSERT OR REPLACE INTO daily_stats (date, checksum, path, post_count, avg_likes, "
+            "max_likes, median_likes, total_likes, categories, keywords, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (stats["date"], checksum, file_info["path"], stats["post_count"],
+             None if pd.isna(stats["avg_likes"]) else stats["avg_likes"],
+             stats["max_likes"],
+             None if pd.isna(stats["median_likes"]) else stats["median_likes"],
+             stats["total_likes"],
+             json.dumps(stats["categories"], ensure_ascii=False),
+             json.dumps(stats["keywords"], ensure_ascii=False),
+             datetime.now().isoformat())
+        )
+        updated.append(file_info["date"])
+    conn.commit()
+    conn.close()
+    return updated
+
+
+def load_daily_stats(since=None, until=None, db_path=DB_PATH):
+    """保存済みの日別集計を日付順に返す（ファイルは読まない）"""
+    if not os.path.exists(db_path):
+        return []
+    query = ("SELECT date, post_count, avg_likes, max_likes, median_likes, total_likes, "
+             "categories, keywords FROM daily_stats WHERE 1=1")
+    params = []
+    if since:
+        query += " AND date >= ?"
+        params.append(since)
+    if until:
+        query += " AND date <= ?"
+        params.append(until)
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(query + " ORDER BY date", params).fetchall()
+    except sqlite3.OperationalError:
+        rows = []  # daily_statsテーブル未作成
+    conn.close()
+    return [_row_to_stats(r) for r in rows]
+
+
+def compare_trends(data_dir=".", since=None, until=None, db_path=DB_PATH):
+    """複数日のデータを比較分析
+
+    ファイルの変更分だけ daily_stats を更新し、期間内の集計を返す。
+    元ファイルを削除・移動した日も daily_stats に残っていれば比較に含まれる。
+    """
+    files = find_data_files(data_dir)
+
+    if files:
+        print(f"データファイル {len(files)}日分を検出:")
+        for f in files:
+            print(f"  - {f['date']}: {f['path']}")
+        updated = sync_daily_stats(files, db_path)
+        print(f"日別集計を更新: {len(updated)}日分（残りは保存済みの集計を使用）")
+
+    daily_stats = load_daily_stats(since, until, db_path)
+
+    if len(daily_stats) < 2:
+        print("比較には2日分以上のデータが必要です。")
+        print(f"現在のデータ: {len(daily_stats)}日分")
+        return None
 
     return daily_stats, files
 
 
 def generate_trend_charts(daily_stats, output_dir="output/charts"):
     """トレンド比較チャートを生成"""
+    # matplotlibはチャート生成時のみ読み込む（集計・レポートだけなら不要）
+    from visualize import COLORS, FONT, plt
+
     os.makedirs(output_dir, exist_ok=True)
 
     dates = [s["date"] for s in daily_stats]
@@ -261,15 +336,14 @@ def generate_trend_report(daily_stats, output_file):
         f.write("## 4. トレンドキーワード比較\n\n")
         for s in daily_stats:
             f.write(f"### {s['date'][4:6]}/{s['date'][6:8]}のトップキーワード\n\n")
-            for word, count in s["keywords"][:10]:
+            for word, count in s["keywords"][:TOP_KEYWORDS]:
                 f.write(f"- **{word}**: {count}件\n")
             f.write("\n")
 
-        # 新登場キーワード検出
+        # 新登場キーワード検出（daily_stats は全キーワードを持つので、前日・当日とも上位だけで比べる）
         if len(daily_stats) >= 2:
-            prev_words = {w for w, _ in daily_stats[-2]["keywords"]}
-            curr_words = {w for w, _ in daily_stats[-1]["keywords"]}
-            new_words = curr_words - prev_words
+            prev_words = {w for w, _ in daily_stats[-2]["keywords"][:TOP_KEYWORDS]}
+            new_words = [w for w, _ in daily_stats[-1]["keywords"][:TOP_KEYWORDS] if w not in prev_words]
 
             if new_words:
                 f.write("### 新たにトレンド入りしたキーワード\n\n")
@@ -283,9 +357,9 @@ def generate_trend_report(daily_stats, output_file):
     print(f"トレンドレポート生成完了: {output_file}")
 
 
-def main():
+def main(since=None, until=None):
     """メイン処理"""
-    result = compare_trends(".")
+    result = compare_trends(".", since=since, until=until)
 
     if result is None:
         return
@@ -308,4 +382,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="複数日のトレンド比較")
+    parser.add_argument("--since", default=None, help="開始日 YYYYMMDD")
+    parser.add_argument("--until", default=None, help="終了日 YYYYMMDD")
+    args = parser.parse_args()
+    main(since=args.since, until=args.until)
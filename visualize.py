@@ -1,99 +1,275 @@
-"""分析結果のグラフ可視化"""
-
+"""分析結果のグラフ可視化
+
+投稿ごとの分類（カテゴリ・冒頭パターン・時刻・CTA・バズスコア）は prepare_chart_data で1回だけ行い、
+各チャートはそこから作った小さな集計データだけを描画する。
+入力データの指紋（ハッシュ）を出力先のマニフェストに記録し、同じ指紋のPNGがあれば描き直さない。
+描き直しが必要なチャートはプロセスプールで並列に描画する（Aggバックエンド）。
+matplotlibの読み込みと日本語フォントの探索は最初のチャートを描くまで行わない
+（全チャートが最新なら matplotlib を読み込まずに終わる）。
+"""
+
+import hashlib
+import json
 import os
-import re
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
-import matplotlib
-matplotlib.use("Agg")  # GUIなし環境対応
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
 import pandas as pd
 
-# 日本語フォント設定
+from loaders import read_table
+from timeseries import parse_dates
+
+JAPANESE_FONTS = [
+    "Noto Sans CJK JP", "Noto Sans JP", "IPAGothic", "IPAPGothic",
+    "VL Gothic", "TakaoGothic", "Meiryo", "MS Gothic", "Yu Gothic",
+]
+
+_backend = None  # (plt, FONT)。初回描画時に _setup() で設定する
+
+
+# ========================================
+# matplotlib・日本語フォント（初回描画まで読み込まない）
+# ========================================
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")  # GUIなし環境対応
+    import matplotlib.pyplot as plt
+    return plt
+
+
 def setup_japanese_font():
-    """利用可能な日本語フォントを探して設定"""
-    japanese_fonts = [
-        "Noto Sans CJK JP", "Noto Sans JP", "IPAGothic", "IPAPGothic",
-        "VL Gothic", "TakaoGothic", "Meiryo", "MS Gothic", "Yu Gothic",
-    ]
+    """利用可能な日本語フォントを探して設定
+
+    フォント一覧は matplotlib 自身のキャッシュ（fontlist-*.json）から pyplot の読み込み時に作られるので、
+    ここでは名前を照合するだけ。
+    """
+    plt = _pyplot()
+    import matplotlib.font_manager as fm
+
     available = {f.name for f in fm.fontManager.ttflist}
-    for font in japanese_fonts:
-        if font in available:
-            plt.rcParams["font.family"] = font
-            return font
+    font = next((f for f in JAPANESE_FONTS if f in available), None)
 
     # フォントが見つからない場合はsans-serifで代用
-    plt.rcParams["font.family"] = "sans-serif"
-    return None
+    plt.rcParams["font.family"] = font or "sans-serif"
+    return font
+
 
-FONT = setup_japanese_font()
+def _setup():
+    """初回呼び出し時にmatplotlib（Agg）を読み込んでフォントを設定し、(plt, FONT) を返す"""
+    global _backend
+    if _backend is None:
+        font = setup_japanese_font()
+        _backend = (_pyplot(), font)
+    return _backend
+
+
+def __getattr__(name):
+    """visualize.plt / visualize.FONT は参照された時点で初期化する"""
+    if name == "plt":
+        return _setup()[0]
+    if name == "FONT":
+        return _setup()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 共通スタイル
 COLORS = ["#4472C4", "#ED7D31", "#A5A5A5", "#FFC000", "#5B9BD5",
            "#70AD47", "#264478", "#9B59B6", "#E74C3C", "#1ABC9C"]
 
+# 描画内容を変えたら上げる（既存PNGのキャッシュを無効にする）
+CHART_VERSION = 1
+MANIFEST_NAME = ".chart_manifest.json"
+
+LENGTH_BUCKETS = {
+    "0-50字": (0, 50), "51-100字": (51, 100), "101-150字": (101, 150),
+    "151-200字": (151, 200), "201-300字": (201, 300),
+    "301-500字": (301, 500), "500字以上": (501, 99999),
+}
+
+CTA_PATTERNS = {
+    "いいね系": r'いいね|👍|ハート',
+    "保存系": r'保存|ブックマーク',
+    "フォロー系": r'フォロー|follow',
+    "シェア系": r'リポスト|RT|シェア|拡散',
+    "コメント系": r'コメント|返信|教えて',
+}
+
+# ========================================
+# 前処理（投稿ごとの分類を1回だけ）
+# ========================================
+
+def _column(df, col, default):
+    if col in df.columns:
+        return df[col]
+    return pd.Series(default, index=df.index)
+
+
+def _jst_hours(dates):
+    """投稿日時 → JSTの時（パースできない行はNaN。パースは timeseries.parse_dates）"""
+    return (parse_dates(dates).dt.hour + 9) % 24  # JST
+
+
+def _best_length_bucket(lengths, likes):
+    """平均いいねが最も高い文字数バケット（analyze_text_lengthと同じ判定）"""
+    best, best_avg = None, None
+    for name, (lo, hi) in LENGTH_BUCKETS.items():
+        mask = (lengths >= lo) & (lengths <= hi)
+        avg = float(likes[mask].mean()) if mask.any() else 0
+        if best_avg is None or avg > best_avg:
+            best, best_avg = name, avg
+    return best
+
+
+def prepare_chart_data(df):
+    """各投稿を1回だけ分類し、チャート共通の特徴量テーブルを返す"""
+    from analyze_posts import calculate_buzz_score
+    from classifier import get_classifier
+
+    texts = _column(df, "本文", "").fillna("").astype(str)
+    likes = pd.to_numeric(_column(df, "いいね数", 0), errors="coerce")
+    lengths = texts.str.len().to_numpy()
+    likes_filled = likes.fillna(0).to_numpy(dtype=np.float64)
+
+    best = _best_length_bucket(lengths, likes_filled)
+    lo, hi = LENGTH_BUCKETS[best]
+    # chart_buzz_score は従来どおり「500字以上」を501〜1000字として扱う
+    score_params = {"optimal_min": lo, "optimal_max": min(hi, 1000)}
+
+    features = pd.DataFrame({
+        "likes": likes_filled,
+        "likes_raw": likes.to_numpy(dtype=np.float64),
+        "length": lengths,
+        "category": get_classifier("category").classify_series(texts).to_numpy(),
+        "opening": get_classifier("opening").classify_series(texts.str.split("\n", n=1).str[0]).to_numpy(),
+        "hour": _jst_hours(_column(df, "投稿日時", None)).to_numpy(),
+        "buzz_score": [calculate_buzz_score(t, score_params)["total_score"] for t in texts],
+    }, index=df.index)
+    for cta_type, pattern in CTA_PATTERNS.items():
+        features[cta_type] = texts.str.contains(pattern, case=False, regex=True).to_numpy()
+    features.attrs["best_bucket"] = best
+    return features
+
+
+def _user_stats(df_raw):
+    """ユーザーごとの投稿数・平均いいね・合計いいね"""
+    likes = pd.to_numeric(_column(df_raw, "いいね数", 0), errors="coerce").fillna(0)
+    users = _column(df_raw, "ユーザー名", "").fillna("")
+    by_user = likes.groupby(users, sort=False).agg(["size", "mean", "sum"])
+    return {
+        "labels": by_user.index.tolist(),
+        "post_counts": by_user["size"].tolist(),
+        "avg_likes": by_user["mean"].tolist(),
+        "total_likes": by_user["sum"].tolist(),
+    }
 
-def _safe_text(row, col, default=""):
-    val = row.get(col, default)
-    return val if pd.notna(val) else default
 
+def aggregate_chart_data(features, df_raw=None):
+    """特徴量テーブルから各チャートの描画用データ（小さなdict）を作る"""
+    data = {}
+    likes = features["likes"]
 
-def chart_category_likes(df, output_dir):
-    """カテゴリ別平均いいね数の横棒グラフ"""
-    from analyze_posts import classify_category
-
-    cat_data = defaultdict(list)
-    for _, row in df.iterrows():
-        text = _safe_text(row, "本文")
-        cat = classify_category(text)
-        cat_data[cat].append(row.get("いいね数", 0))
-
-    categories = []
-    avg_likes = []
-    counts = []
-    for cat, likes in sorted(cat_data.items(), key=lambda x: sum(x[1])/len(x[1]) if x[1] else 0):
-        categories.append(cat)
-        avg_likes.append(sum(likes) / len(likes) if likes else 0)
-        counts.append(len(likes))
+    by_cat = likes.groupby(features["category"], sort=False).agg(["mean", "size"])
+    asc = by_cat.sort_values("mean", kind="stable")
+    data["category_likes"] = {
+        "categories": asc.index.tolist(),
+        "avg_likes": asc["mean"].tolist(),
+        "counts": asc["size"].tolist(),
+    }
+    data["competitive_position"] = {
+        "categories": by_cat.index.tolist(),
+        "counts": by_cat["size"].tolist(),
+        "avgs": by_cat["mean"].tolist(),
+    }
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bars = ax.barh(categories, avg_likes, color=COLORS[:len(categories)])
+    by_open = likes.groupby(features["opening"], sort=False).agg(["mean", "size"])
+    by_open = by_open.sort_values("mean", ascending=False, kind="stable")
+    data["opening_patterns"] = {
+        "labels": [f"{p}\n({n}件)" for p, n in zip(by_open.index, by_open["size"])],
+        "avg_likes": by_open["mean"].tolist(),
+    }
 
-    for bar, count in zip(bars, counts):
-        ax.text(bar.get_width() + 10, bar.get_y() + bar.get_height()/2,
-                f"{bar.get_width():.0f} ({count}件)", va="center", fontsize=10)
+    hourly = likes.groupby(features["hour"]).agg(["mean", "size"]).reindex(range(24))
+    data["time_slots"] = {
+        "avg_likes": hourly["mean"].fillna(0).tolist(),
+        "counts": hourly["size"].fillna(0).astype(int).tolist(),
+    }
 
-    ax.set_xlabel("平均いいね数" if FONT else "Avg Likes")
-    ax.set_title("カテゴリ別 平均いいね数" if FONT else "Avg Likes by Category")
-    plt.tight_layout()
+    cta_cols = list(CTA_PATTERNS)
+    labels, avg_likes, counts = [], [], []
+    for cta_type in cta_cols:
+        hit = features[cta_type].to_numpy()
+        if hit.any():
+            labels.append(cta_type)
+            avg_likes.append(float(likes[hit].mean()))
+            counts.append(int(hit.sum()))
+    no_cta = ~features[cta_cols].to_numpy().any(axis=1)
+    labels.append("CTAなし")
+    avg_likes.append(float(likes[no_cta].mean()) if no_cta.any() else 0)
+    counts.append(int(no_cta.sum()))
+    data["cta_effect"] = {"labels": labels, "avg_likes": avg_likes, "counts": counts}
+
+    raw_likes = features["likes_raw"].dropna().to_numpy()
+    hist, edges = np.histogram(raw_likes, bins=30)
+    data["likes_distribution"] = {
+        "hist": hist, "edges": edges,
+        "mean": float(raw_likes.mean()), "median": float(np.median(raw_likes)),
+    }
+
+    best = features.attrs.get("best_bucket")
+    lo, hi = LENGTH_BUCKETS.get(best, (0, 0))
+    if best == "500字以上":
+        hi = int(features["length"].max()) if len(features) else 1000
+    data["text_length_scatter"] = {
+        "series": [(cat, group["length"].to_numpy(), group["likes"].to_numpy())
+                   for cat, group in features.groupby("category", sort=False)],
+        "best_bucket": best,
+        "span": (lo, hi),
+    }
+
+    data["buzz_score"] = {
+        "scores": features["buzz_score"].to_numpy(dtype=np.float64),
+        "likes": likes.to_numpy(),
+    }
 
-    path = os.path.join(output_dir, "category_likes.png")
+    if df_raw is not None:
+        data["user_analysis"] = _user_stats(df_raw)
+    return data
+
+
+# ========================================
+# 描画（集計データだけを受け取る）
+# ========================================
+
+def _save(fig, path):
+    plt, _ = _setup()
     fig.savefig(path, dpi=150, bbox_inches="tight")
     plt.close(fig)
     return path
 
 
-def chart_opening_patterns(df, output_dir):
-    """冒頭パターン別効果の棒グラフ"""
-    from analyze_posts import classify_opening_pattern
+def draw_category_likes(data, path):
+    """カテゴリ別平均いいね数の横棒グラフ"""
+    plt, FONT = _setup()
+    categories = data["categories"]
+    fig, ax = plt.subplots(figsize=(10, 6))
+    bars = ax.barh(categories, data["avg_likes"], color=COLORS[:len(categories)])
+
+    for bar, count in zip(bars, data["counts"]):
+        ax.text(bar.get_width() + 10, bar.get_y() + bar.get_height()/2,
+                f"{bar.get_width():.0f} ({count}件)", va="center", fontsize=10)
 
-    pattern_data = defaultdict(list)
-    for _, row in df.iterrows():
-        text = _safe_text(row, "本文")
-        first_line = text.split("\n")[0] if text else ""
-        pattern = classify_opening_pattern(first_line)
-        pattern_data[pattern].append(row.get("いいね数", 0))
+    ax.set_xlabel("平均いいね数" if FONT else "Avg Likes")
+    ax.set_title("カテゴリ別 平均いいね数" if FONT else "Avg Likes by Category")
+    plt.tight_layout()
+    return _save(fig, path)
 
-    patterns = []
-    avg_likes = []
-    for pat, likes in sorted(pattern_data.items(), key=lambda x: sum(x[1])/len(x[1]) if x[1] else 0, reverse=True):
-        patterns.append(f"{pat}\n({len(likes)}件)")
-        avg_likes.append(sum(likes) / len(likes) if likes else 0)
 
+def draw_opening_patterns(data, path):
+    """冒頭パターン別効果の棒グラフ"""
+    plt, FONT = _setup()
+    patterns = data["labels"]
     fig, ax = plt.subplots(figsize=(10, 6))
-    bars = ax.bar(patterns, avg_likes, color=COLORS[:len(patterns)])
+    bars = ax.bar(patterns, data["avg_likes"], color=COLORS[:len(patterns)])
 
     for bar in bars:
         ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 5,
@@ -102,32 +278,17 @@ def chart_opening_patterns(df, output_dir):
     ax.set_ylabel("平均いいね数" if FONT else "Avg Likes")
     ax.set_title("冒頭パターン別 平均いいね数" if FONT else "Avg Likes by Opening Pattern")
     plt.tight_layout()
-
-    path = os.path.join(output_dir, "opening_patterns.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
+    return _save(fig, path)
 
 
-def chart_time_slots(df, output_dir):
+def draw_time_slots(data, path):
     """時間帯別いいね数の折れ線グラフ"""
-    from analyze_posts import parse_datetime
-
-    hourly = defaultdict(list)
-    for _, row in df.iterrows():
-        dt = parse_datetime(_safe_text(row, "投稿日時"))
-        if dt:
-            hour = (dt.hour + 9) % 24  # JST
-            hourly[hour].append(row.get("いいね数", 0))
-
+    plt, FONT = _setup()
     hours = list(range(24))
-    avg_likes = [sum(hourly[h]) / len(hourly[h]) if hourly[h] else 0 for h in hours]
-    counts = [len(hourly[h]) for h in hours]
-
     fig, ax1 = plt.subplots(figsize=(12, 6))
 
     color1 = "#4472C4"
-    ax1.plot(hours, avg_likes, "o-", color=color1, linewidth=2, markersize=6, label="平均いいね数")
+    ax1.plot(hours, data["avg_likes"], "o-", color=color1, linewidth=2, markersize=6, label="平均いいね数")
     ax1.set_xlabel("時刻 (JST)" if FONT else "Hour (JST)")
     ax1.set_ylabel("平均いいね数" if FONT else "Avg Likes", color=color1)
     ax1.tick_params(axis="y", labelcolor=color1)
@@ -136,7 +297,7 @@ def chart_time_slots(df, output_dir):
 
     ax2 = ax1.twinx()
     color2 = "#ED7D31"
-    ax2.bar(hours, counts, alpha=0.3, color=color2, label="投稿数")
+    ax2.bar(hours, data["counts"], alpha=0.3, color=color2, label="投稿数")
     ax2.set_ylabel("投稿数" if FONT else "Post Count", color=color2)
     ax2.tick_params(axis="y", labelcolor=color2)
 
@@ -147,120 +308,61 @@ def chart_time_slots(df, output_dir):
     ax1.legend(lines1 + lines2, labels1 + labels2, loc="upper left")
 
     plt.tight_layout()
-    path = os.path.join(output_dir, "time_slots.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
+    return _save(fig, path)
 
 
-def chart_cta_effect(df, output_dir):
+def draw_cta_effect(data, path):
     """CTA有無の比較棒グラフ"""
-    cta_patterns = {
-        "いいね系": r'いいね|👍|ハート',
-        "保存系": r'保存|ブックマーク',
-        "フォロー系": r'フォロー|follow',
-        "シェア系": r'リポスト|RT|シェア|拡散',
-        "コメント系": r'コメント|返信|教えて',
-    }
-
-    cta_data = defaultdict(list)
-    no_cta = []
-
-    for _, row in df.iterrows():
-        text = _safe_text(row, "本文")
-        likes = row.get("いいね数", 0)
-        has_cta = False
-        for cta_type, pattern in cta_patterns.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                cta_data[cta_type].append(likes)
-                has_cta = True
-        if not has_cta:
-            no_cta.append(likes)
-
-    labels = list(cta_data.keys()) + ["CTAなし"]
-    avg_likes = [sum(v)/len(v) if v else 0 for v in cta_data.values()] + \
-                [sum(no_cta)/len(no_cta) if no_cta else 0]
-    post_counts = [len(v) for v in cta_data.values()] + [len(no_cta)]
-
+    plt, FONT = _setup()
+    labels = data["labels"]
     fig, ax = plt.subplots(figsize=(10, 6))
     colors = COLORS[:len(labels)-1] + ["#A5A5A5"]
-    bars = ax.bar(labels, avg_likes, color=colors)
+    bars = ax.bar(labels, data["avg_likes"], color=colors)
 
-    for bar, count in zip(bars, post_counts):
+    for bar, count in zip(bars, data["counts"]):
         ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 5,
                 f"{bar.get_height():.0f}\n({count}件)", ha="center", fontsize=9)
 
     ax.set_ylabel("平均いいね数" if FONT else "Avg Likes")
     ax.set_title("CTA種類別 平均いいね数" if FONT else "Avg Likes by CTA Type")
     plt.tight_layout()
+    return _save(fig, path)
 
-    path = os.path.join(output_dir, "cta_effect.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
-
-
-def chart_likes_distribution(df, output_dir):
-    """いいね数の分布ヒストグラム"""
-    likes = df["いいね数"].dropna().values
 
+def draw_likes_distribution(data, path):
+    """いいね数の分布ヒストグラム（度数は集計済み）"""
+    plt, FONT = _setup()
+    edges = data["edges"]
     fig, ax = plt.subplots(figsize=(10, 6))
-    ax.hist(likes, bins=30, color="#4472C4", edgecolor="white", alpha=0.8)
+    ax.hist(edges[:-1], bins=edges, weights=data["hist"],
+            color="#4472C4", edgecolor="white", alpha=0.8)
 
-    mean_likes = likes.mean()
-    median_likes = pd.Series(likes).median()
-    ax.axvline(mean_likes, color="#ED7D31", linestyle="--", linewidth=2,
-               label=f"平均: {mean_likes:.0f}")
-    ax.axvline(median_likes, color="#70AD47", linestyle="--", linewidth=2,
-               label=f"中央値: {median_likes:.0f}")
+    ax.axvline(data["mean"], color="#ED7D31", linestyle="--", linewidth=2,
+               label=f"平均: {data['mean']:.0f}")
+    ax.axvline(data["median"], color="#70AD47", linestyle="--", linewidth=2,
+               label=f"中央値: {data['median']:.0f}")
 
     ax.set_xlabel("いいね数" if FONT else "Likes")
     ax.set_ylabel("投稿数" if FONT else "Post Count")
     ax.set_title("いいね数の分布" if FONT else "Likes Distribution")
     ax.legend()
     plt.tight_layout()
-
-    path = os.path.join(output_dir, "likes_distribution.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
+    return _save(fig, path)
 
 
-def chart_text_length_scatter(df, output_dir):
+def draw_text_length_scatter(data, path):
     """文字数×いいね数の散布図"""
-    from analyze_posts import classify_category
-
-    lengths = []
-    likes_list = []
-    cats = []
-    for _, row in df.iterrows():
-        text = _safe_text(row, "本文")
-        lengths.append(len(text))
-        likes_list.append(row.get("いいね数", 0))
-        cats.append(classify_category(text))
-
-    # カテゴリ別に色分け
-    unique_cats = list(set(cats))
-    cat_colors = {c: COLORS[i % len(COLORS)] for i, c in enumerate(unique_cats)}
-
+    plt, FONT = _setup()
     fig, ax = plt.subplots(figsize=(10, 6))
 
-    for cat in unique_cats:
-        x = [lengths[i] for i in range(len(cats)) if cats[i] == cat]
-        y = [likes_list[i] for i in range(len(cats)) if cats[i] == cat]
-        ax.scatter(x, y, c=cat_colors[cat], label=cat, alpha=0.6, s=50)
+    # カテゴリ別に色分け
+    for i, (cat, x, y) in enumerate(data["series"]):
+        ax.scatter(x, y, c=COLORS[i % len(COLORS)], label=cat, alpha=0.6, s=50)
 
     # 最適レンジをハイライト
-    from analyze_posts import analyze_text_length
-    tl_data = analyze_text_length(df)
-    best = tl_data["best_bucket"]
-    bucket_ranges = {
-        "0-50字": (0, 50), "51-100字": (51, 100), "101-150字": (101, 150),
-        "151-200字": (151, 200), "201-300字": (201, 300),
-        "301-500字": (301, 500), "500字以上": (501, max(lengths) if lengths else 1000),
-    }
-    if best in bucket_ranges:
-        lo, hi = bucket_ranges[best]
+    best = data["best_bucket"]
+    if best:
+        lo, hi = data["span"]
         ax.axvspan(lo, hi, alpha=0.1, color="green", label=f"最適レンジ ({best})")
 
     ax.set_xlabel("文字数" if FONT else "Character Count")
@@ -268,36 +370,14 @@ def chart_text_length_scatter(df, output_dir):
     ax.set_title("文字数 × いいね数の関係" if FONT else "Character Count vs Likes")
     ax.legend(fontsize=8, loc="upper right")
     plt.tight_layout()
+    return _save(fig, path)
 
-    path = os.path.join(output_dir, "text_length_scatter.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
 
-
-def chart_buzz_score(df, output_dir):
+def draw_buzz_score(data, path):
     """バズスコア×実いいね数の散布図 + スコア分布"""
-    from analyze_posts import calculate_buzz_score, analyze_text_length
-    tl_data = analyze_text_length(df)
-    score_params = {}
-    bucket_ranges = {
-        "0-50字": (0, 50), "51-100字": (51, 100), "101-150字": (101, 150),
-        "151-200字": (151, 200), "201-300字": (201, 300),
-        "301-500字": (301, 500), "500字以上": (501, 1000),
-    }
-    if tl_data["best_bucket"] in bucket_ranges:
-        rng = bucket_ranges[tl_data["best_bucket"]]
-        score_params["optimal_min"] = rng[0]
-        score_params["optimal_max"] = rng[1]
-
-    scores = []
-    likes_list = []
-    for _, row in df.iterrows():
-        text = _safe_text(row, "本文")
-        result = calculate_buzz_score(text, score_params)
-        scores.append(result["total_score"])
-        likes_list.append(row.get("いいね数", 0))
-
+    plt, FONT = _setup()
+    scores = data["scores"]
+    likes_list = data["likes"]
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
 
     # 左: 散布図 + トレンドライン
@@ -305,7 +385,7 @@ def chart_buzz_score(df, output_dir):
     if len(scores) > 2:
         z = np.polyfit(scores, likes_list, 1)
         p = np.poly1d(z)
-        x_line = np.linspace(min(scores), max(scores), 100)
+        x_line = np.linspace(scores.min(), scores.max(), 100)
         ax1.plot(x_line, p(x_line), "--", color="#ED7D31", linewidth=2, label="トレンドライン")
         ax1.legend()
     ax1.set_xlabel("バズスコア" if FONT else "Buzz Score")
@@ -314,7 +394,7 @@ def chart_buzz_score(df, output_dir):
 
     # 右: スコア分布ヒストグラム
     ax2.hist(scores, bins=15, color="#70AD47", edgecolor="white", alpha=0.8)
-    mean_score = sum(scores) / len(scores) if scores else 0
+    mean_score = scores.mean() if len(scores) else 0
     ax2.axvline(mean_score, color="#ED7D31", linestyle="--", linewidth=2,
                 label=f"平均: {mean_score:.0f}点")
     ax2.set_xlabel("バズスコア" if FONT else "Buzz Score")
@@ -323,46 +403,26 @@ def chart_buzz_score(df, output_dir):
     ax2.legend()
 
     plt.tight_layout()
-    path = os.path.join(output_dir, "buzz_score.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
+    return _save(fig, path)
 
 
-def chart_user_analysis(df_raw, output_dir):
+def draw_user_analysis(data, path):
     """ユーザー分析: 投稿数×平均いいねバブルチャート"""
-    user_stats = {}
-    for _, row in df_raw.iterrows():
-        user = row.get("ユーザー名", "")
-        likes = row.get("いいね数", 0)
-        if user not in user_stats:
-            user_stats[user] = {"likes": [], "total": 0}
-        user_stats[user]["likes"].append(likes)
-        user_stats[user]["total"] += likes
-
-    post_counts = []
-    avg_likes = []
-    total_likes = []
-    labels = []
-
-    for user, stats in user_stats.items():
-        count = len(stats["likes"])
-        avg = sum(stats["likes"]) / count if count > 0 else 0
-        post_counts.append(count)
-        avg_likes.append(avg)
-        total_likes.append(stats["total"])
-        labels.append(user)
+    plt, FONT = _setup()
+    post_counts = data["post_counts"]
+    avg_likes = data["avg_likes"]
+    total_likes = data["total_likes"]
 
     fig, ax = plt.subplots(figsize=(10, 6))
 
     # バブルサイズ = 合計いいね
     max_total = max(total_likes) if total_likes else 1
-    sizes = [max(30, (t / max_total) * 500) for t in total_likes]
+    sizes = [max(30, (t / max_total) * 500) if max_total else 30 for t in total_likes]
 
-    scatter = ax.scatter(post_counts, avg_likes, s=sizes, alpha=0.5, c="#4472C4", edgecolors="white")
+    ax.scatter(post_counts, avg_likes, s=sizes, alpha=0.5, c="#4472C4", edgecolors="white")
 
     # リピーターにラベル
-    for i, (pc, al, label) in enumerate(zip(post_counts, avg_likes, labels)):
+    for pc, al, label in zip(post_counts, avg_likes, data["labels"]):
         if pc >= 2:
             ax.annotate(f"@{label}", (pc, al), fontsize=7, alpha=0.7,
                         xytext=(5, 5), textcoords="offset points")
@@ -371,30 +431,15 @@ def chart_user_analysis(df_raw, output_dir):
     ax.set_ylabel("平均いいね数" if FONT else "Avg Likes")
     ax.set_title("ユーザー別 投稿数 × 平均いいね数" if FONT else "Posts vs Avg Likes per User")
     plt.tight_layout()
+    return _save(fig, path)
 
-    path = os.path.join(output_dir, "user_analysis.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
 
-
-def chart_competitive_position(df, output_dir):
+def draw_competitive_position(data, path):
     """競合ポジション四象限マトリクス"""
-    from analyze_posts import classify_category
-
-    cat_data = defaultdict(list)
-    for _, row in df.iterrows():
-        text = _safe_text(row, "本文")
-        cat = classify_category(text)
-        cat_data[cat].append(row.get("いいね数", 0))
-
-    categories = []
-    counts = []
-    avgs = []
-    for cat, likes in cat_data.items():
-        categories.append(cat)
-        counts.append(len(likes))
-        avgs.append(sum(likes) / len(likes) if likes else 0)
+    plt, FONT = _setup()
+    categories = data["categories"]
+    counts = data["counts"]
+    avgs = data["avgs"]
 
     median_count = sorted(counts)[len(counts) // 2] if counts else 0
     median_avg = sorted(avgs)[len(avgs) // 2] if avgs else 0
@@ -438,81 +483,193 @@ def chart_competitive_position(df, output_dir):
     ax.set_ylabel("平均いいね数" if FONT else "Avg Likes")
     ax.set_title("競合ポジション マトリクス" if FONT else "Competitive Position Matrix")
     plt.tight_layout()
+    return _save(fig, path)
 
-    path = os.path.join(output_dir, "competitive_position.png")
-    fig.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    return path
 
+# チャートキー → (表示名, ファイル名, 描画関数)。generate_all_charts の出力順でもある
+CHARTS = {
+    "category_likes": ("カテゴリ別平均いいね数", "category_likes.png", draw_category_likes),
+    "opening_patterns": ("冒頭パターン別効果", "opening_patterns.png", draw_opening_patterns),
+    "time_slots": ("時間帯別分析", "time_slots.png", draw_time_slots),
+    "cta_effect": ("CTA効果比較", "cta_effect.png", draw_cta_effect),
+    "likes_distribution": ("いいね数分布", "likes_distribution.png", draw_likes_distribution),
+    "text_length_scatter": ("文字数×いいね数散布図", "text_length_scatter.png", draw_text_length_scatter),
+    "buzz_score": ("バズスコア分析", "buzz_score.png", draw_buzz_score),
+    "user_analysis": ("ユーザー分析", "user_analysis.png", draw_user_analysis),
+    "competitive_position": ("競合ポジション", "competitive_position.png", draw_competitive_position),
+}
 
-def generate_all_charts(df, output_dir="output/charts", df_raw=None):
-    """全チャートを生成"""
-    os.makedirs(output_dir, exist_ok=True)
 
-    chart_funcs = {
-        "カテゴリ別平均いいね数": chart_category_likes,
-        "冒頭パターン別効果": chart_opening_patterns,
-        "時間帯別分析": chart_time_slots,
-        "CTA効果比較": chart_cta_effect,
-        "いいね数分布": chart_likes_distribution,
-    }
+def render_chart(key, data, path):
+    """1チャートを描画する（プロセスプールのワーカーからも呼ばれる）"""
+    return CHARTS[key][2](data, path)
+
+
+# ========================================
+# 従来の1チャート単位の関数
+# ========================================
+
+def _chart_from_frame(key, df, output_dir, df_raw=None):
+    data = aggregate_chart_data(prepare_chart_data(df), df_raw)
+    return render_chart(key, data[key], os.path.join(output_dir, CHARTS[key][1]))
+
+
+def chart_category_likes(df, output_dir):
+    """カテゴリ別平均いいね数の横棒グラフ"""
+    return _chart_from_frame("category_likes", df, output_dir)
+
+
+def chart_opening_patterns(df, output_dir):
+    """冒頭パターン別効果の棒グラフ"""
+    return _chart_from_frame("opening_patterns", df, output_dir)
+
+
+def chart_time_slots(df, output_dir):
+    """時間帯別いいね数の折れ線グラフ"""
+    return _chart_from_frame("time_slots", df, output_dir)
+
+
+def chart_cta_effect(df, output_dir):
+    """CTA有無の比較棒グラフ"""
+    return _chart_from_frame("cta_effect", df, output_dir)
+
+
+def chart_likes_distribution(df, output_dir):
+    """いいね数の分布ヒストグラム"""
+    return _chart_from_frame("likes_distribution", df, output_dir)
 
+
+def chart_text_length_scatter(df, output_dir):
+    """文字数×いいね数の散布図"""
+    return _chart_from_frame("text_length_scatter", df, output_dir)
+
+
+def chart_buzz_score(df, output_dir):
+    """バズスコア×実いいね数の散布図 + スコア分布"""
+    return _chart_from_frame("buzz_score", df, output_dir)
+
+
+def chart_user_analysis(df_raw, output_dir):
+    """ユーザー分析: 投稿数×平均いいねバブルチャート"""
+    return render_chart("user_analysis", _user_stats(df_raw),
+                        os.path.join(output_dir, CHARTS["user_analysis"][1]))
+
+
+def chart_competitive_position(df, output_dir):
+    """競合ポジション四象限マトリクス"""
+    return _chart_from_frame("competitive_position", df, output_dir)
+
+
+# ========================================
+# 一括生成（指紋キャッシュ + 並列描画）
+# ========================================
+
+def frame_fingerprint(df, columns):
+    """DataFrameの指定列の内容ハッシュ（チャートの版も含める）"""
+    cols = [c for c in columns if c in df.columns]
+    h = hashlib.sha1(f"v{CHART_VERSION}:{len(df)}:{','.join(cols)}".encode("utf-8"))
+    if cols and len(df):
+        hashed = pd.util.hash_pandas_object(df[cols].astype(str), index=False)
+        h.update(hashed.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _render_pending(jobs, workers):
+    """(key, data, path) のリストを描画し、{key: パス or 例外} を返す"""
     results = {}
-    for name, func in chart_funcs.items():
+    if workers > 1 and len(jobs) > 1:
         try:
-            path = func(df, output_dir)
-            results[name] = path
-            print(f"  ✓ {name}: {path}")
-        except Exception as e:
-            print(f"  ✗ {name}: {e}")
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                futures = {key: pool.submit(render_chart, key, data, path) for key, data, path in jobs}
+                for key, future in futures.items():
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:
+                        results[key] = e
+        except (OSError, RuntimeError):
+            pass  # プールが使えない環境では残りを順番に描く
+    for key, data, path in jobs:
+        if key not in results:
+            try:
+                results[key] = render_chart(key, data, path)
+            except Exception as e:
+                results[key] = e
+    return results
 
-    # 新規チャート: 文字数散布図
-    try:
-        path = chart_text_length_scatter(df, output_dir)
-        results["文字数×いいね数散布図"] = path
-        print(f"  ✓ 文字数×いいね数散布図: {path}")
-    except Exception as e:
-        print(f"  ✗ 文字数×いいね数散布図: {e}")
 
-    # 新規チャート: バズスコア分析
-    try:
-        path = chart_buzz_score(df, output_dir)
-        results["バズスコア分析"] = path
-        print(f"  ✓ バズスコア分析: {path}")
-    except Exception as e:
-        print(f"  ✗ バズスコア分析: {e}")
+def generate_all_charts(df, output_dir="output/charts", df_raw=None, workers=None, force=False):
+    """全チャートを生成（入力が前回と同じチャートは既存PNGを使う）"""
+    os.makedirs(output_dir, exist_ok=True)
 
-    # 新規チャート: ユーザー分析
+    post_fp = frame_fingerprint(df, ["本文", "いいね数", "投稿日時"])
+    fingerprints = {key: post_fp for key in CHARTS if key != "user_analysis"}
     if df_raw is not None:
+        fingerprints["user_analysis"] = frame_fingerprint(df_raw, ["ユーザー名", "いいね数"])
+
+    manifest = {} if force else _load_manifest(output_dir)
+    paths = {key: os.path.join(output_dir, CHARTS[key][1]) for key in fingerprints}
+    cached = {key for key, fp in fingerprints.items()
+              if manifest.get(CHARTS[key][1]) == fp and os.path.exists(paths[key])}
+
+    outcomes = {key: paths[key] for key in cached}
+    pending = [key for key in fingerprints if key not in cached]
+    if pending:
         try:
-            path = chart_user_analysis(df_raw, output_dir)
-            results["ユーザー分析"] = path
-            print(f"  ✓ ユーザー分析: {path}")
+            data = aggregate_chart_data(prepare_chart_data(df), df_raw)
+            jobs = [(key, data[key], paths[key]) for key in pending]
+            outcomes.update(_render_pending(jobs, workers or os.cpu_count() or 1))
         except Exception as e:
-            print(f"  ✗ ユーザー分析: {e}")
-
-    # 新規チャート: 競合ポジション
-    try:
-        path = chart_competitive_position(df, output_dir)
-        results["競合ポジション"] = path
-        print(f"  ✓ 競合ポジション: {path}")
-    except Exception as e:
-        print(f"  ✗ 競合ポジション: {e}")
+            outcomes.update({key: e for key in pending})
 
+    results = {}
+    for key in CHARTS:
+        if key not in outcomes:
+            continue
+        name, filename, _ = CHARTS[key]
+        outcome = outcomes[key]
+        if isinstance(outcome, Exception):
+            manifest.pop(filename, None)
+            print(f"  ✗ {name}: {outcome}")
+            continue
+        results[name] = outcome
+        manifest[filename] = fingerprints[key]
+        print(f"  ✓ {name}: {outcome}" + ("（変更なし）" if key in cached else ""))
+
+    if pending:
+        _save_manifest(output_dir, manifest)
     return results
 
 
-if __name__ == "__main__":
-    input_file = "buzz_posts_20260215.csv"
-    if not os.path.exists(input_file):
-        input_file = "output/buzz_posts_20260215.xlsx"
+def main(input_file=None, output_dir="output/charts"):
+    """メイン処理"""
+    if input_file is None:
+        input_file = "buzz_posts_20260215.csv"
+        if not os.path.exists(input_file):
+            input_file = "output/buzz_posts_20260215.xlsx"
 
     if os.path.exists(input_file):
-        if input_file.endswith(".csv"):
-            df = pd.read_csv(input_file)
-        else:
-            df = pd.read_excel(input_file)
+        df = read_table(input_file)
         print(f"読み込み完了: {len(df)}件")
-        generate_all_charts(df)
+        generate_all_charts(df, output_dir)
     else:
         print("エラー: データファイルが見つかりません")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""score_weightsテーブルに保存する線形スコアの重みをデータから最適化する
+
+extract_featuresの結果を一度だけ二値/順序特徴の行列にし、
+log(いいね数+1) に対するリッジ回帰をK分割交差検証（分割ごとに並列）で正則化係数を選んで学習する。
+正則化係数は標準化した目的変数での検証MSEで選ぶ（相関は縮小の大きさを見ないので、相関で選ぶと
+最大の係数に寄って重みがほぼ0になる）。候補は投稿数に比例させる（XᵀX が投稿数に比例して大きくなるため）。
+学習した重みは版（version）ごとに score_weights へ保存し、
+LinearScorer がそれを読み込んで行列×ベクトル1回でスコアを出す。
+"""
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from buzz_score_v2 import extract_features
+from import_csv import DB_PATH, init_db
+
+INTERCEPT = "__intercept__"
+
+CATEGORIES = ["実績報告系", "ノウハウ系", "体験談系", "問題提起系", "ツール紹介系", "ニュース系", "その他"]
+OPENING_PATTERNS = ["疑問形", "数字提示", "煽り", "共感", "断定形", "呼びかけ", "その他"]
+# calculate_buzz_score_v2 の文字数の区切りに合わせる
+LENGTH_BINS = [81, 131, 171, 221, 301]
+
+FEATURE_NAMES = (
+    [f"category:{c}" for c in CATEGORIES]
+    + [f"opening:{p}" for p in OPENING_PATTERNS]
+    + [f"length>={b}" for b in LENGTH_BINS]
+    + ["line_breaks>=3", "line_breaks>=10",
+       "emoji>=1", "emoji>=4",
+       "power_words>=1", "power_words>=2", "power_words>=3",
+       "has_numbers", "has_money", "has_cta", "has_story",
+       "emotion>=1", "emotion>=2", "secret>=1", "secret>=2"]
+)
+
+# 正則化係数の候補（投稿数に対する比。lambda_grid で投稿数を掛ける）
+LAMBDA_SCALES = [1e-4, 3e-4, 1e-3, 3e-3, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0]
+
+
+# ========================================
+# 特徴量行列
+# ========================================
+
+def encode_features(features):
+    """extract_featuresの結果（dictのリスト）を (投稿数 × 特徴数) の0/1行列に変換"""
+    n = len(features)
+    cols = {}
+    cat = np.array([f["category"] for f in features], dtype=object)
+    opening = np.array([f["opening_pattern"] for f in features], dtype=object)
+    for c in CATEGORIES:
+        cols[f"category:{c}"] = cat == c
+    for p in OPENING_PATTERNS:
+        cols[f"opening:{p}"] = opening == p
+
+    def column(key):
+        return np.fromiter((f[key] for f in features), dtype=np.int64, count=n)
+
+    length = column("length")
+    for b in LENGTH_BINS:
+        cols[f"length>={b}"] = length >= b
+    line_breaks = column("line_breaks")
+    cols["line_breaks>=3"] = line_breaks >= 3
+    cols["line_breaks>=10"] = line_breaks >= 10
+    emoji = column("emoji_count")
+    cols["emoji>=1"] = emoji >= 1
+    cols["emoji>=4"] = emoji >= 4
+    pw = column("pw_count")
+    for k in (1, 2, 3):
+        cols[f"power_words>={k}"] = pw >= k
+    for key in ("has_numbers", "has_money", "has_cta", "has_story"):
+        cols[key] = column(key) > 0
+    emotion = column("emotion_count")
+    cols["emotion>=1"] = emotion >= 1
+    cols["emotion>=2"] = emotion >= 2
+    secret = column("secret_count")
+    cols["secret>=1"] = secret >= 1
+    cols["secret>=2"] = secret >= 2
+
+    return np.column_stack([cols[name] for name in FEATURE_NAMES]).astype(np.float32)
+
+
+def build_feature_matrix(texts):
+    """本文のリストから特徴量行列を作る（特徴抽出は1投稿1回だけ）"""
+    return encode_features([extract_features(str(t or "")) for t in texts])
+
+
+# ========================================
+# リッジ回帰 + 交差検証
+# ========================================
+
+def _ridge_path(X, y, lambdas):
+    """中心化したX, yに対し、複数の正則化係数での重みを固有値分解1回でまとめて解く"""
+    x_mean = X.mean(axis=0)
+    y_mean = y.mean()
+    Xc = X - x_mean
+    eigval, eigvec = np.linalg.eigh(Xc.T @ Xc)
+    proj = eigvec.T @ (Xc.T @ (y - y_mean))
+    weights = []
+    for lam in lambdas:
+        w = eigvec @ (proj / (eigval + lam))
+        weights.append((w, y_mean - x_mean @ w))
+    return weights
+
+
+def lambda_grid(n):
+    """投稿数 n に合わせた正則化係数の候補"""
+    return [s * max(n, 1) for s in LAMBDA_SCALES]
+
+
+def _fold_scores(X, y, train, test, lambdas):
+    """1分割分：各正則化係数での (検証MSE, 検証相関) のリストを返す"""
+    path = _ridge_path(X[train], y[train], lambdas)
+    scores = []
+    for w, b in path:
+        pred = X[test] @ w + b
+        mse = float(np.mean((pred - y[test]) ** 2))
+        if pred.std() == 0 or y[test].std() == 0:
+            scores.append((mse, 0.0))
+        else:
+            scores.append((mse, float(np.corrcoef(pred, y[test])[0, 1])))
+    return scores
+
+
+def fit_weights(X, likes, n_folds=5, lambdas=None, seed=42, n_jobs=None):
+    """交差検証で正則化係数を選び、全データで重みを学習する
+
+    正則化係数は検証R²（標準化した log(いいね数+1) での 1 − MSE）が最大のもの。
+    lambdas を省略すると lambda_grid(投稿数)。
+    戻り値: {"weights", "intercept", "lambda", "cv_r2", "cv_corr", "cv_by_lambda"（λ → 検証R²）}
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.log1p(np.maximum(np.asarray(likes, dtype=np.float64), 0))
+    n = len(y)
+    n_folds = max(2, min(n_folds, n))
+    if lambdas is None:
+        lambdas = lambda_grid(n)
+    # 目的変数を標準化して検証MSEを比べる（リッジの解は y の定数倍に比例するので、選ぶ係数は変わらない）
+    scale = y.std() or 1.0
+    z = (y - y.mean()) / scale
+
+    rng = np.random.default_rng(seed)
+    fold_of = rng.permutation(n) % n_folds
+    splits = [(np.flatnonzero(fold_of != k), np.flatnonzero(fold_of == k)) for k in range(n_folds)]
+
+    workers = n_jobs or min(n_folds, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fold_results = list(pool.map(lambda s: _fold_scores(X, z, s[0], s[1], lambdas), splits))
+
+    cv_mse, cv_corr = np.mean(np.array(fold_results), axis=0).T
+    cv_r2 = 1.0 - cv_mse
+    best = int(np.argmax(cv_r2))
+    (w, b), = _ridge_path(X, y, [lambdas[best]])
+    return {
+        "weights": w,
+        "intercept": float(b),
+        "lambda": lambdas[best],
+        "cv_r2": float(cv_r2[best]),
+        "cv_corr": float(cv_corr[best]),
+        "cv_by_lambda": dict(zip(lambdas, cv_r2.tolist())),
+    }
+
+
+# ========================================
+# score_weights への保存・読み込み
+# ========================================
+
+def save_weights(result, version=None, sample_size=0, db_path=DB_PATH):
+    """学習結果を score_weights（と score_history）に版として保存し、版名を返す"""
+    if version is None:
+        version = f"linear_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    rows = [(version, INTERCEPT, result["intercept"])]
+    rows += [(version, name, float(w)) for name, w in zip(FEATURE_NAMES, result["weights"])]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM score_weights WHERE version = ?", (version,))
+    conn.executemany("INSERT INTO score_weights (version, feature, weight) VALUES (?, ?, ?)", rows)
+    conn.execute(
+        "INSERT INTO score_history (version, correlation, sample_size, date, notes) VALUES (?, ?, ?, ?, ?)",
+        (version, result["cv_corr"], sample_size, datetime.now().isoformat(),
+         f"ridge lambda={result['lambda']:g} / {len(FEATURE_NAMES)}特徴 / 交差検証相関(log いいね)"
+         f" / 検証R² {result['cv_r2']:.3f}")
+    )
+    conn.commit()
+    conn.close()
+    return version
+
+
+def latest_version(db_path=DB_PATH):
+    """最後に保存された重みの版名（なければNone）"""
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT version FROM score_weights ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    conn.close()
+    return row[0] if row else None
+
+
+class LinearScorer:
+    """score_weights の重みで特徴量行列をスコア化する（予測 log(いいね数+1)）"""
+
+    def __init__(self, version, weights, intercept):
+        self.version = version
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.intercept = float(intercept)
+
+    @classmethod
+    def load(cls, version=None, db_path=DB_PATH):
+        """指定した版（省略時は最新版）を読み込む。重みがなければNone"""
+        version = version or latest_version(db_path)
+        if version is None:
+            return None
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(
+            "SELECT feature, weight FROM score_weights WHERE version = ?", (version,)
+        ).fetchall()
+        conn.close()
+        table = dict(rows)
+        if not table:
+            return None
+        # 定義にない特徴は0、保存されていない特徴も0として扱う
+        weights = [table.get(name, 0.0) for name in FEATURE_NAMES]
+        return cls(version, weights, table.get(INTERCEPT, 0.0))
+
+    def score_matrix(self, X):
+        """特徴量行列 → 予測 log(いいね数+1)（行列×ベクトル1回）"""
+        return np.asarray(X, dtype=np.float32) @ self.weights + self.intercept
+
+    def score_texts(self, texts):
+        return self.score_matrix(build_feature_matrix(texts))
+
+    def score_many(self, texts):
+        """複数件のスコアと、効いた特徴ごとの寄与のリスト（特徴量行列1つ・行列×ベクトル1回）"""
+        X = build_feature_matrix(texts)
+        preds = self.score_matrix(X)
+        results = []
+        for x, pred in zip(X, preds.tolist()):
+            factors = {name: round(float(w), 3)
+                       for name, w, on in zip(FEATURE_NAMES, self.weights, x) if on}
+            results.append({
+                "version": self.version,
+                "log_likes": round(pred, 3),
+                "predicted_likes": round(float(np.expm1(pred)), 1),
+                "factors": factors,
+            })
+        return results
+
+    def score(self, text):
+        """1件のスコアと、効いた特徴ごとの寄与を返す"""
+        return self.score_many([text])[0]
+
+
+# ========================================
+# メイン
+# ========================================
+
+def optimize(db_path=DB_PATH, n_folds=5):
+    """DB全体から重みを学習して保存する。版名を返す"""
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT text, likes FROM posts WHERE likes > 0").fetchall()
+    conn.close()
+    if len(rows) < n_folds * 2:
+        print(f"学習データが不足しています（{len(rows)}件）。")
+        return None
+
+    texts = [r[0] for r in rows]
+    likes = np.array([r[1] for r in rows], dtype=np.float64)
+
+    print(f"特徴量を抽出中... {len(texts)}件")
+    X = build_feature_matrix(texts)
+
+    print(f"リッジ回帰を{n_folds}分割交差検証で学習中...")
+    result = fit_weights(X, likes, n_folds=n_folds)
+    for lam, r2 in result["cv_by_lambda"].items():
+        mark = " ←" if lam == result["lambda"] else ""
+        print(f"  λ={lam:<9.4g} 検証R² {r2:+.3f}{mark}")
+
+    version = save_weights(result, sample_size=len(texts), db_path=db_path)
+    print(f"\nscore_weights に保存: {version}（検証R² {result['cv_r2']:+.3f} / 交差検証相関 {result['cv_corr']:+.3f}）")
+
+    order = np.argsort(-np.abs(result["weights"]))[:10]
+    print("影響の大きい特徴 TOP10:")
+    for i in order:
+        print(f"  {FEATURE_NAMES[i]:<20} {result['weights'][i]:+.3f}")
+    return version
+
+
+if __name__ == "__main__":
+    optimize()
@@ -12,8 +12,16 @@
 import os
 import re
 from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
 
+from char_classes import char_stats_many
+from classifier import classifier_for
+
+SENTENCE_SPLIT = re.compile(r'[。\.！!？?]')
+LIST_PATTERN = r'^[・\-▶▸✅☑✓◆■●①②③④⑤⑥⑦⑧⑨⑩\d+[\.\)）]]'
+CASUAL_MARKERS = ['〜だよね', '〜だわ', '〜かな', '〜んだけど', '〜って', 'w', 'www']
+
 
 class WritingAnalyzer:
     """投稿文章の詳細分析クラス"""
@@ -61,12 +69,8 @@ class WritingAnalyzer:
 
         first_line = lines[0]
 
-        # パターン判定
-        pattern = "その他"
-        for name, regex in self.opening_patterns.items():
-            if re.search(regex, first_line):
-                pattern = name
-                break
+        # パターン判定（定義順で最初に一致したもの）
+        pattern = classifier_for(self.opening_patterns).classify(first_line)
 
         # 役割を推定
         role_map = {
@@ -171,11 +175,7 @@ class WritingAnalyzer:
         last_sentence = sentences[-1]
 
         # パターン判定
-        pattern = "その他"
-        for name, regex in self.closing_patterns.items():
-            if re.search(regex, text[-50:]):  # 最後50文字で判定
-                pattern = name
-                break
+        pattern = classifier_for(self.closing_patterns).classify(text[-50:])  # 最後50文字で判定
 
         # 効果を推定
         effect_map = {
@@ -300,35 +300,124 @@ class WritingAnalyzer:
             "success_factor": success_factor
         }
 
+    # ========================================
+    # 一括分析（大量の投稿を列単位でまとめて処理）
+    # ========================================
+
+    @staticmethod
+    def split_sentences(texts: List[str]) -> Dict[str, any]:
+        """各投稿を1回だけ行・文に分割し、文の長さを1本の配列（+ 投稿ごとの開始位置）にまとめる"""
+        first_lines, line_counts, lengths, counts = [], [], [], []
+        for text in texts:
+            lines = [l for l in (l.strip() for l in text.split('\n')) if l]
+            first_lines.append(lines[0] if lines else "")
+            line_counts.append(len(lines))
+            sent = [len(x) for x in (x.strip() for x in SENTENCE_SPLIT.split(text)) if x]
+            lengths.extend(sent)
+            counts.append(len(sent))
+        counts = np.array(counts, dtype=np.int64)
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return {
+            "first_lines": first_lines,
+            "line_counts": np.array(line_counts, dtype=np.int64),
+            "lengths": np.array(lengths, dtype=np.float64),
+            "offsets": offsets,
+        }
+
+    @staticmethod
+    def _first_match(series: pd.Series, patterns: Dict[str, str], default: str, flags: int = 0) -> np.ndarray:
+        """パターンを定義順に試し、最初に一致した名前を返す（どれにも一致しなければdefault）"""
+        return classifier_for(patterns, default, flags).classify_series(series).to_numpy()
+
+    def analyze_many(self, texts: List[str]) -> pd.DataFrame:
+        """複数投稿の冒頭・構成・締め・リズムを一括分析（1行1投稿のDataFrame）
+
+        analyze_opening / analyze_structure / analyze_closing / analyze_rhythm と同じ判定を
+        投稿ごとのループではなく列単位で行う。感情の流れ・成功要因は analyze_post を使う。
+        """
+        texts = ["" if t is None else str(t) for t in texts]
+        s = pd.Series(texts, dtype=object)
+        n = len(texts)
+        tokens = self.split_sentences(texts)
+        lengths, offsets = tokens["lengths"], tokens["offsets"]
+        sentence_count = np.diff(offsets)
+        has_sentences = sentence_count > 0
+
+        # 文の長さの平均と平均絶対偏差（投稿ごとの区間で集計）
+        seg = np.repeat(np.arange(n), sentence_count)
+        avg_length = np.bincount(seg, weights=lengths, minlength=n) / np.maximum(sentence_count, 1)
+        deviation = np.abs(lengths - avg_length[seg])
+        variation = np.bincount(seg, weights=deviation, minlength=n) / np.maximum(sentence_count, 1)
+
+        total_chars = s.str.len().to_numpy(dtype=np.int64)
+        has_list = s.str.contains(LIST_PATTERN, regex=True, flags=re.MULTILINE).to_numpy(dtype=bool)
+        has_quote = s.str.contains(r'「.*?」', regex=True).to_numpy(dtype=bool)
+        structure_type = np.select(
+            [has_list, sentence_count <= 3, has_quote],
+            ["リスト型（箇条書きで整理）", "短文完結型（インパクト重視）", "引用型（会話や引用で臨場感）"],
+            default="説明型（論理的に展開）",
+        )
+
+        chars = char_stats_many(s)
+        exclamation = chars["exclamation"].to_numpy()
+        question = chars["question"].to_numpy()
+        ellipsis = chars["ellipsis"].to_numpy()
+        casual = sum(s.str.count(re.escape(m)) for m in CASUAL_MARKERS).to_numpy() if n else np.zeros(0)
+
+        rhythm = np.select([variation < 10, variation < 30],
+                           ["単調（文の長さが均一）", "バランス型（適度な長短の変化）"],
+                           default="メリハリ型（文の長短が大きく変化）")
+        punctuation = np.select(
+            [exclamation >= 3, question >= 2, ellipsis >= 2],
+            ["感嘆型（！の多用で興奮を表現）", "疑問型（？で対話を誘発）", "余韻型（…で間を作る）"],
+            default="標準型（バランスの取れた句読点）",
+        )
+
+        first_lines = pd.Series(tokens["first_lines"], dtype=object)
+        opening = self._first_match(first_lines, self.opening_patterns, "その他")
+        closing = self._first_match(s.str[-50:], self.closing_patterns, "その他")
+
+        return pd.DataFrame({
+            "total_chars": total_chars,
+            "line_count": tokens["line_counts"],
+            "sentence_count": sentence_count,
+            "opening_pattern": np.where(first_lines.to_numpy() != "", opening, "不明"),
+            "structure_type": structure_type,
+            "has_list": has_list,
+            "has_url": s.str.contains(r'https?://', regex=True).to_numpy(dtype=bool),
+            "has_quote": has_quote,
+            "number_count": s.str.count(r'\d+').to_numpy(),
+            "closing_pattern": np.where(has_sentences, closing, "不明"),
+            "rhythm": np.where(has_sentences, rhythm, "不明"),
+            "variation": np.round(variation, 1),
+            "avg_sentence_length": np.round(avg_length, 1),
+            "punctuation_style": np.where(has_sentences, punctuation, "不明"),
+            "exclamation_count": exclamation,
+            "question_count": question,
+            "ellipsis_count": ellipsis,
+            "casual_count": casual,
+            "casual_degree": np.select([casual >= 3, casual >= 1], ["高", "中"], default="低"),
+        })
+
     def compare_writing_styles(self, posts_a: List[Dict], posts_b: List[Dict],
                                label_a: str = "グループA", label_b: str = "グループB") -> Dict[str, any]:
         """2つの投稿グループの文章スタイルを比較"""
 
         def aggregate_analyses(posts):
             """複数投稿の分析結果を集計"""
-            opening_patterns = []
-            structure_types = []
-            closing_patterns = []
-            rhythm_types = []
-            total_chars = []
-            casual_degrees = []
-
-            for post in posts:
-                analysis = self.analyze_post(post['text'], post.get('metrics', {}))
-                opening_patterns.append(analysis['opening']['pattern'])
-                structure_types.append(analysis['structure']['structure_type'])
-                closing_patterns.append(analysis['closing']['pattern'])
-                rhythm_types.append(analysis['rhythm']['rhythm'])
-                total_chars.append(analysis['structure']['stats']['total_chars'])
-                casual_degrees.append(analysis['rhythm']['casual_degree'])
+            frame = self.analyze_many([post['text'] for post in posts])
+
+            def share(column):
+                return frame[column].value_counts(normalize=True) * 100
 
             return {
-                "opening_distribution": pd.Series(opening_patterns).value_counts(normalize=True) * 100,
-                "structure_distribution": pd.Series(structure_types).value_counts(normalize=True) * 100,
-                "closing_distribution": pd.Series(closing_patterns).value_counts(normalize=True) * 100,
-                "rhythm_distribution": pd.Series(rhythm_types).value_counts(normalize=True) * 100,
-                "avg_chars": sum(total_chars) / len(total_chars) if total_chars else 0,
-                "casual_high_rate": casual_degrees.count('高') / len(casual_degrees) * 100 if casual_degrees else 0
+                "opening_distribution": share("opening_pattern"),
+                "structure_distribution": share("structure_type"),
+                "closing_distribution": share("closing_pattern"),
+                "rhythm_distribution": share("rhythm"),
+                "avg_chars": frame["total_chars"].mean() if len(frame) else 0,
+                "casual_high_rate": (frame["casual_degree"] == "高").mean() * 100 if len(frame) else 0
             }
 
         stats_a = aggregate_analyses(posts_a)